@@ -0,0 +1,173 @@
+"""
+Admission control of parse requests for MonkeyOCR API
+"""
+import math
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+import fitz
+
+# Files parsed as a single page
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png'}
+
+
+def count_pages(file_path: str) -> int:
+    """
+    Count the pages of an uploaded file without parsing it
+
+    Args:
+        file_path: PDF or image file
+
+    Returns:
+        Number of pages
+
+    Raises:
+        ValueError: If the file is not a readable PDF, or needs a password
+    """
+    if Path(file_path).suffix.lower() in IMAGE_EXTENSIONS:
+        return 1
+    try:
+        # Only the page tree is read, the pages are not loaded
+        with fitz.open(file_path, filetype='pdf') as doc:
+            needs_pass = doc.needs_pass
+            page_count = doc.page_count
+    except Exception as e:
+        raise ValueError(f"Can not read the PDF: {e}")
+    if needs_pass:
+        raise ValueError("Encrypted PDFs are not supported")
+    return page_count
+
+
+class Rejected(Exception):
+    """A request the server does not take now, or at all"""
+
+    def __init__(self, status_code: int, detail: str, retry_after: Optional[int] = None):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+        self.retry_after = retry_after
+
+
+class Ticket:
+    """The pages of one admitted request"""
+
+    def __init__(self, pages: int):
+        self.pages = pages
+        self.admitted_at = time.time()
+        self.started_at: Optional[float] = None
+
+
+class AdmissionController:
+    """
+    Bounded queue of parse work measured in pages
+
+    Requests are admitted while the pages queued and running stay under
+    max_queued_pages, a request arriving at an empty server is always taken.
+    The throughput used for the wait estimates is a moving average of the
+    pages per second of finished requests times the parallel slots.
+    """
+
+    def __init__(self, max_queued_pages: int, max_pages_per_request: int, slots: int,
+                 initial_pages_per_second: float = 1.0, smoothing: float = 0.2):
+        """
+        Args:
+            max_queued_pages: Pages queued and running above which requests are rejected, 0 for no limit
+            max_pages_per_request: Pages of a single request above which it is rejected, 0 for no limit
+            slots: Requests processed at the same time
+            initial_pages_per_second: Throughput of one slot assumed until requests finished
+            smoothing: Weight of the latest request in the moving average
+        """
+        self.max_queued_pages = max_queued_pages
+        self.max_pages_per_request = max_pages_per_request
+        self.slots = max(1, slots)
+        self.smoothing = smoothing
+        self._pages_per_second = initial_pages_per_second
+        self._lock = threading.Lock()
+        self._queued_requests = 0
+        self._queued_pages = 0
+        self._running_requests = 0
+        self._running_pages = 0
+        self._finished_requests = 0
+        self._rejected_requests = 0
+
+    def _service_rate(self) -> float:
+        return max(self._pages_per_second * self.slots, 1e-3)
+
+    def admit(self, pages: int, force: bool = False) -> Ticket:
+        """
+        Take a request into the queue
+
+        Args:
+            pages: Pages of the request
+            force: Admit it regardless of the limits, for work accepted before a restart
+
+        Returns:
+            The ticket of the request, passed to start and finish
+
+        Raises:
+            Rejected: 413 if the request has too many pages, 429 with a
+                Retry-After if the queue is full
+        """
+        with self._lock:
+            if not force and self.max_pages_per_request and pages > self.max_pages_per_request:
+                self._rejected_requests += 1
+                raise Rejected(
+                    413, f"Document has {pages} pages, at most {self.max_pages_per_request} are accepted"
+                )
+            pending_pages = self._queued_pages + self._running_pages
+            if not force and self.max_queued_pages and pending_pages > 0 \
+                    and pending_pages + pages > self.max_queued_pages:
+                self._rejected_requests += 1
+                # Time until enough of the pending pages are done for this request to fit
+                excess_pages = pending_pages + pages - self.max_queued_pages
+                retry_after = max(1, math.ceil(excess_pages / self._service_rate()))
+                raise Rejected(
+                    429, f"Server is busy with {pending_pages} pages, retry in {retry_after}s", retry_after
+                )
+            self._queued_requests += 1
+            self._queued_pages += pages
+        return Ticket(pages)
+
+    def start(self, ticket: Ticket):
+        """Move an admitted request from the queue to the running ones"""
+        with self._lock:
+            ticket.started_at = time.time()
+            self._queued_requests -= 1
+            self._queued_pages -= ticket.pages
+            self._running_requests += 1
+            self._running_pages += ticket.pages
+
+    def finish(self, ticket: Ticket):
+        """Release the pages of a request, also if it failed or never started"""
+        now = time.time()
+        with self._lock:
+            if ticket.started_at is None:
+                self._queued_requests -= 1
+                self._queued_pages -= ticket.pages
+                return
+            self._running_requests -= 1
+            self._running_pages -= ticket.pages
+            self._finished_requests += 1
+            elapsed = now - ticket.started_at
+            if elapsed > 0 and ticket.pages > 0:
+                self._pages_per_second += self.smoothing * (ticket.pages / elapsed - self._pages_per_second)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Queue depth, throughput and estimated wait of a new request"""
+        with self._lock:
+            pending_pages = self._queued_pages + self._running_pages
+            return {
+                "queued_requests": self._queued_requests,
+                "queued_pages": self._queued_pages,
+                "running_requests": self._running_requests,
+                "running_pages": self._running_pages,
+                "max_queued_pages": self.max_queued_pages,
+                "max_pages_per_request": self.max_pages_per_request,
+                "pages_per_second": round(self._service_rate(), 3),
+                "estimated_wait_seconds": round(pending_pages / self._service_rate(), 1),
+                "saturated": bool(self.max_queued_pages) and pending_pages >= self.max_queued_pages,
+                "finished_requests": self._finished_requests,
+                "rejected_requests": self._rejected_requests,
+            }
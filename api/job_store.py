@@ -0,0 +1,201 @@
+"""
+SQLite-backed store of parse jobs for MonkeyOCR API
+"""
+import json
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Dict, List, Optional, Tuple
+
+# Job states, a job moves queued -> running -> done | failed
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+# Columns holding JSON, decoded when a job is read
+JSON_COLUMNS = ('options', 'artifacts')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    state TEXT NOT NULL,
+    filename TEXT NOT NULL,
+    input_path TEXT NOT NULL,
+    output_dir TEXT NOT NULL,
+    options TEXT NOT NULL DEFAULT '{}',
+    stage TEXT,
+    progress REAL NOT NULL DEFAULT 0,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    artifacts TEXT,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_state_created ON jobs (state, created_at);
+"""
+
+
+class JobStore:
+    """
+    Job table shared by the request handlers and the job workers
+
+    One connection is used from every thread, calls are serialized by a lock.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock:
+            # WAL lets readers go on while a worker writes
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(SCHEMA)
+
+    def _row_to_job(self, row: Optional[sqlite3.Row]) -> Optional[Dict[str, Any]]:
+        if row is None:
+            return None
+        job = dict(row)
+        for column in JSON_COLUMNS:
+            if job[column] is not None:
+                job[column] = json.loads(job[column])
+        return job
+
+    def create(self, filename: str, input_path: str, output_dir: str,
+               options: Optional[Dict[str, Any]] = None, job_id: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Add a queued job
+
+        Args:
+            filename: Uploaded filename
+            input_path: Where the uploaded file is kept until the job is done
+            output_dir: Directory the results are written to
+            options: Parse options of the job, stored as JSON
+            job_id: Id of the job, a new one is generated if not given
+
+        Returns:
+            The job
+        """
+        job_id = job_id or uuid.uuid4().hex
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO jobs (id, state, filename, input_path, output_dir, options, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (job_id, QUEUED, filename, input_path, output_dir, json.dumps(options or {}), time.time())
+            )
+        return self.get(job_id)
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Get a job by id, None if there is no such job"""
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._row_to_job(row)
+
+    def claim_next(self) -> Optional[Dict[str, Any]]:
+        """
+        Mark the oldest queued job running and return it
+
+        Returns:
+            The claimed job, None if no job is queued
+        """
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT id FROM jobs WHERE state = ? ORDER BY created_at LIMIT 1", (QUEUED,)
+                ).fetchone()
+                if row is None:
+                    self._conn.execute("COMMIT")
+                    return None
+                self._conn.execute(
+                    "UPDATE jobs SET state = ?, stage = NULL, progress = 0, error = NULL, "
+                    "attempts = attempts + 1, started_at = ?, finished_at = NULL WHERE id = ?",
+                    (RUNNING, time.time(), row['id'])
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return self.get(row['id'])
+
+    def update(self, job_id: str, **fields: Any):
+        """
+        Set some columns of a job
+
+        Args:
+            job_id: Id of the job
+            **fields: Column values, the JSON columns are encoded
+        """
+        for column in JSON_COLUMNS:
+            if fields.get(column) is not None:
+                fields[column] = json.dumps(fields[column])
+        assignments = ", ".join(f"{column} = ?" for column in fields)
+        with self._lock:
+            self._conn.execute(f"UPDATE jobs SET {assignments} WHERE id = ?", (*fields.values(), job_id))
+
+    def set_progress(self, job_id: str, stage: str, progress: float):
+        """Record the stage a running job is in and its progress from 0 to 1"""
+        self.update(job_id, stage=stage, progress=progress)
+
+    def finish(self, job_id: str, artifacts: Dict[str, Any]):
+        """Mark a job done with the locations of its results"""
+        self.update(job_id, state=DONE, stage=None, progress=1.0, artifacts=artifacts, finished_at=time.time())
+
+    def fail(self, job_id: str, error: str):
+        """Mark a job failed"""
+        self.update(job_id, state=FAILED, error=error, finished_at=time.time())
+
+    def requeue_running(self, max_attempts: Optional[int] = None) -> Tuple[List[str], List[str]]:
+        """
+        Queue the jobs left running by a previous process again
+
+        Args:
+            max_attempts: Jobs claimed this many times are failed instead, so that a
+                job that takes the process down is not run again forever. Defaults to no limit
+
+        Returns:
+            Ids of the requeued jobs and ids of the failed ones
+        """
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = self._conn.execute(
+                    "SELECT id, attempts FROM jobs WHERE state = ?", (RUNNING,)
+                ).fetchall()
+                requeued = [row['id'] for row in rows if max_attempts is None or row['attempts'] < max_attempts]
+                failed = [row for row in rows if row['id'] not in requeued]
+                self._conn.executemany(
+                    "UPDATE jobs SET state = ?, stage = NULL, progress = 0 WHERE id = ?",
+                    [(QUEUED, job_id) for job_id in requeued]
+                )
+                self._conn.executemany(
+                    "UPDATE jobs SET state = ?, error = ?, finished_at = ? WHERE id = ?",
+                    [(FAILED, f"Interrupted in {row['attempts']} attempts", time.time(), row['id'])
+                     for row in failed]
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return requeued, [row['id'] for row in failed]
+
+    def list_jobs(self, state: str) -> List[Dict[str, Any]]:
+        """Jobs in a state, oldest first"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT * FROM jobs WHERE state = ? ORDER BY created_at", (state,)
+            ).fetchall()
+        return [self._row_to_job(row) for row in rows]
+
+    def count(self, state: str) -> int:
+        """Number of jobs in a state"""
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM jobs WHERE state = ?", (state,)).fetchone()[0]
+
+    def close(self):
+        """Close the database connection"""
+        with self._lock:
+            self._conn.close()
@@ -9,30 +9,52 @@ from dotenv import load_dotenv
 # Load environment variables from .env file
 load_dotenv()
 import io
+import json
 import tempfile
-from typing import Optional, List, Dict
+import uuid
+from typing import Optional, List, Dict, Tuple
 from pathlib import Path
 import asyncio
 from concurrent.futures import ThreadPoolExecutor
 from contextlib import asynccontextmanager
 
-from fastapi import FastAPI, UploadFile, File, HTTPException, Form
-from fastapi.responses import JSONResponse, FileResponse
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, FileResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from pydantic import BaseModel
-import zipfile
 import shutil
+import threading
 import time
 
 from magic_pdf.model.custom_model import MonkeyOCR
 from magic_pdf.data.data_reader_writer import FileBasedDataWriter
-from parse import single_task_recognition, parse_pdf
+from parse import single_task_recognition, parse_pdf, parse_pdf_batch, parse_overlays
+from magic_pdf.data.utils import page_ranges_to_ids, parse_page_ranges
+from magic_pdf.libs.draw_bbox import OVERLAY_SUFFIXES
+from magic_pdf.pdf_parse_union_core_v2_llm import shutdown_page_pools
 import uvicorn
 try:
     from .s3_utils import get_s3_client, S3Client
 except ImportError:
     # For running as standalone script
     from s3_utils import get_s3_client, S3Client
+try:
+    from .zip_stream import ZipStream, zip_members
+except ImportError:
+    from zip_stream import ZipStream, zip_members
+try:
+    from .job_store import JobStore, DONE, QUEUED
+except ImportError:
+    from job_store import JobStore, DONE, QUEUED
+try:
+    from .admission import AdmissionController, Rejected, Ticket, count_pages
+except ImportError:
+    from admission import AdmissionController, Rejected, Ticket, count_pages
+try:
+    from .uploads import Upload, UploadRejected, form_bool, receive_upload, receive_uploads
+except ImportError:
+    from uploads import Upload, UploadRejected, form_bool, receive_upload, receive_uploads
 
 # Response models
 class TaskResponse(BaseModel):
@@ -49,11 +71,69 @@ class ParseResponse(BaseModel):
     files: Optional[List[str]] = None
     download_url: Optional[str] = None
     file_urls: Optional[Dict[str, str]] = None  # Map of filename to S3 URL
+    bytes_uploaded: Optional[int] = None  # Bytes sent to S3 for this document
+    pending_files: Optional[List[str]] = None  # Overlays still being drawn after the response
+
+class BatchDocumentResult(BaseModel):
+    filename: str
+    success: bool
+    message: Optional[str] = None
+    files: Optional[List[str]] = None
+    download_url: Optional[str] = None  # ZIP of this document, with archive=documents
+    file_urls: Optional[Dict[str, str]] = None  # Map of filename to S3 URL
+
+class BatchParseResponse(BaseModel):
+    success: bool
+    message: str
+    documents: List[BatchDocumentResult]
+    download_url: Optional[str] = None  # ZIP of all documents, with archive=batch
+    bytes_uploaded: Optional[int] = None
+
+class JobResponse(BaseModel):
+    job_id: str
+    state: str
+    filename: str
+    stage: Optional[str] = None
+    progress: float = 0.0
+    attempts: int = 0
+    error: Optional[str] = None
+    created_at: float
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    status_url: str
+    artifacts_url: str
+
+class JobArtifactsResponse(BaseModel):
+    job_id: str
+    files: List[str]
+    download_url: str
+    file_urls: Optional[Dict[str, str]] = None  # Map of filename to URL
+    bytes_uploaded: Optional[int] = None
+    parse_time: Optional[float] = None  # Seconds spent parsing
 
 # Global model instance
 monkey_ocr_model = None
-executor = ThreadPoolExecutor(max_workers=2)
+executor_workers = 2
+executor = ThreadPoolExecutor(max_workers=executor_workers)
+# Debug overlays are drawn here after /parse responded, off the parsing workers
+overlay_executor = ThreadPoolExecutor(max_workers=1)
 s3_client: Optional[S3Client] = None
+# Jobs submitted to POST /jobs, kept in SQLite so that they survive a restart
+job_store: Optional[JobStore] = None
+job_workers: List[threading.Thread] = []
+job_wakeup = threading.Event()
+job_stop = threading.Event()
+job_worker_count = int(os.getenv("JOB_WORKERS", "1"))
+# Jobs interrupted this many times, e.g. by the process being killed while parsing them, are failed on restart
+job_max_attempts = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+# Admission tickets of the queued jobs, taken by the worker that runs the job
+job_tickets: Dict[str, Ticket] = {}
+# Requests are turned away once the executor and the job workers have this many pages to go
+admission = AdmissionController(
+    max_queued_pages=int(os.getenv("MAX_QUEUED_PAGES", "2000")),
+    max_pages_per_request=int(os.getenv("MAX_PAGES_PER_REQUEST", "1000")),
+    slots=executor_workers + job_worker_count
+)
 
 def initialize_model():
     """Initialize MonkeyOCR model"""
@@ -78,6 +158,27 @@ async def lifespan(app: FastAPI):
             print("✅ S3 client initialized successfully")
         else:
             print("⚠️  S3 not configured, using local file storage")
+        
+        # ZIPs offered before the restart stay downloadable until they expire
+        os.makedirs(downloads_dir, exist_ok=True)
+        prune_zip_downloads()
+        
+        # Resume the jobs of a previous run and start draining the queue
+        global job_store
+        os.makedirs(jobs_dir, exist_ok=True)
+        job_store = JobStore(os.getenv("JOB_DB_PATH", os.path.join(jobs_dir, "jobs.sqlite3")))
+        requeued, failed = job_store.requeue_running(job_max_attempts or None)
+        if requeued:
+            print(f"🔁 Requeued {len(requeued)} interrupted job(s)")
+        if failed:
+            print(f"⚠️ Failed {len(failed)} job(s) interrupted {job_max_attempts} times")
+        # The jobs accepted before the restart count against the queue, they are not turned away
+        for job in job_store.list_jobs(QUEUED):
+            job_tickets[job['id']] = admission.admit(job['options'].get('pages', 1), force=True)
+        for i in range(job_worker_count):
+            worker = threading.Thread(target=run_job_worker, name=f"job_worker_{i}", daemon=True)
+            worker.start()
+            job_workers.append(worker)
     except Exception as e:
         print(f"❌ Failed to initialize: {e}")
         raise
@@ -86,7 +187,19 @@ async def lifespan(app: FastAPI):
     
     # Shutdown
     global executor
+    # Running jobs are finished, queued ones wait for the next start
+    job_stop.set()
+    job_wakeup.set()
+    for worker in job_workers:
+        worker.join()
+    if job_store:
+        job_store.close()
     executor.shutdown(wait=True)
+    overlay_executor.shutdown(wait=True)
+    # Post-processing worker processes of the parses
+    shutdown_page_pools()
+    if s3_client:
+        s3_client.close()
     print("🔄 Application shutdown complete")
 
 app = FastAPI(
@@ -98,10 +211,83 @@ app = FastAPI(
 
 temp_dir = os.getenv("TEMP_DIR", tempfile.gettempdir())
 os.makedirs(temp_dir, exist_ok=True)
+# Inputs and results of the jobs, one directory per job
+jobs_dir = os.getenv("JOBS_DIR", os.path.join(temp_dir, "jobs"))
+# ZIPs of parse results served from disk, a manifest of the members of each that /download/zip reads
+downloads_dir = os.path.join(temp_dir, "downloads")
+# Seconds a ZIP stays downloadable, like the presigned S3 URLs, 0 for no limit
+zip_download_ttl = int(os.getenv("ZIP_DOWNLOAD_TTL", "86400"))
+# Uploads are streamed to disk and turned away once they go over this size
+max_file_size = int(os.getenv("MAX_FILE_SIZE", "104857600"))
+# All files of a /parse/batch request together
+max_batch_size = int(os.getenv("MAX_BATCH_SIZE", "524288000"))
+ALLOWED_EXTENSIONS = {'.pdf', '.jpg', '.jpeg', '.png'}
+# Formats of /parse/stream and their media types
+STREAM_FORMATS = {"sse": "text/event-stream", "ndjson": "application/x-ndjson"}
+# Parses of /parse/stream, kept referenced until they are done
+stream_tasks = set()
 # Only mount static files if S3 is not configured
 if not os.getenv("S3_BUCKET_NAME"):
     app.mount("/static", StaticFiles(directory=temp_dir), name="static")
 
+def upload_form_openapi(file_field: str = "file", multiple: bool = False, **fields) -> Dict:
+    """OpenAPI request body of an endpoint that reads its multipart form itself, with a file or files and fields"""
+    file_schema = {"type": "string", "format": "binary"}
+    properties = {file_field: {"type": "array", "items": file_schema} if multiple else file_schema}
+    properties.update(fields)
+    return {
+        "requestBody": {
+            "required": True,
+            "content": {"multipart/form-data": {"schema": {
+                "type": "object", "required": [file_field], "properties": properties
+            }}}
+        }
+    }
+
+def parse_pages_field(value: Optional[str]) -> Optional[List]:
+    """
+    Parse the pages form field, e.g. '1-5,8,10-' with pages numbered from 1
+    
+    Returns:
+        Page ranges for parse_pdf, None selects every page
+        
+    Raises:
+        HTTPException: 400 for a malformed selection
+    """
+    if not value or not value.strip():
+        return None
+    try:
+        return parse_page_ranges(value)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid pages: {e}")
+
+async def receive_document(request: Request, dest_dir: Optional[str] = None) -> Tuple[Upload, Dict[str, str]]:
+    """
+    Stream the uploaded document of a request to a temporary file
+    
+    Args:
+        request: Request with a multipart form holding the document as "file"
+        dest_dir: Directory of the temporary file, defaults to the system one
+        
+    Returns:
+        (the saved upload, the other form fields)
+        
+    Raises:
+        HTTPException: 400 for an unsupported, malformed or encrypted file, 413 for a file
+            over MAX_FILE_SIZE or a PDF with too many pages, 415 for a body that is not a form
+    """
+    try:
+        return await receive_upload(
+            request,
+            max_size=max_file_size,
+            allowed_extensions=ALLOWED_EXTENSIONS,
+            max_pages=admission.max_pages_per_request,
+            page_field="pages",
+            dest_dir=dest_dir
+        )
+    except UploadRejected as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+
 @app.get("/")
 async def root():
     """Root endpoint"""
@@ -110,185 +296,64 @@ async def root():
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
+    queue = admission.snapshot()
     return {
-        "status": "healthy", 
+        "status": "saturated" if queue["saturated"] else "healthy",
         "model_loaded": monkey_ocr_model is not None,
         "s3_configured": s3_client is not None,
-        "temp_dir": temp_dir
+        "temp_dir": temp_dir,
+        "queue": queue
     }
 
-@app.post("/ocr/text", response_model=TaskResponse)
-async def extract_text(file: UploadFile = File(...)):
+@app.post("/ocr/text", response_model=TaskResponse, openapi_extra=upload_form_openapi())
+async def extract_text(request: Request):
     """Extract text from image or PDF"""
-    return await perform_ocr_task(file, "text")
+    return await perform_ocr_task(request, "text")
 
-@app.post("/ocr/formula", response_model=TaskResponse)
-async def extract_formula(file: UploadFile = File(...)):
+@app.post("/ocr/formula", response_model=TaskResponse, openapi_extra=upload_form_openapi())
+async def extract_formula(request: Request):
     """Extract formulas from image or PDF"""
-    return await perform_ocr_task(file, "formula")
+    return await perform_ocr_task(request, "formula")
 
-@app.post("/ocr/table", response_model=TaskResponse)
-async def extract_table(file: UploadFile = File(...)):
+@app.post("/ocr/table", response_model=TaskResponse, openapi_extra=upload_form_openapi())
+async def extract_table(request: Request):
     """Extract tables from image or PDF"""
-    return await perform_ocr_task(file, "table")
+    return await perform_ocr_task(request, "table")
 
-@app.post("/parse", response_model=ParseResponse)
-async def parse_document(
-    file: UploadFile = File(...),
-    page_markers: bool = Form(False)
-):
+@app.post("/parse", response_model=ParseResponse, openapi_extra=upload_form_openapi(
+    page_markers={"type": "boolean", "default": False},
+    overlays={"type": "string", "default": ""},
+    pages={"type": "string", "default": ""}
+))
+async def parse_document(request: Request):
     """Parse complete document (PDF only)
     
-    Args:
+    Form fields:
         file: PDF file to parse
         page_markers: Whether to insert page break markers between pages
+        overlays: Comma separated debug overlays (model, layout, spans), drawn after the response
+        pages: Pages to parse numbered from 1, e.g. '1-5,8,10-', the others are not rendered or analyzed
     """
     try:
         if not monkey_ocr_model:
             raise HTTPException(status_code=500, detail="Model not initialized")
         
-        # Validate file type
-        allowed_extensions = {'.pdf', '.jpg', '.jpeg', '.png'}
-        file_ext = Path(file.filename).suffix.lower()
-        if file_ext not in allowed_extensions:
-            raise HTTPException(
-                status_code=400, 
-                detail=f"Unsupported file type: {file_ext}. Allowed: {', '.join(allowed_extensions)}"
-            )
-        
-        # Get original filename without extension
-        original_name = '.'.join(file.filename.split('.')[:-1])
-        
-        # Save uploaded file temporarily
-        with tempfile.NamedTemporaryFile(delete=False, suffix=file_ext) as temp_file:
-            content = await file.read()
-            temp_file.write(content)
-            temp_file_path = temp_file.name
+        # Streamed to a temporary file, checked while it arrives
+        upload, form = await receive_document(request)
+        temp_file_path = upload.path
+        page_markers = form_bool(form.get("page_markers"))
         
         try:
-            # Create output directory
-            output_dir = tempfile.mkdtemp(prefix="monkeyocr_parse_")
-            
-            # Run parsing in thread pool
-            loop = asyncio.get_event_loop()
-            result_dir = await loop.run_in_executor(
-                executor, 
-                parse_pdf, 
-                temp_file_path, 
-                output_dir, 
-                monkey_ocr_model,
-                page_markers
-            )
-            
-            # List generated files
-            files = []
-            if os.path.exists(result_dir):
-                for root, dirs, filenames in os.walk(result_dir):
-                    for filename in filenames:
-                        rel_path = os.path.relpath(os.path.join(root, filename), result_dir)
-                        files.append(rel_path)
-            
-            # Create download URL with original filename
-            zip_filename = f"{original_name}_parsed_{int(time.time())}.zip"
-            zip_path = os.path.join(temp_dir, zip_filename)
+            try:
+                selected_overlays = parse_overlays(form.get("overlays", ""))
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=str(e))
+            page_ranges = parse_pages_field(form.get("pages"))
             
-            # Create ZIP file with renamed files
-            with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
-                for root, dirs, filenames in os.walk(result_dir):
-                    for filename in filenames:
-                        file_path = os.path.join(root, filename)
-                        
-                        # Create new filename with original name prefix
-                        file_ext = os.path.splitext(filename)[1]
-                        file_base = os.path.splitext(filename)[0]
-                        
-                        # Handle different file types
-                        if filename.endswith('.md'):
-                            new_filename = f"{original_name}.md"
-                        elif filename.endswith('_content_list.json'):
-                            new_filename = f"{original_name}_content_list.json"
-                        elif filename.endswith('_middle.json'):
-                            new_filename = f"{original_name}_middle.json"
-                        elif filename.endswith('_model.pdf'):
-                            new_filename = f"{original_name}_model.pdf"
-                        elif filename.endswith('_layout.pdf'):
-                            new_filename = f"{original_name}_layout.pdf"
-                        elif filename.endswith('_spans.pdf'):
-                            new_filename = f"{original_name}_spans.pdf"
-                        else:
-                            # For images and other files, keep relative path structure but rename
-                            rel_path = os.path.relpath(file_path, result_dir)
-                            if 'images/' in rel_path:
-                                # Keep images in images subfolder with original name prefix
-                                image_name = os.path.basename(rel_path)
-                                new_filename = f"images/{original_name}_{image_name}"
-                            else:
-                                new_filename = f"{original_name}_{filename}"
-                        
-                        zipf.write(file_path, new_filename)
+            # Turn the request away before any work if the server has too many pages to go
+            ticket = admit_upload(temp_file_path, page_ranges)
             
-            # Prepare file URLs dictionary
-            file_urls = {}
-            
-            # Upload to S3 if configured, otherwise use local storage
-            if s3_client:
-                try:
-                    # Upload individual files to S3 for direct access
-                    if os.getenv("UPLOAD_INDIVIDUAL_FILES_S3", "true").lower() == "true":
-                        # Generate timestamp once for this parse operation
-                        parse_timestamp = int(time.time())
-                        
-                        for root, dirs, filenames in os.walk(result_dir):
-                            for filename in filenames:
-                                file_path = os.path.join(root, filename)
-                                rel_path = os.path.relpath(file_path, result_dir)
-                                
-                                # Generate S3 key for individual file using the same timestamp
-                                file_s3_key = f"{s3_client.prefix}/parsed/{parse_timestamp}_{original_name}/{rel_path}"
-                                
-                                # Upload individual file
-                                s3_client.upload_file(file_path, file_s3_key, metadata={
-                                    'original_filename': file.filename,
-                                    'file_type': os.path.splitext(filename)[1],
-                                    'task_type': 'parse'
-                                })
-                                
-                                # Generate presigned URL for individual file
-                                file_url = s3_client.generate_presigned_url(file_s3_key, expiration=86400)  # 24 hours
-                                file_urls[rel_path] = file_url
-                    
-                    # Upload ZIP file
-                    # Generate S3 key
-                    s3_key = s3_client.generate_s3_key("parsed", original_name)
-                    
-                    # Upload to S3
-                    s3_client.upload_file(zip_path, s3_key, metadata={
-                        'original_filename': file.filename,
-                        'task_type': 'parse',
-                        'timestamp': str(int(time.time()))
-                    })
-                    
-                    # Generate presigned URL
-                    download_url = s3_client.generate_presigned_url(s3_key, expiration=86400)  # 24 hours
-                    
-                    # Clean up local ZIP file
-                    os.unlink(zip_path)
-                except Exception as s3_error:
-                    print(f"S3 upload error: {s3_error}")
-                    # Fallback to local storage on S3 error
-                    download_url = f"/static/{zip_filename}"
-            else:
-                # Use local file storage
-                download_url = f"/static/{zip_filename}"
-            
-            return ParseResponse(
-                success=True,
-                message="Document parsing completed successfully",
-                output_dir=result_dir,
-                files=files,
-                download_url=download_url,
-                file_urls=file_urls if file_urls else None
-            )
+            return await parse_upload(upload, ticket, page_markers, selected_overlays, page_ranges)
             
         finally:
             # Clean up temporary file
@@ -297,12 +362,545 @@ async def parse_document(
             # Clean up result directory after some time (optional)
             # shutil.rmtree(result_dir, ignore_errors=True)
             
+    except HTTPException:
+        raise
     except Exception as e:
         import traceback
         print(f"Parse endpoint error: {e}")
         print(traceback.format_exc())
         raise HTTPException(status_code=500, detail=f"Parsing failed: {str(e)}")
 
+async def parse_upload(upload: Upload, ticket: Ticket, page_markers: bool, selected_overlays: Tuple[str, ...],
+                       page_ranges: Optional[List], on_event=None) -> ParseResponse:
+    """
+    Parse an admitted upload on the executor and publish its results
+    
+    Args:
+        upload: The uploaded document, still in its temporary file
+        ticket: Admission ticket of the request, released once the parse is done
+        page_markers: Whether to insert page break markers between pages
+        selected_overlays: Debug overlays, drawn after the response
+        page_ranges: Pages to parse, None for every page
+        on_event: Called from the parsing thread with the progress events of parse_pdf
+        
+    Returns:
+        The response of /parse
+    """
+    try:
+        original_name = '.'.join(upload.filename.split('.')[:-1])
+        
+        # Create output directory
+        output_dir = tempfile.mkdtemp(prefix="monkeyocr_parse_")
+        
+        # Generate timestamp once for this parse operation
+        parse_timestamp = int(time.time())
+        
+        # Overlays are written next to the results once drawn, they are left out of the ZIP
+        temp_name = '.'.join(os.path.basename(upload.path).split('.')[:-1])
+        pending_files = [f"{temp_name}{OVERLAY_SUFFIXES[overlay]}" for overlay in selected_overlays]
+        overlay_done = None
+        if pending_files and s3_client and os.getenv("UPLOAD_INDIVIDUAL_FILES_S3", "true").lower() == "true":
+            overlay_done = make_overlay_uploader(
+                f"{s3_client.prefix}/parsed/{parse_timestamp}_{original_name}", upload.filename
+            )
+        
+        # Run parsing in thread pool
+        parse_future = submit_admitted(
+            ticket,
+            parse_pdf, 
+            upload.path, 
+            output_dir, 
+            monkey_ocr_model,
+            page_markers,
+            selected_overlays,
+            overlay_executor,
+            overlay_done,
+            page_ranges,
+            on_event
+        )
+    except BaseException:
+        release_unsubmitted(ticket)
+        raise
+    result_dir = await parse_future
+    
+    # Create download URL with original filename, the ZIP is built while it is sent
+    zip_filename = f"{original_name}_parsed_{int(time.time())}.zip"
+    published = publish_results(
+        result_dir, original_name, upload.filename, zip_filename, parse_timestamp, pending_files
+    )
+    
+    return ParseResponse(
+        success=True,
+        message="Document parsing completed successfully",
+        output_dir=result_dir,
+        files=published['files'],
+        download_url=published['download_url'],
+        file_urls=published['file_urls'],
+        bytes_uploaded=published['bytes_uploaded'],
+        pending_files=pending_files if pending_files else None
+    )
+
+def format_stream_event(event: Dict, stream_format: str) -> bytes:
+    """Encode a progress event as a Server-Sent Event or as a line of NDJSON"""
+    data = json.dumps(event, ensure_ascii=False)
+    if stream_format == "ndjson":
+        return f"{data}\n".encode('utf-8')
+    return f"event: {event['event']}\ndata: {data}\n\n".encode('utf-8')
+
+@app.post("/parse/stream", openapi_extra=upload_form_openapi(
+    page_markers={"type": "boolean", "default": False},
+    overlays={"type": "string", "default": ""},
+    pages={"type": "string", "default": ""},
+    format={"type": "string", "enum": list(STREAM_FORMATS), "default": "sse"}
+))
+async def parse_document_stream(request: Request):
+    """Parse a document like /parse, streaming the progress and every page as soon as it is done
+    
+    Form fields:
+        file: PDF file to parse
+        page_markers: Whether to insert page break markers between pages of the Markdown file
+        overlays: Comma separated debug overlays (model, layout, spans), drawn after the result
+        pages: Pages to parse numbered from 1, e.g. '1-5,8,10-'
+        format: 'sse' for Server-Sent Events, 'ndjson' for one JSON object per line
+    
+    Events:
+        stage: 'rendered', 'layout' or 'recognized' with the pages or regions done and their total
+        page: the Markdown and the content list items of a page, in page order
+        result: the response of /parse, the last event
+        error: the detail of a failed parse, the last event
+    """
+    if not monkey_ocr_model:
+        raise HTTPException(status_code=500, detail="Model not initialized")
+    
+    upload, form = await receive_document(request)
+    try:
+        stream_format = form.get("format") or "sse"
+        if stream_format not in STREAM_FORMATS:
+            raise HTTPException(
+                status_code=400, detail=f"Unsupported format: {stream_format}. Allowed: {', '.join(STREAM_FORMATS)}"
+            )
+        try:
+            selected_overlays = parse_overlays(form.get("overlays", ""))
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        page_ranges = parse_pages_field(form.get("pages"))
+        ticket = admit_upload(upload.path, page_ranges)
+    except BaseException:
+        upload.discard()
+        raise
+    
+    # Events come from the parsing thread, None ends the stream
+    loop = asyncio.get_event_loop()
+    events = asyncio.Queue()
+    
+    def emit(event):
+        loop.call_soon_threadsafe(events.put_nowait, event)
+    
+    async def run():
+        try:
+            response = await parse_upload(
+                upload, ticket, form_bool(form.get("page_markers")), selected_overlays, page_ranges, emit
+            )
+            emit({'event': 'result', **jsonable_encoder(response)})
+        except Exception as e:
+            import traceback
+            print(f"Parse stream error: {e}")
+            print(traceback.format_exc())
+            emit({'event': 'error', 'detail': f"Parsing failed: {str(e)}"})
+        finally:
+            upload.discard()
+            emit(None)
+    
+    # The parse goes on if the client leaves, its results are published as for /parse
+    task = asyncio.ensure_future(run())
+    stream_tasks.add(task)
+    task.add_done_callback(stream_tasks.discard)
+    
+    async def stream():
+        while True:
+            event = await events.get()
+            if event is None:
+                break
+            yield format_stream_event(event, stream_format)
+    
+    return StreamingResponse(
+        stream(),
+        media_type=STREAM_FORMATS[stream_format],
+        # proxies must pass the events on as they come
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+def publish_results(result_dir: str, original_name: str, original_filename: str, zip_filename: str,
+                    parse_timestamp: int, pending_files: List[str] = (), local_download_url: Optional[str] = None,
+                    make_zip: bool = True) -> Dict:
+    """
+    Make the results of a parse downloadable, uploaded to S3 if configured
+    
+    Args:
+        result_dir: Directory written by parse_pdf
+        original_name: Uploaded filename without extension
+        original_filename: Uploaded filename
+        zip_filename: Name of the ZIP of the results
+        parse_timestamp: Timestamp in the S3 keys of the individual files
+        pending_files: Files not written yet, left out of the ZIP and the upload but given a URL
+        local_download_url: URL the ZIP is served at without S3, defaults to one of /download/zip
+        make_zip: Whether to offer the ZIP of the results, download_url is None if not
+        
+    Returns:
+        Dict with the files, download_url, file_urls, bytes_uploaded, and the S3 keys
+        zip_key and file_keys when uploaded
+    """
+    # List generated files, the same walk gives the ZIP members
+    members = zip_members(result_dir, original_name, skip=pending_files) if os.path.exists(result_dir) else []
+    files = [os.path.relpath(file_path, result_dir) for file_path, _ in members]
+    
+    # Prepare file URLs dictionary
+    file_urls = {}
+    s3_keys = {}
+    bytes_uploaded = 0
+    
+    # Upload individual files to S3 for direct access
+    if s3_client and os.getenv("UPLOAD_INDIVIDUAL_FILES_S3", "true").lower() == "true":
+        try:
+            # Generate S3 keys for individual files using the same timestamp
+            s3_keys = {
+                rel_path: f"{s3_client.prefix}/parsed/{parse_timestamp}_{original_name}/{rel_path}"
+                for rel_path in files + list(pending_files)
+            }
+            
+            # Upload individual files in parallel
+            bytes_uploaded += s3_client.upload_files([
+                (os.path.join(result_dir, rel_path), s3_keys[rel_path], {
+                    'original_filename': original_filename,
+                    'file_type': os.path.splitext(rel_path)[1],
+                    'task_type': 'parse'
+                })
+                for rel_path in files
+            ])
+            
+            # Generate presigned URLs for individual files, the overlays are uploaded under theirs once drawn
+            presigned_urls = s3_client.generate_presigned_urls(s3_keys.values(), expiration=86400)  # 24 hours
+            file_urls = {rel_path: presigned_urls[s3_key] for rel_path, s3_key in s3_keys.items()}
+        except Exception as s3_error:
+            print(f"S3 upload error: {s3_error}")
+            s3_keys = {}
+    
+    download_url = zip_key = None
+    if make_zip:
+        download_url, zip_key, zip_bytes = publish_archive(
+            members, zip_filename, original_name, original_filename, local_download_url
+        )
+        bytes_uploaded += zip_bytes
+    
+    return {
+        'files': files,
+        'download_url': download_url,
+        'file_urls': file_urls if file_urls else None,
+        'bytes_uploaded': bytes_uploaded if s3_client else None,
+        'zip_key': zip_key,
+        'file_keys': s3_keys if s3_keys else None,
+    }
+
+def publish_archive(members: List, zip_filename: str, name: str, original_filename: str,
+                    local_download_url: Optional[str] = None) -> Tuple[str, Optional[str], int]:
+    """
+    Offer a ZIP of some files, streamed into S3 if configured or else from disk when downloaded
+    
+    Args:
+        members: (file path, archive name) of the files
+        zip_filename: Name of the ZIP
+        name: Name in the S3 key of the ZIP
+        original_filename: Uploaded filename, stored in the S3 metadata
+        local_download_url: URL the ZIP is served at without S3, defaults to one of /download/zip
+        
+    Returns:
+        (download URL, S3 key or None, bytes uploaded)
+    """
+    if s3_client:
+        try:
+            # Stream the ZIP into a multipart upload
+            s3_key = s3_client.generate_s3_key("parsed", name)
+            bytes_uploaded = s3_client.upload_stream(ZipStream(members, zip_filename), s3_key, metadata={
+                'original_filename': original_filename,
+                'task_type': 'parse',
+                'timestamp': str(int(time.time()))
+            })
+            
+            # Generate presigned URL
+            return s3_client.generate_presigned_url(s3_key, expiration=86400), s3_key, bytes_uploaded  # 24 hours
+        except Exception as s3_error:
+            print(f"S3 upload error: {s3_error}")
+            # Fallback to local streaming on S3 error
+    
+    # Stream the ZIP from the result directory when it is downloaded
+    return serve_zip_locally(members, zip_filename, local_download_url), None, 0
+
+def admit_upload(file_path: str, page_ranges: Optional[List] = None) -> Ticket:
+    """Count the pages of an upload and admit it to the queue, see admit_uploads"""
+    return admit_uploads([file_path], page_ranges)
+
+def admit_uploads(file_paths: List[str], page_ranges: Optional[List] = None) -> Ticket:
+    """
+    Count the pages of the uploads of a request and admit them to the queue
+    
+    Args:
+        file_paths: The uploaded files
+        page_ranges: Pages selected of every file, only these are counted
+        
+    Returns:
+        The admission ticket, released by run_admitted or the job worker
+        
+    Raises:
+        HTTPException: 400 for an unreadable PDF or a file without a selected page,
+            413 for too many pages, 429 with a Retry-After header while the queue is full
+    """
+    try:
+        pages = 0
+        for file_path in file_paths:
+            page_count = count_pages(file_path)
+            if page_ranges:
+                page_count = len(page_ranges_to_ids(page_ranges, page_count))
+                if not page_count:
+                    raise ValueError("No selected page in the document")
+            pages += page_count
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    try:
+        return admission.admit(pages)
+    except Rejected as e:
+        headers = {"Retry-After": str(e.retry_after)} if e.retry_after is not None else None
+        raise HTTPException(status_code=e.status_code, detail=e.detail, headers=headers)
+
+def run_admitted(ticket: Ticket, func, *args):
+    """Run func(*args) on the executor, the pages of the ticket are released when it is done"""
+    admission.start(ticket)
+    try:
+        return func(*args)
+    finally:
+        admission.finish(ticket)
+
+def submit_admitted(ticket: Ticket, func, *args) -> asyncio.Future:
+    """Submit run_admitted to the executor, the ticket is released by it from then on"""
+    return asyncio.get_event_loop().run_in_executor(executor, run_admitted, ticket, func, *args)
+
+def release_unsubmitted(ticket: Ticket):
+    """Release the pages of an admitted request that failed before submit_admitted"""
+    admission.finish(ticket)
+
+def serve_zip_locally(members: List, zip_filename: str, local_download_url: Optional[str]) -> str:
+    """
+    Register the ZIP for /download/zip unless it is served at its own URL
+    
+    The members are written to a manifest under a new ID, so that the ZIP
+    can be downloaded after a restart and equally named ZIPs do not collide.
+    """
+    if local_download_url is not None:
+        return local_download_url
+    prune_zip_downloads()
+    zip_id = uuid.uuid4().hex
+    manifest = {
+        "filename": zip_filename,
+        "members": members,
+        "expires": time.time() + zip_download_ttl if zip_download_ttl > 0 else None
+    }
+    os.makedirs(downloads_dir, exist_ok=True)
+    manifest_path = os.path.join(downloads_dir, f"{zip_id}.json")
+    with open(manifest_path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False)
+    os.replace(manifest_path + ".tmp", manifest_path)
+    return f"/download/zip/{zip_id}"
+
+def read_zip_download(zip_id: str) -> Optional[Dict]:
+    """The manifest of a ZIP registered by serve_zip_locally, None if there is none or it expired"""
+    try:
+        if uuid.UUID(zip_id).hex != zip_id:
+            return None
+        with open(os.path.join(downloads_dir, f"{zip_id}.json"), encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (ValueError, OSError):
+        return None
+    if manifest["expires"] is not None and manifest["expires"] < time.time():
+        return None
+    return manifest
+
+def prune_zip_downloads():
+    """Delete the manifests of the expired ZIPs, their result directories are left alone"""
+    if zip_download_ttl <= 0 or not os.path.isdir(downloads_dir):
+        return
+    now = time.time()
+    for entry in os.scandir(downloads_dir):
+        # A manifest expires zip_download_ttl after it was written
+        try:
+            if entry.stat().st_mtime + zip_download_ttl < now:
+                os.unlink(entry.path)
+        except OSError:
+            pass
+
+@app.post("/parse/batch", response_model=BatchParseResponse, openapi_extra=upload_form_openapi(
+    "files", multiple=True,
+    page_markers={"type": "boolean", "default": False},
+    overlays={"type": "string", "default": ""},
+    archive={"type": "string", "default": "batch"},
+    pages={"type": "string", "default": ""}
+))
+async def parse_batch(request: Request):
+    """Parse many documents together
+    
+    The layout model runs over the pages of all documents and their crops
+    share the VLM batches, the results are split back per document.
+    
+    Form fields:
+        files: PDF or image files to parse
+        page_markers: Whether to insert page break markers between pages
+        overlays: Comma separated debug overlays (model, layout, spans), drawn before the response
+        archive: 'batch' for one ZIP of all documents, 'documents' for a ZIP per document
+        pages: Pages to parse of every document numbered from 1, e.g. '1-5,8,10-'
+    """
+    try:
+        if not monkey_ocr_model:
+            raise HTTPException(status_code=500, detail="Model not initialized")
+        
+        # Each file is streamed to a file of its own under the input directory and checked while it arrives,
+        # the results of equally named files do not collide
+        input_dir = tempfile.mkdtemp(prefix="monkeyocr_batch_input_")
+        try:
+            try:
+                uploads, form = await receive_uploads(
+                    request,
+                    "files",
+                    max_size=max_file_size,
+                    max_total_size=max_batch_size,
+                    allowed_extensions=ALLOWED_EXTENSIONS,
+                    max_pages=admission.max_pages_per_request,
+                    page_field="pages",
+                    dest_dir=input_dir
+                )
+            except UploadRejected as e:
+                raise HTTPException(status_code=e.status_code, detail=e.detail)
+            page_markers = form_bool(form.get("page_markers"))
+            archive = form.get("archive") or "batch"
+            if archive not in ("batch", "documents"):
+                raise HTTPException(status_code=400, detail=f"Unsupported archive: {archive}. Allowed: batch, documents")
+            try:
+                selected_overlays = parse_overlays(form.get("overlays", ""))
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=str(e))
+            page_ranges = parse_pages_field(form.get("pages"))
+            input_paths = [upload.path for upload in uploads]
+            
+            # The pages of all documents count against the queue and the per request limit
+            ticket = admit_uploads(input_paths, page_ranges)
+            try:
+                output_dir = tempfile.mkdtemp(prefix="monkeyocr_parse_")
+                parse_timestamp = int(time.time())
+                
+                # Run parsing in thread pool
+                parse_future = submit_admitted(
+                    ticket,
+                    parse_pdf_batch,
+                    input_paths,
+                    output_dir,
+                    monkey_ocr_model,
+                    page_markers,
+                    selected_overlays,
+                    page_ranges
+                )
+            except BaseException:
+                release_unsubmitted(ticket)
+                raise
+            results = await parse_future
+        finally:
+            shutil.rmtree(input_dir, ignore_errors=True)
+        
+        documents = []
+        batch_members = []
+        bytes_uploaded = 0
+        used_names = set()
+        for upload, result in zip(uploads, results):
+            if isinstance(result, Exception):
+                documents.append(BatchDocumentResult(filename=upload.filename, success=False, message=str(result)))
+                continue
+            
+            # Each document gets a folder in the batch ZIP, named after it
+            original_name = '.'.join(upload.filename.split('.')[:-1])
+            name = original_name
+            suffix = 1
+            while name in used_names:
+                name = f"{original_name}_{suffix}"
+                suffix += 1
+            used_names.add(name)
+            
+            published = publish_results(
+                result, name, upload.filename, f"{name}_parsed_{parse_timestamp}.zip", parse_timestamp,
+                make_zip=archive == "documents"
+            )
+            bytes_uploaded += published['bytes_uploaded'] or 0
+            batch_members.extend(
+                (file_path, f"{name}/{archive_name}") for file_path, archive_name in zip_members(result, name)
+            )
+            documents.append(BatchDocumentResult(
+                filename=upload.filename,
+                success=True,
+                files=published['files'],
+                download_url=published['download_url'],
+                file_urls=published['file_urls']
+            ))
+        
+        download_url = None
+        if archive == "batch" and batch_members:
+            download_url, _, zip_bytes = publish_archive(
+                batch_members, f"batch_parsed_{parse_timestamp}.zip", "batch", f"{len(uploads)} files"
+            )
+            bytes_uploaded += zip_bytes
+        
+        succeeded = sum(document.success for document in documents)
+        return BatchParseResponse(
+            success=succeeded > 0,
+            message=f"Parsed {succeeded} of {len(uploads)} documents",
+            documents=documents,
+            download_url=download_url,
+            bytes_uploaded=bytes_uploaded if s3_client else None
+        )
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        import traceback
+        print(f"Batch parse endpoint error: {e}")
+        print(traceback.format_exc())
+        raise HTTPException(status_code=500, detail=f"Parsing failed: {str(e)}")
+
+def make_overlay_uploader(s3_prefix: str, original_filename: str):
+    """Upload the overlays drawn in the background once their future is done"""
+    def upload(future):
+        try:
+            s3_client.upload_files([
+                (file_path, f"{s3_prefix}/{os.path.basename(file_path)}", {
+                    'original_filename': original_filename,
+                    'file_type': '.pdf',
+                    'task_type': 'parse'
+                })
+                for file_path in future.result()
+            ])
+        except Exception as e:
+            print(f"Overlay upload error: {e}")
+    return upload
+
+@app.get("/download/zip/{zip_id}")
+async def download_zip(zip_id: str):
+    """Download the ZIP of parse results served without S3, built while it is sent"""
+    manifest = read_zip_download(zip_id)
+    if manifest is None:
+        raise HTTPException(status_code=404, detail="Download not found or expired")
+    members = [(file_path, archive_name) for file_path, archive_name in manifest["members"]]
+    if not all(os.path.exists(file_path) for file_path, _ in members):
+        raise HTTPException(status_code=404, detail="Results of the download were removed")
+    return StreamingResponse(
+        iter(ZipStream(members, manifest["filename"])),
+        media_type='application/zip',
+        headers={'Content-Disposition': f'attachment; filename="{manifest["filename"]}"'}
+    )
+
 @app.get("/download/{filename}")
 async def download_file(filename: str):
     """Download result files - redirects to S3 if configured"""
@@ -328,57 +926,255 @@ async def download_file(filename: str):
             media_type='application/octet-stream'
         )
 
+@app.post("/jobs", response_model=JobResponse, status_code=202, openapi_extra=upload_form_openapi(
+    page_markers={"type": "boolean", "default": False},
+    overlays={"type": "string", "default": ""},
+    pages={"type": "string", "default": ""}
+))
+async def submit_job(request: Request):
+    """Queue a document for parsing and return at once
+    
+    Form fields:
+        file: PDF or image file to parse
+        page_markers: Whether to insert page break markers between pages
+        overlays: Comma separated debug overlays (model, layout, spans), drawn before the job is done
+        pages: Pages to parse numbered from 1, e.g. '1-5,8,10-', the others are not rendered or analyzed
+    """
+    if not monkey_ocr_model or not job_store:
+        raise HTTPException(status_code=500, detail="Model not initialized")
+    
+    # The upload is kept in the job directory until the job is done, a restarted server parses it from there
+    job_id = uuid.uuid4().hex
+    job_dir = os.path.join(jobs_dir, job_id)
+    os.makedirs(job_dir, exist_ok=True)
+    try:
+        upload, form = await receive_document(request, dest_dir=job_dir)
+        page_markers = form_bool(form.get("page_markers"))
+        try:
+            selected_overlays = parse_overlays(form.get("overlays", ""))
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        page_ranges = parse_pages_field(form.get("pages"))
+        input_path = os.path.join(job_dir, f"input{Path(upload.filename).suffix.lower()}")
+        os.replace(upload.path, input_path)
+        ticket = admit_upload(input_path, page_ranges)
+    except BaseException:
+        shutil.rmtree(job_dir, ignore_errors=True)
+        raise
+    
+    job_tickets[job_id] = ticket
+    try:
+        job = job_store.create(
+            upload.filename, input_path, os.path.join(job_dir, "output"),
+            options={
+                'page_markers': page_markers, 'overlays': list(selected_overlays), 'pages': ticket.pages,
+                'page_ranges': page_ranges
+            },
+            job_id=job_id
+        )
+    except BaseException:
+        # The job was never stored, its pages leave the queue and its upload is dropped
+        job_tickets.pop(job_id, None)
+        admission.finish(ticket)
+        shutil.rmtree(job_dir, ignore_errors=True)
+        raise
+    job_wakeup.set()
+    return job_response(job)
+
+@app.get("/jobs/{job_id}", response_model=JobResponse)
+async def get_job(job_id: str):
+    """Get the state and progress of a job"""
+    return job_response(get_job_or_404(job_id))
+
+@app.get("/jobs/{job_id}/artifacts", response_model=JobArtifactsResponse)
+async def get_job_artifacts(job_id: str):
+    """Get the result files of a finished job and their URLs"""
+    job = get_job_or_404(job_id)
+    if job['state'] != DONE:
+        raise HTTPException(status_code=409, detail=f"Job is {job['state']}")
+    
+    artifacts = job['artifacts']
+    download_url = artifacts['download_url']
+    file_urls = artifacts['file_urls']
+    # Presigned URLs expire, new ones are signed for every request
+    if s3_client and artifacts.get('zip_key'):
+        download_url = s3_client.generate_presigned_url(artifacts['zip_key'], expiration=86400)  # 24 hours
+    if s3_client and artifacts.get('file_keys'):
+        presigned_urls = s3_client.generate_presigned_urls(artifacts['file_keys'].values(), expiration=86400)
+        file_urls = {rel_path: presigned_urls[s3_key] for rel_path, s3_key in artifacts['file_keys'].items()}
+    if file_urls is None:
+        file_urls = {rel_path: f"/jobs/{job_id}/artifacts/{rel_path}" for rel_path in artifacts['files']}
+    
+    return JobArtifactsResponse(
+        job_id=job_id,
+        files=artifacts['files'],
+        download_url=download_url,
+        file_urls=file_urls,
+        bytes_uploaded=artifacts.get('bytes_uploaded'),
+        parse_time=artifacts.get('parse_time')
+    )
+
+@app.get("/jobs/{job_id}/artifacts/{rel_path:path}")
+async def get_job_artifact(job_id: str, rel_path: str):
+    """Download one result file of a finished job"""
+    job = get_job_or_404(job_id)
+    if job['state'] != DONE or rel_path not in job['artifacts']['files']:
+        raise HTTPException(status_code=404, detail="File not found")
+    return FileResponse(path=os.path.join(job['artifacts']['result_dir'], rel_path), filename=os.path.basename(rel_path))
+
+@app.get("/jobs/{job_id}/download")
+async def download_job(job_id: str):
+    """Download the results of a finished job as a ZIP, built while it is sent"""
+    job = get_job_or_404(job_id)
+    if job['state'] != DONE:
+        raise HTTPException(status_code=409, detail=f"Job is {job['state']}")
+    original_name = '.'.join(job['filename'].split('.')[:-1])
+    zip_filename = f"{original_name}_parsed_{job_id}.zip"
+    return StreamingResponse(
+        iter(ZipStream(zip_members(job['artifacts']['result_dir'], original_name), zip_filename)),
+        media_type='application/zip',
+        headers={'Content-Disposition': f'attachment; filename="{zip_filename}"'}
+    )
+
 @app.get("/results/{task_id}")
 async def get_results(task_id: str):
-    """Get parsing results by task ID"""
-    result_dir = f"/app/tmp/monkeyocr_parse_{task_id}"
-    
-    if not os.path.exists(result_dir):
+    """Get parsing results by task ID, the ID of a job"""
+    job = job_store.get(task_id) if job_store else None
+    if job is None or job['state'] != DONE:
         raise HTTPException(status_code=404, detail="Results not found")
     
-    files = []
-    for root, dirs, filenames in os.walk(result_dir):
-        for filename in filenames:
-            rel_path = os.path.relpath(os.path.join(root, filename), result_dir)
-            files.append(rel_path)
-    
-    return {"files": files, "result_dir": result_dir}
+    return {"files": job['artifacts']['files'], "result_dir": job['artifacts']['result_dir']}
+
+def get_job_or_404(job_id: str) -> Dict:
+    """Get a job from the job store, 404 if there is no such job"""
+    job = job_store.get(job_id) if job_store else None
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+def job_response(job: Dict) -> JobResponse:
+    """Build the response describing a job"""
+    return JobResponse(
+        job_id=job['id'],
+        state=job['state'],
+        filename=job['filename'],
+        stage=job['stage'],
+        progress=job['progress'],
+        attempts=job['attempts'],
+        error=job['error'],
+        created_at=job['created_at'],
+        started_at=job['started_at'],
+        finished_at=job['finished_at'],
+        status_url=f"/jobs/{job['id']}",
+        artifacts_url=f"/jobs/{job['id']}/artifacts"
+    )
+
+def run_job_worker():
+    """Run the queued jobs one after another until shutdown"""
+    while not job_stop.is_set():
+        # Cleared before looking so that a job queued meanwhile wakes the wait below
+        job_wakeup.clear()
+        job = job_store.claim_next()
+        if job is None:
+            job_wakeup.wait(timeout=5.0)
+            continue
+        run_job(job)
 
-async def perform_ocr_task(file: UploadFile, task_type: str) -> TaskResponse:
+# Share of the job progress of each parsing stage, the page events come after the stages
+JOB_PROGRESS_SPANS = {
+    'rendered': (0.0, 0.05),
+    'layout': (0.05, 0.15),
+    'recognized': (0.15, 0.6),
+    'page': (0.6, 0.9),
+}
+
+def job_progress(job_id: str):
+    """An on_event callback of parse_pdf recording the progress of a job"""
+    def on_event(event: Dict):
+        stage = event['stage'] if event['event'] == 'stage' else event['event']
+        if stage not in JOB_PROGRESS_SPANS:
+            return
+        start, end = JOB_PROGRESS_SPANS[stage]
+        done = event['done'] / event['total'] if event['total'] else 1.0
+        job_store.set_progress(job_id, stage, round(start + (end - start) * done, 3))
+    return on_event
+
+def run_job(job: Dict):
+    """Parse the document of a claimed job and publish its results"""
+    job_id = job['id']
+    options = job['options']
+    original_name = '.'.join(job['filename'].split('.')[:-1])
+    ticket = job_tickets.pop(job_id, None) or admission.admit(options.get('pages', 1), force=True)
+    admission.start(ticket)
+    try:
+        # An interrupted attempt may have left partial results, the job starts over
+        shutil.rmtree(job['output_dir'], ignore_errors=True)
+        os.makedirs(job['output_dir'], exist_ok=True)
+        
+        job_store.set_progress(job_id, "parsing", 0.0)
+        parse_timestamp = int(time.time())
+        start_time = time.time()
+        result_dir = parse_pdf(
+            job['input_path'],
+            job['output_dir'],
+            monkey_ocr_model,
+            options.get('page_markers', False),
+            tuple(options.get('overlays', ())),
+            pages=options.get('page_ranges'),
+            on_event=job_progress(job_id)
+        )
+        parse_time = time.time() - start_time
+        
+        job_store.set_progress(job_id, "publishing", 0.9)
+        artifacts = publish_results(
+            result_dir, original_name, job['filename'], f"{original_name}_parsed_{job_id}.zip",
+            parse_timestamp, local_download_url=f"/jobs/{job_id}/download"
+        )
+        artifacts['result_dir'] = result_dir
+        artifacts['parse_time'] = parse_time
+        job_store.finish(job_id, artifacts)
+        
+        # The results stay for the artifacts endpoints, the input is no longer needed
+        os.unlink(job['input_path'])
+    except Exception as e:
+        import traceback
+        print(f"Job {job_id} error: {e}")
+        print(traceback.format_exc())
+        job_store.fail(job_id, str(e))
+    finally:
+        admission.finish(ticket)
+
+async def perform_ocr_task(request: Request, task_type: str) -> TaskResponse:
     """Perform OCR task on uploaded file"""
     try:
         if not monkey_ocr_model:
             raise HTTPException(status_code=500, detail="Model not initialized")
         
-        # Validate file type
-        allowed_extensions = {'.pdf', '.jpg', '.jpeg', '.png'}
-        file_ext = Path(file.filename).suffix.lower()
-        if file_ext not in allowed_extensions:
-            raise HTTPException(
-                status_code=400, 
-                detail=f"Unsupported file type: {file_ext}. Allowed: {', '.join(allowed_extensions)}"
-            )
-        
-        # Save uploaded file temporarily
-        with tempfile.NamedTemporaryFile(delete=False, suffix=file_ext) as temp_file:
-            content = await file.read()
-            temp_file.write(content)
-            temp_file_path = temp_file.name
+        # Streamed to a temporary file, checked while it arrives
+        upload, _ = await receive_document(request)
+        temp_file_path = upload.path
         
         try:
-            # Create output directory
-            output_dir = tempfile.mkdtemp(prefix=f"monkeyocr_{task_type}_")
+            # Turn the request away before any work if the server has too many pages to go
+            ticket = admit_upload(temp_file_path)
             
-            # Run OCR task in thread pool
-            loop = asyncio.get_event_loop()
-            result_dir = await loop.run_in_executor(
-                executor,
-                single_task_recognition,
-                temp_file_path,
-                output_dir,
-                monkey_ocr_model,
-                task_type
-            )
+            try:
+                # Create output directory
+                output_dir = tempfile.mkdtemp(prefix=f"monkeyocr_{task_type}_")
+                
+                # Run OCR task in thread pool
+                ocr_future = submit_admitted(
+                    ticket,
+                    single_task_recognition,
+                    temp_file_path,
+                    output_dir,
+                    monkey_ocr_model,
+                    task_type
+                )
+            except BaseException:
+                release_unsubmitted(ticket)
+                raise
+            result_dir = await ocr_future
             
             # Read result file
             result_files = [f for f in os.listdir(result_dir) if f.endswith(f'_{task_type}_result.md')]
@@ -393,11 +1189,11 @@ async def perform_ocr_task(file: UploadFile, task_type: str) -> TaskResponse:
             s3_url = None
             if s3_client and os.getenv("STORE_OCR_RESULTS_S3", "false").lower() == "true":
                 # Generate S3 key
-                s3_key = s3_client.generate_s3_key("ocr", file.filename, task_type)
+                s3_key = s3_client.generate_s3_key("ocr", upload.filename, task_type)
                 
                 # Upload to S3
                 s3_client.upload_file(result_file_path, s3_key, metadata={
-                    'original_filename': file.filename,
+                    'original_filename': upload.filename,
                     'task_type': task_type,
                     'timestamp': str(int(time.time()))
                 })
@@ -417,6 +1213,16 @@ async def perform_ocr_task(file: UploadFile, task_type: str) -> TaskResponse:
             # Clean up temporary file
             os.unlink(temp_file_path)
             
+    except HTTPException as e:
+        # Rejections are answered with their status so that clients back off
+        if e.status_code in (413, 429):
+            raise
+        return TaskResponse(
+            success=False,
+            task_type=task_type,
+            content="",
+            message=f"OCR task failed: {str(e)}"
+        )
     except Exception as e:
         return TaskResponse(
             success=False,
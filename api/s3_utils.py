@@ -3,9 +3,13 @@ S3 utilities for MonkeyOCR API
 """
 import os
 import boto3
-from botocore.exceptions import ClientError
-from typing import Optional, Dict, Any
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config
+from botocore.exceptions import BotoCoreError, ClientError
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Optional, Dict, Any, Iterable, List, Tuple
 import logging
+import threading
 import time
 
 logger = logging.getLogger(__name__)
@@ -18,6 +22,8 @@ class S3Client:
         self.endpoint_url = os.getenv("S3_ENDPOINT_URL")  # For MinIO/S3-compatible services
         self.use_ssl = os.getenv("S3_USE_SSL", "true").lower() == "true"
         self.verify_ssl = os.getenv("S3_VERIFY_SSL", "true").lower() == "true"
+        self.upload_concurrency = int(os.getenv("S3_UPLOAD_CONCURRENCY", "16"))
+        self.upload_retries = int(os.getenv("S3_UPLOAD_RETRIES", "3"))
         
         # Build client configuration
         client_config = {
@@ -25,6 +31,11 @@ class S3Client:
             'region_name': self.region,
             'aws_access_key_id': os.getenv("AWS_ACCESS_KEY_ID"),
             'aws_secret_access_key': os.getenv("AWS_SECRET_ACCESS_KEY"),
+            # One client is shared by all upload threads, its pool needs a connection for each
+            'config': Config(
+                max_pool_connections=self.upload_concurrency * 2,
+                retries={'max_attempts': self.upload_retries + 1, 'mode': 'standard'},
+            ),
         }
         
         # Add optional parameters
@@ -41,6 +52,16 @@ class S3Client:
         # Initialize S3 client
         self.s3_client = boto3.client(**client_config)
         
+        # Result files are mostly small crops: a single PUT up to 16 MiB, and no
+        # transfer threads per file, files are uploaded in parallel by upload_files
+        self.transfer_config = TransferConfig(
+            multipart_threshold=16 * 1024 * 1024,
+            multipart_chunksize=16 * 1024 * 1024,
+            use_threads=False,
+        )
+        self._upload_executor: Optional[ThreadPoolExecutor] = None
+        self._upload_executor_lock = threading.Lock()
+        
         if not self.bucket_name:
             raise ValueError("S3_BUCKET_NAME environment variable is required")
     
@@ -65,7 +86,8 @@ class S3Client:
                 file_path,
                 self.bucket_name,
                 s3_key,
-                ExtraArgs=extra_args
+                ExtraArgs=extra_args,
+                Config=self.transfer_config
             )
             logger.info(f"Uploaded {file_path} to s3://{self.bucket_name}/{s3_key}")
             return s3_key
@@ -73,6 +95,60 @@ class S3Client:
             logger.error(f"Failed to upload file to S3: {e}")
             raise
     
+    def _get_upload_executor(self) -> ThreadPoolExecutor:
+        with self._upload_executor_lock:
+            if self._upload_executor is None:
+                self._upload_executor = ThreadPoolExecutor(
+                    max_workers=self.upload_concurrency, thread_name_prefix="s3_upload"
+                )
+            return self._upload_executor
+    
+    def _upload_file_with_retries(self, file_path: str, s3_key: str, metadata: Optional[Dict[str, str]]) -> int:
+        # botocore retries throttling and transient errors of a request, this retries the
+        # whole file on what is left, e.g. a connection reset while the body was sent
+        for attempt in range(self.upload_retries + 1):
+            try:
+                self.upload_file(file_path, s3_key, metadata)
+                return os.path.getsize(file_path)
+            except (ClientError, BotoCoreError, OSError) as e:
+                if attempt == self.upload_retries:
+                    raise
+                delay = 0.5 * 2 ** attempt
+                logger.warning(f"Retrying upload of {file_path} in {delay:.1f}s: {e}")
+                time.sleep(delay)
+    
+    def upload_files(self, uploads: List[Tuple[str, str, Optional[Dict[str, str]]]]) -> int:
+        """
+        Upload many files in parallel over the shared client
+        
+        Args:
+            uploads: List of (file path, S3 object key, metadata)
+            
+        Returns:
+            Number of bytes uploaded
+        """
+        if not uploads:
+            return 0
+        start = time.time()
+        executor = self._get_upload_executor()
+        futures = [
+            executor.submit(self._upload_file_with_retries, file_path, s3_key, metadata)
+            for file_path, s3_key, metadata in uploads
+        ]
+        size = 0
+        error = None
+        for future in as_completed(futures):
+            try:
+                size += future.result()
+            except Exception as e:
+                if error is None:
+                    error = e
+        if error is not None:
+            logger.error(f"Failed to upload files to S3: {error}")
+            raise error
+        logger.info(f"Uploaded {len(uploads)} files, {size} bytes in {time.time() - start:.2f}s")
+        return size
+    
     def upload_file_obj(self, file_obj: Any, s3_key: str, metadata: Optional[Dict[str, str]] = None) -> str:
         """
         Upload a file object to S3
@@ -102,6 +178,57 @@ class S3Client:
             logger.error(f"Failed to upload file object to S3: {e}")
             raise
     
+    def upload_stream(self, chunks: Iterable[bytes], s3_key: str, metadata: Optional[Dict[str, str]] = None,
+                      part_size: int = 8 * 1024 * 1024) -> int:
+        """
+        Upload a stream of chunks to S3 with a multipart upload, without
+        knowing its size and without writing it to disk
+        
+        Args:
+            chunks: Bytes of the object, in order
+            s3_key: S3 object key (path in bucket)
+            metadata: Optional metadata to attach to the object
+            part_size: Bytes per part, S3 needs at least 5 MiB for all parts but the last
+            
+        Returns:
+            Number of bytes uploaded
+        """
+        extra_args = {'Metadata': metadata} if metadata else {}
+        upload_id = self.s3_client.create_multipart_upload(
+            Bucket=self.bucket_name, Key=s3_key, **extra_args
+        )['UploadId']
+        parts = []
+        size = 0
+        
+        def upload_part(data: bytes):
+            part_number = len(parts) + 1
+            response = self.s3_client.upload_part(
+                Bucket=self.bucket_name, Key=s3_key, UploadId=upload_id,
+                PartNumber=part_number, Body=data
+            )
+            parts.append({'ETag': response['ETag'], 'PartNumber': part_number})
+        
+        try:
+            pending = bytearray()
+            for chunk in chunks:
+                pending += chunk
+                size += len(chunk)
+                if len(pending) >= part_size:
+                    upload_part(bytes(pending))
+                    pending.clear()
+            if pending or not parts:
+                upload_part(bytes(pending))
+            self.s3_client.complete_multipart_upload(
+                Bucket=self.bucket_name, Key=s3_key, UploadId=upload_id,
+                MultipartUpload={'Parts': parts}
+            )
+        except Exception as e:
+            logger.error(f"Failed to upload stream to S3: {e}")
+            self.s3_client.abort_multipart_upload(Bucket=self.bucket_name, Key=s3_key, UploadId=upload_id)
+            raise
+        logger.info(f"Uploaded {size} bytes in {len(parts)} parts to s3://{self.bucket_name}/{s3_key}")
+        return size
+    
     def generate_presigned_url(self, s3_key: str, expiration: int = 3600) -> str:
         """
         Generate a presigned URL for downloading from S3
@@ -136,6 +263,45 @@ class S3Client:
             logger.error(f"Failed to generate presigned URL: {e}")
             raise
     
+    def generate_presigned_urls(self, s3_keys: Iterable[str], expiration: int = 3600) -> Dict[str, str]:
+        """
+        Generate presigned download URLs for many objects
+        
+        Presigning is local, the URLs are signed one after another without
+        network calls and with the public URL settings read once.
+        
+        Args:
+            s3_keys: S3 object keys
+            expiration: URL expiration time in seconds (default: 1 hour)
+            
+        Returns:
+            Map of S3 key to presigned URL
+        """
+        public_url = os.getenv("S3_PUBLIC_URL")
+        replace_endpoint = public_url and self.endpoint_url
+        urls = {}
+        try:
+            for s3_key in s3_keys:
+                url = self.s3_client.generate_presigned_url(
+                    'get_object',
+                    Params={'Bucket': self.bucket_name, 'Key': s3_key},
+                    ExpiresIn=expiration
+                )
+                if replace_endpoint:
+                    url = url.replace(self.endpoint_url, public_url.rstrip('/'))
+                urls[s3_key] = url
+        except ClientError as e:
+            logger.error(f"Failed to generate presigned URLs: {e}")
+            raise
+        return urls
+    
+    def close(self):
+        """Wait for the uploads in progress and stop the upload threads"""
+        with self._upload_executor_lock:
+            if self._upload_executor is not None:
+                self._upload_executor.shutdown(wait=True)
+                self._upload_executor = None
+    
     def generate_presigned_post(self, s3_key: str, expiration: int = 3600) -> Dict[str, Any]:
         """
         Generate a presigned POST URL for uploading directly to S3
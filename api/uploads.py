@@ -0,0 +1,282 @@
+"""
+Streaming multipart uploads with early validation for MonkeyOCR API
+"""
+import os
+import re
+import tempfile
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+try:
+    import python_multipart as multipart
+    from python_multipart.multipart import parse_options_header
+except ImportError:
+    # Older python-multipart releases, the same package under its former name
+    import multipart
+    from multipart.multipart import parse_options_header
+
+# Bytes at the start of a PDF searched for the header and the linearization dictionary
+PDF_HEAD_SIZE = 64 * 1024
+# The header may follow some garbage, readers look for it in the first kilobyte
+PDF_HEADER_WINDOW = 1024
+
+LINEARIZATION_DICT = re.compile(rb'<<[^>]*?/Linearized\s[^>]*?>>', re.DOTALL)
+PAGE_COUNT_ENTRY = re.compile(rb'/N\s+(\d+)')
+ENCRYPT_ENTRY = re.compile(rb'/Encrypt\s*(<<|\d+\s+\d+\s+R)')
+
+
+class UploadRejected(Exception):
+    """An upload turned away while it is received"""
+
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+class Upload:
+    """A file received by receive_upload, saved to a temporary file"""
+
+    def __init__(self, filename: str, path: str):
+        self.filename = filename
+        self.path = path
+        self.size = 0
+
+    def discard(self):
+        """Delete the temporary file"""
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+
+
+class PdfHeadCheck:
+    """
+    Checks a PDF from its first bytes, while the rest is still coming
+
+    The page count and the encryption are only known this early for
+    linearized PDFs, whose first page section holds them. Other PDFs are
+    checked once they are complete.
+    """
+
+    def __init__(self, max_pages: int = 0):
+        self.max_pages = max_pages
+        self._head = b''
+        self._done = False
+
+    def feed(self, data: bytes):
+        """
+        Look at the next bytes of the file
+
+        Raises:
+            UploadRejected: 400 for a file that is not a PDF or is encrypted,
+                413 for a linearized PDF with too many pages
+        """
+        if self._done:
+            return
+        self._head += data[:PDF_HEAD_SIZE - len(self._head)]
+        if b'%PDF-' not in self._head[:PDF_HEADER_WINDOW]:
+            if len(self._head) >= PDF_HEADER_WINDOW:
+                raise UploadRejected(400, "File is not a PDF")
+            return
+
+        linearization = LINEARIZATION_DICT.search(self._head)
+        if linearization is None:
+            # The dictionary is the first object, it is complete within the head of a linearized file
+            self._done = len(self._head) >= PDF_HEAD_SIZE
+            return
+        page_count = PAGE_COUNT_ENTRY.search(linearization.group(0))
+        if page_count and self.max_pages and int(page_count.group(1)) > self.max_pages:
+            raise UploadRejected(
+                413, f"Document has {int(page_count.group(1))} pages, at most {self.max_pages} are accepted"
+            )
+        # The trailer of the first page section follows its cross-reference table
+        if ENCRYPT_ENTRY.search(self._head, linearization.end()):
+            raise UploadRejected(400, "Encrypted PDFs are not supported")
+        self._done = len(self._head) >= PDF_HEAD_SIZE
+
+
+async def receive_upload(request, file_field: str = "file", max_size: int = 0,
+                         allowed_extensions: Iterable[str] = (), max_pages: int = 0,
+                         page_field: Optional[str] = None, dest_dir: Optional[str] = None):
+    """
+    Receive a multipart form with one file, streaming the file to disk
+
+    The file is written chunk by chunk as it arrives, so a request holds no
+    more than a chunk in memory. It is rejected as soon as it goes over
+    max_size, has a type not allowed, or its first bytes show a PDF that is
+    encrypted or has too many pages.
+
+    Args:
+        request: The Starlette request, its body is not read before
+        file_field: Name of the form field of the file
+        max_size: Largest file in bytes, 0 for no limit
+        allowed_extensions: Lower case extensions accepted, with the dot
+        max_pages: Most pages of a PDF, 0 for no limit
+        page_field: Name of a form field selecting pages, the page count of the
+            document is not checked if it comes before the file
+        dest_dir: Directory of the temporary file, defaults to the system one
+
+    Returns:
+        (Upload, dict of the other form fields as strings)
+
+    Raises:
+        UploadRejected: 400, 413 or 415 for an upload turned away
+    """
+    uploads, fields = await receive_uploads(
+        request, file_field, max_size=max_size, max_files=1, allowed_extensions=allowed_extensions,
+        max_pages=max_pages, page_field=page_field, dest_dir=dest_dir
+    )
+    return uploads[0], fields
+
+
+async def receive_uploads(request, file_field: str = "files", max_size: int = 0,
+                          max_total_size: int = 0, max_files: int = 0,
+                          allowed_extensions: Iterable[str] = (), max_pages: int = 0,
+                          page_field: Optional[str] = None, dest_dir: Optional[str] = None):
+    """
+    Receive a multipart form with files, streaming each file to disk
+
+    Every part named file_field is checked like the file of receive_upload,
+    and the form is rejected as soon as one of them is. Parts of the field
+    past max_files are ignored.
+
+    Args:
+        request: The Starlette request, its body is not read before
+        file_field: Name of the form field of the files
+        max_size: Largest file in bytes, 0 for no limit
+        max_total_size: Most bytes of all files together, 0 for no limit
+        max_files: Most files kept, 0 for no limit
+        allowed_extensions: Lower case extensions accepted, with the dot
+        max_pages: Most pages of a PDF, 0 for no limit
+        page_field: Name of a form field selecting pages, the page count of the
+            documents is not checked if it comes before them
+        dest_dir: Directory of the temporary files, defaults to the system one
+
+    Returns:
+        (list of Upload in the order of the form, dict of the other form fields as strings)
+
+    Raises:
+        UploadRejected: 400, 413 or 415 for an upload turned away
+    """
+    content_type, params = parse_options_header(request.headers.get("content-type", ""))
+    if content_type != b"multipart/form-data" or b"boundary" not in params:
+        raise UploadRejected(415, "Expected a multipart/form-data body")
+    # A declared size over the limit is turned away before any byte is read
+    declared_limit = max_total_size or (max_size if max_files == 1 else 0)
+    content_length = request.headers.get("content-length")
+    if declared_limit and content_length and content_length.isdigit() and int(content_length) > declared_limit + 64 * 1024:
+        raise UploadRejected(413, f"Upload is larger than {declared_limit} bytes")
+
+    allowed_extensions = set(allowed_extensions)
+    fields: Dict[str, str] = {}
+    uploads: List[Upload] = []
+    total_size = 0
+    state = {'header_field': b'', 'header_value': b'', 'headers': {}}
+    # Part events of the current chunk, handled after the parser returned
+    events = []
+
+    def on_part_begin():
+        state['headers'] = {}
+
+    def on_header_field(data, start, end):
+        state['header_field'] += data[start:end]
+
+    def on_header_value(data, start, end):
+        state['header_value'] += data[start:end]
+
+    def on_header_end():
+        state['headers'][state['header_field'].lower()] = state['header_value']
+        state['header_field'] = state['header_value'] = b''
+
+    def on_headers_finished():
+        _, options = parse_options_header(state['headers'].get(b'content-disposition', b''))
+        events.append(('begin', options.get(b'name', b'').decode(), options.get(b'filename')))
+
+    def on_part_data(data, start, end):
+        events.append(('data', data[start:end]))
+
+    def on_part_end():
+        events.append(('end',))
+
+    parser = multipart.MultipartParser(params[b"boundary"], {
+        'on_part_begin': on_part_begin,
+        'on_header_field': on_header_field,
+        'on_header_value': on_header_value,
+        'on_header_end': on_header_end,
+        'on_headers_finished': on_headers_finished,
+        'on_part_data': on_part_data,
+        'on_part_end': on_part_end,
+    })
+
+    file_obj = None
+    # Where the data of the current part goes: 'file', 'field', or None for other files
+    target = None
+    field_name = None
+    field_value = []
+    head_check = None
+    try:
+        async for chunk in request.stream():
+            parser.write(chunk)
+            for event in events:
+                if event[0] == 'begin':
+                    field_name, filename = event[1], event[2]
+                    field_value = []
+                    if filename is None:
+                        target = 'field'
+                    elif field_name != file_field or (max_files and len(uploads) >= max_files):
+                        target = None
+                    else:
+                        target = 'file'
+                        filename = filename.decode('utf-8', 'replace')
+                        file_ext = Path(filename).suffix.lower()
+                        if allowed_extensions and file_ext not in allowed_extensions:
+                            raise UploadRejected(
+                                400, f"Unsupported file type of {filename}: {file_ext}. Allowed: {', '.join(sorted(allowed_extensions))}"
+                            )
+                        fd, path = tempfile.mkstemp(suffix=file_ext, dir=dest_dir)
+                        file_obj = os.fdopen(fd, 'wb')
+                        upload = Upload(filename, path)
+                        uploads.append(upload)
+                        # Only the selected pages count, which the document page count says nothing about
+                        page_limit = 0 if page_field and fields.get(page_field, '').strip() else max_pages
+                        head_check = PdfHeadCheck(page_limit) if file_ext == '.pdf' else None
+                elif event[0] == 'data':
+                    if target == 'file':
+                        upload.size += len(event[1])
+                        total_size += len(event[1])
+                        if max_size and upload.size > max_size:
+                            raise UploadRejected(413, f"Upload {upload.filename} is larger than {max_size} bytes")
+                        if max_total_size and total_size > max_total_size:
+                            raise UploadRejected(413, f"Uploads are larger than {max_total_size} bytes together")
+                        if head_check is not None:
+                            try:
+                                head_check.feed(event[1])
+                            except UploadRejected as e:
+                                raise UploadRejected(e.status_code, f"{upload.filename}: {e.detail}")
+                        file_obj.write(event[1])
+                    elif target == 'field':
+                        field_value.append(event[1])
+                else:
+                    if target == 'file':
+                        file_obj.close()
+                        file_obj = None
+                    elif target == 'field':
+                        fields[field_name] = b''.join(field_value).decode('utf-8', 'replace')
+                    target = None
+            events.clear()
+        parser.finalize()
+        if not uploads:
+            raise UploadRejected(400, f"Missing file field: {file_field}")
+    except BaseException:
+        if file_obj is not None:
+            file_obj.close()
+        for upload in uploads:
+            upload.discard()
+        raise
+    return uploads, fields
+
+
+def form_bool(value: Optional[str], default: bool = False) -> bool:
+    """Read a boolean form field the way FastAPI does"""
+    if value is None or value == "":
+        return default
+    return value.strip().lower() in ("1", "true", "on", "yes")
@@ -0,0 +1,128 @@
+"""
+Streaming ZIP archives of parse results for MonkeyOCR API
+"""
+import os
+import time
+import zipfile
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+# Members in these formats are already compressed, deflating them again only costs time
+STORED_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.gif', '.webp', '.zip', '.gz', '.br'}
+
+# Result files renamed after the original document in the archive
+RENAMED_SUFFIXES = ['_content_list.json', '_middle.json', '_model.pdf', '_layout.pdf', '_spans.pdf']
+
+
+def zip_members(result_dir: str, original_name: str, skip: Iterable[str] = ()) -> List[Tuple[str, str]]:
+    """
+    List the files of a result directory with their names in the archive
+    
+    Args:
+        result_dir: Directory written by parse_pdf
+        original_name: Uploaded filename without extension, prefixed to the member names
+        skip: Paths relative to result_dir left out of the archive
+        
+    Returns:
+        List of (file path, archive name)
+    """
+    skip = set(skip)
+    members = []
+    for root, dirs, filenames in os.walk(result_dir):
+        for filename in filenames:
+            file_path = os.path.join(root, filename)
+            rel_path = os.path.relpath(file_path, result_dir)
+            if rel_path in skip:
+                continue
+            
+            suffix = next((suffix for suffix in RENAMED_SUFFIXES if filename.endswith(suffix)), None)
+            if filename.endswith('.md'):
+                new_filename = f"{original_name}.md"
+            elif suffix is not None:
+                new_filename = f"{original_name}{suffix}"
+            elif 'images/' in rel_path:
+                # Keep images in images subfolder with original name prefix
+                new_filename = f"images/{original_name}_{os.path.basename(rel_path)}"
+            else:
+                new_filename = f"{original_name}_{filename}"
+            members.append((file_path, new_filename))
+    return members
+
+
+class _ChunkBuffer:
+    """Unseekable sink collecting what ZipFile writes until it is taken"""
+    
+    def __init__(self):
+        self._chunks = []
+    
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+    
+    def flush(self):
+        pass
+    
+    def take(self) -> bytes:
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+class ZipStream:
+    """
+    A ZIP archive produced chunk by chunk while it is iterated, nothing is
+    written to disk. Already compressed members are stored, the others deflated.
+    """
+    
+    def __init__(self, members: List[Tuple[str, str]], name: str = "", chunk_size: int = 1024 * 1024):
+        """
+        Args:
+            members: List of (file path, archive name)
+            name: Archive name used in logs
+            chunk_size: Bytes read from a member at a time
+        """
+        self.members = members
+        self.name = name
+        self.chunk_size = chunk_size
+        self.bytes_sent = 0
+        self.time_to_first_byte: Optional[float] = None
+        self.duration: Optional[float] = None
+    
+    def __iter__(self) -> Iterator[bytes]:
+        start = time.time()
+        buffer = _ChunkBuffer()
+        
+        def emit():
+            data = buffer.take()
+            if data:
+                if self.time_to_first_byte is None:
+                    self.time_to_first_byte = time.time() - start
+                self.bytes_sent += len(data)
+            return data
+        
+        with zipfile.ZipFile(buffer, 'w', compression=zipfile.ZIP_DEFLATED) as zipf:
+            for file_path, arcname in self.members:
+                zinfo = zipfile.ZipInfo.from_file(file_path, arcname)
+                if os.path.splitext(file_path)[1].lower() in STORED_EXTENSIONS:
+                    zinfo.compress_type = zipfile.ZIP_STORED
+                else:
+                    zinfo.compress_type = zipfile.ZIP_DEFLATED
+                with open(file_path, 'rb') as src, zipf.open(zinfo, 'w') as dest:
+                    while True:
+                        data = src.read(self.chunk_size)
+                        if not data:
+                            break
+                        dest.write(data)
+                        chunk = emit()
+                        if chunk:
+                            yield chunk
+                chunk = emit()
+                if chunk:
+                    yield chunk
+        # The central directory is written on close
+        chunk = emit()
+        if chunk:
+            yield chunk
+        
+        self.duration = time.time() - start
+        print(f"ZIP {self.name}: {len(self.members)} files, {self.bytes_sent} bytes, "
+              f"first byte after {self.time_to_first_byte or 0:.3f}s, done after {self.duration:.3f}s")
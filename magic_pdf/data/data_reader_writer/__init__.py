@@ -2,6 +2,8 @@ from magic_pdf.data.data_reader_writer.filebase import \
     FileBasedDataReader  # noqa: F401
 from magic_pdf.data.data_reader_writer.filebase import \
     FileBasedDataWriter  # noqa: F401
+from magic_pdf.data.data_reader_writer.filebase import \
+    MappedFile  # noqa: F401
 from magic_pdf.data.data_reader_writer.multi_bucket_s3 import \
     MultiBucketS3DataReader  # noqa: F401
 from magic_pdf.data.data_reader_writer.multi_bucket_s3 import \
@@ -1,5 +1,6 @@
 
 from abc import ABC, abstractmethod
+from typing import Iterable
 
 
 class DataReader(ABC):
@@ -61,3 +62,15 @@ class DataWriter(ABC):
             if flag:
                 self.write(path, bit_data)
                 break
+
+    def write_stream(self, path: str, chunks: Iterable[bytes]) -> None:
+        """Write the chunks to the file one after another.
+
+        Writers that can append override this to write every chunk as it
+        comes, the default joins them and writes once.
+
+        Args:
+            path (str): the target file where to write
+            chunks (Iterable[bytes]): the data want to write, in order
+        """
+        self.write(path, b''.join(chunks))
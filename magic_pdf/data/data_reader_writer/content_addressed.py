@@ -0,0 +1,95 @@
+import os
+import threading
+
+from magic_pdf.data.data_reader_writer.base import DataWriter
+from magic_pdf.libs.hash_utils import compute_bytes_sha256
+
+
+class ContentAddressedDataWriter(DataWriter):
+    def __init__(self, writer: DataWriter) -> None:
+        """Write through writer under the sha256 of the data, each distinct
+        content is written once.
+
+        The path given to `write` keeps its extension and is recorded in
+        `manifest`, mapped to the content key the data is stored under.
+
+        Args:
+            writer (DataWriter): the writer doing the actual writes
+        """
+        self._writer = writer
+        self._lock = threading.Lock()
+        self._sizes = {}
+        self.manifest = {}
+        self.bytes_written = 0
+        self.bytes_deduplicated = 0
+
+    def write(self, path: str, data: bytes) -> None:
+        """Write the data under its content key, unless that content is
+        already written.
+
+        Args:
+            path (str): the path the data is referenced by
+            data (bytes): the data want to write
+        """
+        key = compute_bytes_sha256(data) + os.path.splitext(path)[1]
+        with self._lock:
+            self.manifest[path] = key
+            if key in self._sizes:
+                self.bytes_deduplicated += len(data)
+                return
+            # claimed before writing, a concurrent write of the same content skips it
+            self._sizes[key] = len(data)
+        try:
+            self._writer.write(key, data)
+        except BaseException:
+            with self._lock:
+                self._sizes.pop(key, None)
+                self.manifest.pop(path, None)
+            raise
+        with self._lock:
+            self.bytes_written += len(data)
+
+    def stats(self) -> dict:
+        """The counts of the written data.
+
+        Returns:
+            dict: images (paths written), unique_images (contents stored),
+                bytes_written and bytes_deduplicated (bytes not written again)
+        """
+        with self._lock:
+            return {
+                'images': len(self.manifest),
+                'unique_images': len(self._sizes),
+                'bytes_written': self.bytes_written,
+                'bytes_deduplicated': self.bytes_deduplicated,
+            }
+
+
+def merge_image_stats(stats_list, manifest: dict) -> dict:
+    """Sum the `ContentAddressedDataWriter.stats` of several writers, the
+    image counts are taken from their merged manifest."""
+    merged = {
+        'images': len(manifest),
+        'unique_images': len(set(manifest.values())),
+        'bytes_written': 0,
+        'bytes_deduplicated': 0,
+    }
+    for stats in stats_list:
+        merged['bytes_written'] += stats.get('bytes_written', 0)
+        merged['bytes_deduplicated'] += stats.get('bytes_deduplicated', 0)
+    return merged
+
+
+def apply_image_manifest(obj, manifest: dict) -> None:
+    """Replace the `image_path` of every span under obj by its content key."""
+    if isinstance(obj, dict):
+        image_path = obj.get('image_path')
+        if image_path and image_path in manifest:
+            obj['image_path'] = manifest[image_path]
+        for value in obj.values():
+            if isinstance(value, (dict, list)):
+                apply_image_manifest(value, manifest)
+    elif isinstance(obj, list):
+        for item in obj:
+            if isinstance(item, (dict, list)):
+                apply_image_manifest(item, manifest)
@@ -1,16 +1,37 @@
+import mmap
 import os
+from typing import Iterable
 
 from magic_pdf.data.data_reader_writer.base import DataReader, DataWriter
 
 
+class MappedFile(mmap.mmap):
+    """A read only memory map of a file, which remembers the path of the
+    file.
+
+    It can be used where bytes are, slicing it copies only the slice. The
+    pages of the file are loaded on access and are shared with the page
+    cache, and the pdf helpers open the file by `name` instead of copying
+    the map.
+    """
+
+    def __new__(cls, path: str):
+        with open(path, 'rb') as f:
+            self = super().__new__(cls, f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.name = path
+        return self
+
+
 class FileBasedDataReader(DataReader):
-    def __init__(self, parent_dir: str = ''):
+    def __init__(self, parent_dir: str = '', use_mmap: bool = False):
         """Initialized with parent_dir.
 
         Args:
             parent_dir (str, optional): the parent directory that may be used within methods. Defaults to ''.
+            use_mmap (bool, optional): read whole files as a MappedFile instead of bytes. Defaults to False.
         """
         self._parent_dir = parent_dir
+        self._use_mmap = use_mmap
 
     def read_at(self, path: str, offset: int = 0, limit: int = -1) -> bytes:
         """Read at offset and limit.
@@ -21,12 +42,16 @@ class FileBasedDataReader(DataReader):
             limit (int, optional): the length of bytes want to read. Defaults to -1.
 
         Returns:
-            bytes: the content of file
+            bytes: the content of file, a MappedFile if use_mmap is set and the whole of a non empty file is read
         """
         fn_path = path
         if not os.path.isabs(fn_path) and len(self._parent_dir) > 0:
             fn_path = os.path.join(self._parent_dir, path)
 
+        # an empty file can not be mapped
+        if self._use_mmap and offset == 0 and limit == -1 and os.path.getsize(fn_path) > 0:
+            return MappedFile(fn_path)
+
         with open(fn_path, 'rb') as f:
             f.seek(offset)
             if limit == -1:
@@ -51,6 +76,15 @@ class FileBasedDataWriter(DataWriter):
             path (str): the path of file, if the path is relative path, it will be joined with parent_dir.
             data (bytes): the data want to write
         """
+        self.write_stream(path, [data])
+
+    def write_stream(self, path: str, chunks: Iterable[bytes]) -> None:
+        """Write file with the chunks, each chunk is written as it comes.
+
+        Args:
+            path (str): the path of file, if the path is relative path, it will be joined with parent_dir.
+            chunks (Iterable[bytes]): the data want to write, in order
+        """
         fn_path = path
         if not os.path.isabs(fn_path) and len(self._parent_dir) > 0:
             fn_path = os.path.join(self._parent_dir, path)
@@ -59,4 +93,5 @@ class FileBasedDataWriter(DataWriter):
             os.makedirs(os.path.dirname(fn_path), exist_ok=True)
 
         with open(fn_path, 'wb') as f:
-            f.write(data)
+            for chunk in chunks:
+                f.write(chunk)
@@ -1,7 +1,9 @@
 
+from loguru import logger
+
 from magic_pdf.config.exceptions import InvalidConfig, InvalidParams
 from magic_pdf.data.data_reader_writer.base import DataReader, DataWriter
-from magic_pdf.data.io.s3 import S3Reader, S3Writer
+from magic_pdf.data.io.s3 import S3RangeFile, S3Reader, S3Writer
 from magic_pdf.data.schemas import S3Config
 from magic_pdf.libs.path_utils import (parse_s3_range_params, parse_s3path,
                                        remove_non_official_s3_args)
@@ -49,17 +51,32 @@ class MultiS3Mixin:
 
 
 class MultiBucketS3DataReader(DataReader, MultiS3Mixin):
-    def read(self, path: str) -> bytes:
+    def read(self, path: str, page_ids: list[int] | None = None) -> bytes:
         """Read the path from s3, select diffect bucket client for each request
         based on the bucket, also support range read.
 
         Args:
             path (str): the s3 path of file, the path must be in the format of s3://bucket_name/path?offset,limit.
             for example: s3://bucket_name/path?0,100.
+            page_ids (list[int] | None, optional): the path is a pdf, read only the
+                byte ranges of these pages and return a pdf of them in this order,
+                see `extract_pdf_pages`. Defaults to None, the whole file.
 
         Returns:
             bytes: the content of s3 file.
         """
+        if page_ids is not None:
+            # imported here, magic_pdf.data.utils imports this package
+            from magic_pdf.data.utils import extract_pdf_pages
+
+            with self.open(remove_non_official_s3_args(path)) as stream:
+                bits = extract_pdf_pages(stream, page_ids)
+                logger.info(
+                    f'{path}: {stream.bytes_fetched} of {len(stream)} bytes fetched '
+                    f'in {stream.requests} requests for {len(page_ids)} pages'
+                )
+            return bits
+
         may_range_params = parse_s3_range_params(path)
         if may_range_params is None or 2 != len(may_range_params):
             byte_start, byte_len = 0, -1
@@ -107,6 +124,25 @@ class MultiBucketS3DataReader(DataReader, MultiS3Mixin):
                 path = self.default_prefix + '/' + path
         return s3_reader.read_at(path, offset, limit)
 
+    def open(self, path: str, **kwargs) -> S3RangeFile:
+        """Open the file for reading by ranges, only the parts read are
+        fetched, see `S3RangeFile` for the keyword arguments.
+
+        Args:
+            path (str): the file path.
+
+        Returns:
+            S3RangeFile: the seekable file object.
+        """
+        if path.startswith('s3://'):
+            bucket_name, path = parse_s3path(path)
+            s3_reader = self.__get_s3_client(bucket_name)
+        else:
+            s3_reader = self.__get_s3_client(self.default_bucket)
+            if self.default_prefix:
+                path = self.default_prefix + '/' + path
+        return s3_reader.open(path, **kwargs)
+
 
 class MultiBucketS3DataWriter(DataWriter, MultiS3Mixin):
     def __get_s3_client(self, bucket_name: str):
@@ -0,0 +1,75 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable
+
+from magic_pdf.data.data_reader_writer.base import DataWriter
+
+
+class PipelinedDataWriter(DataWriter):
+    def __init__(self, writer: DataWriter, num_workers: int = 4, max_in_flight: int = 16) -> None:
+        """Write through writer in a thread pool.
+
+        Args:
+            writer (DataWriter): the writer doing the actual writes
+            num_workers (int, optional): the number of writing threads. Defaults to 4.
+            max_in_flight (int, optional): submitting blocks while that many writes
+                are pending, which bounds the memory held by queued data. Defaults to 16.
+        """
+        self._writer = writer
+        self._executor = ThreadPoolExecutor(max_workers=num_workers, thread_name_prefix='data_writer')
+        self._in_flight = threading.BoundedSemaphore(max_in_flight)
+        self._futures = []
+
+    def write(self, path: str, data: bytes) -> None:
+        """Queue the write of data, see `flush`.
+
+        Args:
+            path (str): the target file where to write
+            data (bytes): the data want to write
+        """
+        self.submit(path, lambda: data)
+
+    def submit(self, path: str, make_data: Callable[[], bytes]) -> None:
+        """Queue the write of the data make_data returns, make_data runs in the
+        writing thread, e.g. to encode an image off the caller thread.
+
+        Args:
+            path (str): the target file where to write
+            make_data (Callable[[], bytes]): produces the data want to write
+        """
+        self._in_flight.acquire()
+        try:
+            self._futures.append(self._executor.submit(self._write, path, make_data))
+        except BaseException:
+            self._in_flight.release()
+            raise
+
+    def _write(self, path, make_data):
+        try:
+            self._writer.write(path, make_data())
+        finally:
+            self._in_flight.release()
+
+    def flush(self) -> None:
+        """Wait for the queued writes, the first failed write raises its error."""
+        futures, self._futures = self._futures, []
+        error = None
+        for future in futures:
+            exc = future.exception()
+            if exc is not None and error is None:
+                error = exc
+        if error is not None:
+            raise error
+
+    def close(self) -> None:
+        """Flush and stop the writing threads."""
+        try:
+            self.flush()
+        finally:
+            self._executor.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
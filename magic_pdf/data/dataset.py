@@ -7,7 +7,8 @@ from loguru import logger
 
 from magic_pdf.config.enums import SupportedPdfParseMethod
 from magic_pdf.data.schemas import PageInfo
-from magic_pdf.data.utils import fitz_doc_to_image
+from magic_pdf.data.data_reader_writer.filebase import MappedFile
+from magic_pdf.data.utils import fitz_doc_image_size, fitz_doc_to_image, open_pdf
 from magic_pdf.filter import classify
 
 
@@ -17,6 +18,15 @@ class PageableData(ABC):
         """Transform data to image."""
         pass
 
+    def get_image_size(self) -> dict:
+        """Get the size of the image of `get_image`.
+
+        Returns:
+            dict: {width: int, height: int}
+        """
+        img_dict = self.get_image()
+        return {'width': img_dict['width'], 'height': img_dict['height']}
+
     @abstractmethod
     def get_doc(self) -> fitz.Page:
         """Get the pymudoc page."""
@@ -83,6 +93,12 @@ class Dataset(ABC):
         """The bits used to create this dataset."""
         pass
 
+    @abstractmethod
+    def get_doc(self) -> fitz.Document:
+        """Get the opened pymudoc document, it stays readable when the file it
+        was opened from is deleted, and is closed by `close`."""
+        pass
+
     @abstractmethod
     def get_page(self, page_id: int) -> PageableData:
         """Get the page indexed by page_id.
@@ -132,15 +148,27 @@ class Dataset(ABC):
         """
         pass
 
+    @abstractmethod
+    def close(self):
+        """Close the pymudoc document, the pages can not be used after.
+        """
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
 
 class PymuDocDataset(Dataset):
     def __init__(self, bits: bytes, lang=None):
         """Initialize the dataset, which wraps the pymudoc documents.
 
         Args:
-            bits (bytes): the bytes of the pdf
+            bits (bytes | MappedFile): the bytes of the pdf, a MappedFile is opened from its file without copying
         """
-        self._raw_fitz = fitz.open('pdf', bits)
+        self._raw_fitz = open_pdf(bits)
         self._records = [Doc(v) for v in self._raw_fitz]
         self._data_bits = bits
         self._raw_data = bits
@@ -170,6 +198,10 @@ class PymuDocDataset(Dataset):
         """The pdf bits used to create this dataset."""
         return self._data_bits
 
+    def get_doc(self) -> fitz.Document:
+        """The opened pymudoc document."""
+        return self._raw_fitz
+
     def get_page(self, page_id: int) -> PageableData:
         """The page doc object.
 
@@ -220,15 +252,29 @@ class PymuDocDataset(Dataset):
         """
         return PymuDocDataset(self._raw_data)
 
+    def close(self):
+        """Close the pymudoc document and unmap a mapped input file, the
+        pages can not be used after.
+        """
+        self._records = []
+        self._raw_fitz.close()
+        if isinstance(self._raw_data, MappedFile):
+            self._raw_data.close()
+
 
 class ImageDataset(Dataset):
     def __init__(self, bits: bytes):
         """Initialize the dataset, which wraps the pymudoc documents.
 
         Args:
-            bits (bytes): the bytes of the photo which will be converted to pdf first. then converted to pymudoc.
+            bits (bytes | MappedFile): the bytes of the photo which will be converted to pdf first. then converted to pymudoc.
         """
-        pdf_bytes = fitz.open(stream=bits).convert_to_pdf()
+        if isinstance(bits, MappedFile):
+            image_doc = fitz.open(bits.name)
+        else:
+            image_doc = fitz.open(stream=bits)
+        with image_doc:
+            pdf_bytes = image_doc.convert_to_pdf()
         self._raw_fitz = fitz.open('pdf', pdf_bytes)
         self._records = [Doc(v) for v in self._raw_fitz]
         self._raw_data = bits
@@ -254,6 +300,10 @@ class ImageDataset(Dataset):
         """The pdf bits used to create this dataset."""
         return self._data_bits
 
+    def get_doc(self) -> fitz.Document:
+        """The opened pymudoc document."""
+        return self._raw_fitz
+
     def get_page(self, page_id: int) -> PageableData:
         """The page doc object.
 
@@ -301,6 +351,15 @@ class ImageDataset(Dataset):
         """
         return ImageDataset(self._raw_data)
 
+    def close(self):
+        """Close the pymudoc document and unmap a mapped input file, the
+        pages can not be used after.
+        """
+        self._records = []
+        self._raw_fitz.close()
+        if isinstance(self._raw_data, MappedFile):
+            self._raw_data.close()
+
 class Doc(PageableData):
     """Initialized with pymudoc object."""
 
@@ -319,6 +378,17 @@ class Doc(PageableData):
         """
         return fitz_doc_to_image(self._doc)
 
+    def get_image_size(self):
+        """Return the size of the image, the page is not rendered.
+
+        Returns:
+            dict: {
+                width: int,
+                height: int
+            }
+        """
+        return fitz_doc_image_size(self._doc)
+
     def get_doc(self) -> fitz.Page:
         """Get the pymudoc object.
 
@@ -1,6 +1,6 @@
 
 from magic_pdf.data.io.base import IOReader, IOWriter  # noqa: F401
 from magic_pdf.data.io.http import HttpReader, HttpWriter  # noqa: F401
-from magic_pdf.data.io.s3 import S3Reader, S3Writer  # noqa: F401
+from magic_pdf.data.io.s3 import S3RangeFile, S3Reader, S3Writer  # noqa: F401
 
-__all__ = ['IOReader', 'IOWriter', 'HttpReader', 'HttpWriter', 'S3Reader', 'S3Writer']
\ No newline at end of file
+__all__ = ['IOReader', 'IOWriter', 'HttpReader', 'HttpWriter', 'S3RangeFile', 'S3Reader', 'S3Writer']
\ No newline at end of file
@@ -1,8 +1,47 @@
+import io
+import threading
+from collections import OrderedDict
+
 import boto3
 from botocore.config import Config
 
 from magic_pdf.data.io.base import IOReader, IOWriter
 
+# clients are thread safe and keep a connection pool, one is shared by every
+# reader and writer of the same credentials and endpoint
+_s3_clients = {}
+_s3_clients_lock = threading.Lock()
+
+
+def get_s3_client(ak: str, sk: str, endpoint_url: str, addressing_style: str = 'auto', max_pool_connections: int = 32):
+    """Get the shared boto3 client of the credentials and endpoint.
+
+    Args:
+        ak (str): access key
+        sk (str): secret key
+        endpoint_url (str): endpoint url of s3
+        addressing_style (str, optional): Defaults to 'auto'.
+        max_pool_connections (int, optional): the connections kept open by the client. Defaults to 32.
+
+    Returns:
+        the boto3 s3 client
+    """
+    key = (ak, sk, endpoint_url, addressing_style)
+    with _s3_clients_lock:
+        if key not in _s3_clients:
+            _s3_clients[key] = boto3.client(
+                service_name='s3',
+                aws_access_key_id=ak,
+                aws_secret_access_key=sk,
+                endpoint_url=endpoint_url,
+                config=Config(
+                    s3={'addressing_style': addressing_style},
+                    retries={'max_attempts': 5, 'mode': 'standard'},
+                    max_pool_connections=max_pool_connections,
+                ),
+            )
+        return _s3_clients[key]
+
 
 class S3Reader(IOReader):
     def __init__(
@@ -26,16 +65,7 @@ class S3Reader(IOReader):
         self._bucket = bucket
         self._ak = ak
         self._sk = sk
-        self._s3_client = boto3.client(
-            service_name='s3',
-            aws_access_key_id=ak,
-            aws_secret_access_key=sk,
-            endpoint_url=endpoint_url,
-            config=Config(
-                s3={'addressing_style': addressing_style},
-                retries={'max_attempts': 5, 'mode': 'standard'},
-            ),
-        )
+        self._s3_client = get_s3_client(ak, sk, endpoint_url, addressing_style)
 
     def read(self, key: str) -> bytes:
         """Read the file.
@@ -70,6 +100,140 @@ class S3Reader(IOReader):
             )
         return res['Body'].read()
 
+    def size(self, key: str) -> int:
+        """The size of the file.
+
+        Args:
+            key (str): the path of file
+
+        Returns:
+            int: the size in bytes
+        """
+        return self._s3_client.head_object(Bucket=self._bucket, Key=key)['ContentLength']
+
+    def open(self, key: str, **kwargs) -> 'S3RangeFile':
+        """Open the file for reading by ranges, see `S3RangeFile`.
+
+        Args:
+            key (str): the path of file
+
+        Returns:
+            S3RangeFile: the seekable file object
+        """
+        return S3RangeFile(self, key, **kwargs)
+
+
+class S3RangeFile(io.RawIOBase):
+    def __init__(
+        self,
+        reader: S3Reader,
+        key: str,
+        block_size: int = 64 << 10,
+        cache_blocks: int = 1024,
+        read_ahead: int = 64,
+        size: int | None = None,
+    ):
+        """A seekable read only file object over a s3 file, it fetches the
+        blocks it reads with ranged gets.
+
+        The last cache_blocks blocks read are cached. Reads of consecutive
+        blocks fetch the next blocks with them in the same request, one more
+        for each block of the run up to read_ahead, so sequential reads take
+        few requests while scattered reads fetch single blocks.
+
+        Args:
+            reader (S3Reader): the reader of the bucket
+            key (str): the path of file
+            block_size (int, optional): the bytes of a block. Defaults to 64 KiB.
+            cache_blocks (int, optional): the number of cached blocks. Defaults to 1024.
+            read_ahead (int, optional): the most blocks fetched ahead on sequential reads. Defaults to 64.
+            size (int, optional): the size of the file, asked to s3 if not given.
+        """
+        super().__init__()
+        self._reader = reader
+        self._key = key
+        self._block_size = block_size
+        self._cache_blocks = max(cache_blocks, read_ahead + 1)
+        self._read_ahead = read_ahead
+        self._size = reader.size(key) if size is None else size
+        self._pos = 0
+        self._cache = OrderedDict()
+        self._last_block = None
+        self._sequential_run = 0
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.bytes_fetched = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._pos
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_SET:
+            pos = offset
+        elif whence == io.SEEK_CUR:
+            pos = self._pos + offset
+        elif whence == io.SEEK_END:
+            pos = self._size + offset
+        else:
+            raise ValueError(f'invalid whence: {whence}')
+        if pos < 0:
+            raise ValueError(f'negative seek position: {pos}')
+        self._pos = pos
+        return pos
+
+    def __len__(self) -> int:
+        return self._size
+
+    def _block(self, index: int) -> bytes:
+        with self._lock:
+            if self._last_block is not None and index == self._last_block + 1:
+                self._sequential_run += 1
+            elif index != self._last_block:
+                self._sequential_run = 0
+            self._last_block = index
+
+            block = self._cache.get(index)
+            if block is not None:
+                self._cache.move_to_end(index)
+                return block
+
+            count = 1 + min(self._sequential_run, self._read_ahead)
+            start = index * self._block_size
+            limit = min(count * self._block_size, self._size - start)
+            data = self._reader.read_at(self._key, start, limit)
+            self.requests += 1
+            self.bytes_fetched += len(data)
+
+            for i in range(0, len(data), self._block_size):
+                self._cache[index + i // self._block_size] = data[i:i + self._block_size]
+                self._cache.move_to_end(index + i // self._block_size)
+            while len(self._cache) > self._cache_blocks:
+                self._cache.popitem(last=False)
+            return data[:self._block_size]
+
+    def readinto(self, b) -> int:
+        view = memoryview(b).cast('B')
+        n = 0
+        while n < len(view) and self._pos < self._size:
+            index, offset = divmod(self._pos, self._block_size)
+            block = self._block(index)
+            chunk = block[offset:offset + len(view) - n]
+            if not chunk:
+                break
+            view[n:n + len(chunk)] = chunk
+            n += len(chunk)
+            self._pos += len(chunk)
+        return n
+
+    def readall(self) -> bytes:
+        return self.read(max(self._size - self._pos, 0))
+
 
 class S3Writer(IOWriter):
     def __init__(
@@ -93,16 +257,7 @@ class S3Writer(IOWriter):
         self._bucket = bucket
         self._ak = ak
         self._sk = sk
-        self._s3_client = boto3.client(
-            service_name='s3',
-            aws_access_key_id=ak,
-            aws_secret_access_key=sk,
-            endpoint_url=endpoint_url,
-            config=Config(
-                s3={'addressing_style': addressing_style},
-                retries={'max_attempts': 5, 'mode': 'standard'},
-            ),
-        )
+        self._s3_client = get_s3_client(ak, sk, endpoint_url, addressing_style)
 
     def write(self, key: str, data: bytes):
         """Write file with data.
@@ -1,53 +1,218 @@
 import json
 import os
+import queue
 import tempfile
+import threading
 import shutil
 from pathlib import Path
+from typing import Callable, Iterable, Iterator
 
 from magic_pdf.config.exceptions import EmptyData, InvalidParams
 from magic_pdf.data.data_reader_writer import (FileBasedDataReader,
                                                MultiBucketS3DataReader)
 from magic_pdf.data.dataset import ImageDataset, PymuDocDataset
+from magic_pdf.data.utils import extract_pdf_pages
 from magic_pdf.utils.office_to_pdf import convert_file_to_pdf, ConvertToPdfError
 
-def read_jsonl(
-    s3_path_or_local: str, s3_client: MultiBucketS3DataReader | None = None
-) -> list[PymuDocDataset]:
-    """Read the jsonl file and return the list of PymuDocDataset.
+
+_PREFETCH_DONE = object()
+
+
+def _iter_prefetched(items: Iterable, load: Callable, prefetch: int) -> Iterator:
+    """Yield load(item) for every item, the next prefetch items are loaded
+    on a background thread while the current one is used.
+
+    Args:
+        items (Iterable): the items to load, iterated on the background thread
+        load (Callable): loads an item, e.g. reads the bytes of a file
+        prefetch (int): the most items loaded ahead, 0 loads them when they are asked for
+
+    Yields:
+        the loaded items, in order
+    """
+    if prefetch <= 0:
+        for item in items:
+            yield load(item)
+        return
+
+    loaded = queue.Queue(maxsize=prefetch)
+    stop = threading.Event()
+
+    def put(entry):
+        # gives up when the consumer stopped, instead of blocking on a full queue forever
+        while not stop.is_set():
+            try:
+                loaded.put(entry, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def worker():
+        try:
+            for item in items:
+                if not put((load(item), None)):
+                    return
+        except BaseException as e:  # noqa
+            put((None, e))
+            return
+        put(_PREFETCH_DONE)
+
+    thread = threading.Thread(target=worker, name='dataset_prefetch', daemon=True)
+    thread.start()
+    try:
+        while True:
+            entry = loaded.get()
+            if entry is _PREFETCH_DONE:
+                return
+            value, error = entry
+            if error is not None:
+                raise error
+            yield value
+    finally:
+        stop.set()
+
+
+def _iter_datasets(bits_iter: Iterator[bytes], make: Callable, close_after_use: bool) -> Iterator:
+    for bits in bits_iter:
+        ds = make(bits)
+        if not close_after_use:
+            yield ds
+            continue
+        try:
+            yield ds
+        finally:
+            ds.close()
+
+
+def iter_jsonl(
+    s3_path_or_local: str,
+    s3_client: MultiBucketS3DataReader | None = None,
+    prefetch: int = 2,
+    close_after_use: bool = True,
+) -> Iterator[PymuDocDataset]:
+    """Read the jsonl file and yield a PymuDocDataset for each line, one at a
+    time.
+
+    A line may have `page_ids`, the pages of the pdf to read, then the dataset
+    has only them in this order and only their byte ranges are read from s3,
+    see `read_s3_pdf`.
 
     Args:
         s3_path_or_local (str): local file or s3 path
         s3_client (MultiBucketS3DataReader | None, optional): s3 client that support multiple bucket. Defaults to None.
+        prefetch (int, optional): the pdf files read ahead on a background thread. Defaults to 2.
+        close_after_use (bool, optional): close each dataset when the next one is asked for. Defaults to True.
 
     Raises:
         InvalidParams: if s3_path_or_local is s3 path but s3_client is not provided.
         EmptyData: if no pdf file location is provided in some line of jsonl file.
         InvalidParams: if the file location is s3 path but s3_client is not provided
 
-    Returns:
-        list[PymuDocDataset]: each line in the jsonl file will be converted to a PymuDocDataset
+    Yields:
+        PymuDocDataset: the dataset of each line in the jsonl file
     """
-    bits_arr = []
     if s3_path_or_local.startswith('s3://'):
         if s3_client is None:
             raise InvalidParams('s3_client is required when s3_path is provided')
         jsonl_bits = s3_client.read(s3_path_or_local)
     else:
         jsonl_bits = FileBasedDataReader('').read(s3_path_or_local)
-    jsonl_d = [
-        json.loads(line) for line in jsonl_bits.decode().split('\n') if line.strip()
-    ]
-    for d in jsonl_d:
+    pdfs = []
+    for line in jsonl_bits.decode().split('\n'):
+        if not line.strip():
+            continue
+        d = json.loads(line)
         pdf_path = d.get('file_location', '') or d.get('path', '')
         if len(pdf_path) == 0:
             raise EmptyData('pdf file location is empty')
+        if pdf_path.startswith('s3://') and s3_client is None:
+            raise InvalidParams('s3_client is required when s3_path is provided')
+        pdfs.append((pdf_path, d.get('page_ids')))
+
+    def read(pdf):
+        pdf_path, page_ids = pdf
         if pdf_path.startswith('s3://'):
-            if s3_client is None:
-                raise InvalidParams('s3_client is required when s3_path is provided')
-            bits_arr.append(s3_client.read(pdf_path))
-        else:
-            bits_arr.append(FileBasedDataReader('').read(pdf_path))
-    return [PymuDocDataset(bits) for bits in bits_arr]
+            return s3_client.read(pdf_path, page_ids=page_ids)
+        if page_ids is not None:
+            with open(pdf_path, 'rb') as f:
+                return extract_pdf_pages(f, page_ids)
+        return FileBasedDataReader('').read(pdf_path)
+
+    return _iter_datasets(_iter_prefetched(pdfs, read, prefetch), PymuDocDataset, close_after_use)
+
+
+def read_jsonl(
+    s3_path_or_local: str, s3_client: MultiBucketS3DataReader | None = None
+) -> list[PymuDocDataset]:
+    """Read the jsonl file and return the list of PymuDocDataset.
+
+    Args:
+        s3_path_or_local (str): local file or s3 path
+        s3_client (MultiBucketS3DataReader | None, optional): s3 client that support multiple bucket. Defaults to None.
+
+    Raises:
+        InvalidParams: if s3_path_or_local is s3 path but s3_client is not provided.
+        EmptyData: if no pdf file location is provided in some line of jsonl file.
+        InvalidParams: if the file location is s3 path but s3_client is not provided
+
+    Returns:
+        list[PymuDocDataset]: each line in the jsonl file will be converted to a PymuDocDataset, of the pages in its `page_ids` when given
+    """
+    return list(iter_jsonl(s3_path_or_local, s3_client, prefetch=0, close_after_use=False))
+
+
+def read_s3_pdf(
+    s3_path: str, s3_client: MultiBucketS3DataReader, page_ids: list[int] | None = None
+) -> PymuDocDataset:
+    """Read a pdf from s3, only the byte ranges of page_ids when given.
+
+    The pages are copied into a new pdf from a `S3RangeFile` of the pdf, which
+    fetches the blocks they touch, see `extract_pdf_pages`. The dataset has
+    the pages of page_ids in this order, numbered from 0.
+
+    Args:
+        s3_path (str): s3 path of the pdf
+        s3_client (MultiBucketS3DataReader): s3 client that support multiple bucket
+        page_ids (list[int] | None, optional): the pages to read. Defaults to None, all pages.
+
+    Raises:
+        ValueError: if a page is not in the pdf
+
+    Returns:
+        PymuDocDataset: the dataset of the pdf or of its pages in page_ids
+    """
+    return PymuDocDataset(s3_client.read(s3_path, page_ids=page_ids))
+
+
+def _find_files(path: str, suffixes: set[str]) -> list[str]:
+    if not os.path.isdir(path):
+        return [path]
+    fns = []
+    for root, _, files in os.walk(path):
+        for file in files:
+            if Path(file).suffix in suffixes:
+                fns.append(os.path.join(root, file))
+    return fns
+
+
+def iter_local_pdfs(
+    path: str, prefetch: int = 2, close_after_use: bool = True, use_mmap: bool = False
+) -> Iterator[PymuDocDataset]:
+    """Read pdf from path or directory, one file at a time.
+
+    Args:
+        path (str): pdf file path or directory that contains pdf files
+        prefetch (int, optional): the files read ahead on a background thread. Defaults to 2.
+        close_after_use (bool, optional): close each dataset when the next one is asked for. Defaults to True.
+        use_mmap (bool, optional): map the files instead of reading them into memory. Defaults to False.
+
+    Yields:
+        PymuDocDataset: the dataset of each pdf file
+    """
+    reader = FileBasedDataReader(use_mmap=use_mmap)
+    bits_iter = _iter_prefetched(_find_files(path, {'.pdf'}), reader.read, prefetch)
+    return _iter_datasets(bits_iter, PymuDocDataset, close_after_use)
 
 
 def read_local_pdfs(path: str) -> list[PymuDocDataset]:
@@ -59,19 +224,8 @@ def read_local_pdfs(path: str) -> list[PymuDocDataset]:
     Returns:
         list[PymuDocDataset]: each pdf file will converted to a PymuDocDataset
     """
-    if os.path.isdir(path):
-        reader = FileBasedDataReader()
-        ret = []
-        for root, _, files in os.walk(path):
-            for file in files:
-                suffix = file.split('.')
-                if suffix[-1] == 'pdf':
-                    ret.append( PymuDocDataset(reader.read(os.path.join(root, file))))
-        return ret
-    else:
-        reader = FileBasedDataReader()
-        bits = reader.read(path)
-        return [PymuDocDataset(bits)]
+    return list(iter_local_pdfs(path, prefetch=0, close_after_use=False))
+
 
 def read_local_office(path: str) -> list[PymuDocDataset]:
     """Read ms-office file (ppt, pptx, doc, docx) from path or directory.
@@ -116,6 +270,30 @@ def read_local_office(path: str) -> list[PymuDocDataset]:
     shutil.rmtree(temp_dir)
     return ret
 
+def iter_local_images(
+    path: str,
+    suffixes: list[str] = ['.png', '.jpg'],
+    prefetch: int = 2,
+    close_after_use: bool = True,
+    use_mmap: bool = False,
+) -> Iterator[ImageDataset]:
+    """Read images from path or directory, one file at a time.
+
+    Args:
+        path (str): image file path or directory that contains image files
+        suffixes (list[str]): the suffixes of the image files used to filter the files. Example: ['.jpg', '.png']
+        prefetch (int, optional): the files read ahead on a background thread. Defaults to 2.
+        close_after_use (bool, optional): close each dataset when the next one is asked for. Defaults to True.
+        use_mmap (bool, optional): map the files instead of reading them into memory. Defaults to False.
+
+    Yields:
+        ImageDataset: the dataset of each image file
+    """
+    reader = FileBasedDataReader(use_mmap=use_mmap)
+    bits_iter = _iter_prefetched(_find_files(path, set(suffixes)), reader.read, prefetch)
+    return _iter_datasets(bits_iter, ImageDataset, close_after_use)
+
+
 def read_local_images(path: str, suffixes: list[str]=['.png', '.jpg']) -> list[ImageDataset]:
     """Read images from path or directory.
 
@@ -126,17 +304,4 @@ def read_local_images(path: str, suffixes: list[str]=['.png', '.jpg']) -> list[I
     Returns:
         list[ImageDataset]: each image file will converted to a ImageDataset
     """
-    if os.path.isdir(path):
-        imgs_bits = []
-        s_suffixes = set(suffixes)
-        reader = FileBasedDataReader()
-        for root, _, files in os.walk(path):
-            for file in files:
-                suffix = Path(file).suffix
-                if suffix in s_suffixes:
-                    imgs_bits.append(reader.read(os.path.join(root, file)))
-        return [ImageDataset(bits) for bits in imgs_bits]
-    else:
-        reader = FileBasedDataReader()
-        bits = reader.read(path)
-        return [ImageDataset(bits)]
+    return list(iter_local_images(path, suffixes, prefetch=0, close_after_use=False))
@@ -1,10 +1,47 @@
+from io import BytesIO
+
 import fitz
 import numpy as np
+import pypdf
 from loguru import logger
 
+from magic_pdf.data.data_reader_writer.filebase import MappedFile
 from magic_pdf.utils.annotations import ImportPIL
 
 
+def open_pdf(pdf_bytes) -> fitz.Document:
+    """Open the pdf, a MappedFile is opened from its file so that its content
+    is not copied into a bytes object.
+
+    Args:
+        pdf_bytes (bytes | MappedFile): the pdf
+
+    Returns:
+        fitz.Document: the opened document
+    """
+    if isinstance(pdf_bytes, MappedFile):
+        return fitz.open(pdf_bytes.name, filetype='pdf')
+    return fitz.open('pdf', pdf_bytes)
+
+
+def fitz_doc_image_size(doc, dpi=200) -> dict:
+    """Get the size of the image `fitz_doc_to_image` makes of a page, without
+    rendering it.
+
+    Args:
+        doc (_type_): pymudoc page
+        dpi (int, optional): reset the dpi of dpi. Defaults to 200.
+
+    Returns:
+        dict: {'width': width, 'height': height }
+    """
+    rect = (doc.rect * fitz.Matrix(dpi / 72, dpi / 72)).irect
+    # same fallback as fitz_doc_to_image
+    if rect.width > 4500 or rect.height > 4500:
+        rect = doc.rect.irect
+    return {'width': rect.width, 'height': rect.height}
+
+
 @ImportPIL
 def fitz_doc_to_image(doc, dpi=200) -> dict:
     """Convert fitz.Document to image, Then convert the image to numpy array.
@@ -35,7 +72,7 @@ def fitz_doc_to_image(doc, dpi=200) -> dict:
 def load_images_from_pdf(pdf_bytes: bytes, dpi=200, start_page_id=0, end_page_id=None) -> list:
     from PIL import Image
     images = []
-    with fitz.open('pdf', pdf_bytes) as doc:
+    with open_pdf(pdf_bytes) as doc:
         pdf_page_num = doc.page_count
         end_page_id = (
             end_page_id
@@ -65,3 +102,133 @@ def load_images_from_pdf(pdf_bytes: bytes, dpi=200, start_page_id=0, end_page_id
             images.append(img_dict)
     return images
     return images
+
+
+def extract_pdf_pages(stream, page_ids: list) -> bytes:
+    """Copy some pages of a pdf into a new pdf, reading from stream only the
+    objects of those pages.
+
+    The pages are copied with pypdf, which reads the objects on demand. When
+    pypdf can not read the pdf, e.g. it is encrypted, the whole stream is read
+    and the pages are copied with PyMuPDF, so the new pdf has the same pages
+    either way.
+
+    Args:
+        stream: a seekable file object of the pdf, e.g. a `S3RangeFile`
+        page_ids (list): the indexes of the pages, in the order of the new pdf
+
+    Raises:
+        ValueError: if a page is not in the pdf
+
+    Returns:
+        bytes: the new pdf
+    """
+    pages = None
+    try:
+        reader = pypdf.PdfReader(stream)
+        if not reader.is_encrypted:
+            pages = reader.pages
+            page_count = len(pages)
+    except Exception as e:
+        logger.warning(f'pypdf can not read the pdf, read the whole pdf: {e}')
+        pages = None
+
+    if pages is not None:
+        missing = [page_id for page_id in page_ids if not 0 <= page_id < page_count]
+        if missing:
+            raise ValueError(f'pages {missing} not in the pdf of {page_count} pages')
+        try:
+            writer = pypdf.PdfWriter()
+            for page_id in page_ids:
+                writer.add_page(pages[page_id])
+            output = BytesIO()
+            writer.write(output)
+            return output.getvalue()
+        except Exception as e:
+            logger.warning(f'extract pages {page_ids} failed, read the whole pdf: {e}')
+
+    stream.seek(0)
+    with fitz.open('pdf', stream.read()) as doc:
+        doc.select(page_ids)
+        return doc.tobytes()
+
+
+def select_page_ids(page_count: int, start_page_id=0, end_page_id=None, page_ids=None) -> list:
+    """Get the pages of a document selected by a page range and a page list.
+
+    Args:
+        page_count (int): the pages of the document
+        start_page_id (int, optional): the first page. Defaults to 0.
+        end_page_id (int, optional): the last page, None or a negative value for the last page of the document
+        page_ids (Iterable[int], optional): only these pages of the range, in any order. Defaults to all of them.
+
+    Returns:
+        list[int]: the selected page indexes, sorted and without duplicates
+    """
+    end_page_id = (
+        end_page_id
+        if end_page_id is not None and end_page_id >= 0
+        else page_count - 1
+    )
+    if end_page_id > page_count - 1:
+        logger.warning('end_page_id is out of range, use pdf_docs length')
+        end_page_id = page_count - 1
+    start_page_id = max(start_page_id or 0, 0)
+    if page_ids is None:
+        return list(range(start_page_id, end_page_id + 1))
+    selected = sorted({page_id for page_id in page_ids if start_page_id <= page_id <= end_page_id})
+    if len(selected) < len(set(page_ids)):
+        logger.warning('some page_ids are out of range, they are skipped')
+    return selected
+
+
+def parse_page_ranges(spec: str) -> list:
+    """Parse a page selection like '1-5,8,10-' into ranges of page indexes.
+
+    The pages are numbered from 1 in the spec, a range without an end goes to
+    the last page.
+
+    Args:
+        spec (str): comma separated pages and inclusive page ranges
+
+    Returns:
+        list[tuple[int, int | None]]: (first, last) page indexes from 0, last is None for the last page
+
+    Raises:
+        ValueError: if the spec is malformed
+    """
+    ranges = []
+    for part in spec.split(','):
+        part = part.strip()
+        if not part:
+            continue
+        first, sep, last = part.partition('-')
+        try:
+            first = int(first) if first.strip() else 1
+            last = (int(last) if last.strip() else None) if sep else first
+        except ValueError:
+            raise ValueError(f'invalid page range: {part}')
+        if first < 1 or (last is not None and last < first):
+            raise ValueError(f'invalid page range: {part}')
+        ranges.append((first - 1, None if last is None else last - 1))
+    if not ranges:
+        raise ValueError('no pages selected')
+    return ranges
+
+
+def page_ranges_to_ids(page_ranges, page_count: int) -> list:
+    """Get the page indexes of the ranges made by `parse_page_ranges` that
+    are in a document.
+
+    Args:
+        page_ranges (list[tuple[int, int | None]]): the ranges
+        page_count (int): the pages of the document
+
+    Returns:
+        list[int]: the page indexes, sorted and without duplicates
+    """
+    page_ids = set()
+    for first, last in page_ranges:
+        last = page_count - 1 if last is None else min(last, page_count - 1)
+        page_ids.update(range(first, last + 1))
+    return sorted(page_ids)
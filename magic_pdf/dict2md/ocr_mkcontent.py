@@ -241,15 +241,28 @@ def para_to_standard_format_v2(para_block, img_buket_path, page_idx, drop_reason
     return para_content
 
 
-def union_make(pdf_info_dict: list,
-               make_mode: str,
-               drop_mode: str,
-               img_buket_path: str = '',
-               page_markers: bool = False,
-               ):
-    output_content = []
-    total_pages = len(pdf_info_dict)
-    
+def union_make_pages(pdf_info_dict,
+                     make_mode: str,
+                     drop_mode: str,
+                     img_buket_path: str = '',
+                     page_markers: bool = False,
+                     total_pages: int = None,
+                     ):
+    """Make the content page by page.
+
+    Args:
+        pdf_info_dict (Iterable[dict]): the page infos, may be a generator of pages still being parsed
+        total_pages (int, optional): the page count used by the page markers. Defaults to len(pdf_info_dict).
+
+    Yields:
+        str | list: for the markdown modes the markdown of one page, the chunks
+            are joined with '\n\n'. For STANDARD_FORMAT the content list items of one page.
+            Pages without content yield nothing.
+    """
+    if total_pages is None:
+        total_pages = len(pdf_info_dict)
+    has_content = False
+
     for page_info in pdf_info_dict:
         drop_reason_flag = False
         drop_reason = None
@@ -273,13 +286,14 @@ def union_make(pdf_info_dict: list,
         page_idx = page_info.get('page_idx')
         if not paras_of_layout:
             continue
-            
+
+        page_content = []
         # Add page marker before content (except for first page)
-        if page_markers and page_idx > 0 and output_content:
+        if page_markers and page_idx > 0 and has_content:
             if make_mode in [MakeMode.MM_MD, MakeMode.NLP_MD]:
                 # For markdown modes, add HTML comment as page marker
                 page_marker = f"<!-- Page Break: Page {page_idx + 1} of {total_pages} -->"
-                output_content.append(page_marker)
+                page_content.append(page_marker)
             elif make_mode == MakeMode.STANDARD_FORMAT:
                 # For standard format, add as a separate block
                 page_marker_block = {
@@ -287,16 +301,16 @@ def union_make(pdf_info_dict: list,
                     'page_num': page_idx + 1,
                     'total_pages': total_pages
                 }
-                output_content.append(page_marker_block)
-        
+                page_content.append(page_marker_block)
+
         if make_mode == MakeMode.MM_MD:
             page_markdown = ocr_mk_markdown_with_para_core_v2(
                 paras_of_layout, 'mm', img_buket_path)
-            output_content.extend(page_markdown)
+            page_content.extend(page_markdown)
         elif make_mode == MakeMode.NLP_MD:
             page_markdown = ocr_mk_markdown_with_para_core_v2(
                 paras_of_layout, 'nlp')
-            output_content.extend(page_markdown)
+            page_content.extend(page_markdown)
         elif make_mode == MakeMode.STANDARD_FORMAT:
             for para_block in paras_of_layout:
                 if drop_reason_flag:
@@ -305,11 +319,28 @@ def union_make(pdf_info_dict: list,
                 else:
                     para_content = para_to_standard_format_v2(
                         para_block, img_buket_path, page_idx)
-                output_content.append(para_content)
+                page_content.append(para_content)
+
+        if not page_content:
+            continue
+        has_content = True
+        if make_mode in [MakeMode.MM_MD, MakeMode.NLP_MD]:
+            yield '\n\n'.join(page_content)
+        elif make_mode == MakeMode.STANDARD_FORMAT:
+            yield page_content
+
+
+def union_make(pdf_info_dict: list,
+               make_mode: str,
+               drop_mode: str,
+               img_buket_path: str = '',
+               page_markers: bool = False,
+               ):
+    pages = union_make_pages(pdf_info_dict, make_mode, drop_mode, img_buket_path, page_markers)
     if make_mode in [MakeMode.MM_MD, MakeMode.NLP_MD]:
-        return '\n\n'.join(output_content)
+        return '\n\n'.join(pages)
     elif make_mode == MakeMode.STANDARD_FORMAT:
-        return output_content
+        return [para_content for page_content in pages for para_content in page_content]
 
 
 def get_title_level(block):
@@ -4,6 +4,7 @@ import fitz
 from loguru import logger
 
 from magic_pdf.config.drop_reason import DropReason
+from magic_pdf.data.utils import open_pdf
 from magic_pdf.libs.commons import get_top_percent_list, mymax
 from magic_pdf.libs.language import detect_lang
 from magic_pdf.libs.pdf_check import detect_invalid_chars_by_pymupdf, detect_invalid_chars
@@ -302,7 +303,7 @@ def check_invalid_chars(pdf_bytes):
 
 
 def pdf_meta_scan(pdf_bytes: bytes):
-    doc = fitz.open('pdf', pdf_bytes)
+    doc = open_pdf(pdf_bytes)
     is_needs_password = doc.needs_pass
     is_encrypted = doc.is_encrypted
     total_page = len(doc)
@@ -3,7 +3,7 @@ from magic_pdf.config.constants import CROSS_PAGE
 from magic_pdf.config.ocr_content_type import (BlockType, CategoryId,
                                                ContentType)
 from magic_pdf.data.dataset import Dataset
-from magic_pdf.model.magic_model import MagicModel
+from magic_pdf.data.utils import open_pdf
 
 
 def draw_bbox_without_number(i, bbox_list, page, rgb_config, fill_config):
@@ -68,7 +68,8 @@ def draw_bbox_with_number(i, bbox_list, page, rgb_config, fill_config, draw_bbox
         )  # Insert the index in the top left corner of the rectangle
 
 
-def draw_layout_bbox(pdf_info, pdf_bytes, out_path, filename):
+def layout_overlay_layers(pdf_info):
+    """The layers `draw_layout_bbox` draws, see `draw_overlays`."""
     dropped_bbox_list = []
     tables_list, tables_body_list = [], []
     tables_caption_list, tables_footnote_list = [], []
@@ -171,34 +172,32 @@ def draw_layout_bbox(pdf_info, pdf_bytes, out_path, filename):
 
         layout_bbox_list.append(page_block_list)
 
-    pdf_docs = fitz.open('pdf', pdf_bytes)
-
-    for i, page in enumerate(pdf_docs):
-
-        draw_bbox_without_number(i, dropped_bbox_list, page, [158, 158, 158], True)
-        # draw_bbox_without_number(i, tables_list, page, [153, 153, 0], True)  # color !
-        draw_bbox_without_number(i, tables_body_list, page, [204, 204, 0], True)
-        draw_bbox_without_number(i, tables_caption_list, page, [255, 255, 102], True)
-        draw_bbox_without_number(i, tables_footnote_list, page, [229, 255, 204], True)
-        # draw_bbox_without_number(i, imgs_list, page, [51, 102, 0], True)
-        draw_bbox_without_number(i, imgs_body_list, page, [153, 255, 51], True)
-        draw_bbox_without_number(i, imgs_caption_list, page, [102, 178, 255], True)
-        draw_bbox_without_number(i, imgs_footnote_list, page, [255, 178, 102], True),
-        draw_bbox_without_number(i, titles_list, page, [102, 102, 255], True)
-        draw_bbox_without_number(i, texts_list, page, [153, 0, 76], True)
-        draw_bbox_without_number(i, interequations_list, page, [0, 255, 0], True)
-        draw_bbox_without_number(i, lists_list, page, [40, 169, 92], True)
-        draw_bbox_without_number(i, indexs_list, page, [40, 169, 92], True)
-
-        draw_bbox_with_number(
-            i, layout_bbox_list, page, [255, 0, 0], False, draw_bbox=False
-        )
-
-    # Save the PDF
-    pdf_docs.save(f'{out_path}/{filename}')
-
-
-def draw_span_bbox(pdf_info, pdf_bytes, out_path, filename):
+    # (bbox_list, rgb_config, fill_config, with_number, draw_bbox), drawn in order
+    return [
+        (dropped_bbox_list, [158, 158, 158], True, False, True),
+        # (tables_list, [153, 153, 0], True, False, True),  # color !
+        (tables_body_list, [204, 204, 0], True, False, True),
+        (tables_caption_list, [255, 255, 102], True, False, True),
+        (tables_footnote_list, [229, 255, 204], True, False, True),
+        # (imgs_list, [51, 102, 0], True, False, True),
+        (imgs_body_list, [153, 255, 51], True, False, True),
+        (imgs_caption_list, [102, 178, 255], True, False, True),
+        (imgs_footnote_list, [255, 178, 102], True, False, True),
+        (titles_list, [102, 102, 255], True, False, True),
+        (texts_list, [153, 0, 76], True, False, True),
+        (interequations_list, [0, 255, 0], True, False, True),
+        (lists_list, [40, 169, 92], True, False, True),
+        (indexs_list, [40, 169, 92], True, False, True),
+        (layout_bbox_list, [255, 0, 0], False, True, False),
+    ]
+
+
+def draw_layout_bbox(pdf_info, pdf_bytes, out_path, filename, page_ids=None):
+    draw_overlays(pdf_bytes, out_path, {'layout': filename}, pdf_info=pdf_info, page_ids=page_ids)
+
+
+def span_overlay_layers(pdf_info):
+    """The layers `draw_span_bbox` draws, see `draw_overlays`."""
     text_list = []
     inline_equation_list = []
     interline_equation_list = []
@@ -272,28 +271,33 @@ def draw_span_bbox(pdf_info, pdf_bytes, out_path, filename):
         interline_equation_list.append(page_interline_equation_list)
         image_list.append(page_image_list)
         table_list.append(page_table_list)
-    pdf_docs = fitz.open('pdf', pdf_bytes)
-    for i, page in enumerate(pdf_docs):
+    return [
+        (text_list, [255, 0, 0], False, False, True),
+        (inline_equation_list, [0, 255, 0], False, False, True),
+        (interline_equation_list, [0, 0, 255], False, False, True),
+        (image_list, [255, 204, 0], False, False, True),
+        (table_list, [204, 0, 255], False, False, True),
+        (dropped_list, [158, 158, 158], False, False, True),
+    ]
 
-        draw_bbox_without_number(i, text_list, page, [255, 0, 0], False)
-        draw_bbox_without_number(i, inline_equation_list, page, [0, 255, 0], False)
-        draw_bbox_without_number(i, interline_equation_list, page, [0, 0, 255], False)
-        draw_bbox_without_number(i, image_list, page, [255, 204, 0], False)
-        draw_bbox_without_number(i, table_list, page, [204, 0, 255], False)
-        draw_bbox_without_number(i, dropped_list, page, [158, 158, 158], False)
 
-    # Save the PDF
-    pdf_docs.save(f'{out_path}/{filename}')
+def draw_span_bbox(pdf_info, pdf_bytes, out_path, filename, page_ids=None):
+    draw_overlays(pdf_bytes, out_path, {'spans': filename}, pdf_info=pdf_info, page_ids=page_ids)
+
 
+def model_overlay_layers(model_list, pdf_docs: fitz.Document):
+    """The layers `draw_model_bbox` draws, see `draw_overlays`.
 
-def draw_model_bbox(model_list, dataset: Dataset, out_path, filename):
+    The detections are drawn as the model returned them, scaled to the page
+    like `MagicModel` does and without the ones it drops for a low score,
+    the other `MagicModel` fix-ups are not run for a debug overlay.
+    """
     dropped_bbox_list = []
     tables_body_list, tables_caption_list, tables_footnote_list = [], [], []
     imgs_body_list, imgs_caption_list, imgs_footnote_list = [], [], []
     titles_list = []
     texts_list = []
     interequations_list = []
-    magic_model = MagicModel(model_list, dataset)
     for i in range(len(model_list)):
         page_dropped_list = []
         tables_body, tables_caption, tables_footnote = [], [], []
@@ -301,10 +305,28 @@ def draw_model_bbox(model_list, dataset: Dataset, out_path, filename):
         titles = []
         texts = []
         interequations = []
-        page_info = magic_model.get_model_list(i)
+        page_info = model_list[i]
         layout_dets = page_info['layout_dets']
+        if layout_dets:
+            # the size get_scale_ratio renders the page for
+            page_rect = pdf_docs[page_info['page_info']['page_no']].rect
+            horizontal_scale_ratio = page_info['page_info']['width'] / round(page_rect.width)
+            vertical_scale_ratio = page_info['page_info']['height'] / round(page_rect.height)
         for layout_det in layout_dets:
-            bbox = layout_det['bbox']
+            if layout_det.get('score', 1) <= 0.05:
+                continue
+            if layout_det.get('bbox') is not None:
+                x0, y0, x1, y1 = layout_det['bbox']
+            else:
+                x0, y0, _, _, x1, y1, _, _ = layout_det['poly']
+            bbox = [
+                int(x0 / horizontal_scale_ratio),
+                int(y0 / vertical_scale_ratio),
+                int(x1 / horizontal_scale_ratio),
+                int(y1 / vertical_scale_ratio),
+            ]
+            if bbox[2] - bbox[0] <= 0 or bbox[3] - bbox[1] <= 0:
+                continue
             if layout_det['category_id'] == CategoryId.Text:
                 texts.append(bbox)
             elif layout_det['category_id'] == CategoryId.Title:
@@ -337,23 +359,101 @@ def draw_model_bbox(model_list, dataset: Dataset, out_path, filename):
         dropped_bbox_list.append(page_dropped_list)
         imgs_footnote_list.append(imgs_footnote)
 
-    for i in range(len(dataset)):
-        page = dataset.get_page(i)
-        draw_bbox_with_number(
-            i, dropped_bbox_list, page, [158, 158, 158], True
-        )  # color !
-        draw_bbox_with_number(i, tables_body_list, page, [204, 204, 0], True)
-        draw_bbox_with_number(i, tables_caption_list, page, [255, 255, 102], True)
-        draw_bbox_with_number(i, tables_footnote_list, page, [229, 255, 204], True)
-        draw_bbox_with_number(i, imgs_body_list, page, [153, 255, 51], True)
-        draw_bbox_with_number(i, imgs_caption_list, page, [102, 178, 255], True)
-        draw_bbox_with_number(i, imgs_footnote_list, page, [255, 178, 102], True)
-        draw_bbox_with_number(i, titles_list, page, [102, 102, 255], True)
-        draw_bbox_with_number(i, texts_list, page, [153, 0, 76], True)
-        draw_bbox_with_number(i, interequations_list, page, [0, 255, 0], True)
-
-    # Save the PDF
-    dataset.dump_to_file(f'{out_path}/{filename}')
+    return [
+        (dropped_bbox_list, [158, 158, 158], True, True, True),  # color !
+        (tables_body_list, [204, 204, 0], True, True, True),
+        (tables_caption_list, [255, 255, 102], True, True, True),
+        (tables_footnote_list, [229, 255, 204], True, True, True),
+        (imgs_body_list, [153, 255, 51], True, True, True),
+        (imgs_caption_list, [102, 178, 255], True, True, True),
+        (imgs_footnote_list, [255, 178, 102], True, True, True),
+        (titles_list, [102, 102, 255], True, True, True),
+        (texts_list, [153, 0, 76], True, True, True),
+        (interequations_list, [0, 255, 0], True, True, True),
+    ]
+
+
+def draw_model_bbox(model_list, dataset: Dataset, out_path, filename, page_ids=None):
+    draw_overlays(dataset.get_doc(), out_path, {'model': filename}, model_list=model_list, page_ids=page_ids)
+
+
+OVERLAY_SUFFIXES = {
+    'model': '_model.pdf',
+    'layout': '_layout.pdf',
+    'spans': '_spans.pdf',
+}
+
+
+def draw_layers(i, layers, page):
+    """Draw the boxes of page i of every layer with one shape, its drawing
+    commands are added to the page once instead of once per box."""
+    shape = page.new_shape()
+    for bbox_list, rgb_config, fill_config, with_number, draw_bbox in layers:
+        if i >= len(bbox_list):
+            continue
+        new_rgb = [float(item) / 255 for item in rgb_config]
+        for j, bbox in enumerate(bbox_list[i]):
+            x0, y0, x1, y1 = bbox
+            if draw_bbox:
+                shape.draw_rect(fitz.Rect(x0, y0, x1, y1))
+                if fill_config:
+                    shape.finish(color=None, fill=new_rgb, fill_opacity=0.3, width=0.5)
+                else:
+                    shape.finish(color=new_rgb, fill=None, fill_opacity=1, width=0.5)
+            if with_number:
+                shape.insert_text((x1 + 2, y0 + 10), str(j + 1), fontsize=10, color=new_rgb)
+    shape.commit(overlay=True)
+
+
+def draw_overlays(pdf_bytes, out_path, filenames: dict, pdf_info=None, model_list=None, page_ids=None) -> list:
+    """Draw any subset of the model, layout and spans overlays.
+
+    The document is opened once, every overlay is drawn on a copy of its
+    pages made from the opened document.
+
+    Args:
+        pdf_bytes (bytes | MappedFile | fitz.Document): the document, an opened document is read as it is and left open
+        out_path (str): the directory of the overlay files
+        filenames (dict): overlay name -> file name, the names are the keys of `OVERLAY_SUFFIXES`
+        pdf_info (list, optional): the pdf_info of the pipe result, needed by layout and spans
+        model_list (list, optional): the inference result, needed by model
+        page_ids (list[int], optional): the parsed pages, the overlays only have these pages. Defaults to all pages.
+
+    Returns:
+        list: the paths of the written files
+    """
+    opened = isinstance(pdf_bytes, fitz.Document)
+    pdf_docs = pdf_bytes if opened else open_pdf(pdf_bytes)
+    paths = []
+    try:
+        for overlay, filename in filenames.items():
+            if overlay == 'model':
+                layers = model_overlay_layers(model_list, pdf_docs)
+            elif overlay == 'layout':
+                layers = layout_overlay_layers(pdf_info)
+            elif overlay == 'spans':
+                layers = span_overlay_layers(pdf_info)
+            else:
+                raise ValueError(f'overlay: {overlay} is not supported.')
+
+            overlay_docs = fitz.open()
+            if page_ids is None or len(page_ids) == pdf_docs.page_count:
+                overlay_docs.insert_pdf(pdf_docs)
+                for i, page in enumerate(overlay_docs):
+                    draw_layers(i, layers, page)
+            else:
+                # the pages are copied one by one, the resources they share are copied once
+                for page_id in page_ids:
+                    overlay_docs.insert_pdf(pdf_docs, from_page=page_id, to_page=page_id)
+                    draw_layers(page_id, layers, overlay_docs[-1])
+            path = f'{out_path}/{filename}'
+            overlay_docs.save(path)
+            overlay_docs.close()
+            paths.append(path)
+    finally:
+        if not opened:
+            pdf_docs.close()
+    return paths
 
 
 def draw_line_sort_bbox(pdf_info, pdf_bytes, out_path, filename):
@@ -399,7 +499,7 @@ def draw_line_sort_bbox(pdf_info, pdf_bytes, out_path, filename):
                             page_line_list.append({'index': index, 'bbox': bbox})
         sorted_bboxes = sorted(page_line_list, key=lambda x: x['index'])
         layout_bbox_list.append(sorted_bbox['bbox'] for sorted_bbox in sorted_bboxes)
-    pdf_docs = fitz.open('pdf', pdf_bytes)
+    pdf_docs = open_pdf(pdf_bytes)
     for i, page in enumerate(pdf_docs):
         draw_bbox_with_number(i, layout_bbox_list, page, [255, 0, 0], False)
 
@@ -407,7 +507,7 @@ def draw_line_sort_bbox(pdf_info, pdf_bytes, out_path, filename):
 
 
 def draw_char_bbox(pdf_bytes, out_path, filename):
-    pdf_docs = fitz.open('pdf', pdf_bytes)
+    pdf_docs = open_pdf(pdf_bytes)
     for i, page in enumerate(pdf_docs):
         for block in page.get_text('rawdict', flags=fitz.TEXT_PRESERVE_LIGATURES | fitz.TEXT_PRESERVE_WHITESPACE | fitz.TEXT_MEDIABOX_CLIP)['blocks']:
             for line in block['lines']:
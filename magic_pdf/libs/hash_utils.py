@@ -1,9 +1,22 @@
 import hashlib
 
+# bytes hashed per update, a memory map is read in pieces of this size
+HASH_CHUNK_SIZE = 1 << 20
+
+
+def _update_in_chunks(hasher, data):
+    view = memoryview(data)
+    try:
+        for offset in range(0, len(view), HASH_CHUNK_SIZE):
+            hasher.update(view[offset:offset + HASH_CHUNK_SIZE])
+    finally:
+        # a memory map can only be closed when no view of it is left
+        view.release()
+
 
 def compute_md5(file_bytes):
     hasher = hashlib.md5()
-    hasher.update(file_bytes)
+    _update_in_chunks(hasher, file_bytes)
     return hasher.hexdigest().upper()
 
 
@@ -13,3 +26,9 @@ def compute_sha256(input_string):
     input_bytes = input_string.encode('utf-8')
     hasher.update(input_bytes)
     return hasher.hexdigest()
+
+
+def compute_bytes_sha256(data):
+    hasher = hashlib.sha256()
+    _update_in_chunks(hasher, data)
+    return hasher.hexdigest()
@@ -0,0 +1,125 @@
+import json
+from typing import Iterable, Iterator
+
+import brotli
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# suffix of the brotli compressed json files, `load` picks the format by it
+COMPRESSED_SUFFIX = '.br'
+
+
+def dumps(obj, indent: int = 0) -> bytes:
+    """Serialize obj to utf-8 json, with orjson when it is installed.
+
+    The output of orjson loads to the same values as the output of the json
+    module, except for NaN and infinite floats. orjson writes them as null,
+    the json module as NaN and Infinity, which are not json and only load
+    with `loads`. Some floats are written differently too, e.g. 1e16 where
+    the json module writes 1e+16. Numpy values are only serialized by orjson.
+
+    Args:
+        obj: the object to serialize
+        indent (int, optional): 0 for compact output, otherwise the indent of
+            pretty printed output. orjson only handles 2, other indents use the
+            json module. Defaults to 0.
+
+    Returns:
+        bytes: the json
+    """
+    if orjson is not None and indent in (0, 2):
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        try:
+            return orjson.dumps(obj, option=option)
+        except TypeError:
+            # e.g. integers above 64 bit or lone surrogates, the json module handles them
+            pass
+    if indent:
+        json_str = json.dumps(obj, ensure_ascii=False, indent=indent)
+    else:
+        json_str = json.dumps(obj, ensure_ascii=False, separators=(',', ':'))
+    return json_str.encode('utf-8', errors='replace')
+
+
+def _iter_list(items: Iterable, indent: int, depth: int) -> Iterator[bytes]:
+    if indent:
+        prefix = b'\n' + b' ' * (indent * (depth + 1))
+        first = True
+        for item in items:
+            yield (b'[' if first else b',') + prefix + dumps(item, indent).replace(b'\n', prefix)
+            first = False
+        yield b'[]' if first else b'\n' + b' ' * (indent * depth) + b']'
+    else:
+        first = True
+        for item in items:
+            yield (b'[' if first else b',') + dumps(item)
+            first = False
+        yield b'[]' if first else b']'
+
+
+def iter_dumps_list(items: Iterable, indent: int = 0) -> Iterator[bytes]:
+    """Serialize the items as a json list, one chunk per item.
+
+    The chunks joined are `dumps(list(items), indent)`, items may be a
+    generator so the list is never held in memory.
+    """
+    yield from _iter_list(items, indent, 0)
+
+
+def iter_dumps_dict(obj: dict, stream_key: str, indent: int = 0) -> Iterator[bytes]:
+    """Serialize a dict, the list under stream_key one chunk per item.
+
+    Used for the middle json, whose `pdf_info` is written page by page.
+    """
+    if not obj:
+        yield b'{}'
+        return
+    prefix = b'\n' + b' ' * indent if indent else b''
+    key_sep = b': ' if indent else b':'
+    for i, (key, value) in enumerate(obj.items()):
+        head = (b'{' if i == 0 else b',') + prefix + dumps(str(key)) + key_sep
+        if key == stream_key and isinstance(value, list):
+            yield head
+            yield from _iter_list(value, indent, 1)
+        else:
+            yield head + dumps(value, indent).replace(b'\n', prefix)
+    yield b'\n}' if indent else b'}'
+
+
+def compress_chunks(chunks: Iterable[bytes], quality: int = 6) -> Iterator[bytes]:
+    """Brotli compress a stream of chunks."""
+    compressor = brotli.Compressor(quality=quality)
+    for chunk in chunks:
+        compressed = compressor.process(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.finish()
+
+
+def loads(data: bytes, compressed: bool = False):
+    """Load json written by `dumps` or the iter_dumps functions.
+
+    Args:
+        data (bytes): the file content
+        compressed (bool, optional): whether data went through `compress_chunks`. Defaults to False.
+    """
+    if compressed:
+        data = brotli.decompress(data)
+    if orjson is not None:
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            # e.g. NaN written by the json module, which orjson rejects
+            pass
+    return json.loads(data)
+
+
+def load(path: str):
+    """Load a json file, brotli compressed if its name ends with `COMPRESSED_SUFFIX`."""
+    with open(path, 'rb') as f:
+        return loads(f.read(), compressed=path.endswith(COMPRESSED_SUFFIX))
@@ -1,3 +1,5 @@
+import re
+
 
 def ocr_escape_special_markdown_char(content):
     special_chars = ["*", "`", "~", "$"]
@@ -5,3 +7,23 @@ def ocr_escape_special_markdown_char(content):
         content = content.replace(char, "\\" + char)
 
     return content
+
+
+# the unescaping of `\$` `\*` and the escaping of the special tokens of the
+# chat model, done in one pass over the markdown
+_MARKDOWN_OUTPUT_REPLACEMENTS = {
+    '\\$': '$',
+    '\\*': '*',
+    '<seg>': '\\<seg\\>',
+    '<sos': '\\<sos\\>',
+    '<eos>': '\\<eos\\>',
+    '<pad>': '\\<pad\\>',
+    '<unk>': '\\<unk\\>',
+    '<sep>': '\\<sep\\>',
+    '<cls>': '\\<cls\\>',
+}
+_MARKDOWN_OUTPUT_PATTERN = re.compile('|'.join(re.escape(k) for k in _MARKDOWN_OUTPUT_REPLACEMENTS))
+
+
+def escape_markdown_output(content):
+    return _MARKDOWN_OUTPUT_PATTERN.sub(lambda m: _MARKDOWN_OUTPUT_REPLACEMENTS[m.group(0)], content)
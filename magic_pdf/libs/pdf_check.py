@@ -5,6 +5,8 @@ import re
 from io import BytesIO
 from pdfminer.high_level import extract_text
 
+from magic_pdf.data.utils import open_pdf
+
 
 def calculate_sample_count(total_page: int):
     select_page_cnt = min(10, total_page)
@@ -12,7 +14,7 @@ def calculate_sample_count(total_page: int):
 
 
 def extract_pages(src_pdf_bytes: bytes) -> fitz.Document:
-    pdf_docs = fitz.open("pdf", src_pdf_bytes)
+    pdf_docs = open_pdf(src_pdf_bytes)
     total_page = len(pdf_docs)
     if total_page == 0:
 
@@ -1,22 +1,27 @@
 from io import BytesIO
 import cv2
 import fitz
+from loguru import logger
 import numpy as np
 from PIL import Image
 from magic_pdf.data.data_reader_writer import DataWriter
+from magic_pdf.data.data_reader_writer.pipelined import PipelinedDataWriter
+from magic_pdf.libs.boxbase import calculate_iou
 from magic_pdf.libs.commons import join_path
 from magic_pdf.libs.hash_utils import compute_sha256
 
 
-def cut_image(bbox: tuple, page_num: int, page: fitz.Page, return_path, imageWriter: DataWriter):
-
+def cut_image_path(bbox: tuple, page_num: int, return_path, ext: str = 'jpg'):
     filename = f'{page_num}_{int(bbox[0])}_{int(bbox[1])}_{int(bbox[2])}_{int(bbox[3])}'
 
-
     img_path = join_path(return_path, filename) if return_path is not None else None
 
+    return f'{compute_sha256(img_path)}.{ext}'
 
-    img_hash256_path = f'{compute_sha256(img_path)}.jpg'
+
+def cut_image(bbox: tuple, page_num: int, page: fitz.Page, return_path, imageWriter: DataWriter):
+
+    img_hash256_path = cut_image_path(bbox, page_num, return_path)
 
 
     rect = fitz.Rect(*bbox)
@@ -32,6 +37,133 @@ def cut_image(bbox: tuple, page_num: int, page: fitz.Page, return_path, imageWri
     return img_hash256_path
 
 
+def encode_jpeg(samples: bytes, width: int, height: int, quality: int = 95) -> bytes:
+    # Pillow releases the GIL while encoding, so images encode in parallel in writer threads
+    buffer = BytesIO()
+    Image.frombytes('RGB', (width, height), samples).save(buffer, format='JPEG', quality=quality)
+    return buffer.getvalue()
+
+
+# the embedded image formats browsers and markdown viewers display as they are
+EMBEDDED_IMAGE_EXTS = {'jpeg': 'jpg', 'png': 'png'}
+
+
+def embedded_image_for_clip(page: fitz.Page, bbox: tuple, image_infos: list, iou_threshold: float = 0.9):
+    """Find the embedded image a clip shows, when the clip is exactly one
+    raster image of the page.
+
+    The image must be the only one under the clip, cover it at
+    iou_threshold, be placed upright without rotation or flip and have no
+    text drawn over it, otherwise the rendered clip would differ from the
+    image stream.
+
+    Args:
+        page (fitz.Page): the page
+        bbox (tuple): the clip
+        image_infos (list): page.get_image_info(xrefs=True)
+        iou_threshold (float, optional): the minimal iou of the clip and the image. Defaults to 0.9.
+
+    Returns:
+        dict | None: the image info, None when the clip has to be rendered
+    """
+    overlapping = [
+        info for info in image_infos
+        if calculate_iou(bbox, info['bbox']) > 0
+    ]
+    if len(overlapping) != 1:
+        return None
+    info = overlapping[0]
+    if info.get('xref', 0) <= 0 or calculate_iou(bbox, info['bbox']) < iou_threshold:
+        return None
+    a, b, c, d, _, _ = info['transform']
+    if abs(b) > 1e-3 or abs(c) > 1e-3 or a <= 0 or d <= 0:
+        return None
+    if page.get_text('words', clip=fitz.Rect(*info['bbox'])):
+        return None
+    return info
+
+
+def extract_embedded_image(doc: fitz.Document, xref: int):
+    """Get the stored bytes of an embedded image, without decoding it.
+
+    Returns:
+        tuple | None: (bytes, ext), None for images with a soft mask, in CMYK
+            or in a format viewers do not display
+    """
+    try:
+        image = doc.extract_image(xref)
+    except Exception as e:
+        logger.warning(f'extract image xref {xref} failed: {e}')
+        return None
+    if not image or image.get('smask', 0) or image.get('colorspace', 3) not in (1, 3):
+        return None
+    ext = EMBEDDED_IMAGE_EXTS.get(image.get('ext'))
+    if ext is None:
+        return None
+    return image['image'], ext
+
+
+def cut_images(clips: list, page_num: int, page: fitz.Page, imageWriter: DataWriter, extract_embedded: bool = True):
+    """Cut several clips of a page, the images `cut_image` cuts one by one.
+
+    A clip that is exactly one embedded jpeg or png image is written with
+    the image's own stream bytes, see `embedded_image_for_clip`. The other
+    clips are rendered: the page is interpreted once into a display list
+    and every clip is rasterized from it at 3x zoom. With a
+    `PipelinedDataWriter` the JPEG encoding and the writes run in its
+    threads.
+
+    Args:
+        clips (list): (bbox, return_path) of every image
+        page_num (int): the page index
+        page (fitz.Page): the page
+        imageWriter (DataWriter): the writer of the images
+        extract_embedded (bool, optional): copy embedded images out instead of
+            rendering them. Defaults to True.
+
+    Returns:
+        list: the image paths, in the order of clips
+    """
+    img_paths = []
+    if not clips:
+        return img_paths
+
+    image_infos = []
+    if extract_embedded and page.rotation == 0:
+        image_infos = page.get_image_info(xrefs=True)
+    extracted = {}
+    display_list = None
+    zoom = fitz.Matrix(3, 3)
+    for bbox, return_path in clips:
+        info = embedded_image_for_clip(page, bbox, image_infos) if image_infos else None
+        if info is not None:
+            xref = info['xref']
+            if xref not in extracted:
+                extracted[xref] = extract_embedded_image(page.parent, xref)
+            if extracted[xref] is not None:
+                data, ext = extracted[xref]
+                img_hash256_path = cut_image_path(bbox, page_num, return_path, ext=ext)
+                imageWriter.write(img_hash256_path, data)
+                img_paths.append(img_hash256_path)
+                continue
+
+        if display_list is None:
+            display_list = page.get_displaylist()
+        img_hash256_path = cut_image_path(bbox, page_num, return_path)
+        pix = display_list.get_pixmap(matrix=zoom, clip=fitz.Rect(*bbox), alpha=False)
+        samples, width, height = pix.samples, pix.width, pix.height
+
+        def make_data(samples=samples, width=width, height=height):
+            return encode_jpeg(samples, width, height)
+
+        if isinstance(imageWriter, PipelinedDataWriter):
+            imageWriter.submit(img_hash256_path, make_data)
+        else:
+            imageWriter.write(img_hash256_path, make_data())
+        img_paths.append(img_hash256_path)
+    return img_paths
+
+
 def cut_image_to_pil_image(bbox: tuple, page: fitz.Page, mode="pillow"):
 
 
@@ -1,5 +1,4 @@
 import base64
-import copy
 import time
 
 import cv2
@@ -15,10 +14,21 @@ from magic_pdf.model.sub_modules.model_utils import (
     clean_vram, crop_img)
 
 YOLO_LAYOUT_BASE_BATCH_SIZE = 1
+# regions sent to the VLM per call when the progress is reported
+RECOGNITION_PROGRESS_CHUNK = 64
 
 class BatchAnalyzeLLM:
-    def __init__(self, model):
+    def __init__(self, model, progress=None):
+        """
+        Args:
+            model: the models
+            progress (Callable[[str, int, int], None], optional): called with a stage, the
+                work done and the total work, 'layout' once the layout of all pages is detected and
+                'recognized' with the regions recognized so far. The VLM then sees the regions in
+                chunks of RECOGNITION_PROGRESS_CHUNK instead of all at once.
+        """
         self.model = model
+        self.progress = progress
 
     def __call__(self, images: list) -> list:
         images_layout_res = []
@@ -52,6 +62,9 @@ class BatchAnalyzeLLM:
             f'layout time: {round(time.time() - layout_start_time, 2)}, image num: {len(images)}'
         )
 
+        if self.progress is not None:
+            self.progress('layout', len(images), len(images))
+
         clean_vram(self.model.device, vram_threshold=8)
 
         llm_ocr_start = time.time()
@@ -81,14 +94,15 @@ class BatchAnalyzeLLM:
                 res = layout_res[i]
                 ocr = ocr_result[page_idxs[index]+i]
                 # ocr = self.llm_ocr(new_image, res['category_id'])
+                # the ocr twins only replace top-level keys, the poly is shared
                 if res['category_id'] in [8, 14]:
-                    temp_res = copy.deepcopy(res)
+                    temp_res = dict(res)
                     temp_res['category_id'] = 14
                     temp_res['score'] = 1.0
                     temp_res['latex'] = ocr
                     ocr_results.append(temp_res)
                 elif res['category_id'] in [0, 1, 2, 4, 6, 7, 101]:
-                    temp_res = copy.deepcopy(res)
+                    temp_res = dict(res)
                     temp_res['category_id'] = 15
                     temp_res['score'] = 1.0
                     temp_res['text'] = ocr
@@ -150,7 +164,7 @@ class BatchAnalyzeLLM:
                     continue
                 new_images.append(images[i])
                 messages.append(cid2instruction[cat_ids[i]])
-            out = self.model.chat_model.batch_inference(new_images, messages)
+            out = self._batch_inference(self.model.chat_model.batch_inference, new_images, messages)
             outs.extend(out)
         else:
             buffer = BytesIO()
@@ -175,7 +189,7 @@ class BatchAnalyzeLLM:
                 buffer.seek(0)
                 buffer.truncate(0)
                 # if len(messages) == max_batch_size or i == len(images) - 1:
-            outs.extend(self.model.llm_model.batch_inference(messages))
+            outs.extend(self._batch_inference(self.model.llm_model.batch_inference, messages))
         for j in ignore_idx:
             outs.insert(j, '')
         messages.clear()
@@ -188,4 +202,17 @@ class BatchAnalyzeLLM:
                     outs[j] = sanitize_mf(outs[j])
                 else:
                     outs[j] = sanitize_md(outs[j])
-        return outs
\ No newline at end of file
+        return outs
+
+    def _batch_inference(self, infer, *inputs):
+        """Run infer over the inputs at once, or in chunks reporting the regions done when there is a progress callback."""
+        if self.progress is None:
+            return infer(*inputs)
+        total = len(inputs[0])
+        outs = []
+        for start in range(0, total, RECOGNITION_PROGRESS_CHUNK):
+            outs.extend(infer(*(values[start:start + RECOGNITION_PROGRESS_CHUNK] for values in inputs)))
+            self.progress('recognized', len(outs), total)
+        if total == 0:
+            self.progress('recognized', 0, 0)
+        return outs
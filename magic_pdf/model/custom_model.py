@@ -92,7 +92,19 @@ class MonkeyOCR:
         else:
             logger.error('model name not allow')
         self.layoutreader_model = model
-        logger.info(f'layoutreader model loaded: {self.layout_reader_name}')
+        # how duplicated orders in layoutreader logits are resolved: parity, greedy or lsa
+        self.layoutreader_decode_mode = layout_reader_config.get('decode_mode', 'parity')
+        # pages with more than 200 lines: `chunked` orders xycut groups with layoutreader, `xycut` uses xycut only
+        self.layoutreader_long_page_mode = layout_reader_config.get('long_page_mode', 'chunked')
+        logger.info(f'layoutreader model loaded: {self.layout_reader_name}, decode mode: {self.layoutreader_decode_mode}')
+
+        # pages are post-processed in that many worker processes when above 1
+        self.post_proc_workers = self.configs.get('post_proc', {}).get('num_workers', 0)
+
+        # json files written by parse.py: indent 0 is compact, compress writes brotli *.json.br files
+        output_config = self.configs.get('output', {})
+        self.json_indent = output_config.get('json_indent', 0)
+        self.compress_json = output_config.get('compress_json', False)
 
         self.chat_config = self.configs.get('chat_config', {})
         chat_backend = self.chat_config.get('backend', 'lmdeploy')
@@ -6,47 +6,144 @@ from loguru import logger
 from magic_pdf.model.batch_analyze_llm import BatchAnalyzeLLM
 
 from magic_pdf.data.dataset import Dataset
+from magic_pdf.data.utils import select_page_ids
 from magic_pdf.libs.clean_memory import clean_memory
 from magic_pdf.operators.models_llm import InferenceResultLLM
         
 
+def _render_pages(dataset: Dataset, page_ids: list):
+    """Render the selected pages once, the size of the others is computed without rendering them.
+
+    Returns:
+        tuple: (the `get_image` dicts of the selected pages, the page infos of all pages)
+    """
+    selected = set(page_ids)
+    page_images = []
+    page_infos = []
+    for index in range(len(dataset)):
+        page = dataset.get_page(index)
+        if index in selected:
+            img_dict = page.get_image()
+            page_images.append(img_dict)
+        else:
+            img_dict = page.get_image_size()
+        page_infos.append({'page_no': index, 'height': img_dict['height'], 'width': img_dict['width']})
+    return page_images, page_infos
+
+
+def _model_json(page_infos, analyze_result, page_ids):
+    selected = set(page_ids)
+    model_json = []
+    results = iter(analyze_result)
+    for page_info in page_infos:
+        if page_info['page_no'] in selected:
+            result = next(results)
+        else:
+            result = []
+        model_json.append({'layout_dets': result, 'page_info': page_info})
+    return model_json
+
+
 def doc_analyze_llm(
     dataset: Dataset,
     MonkeyOCR_model,
     start_page_id=0,
     end_page_id=None,
+    page_ids=None,
+    progress=None,
+    keep_images=False,
 ) -> InferenceResultLLM:
+    """Analyze the selected pages of a document, the others are neither
+    rendered nor seen by the models.
+
+    Args:
+        dataset (Dataset): the document
+        MonkeyOCR_model: the models
+        start_page_id (int, optional): the first page. Defaults to 0.
+        end_page_id (int, optional): the last page. Defaults to the last page of the document.
+        page_ids (list[int], optional): only these pages of the range. Defaults to all of them.
+        progress (Callable[[str, int, int], None], optional): called with a stage, the work done and
+            the total work: 'rendered' with the pages, then the stages of `BatchAnalyzeLLM`.
+        keep_images (bool, optional): keep the rendered pages with the result, `pipe_txt_mode` crops
+            the text spans without pdf chars from them instead of rendering the pages again. Defaults to False.
 
-    end_page_id = end_page_id if end_page_id else len(dataset) - 1
+    Returns:
+        InferenceResultLLM: the result, the pages not selected have no layout
+    """
+    page_ids = select_page_ids(len(dataset), start_page_id, end_page_id, page_ids)
 
     device = MonkeyOCR_model.device
 
+    batch_model = BatchAnalyzeLLM(model=MonkeyOCR_model, progress=progress)
+
+    doc_analyze_start = time.time()
+
+    page_images, page_infos = _render_pages(dataset, page_ids)
+    if progress is not None:
+        progress('rendered', len(page_images), len(page_images))
+    analyze_result = batch_model([img_dict['img'] for img_dict in page_images])
+    model_json = _model_json(page_infos, analyze_result, page_ids)
+    page_images = dict(zip(page_ids, page_images)) if keep_images else None
+
+    gc_start = time.time()
+    clean_memory(device)
+    gc_time = round(time.time() - gc_start, 2)
+    logger.info(f'gc time: {gc_time}')
+
+    doc_analyze_time = round(time.time() - doc_analyze_start, 2)
+    doc_analyze_speed = round(len(page_ids) / doc_analyze_time, 2) if doc_analyze_time else len(page_ids)
+    logger.info(
+        f'doc analyze time: {round(time.time() - doc_analyze_start, 2)},'
+        f'speed: {doc_analyze_speed} pages/second'
+    )
+
+    return InferenceResultLLM(model_json, dataset, page_ids=page_ids, page_images=page_images)
+
+
+def doc_analyze_llm_batch(
+    datasets: list[Dataset],
+    MonkeyOCR_model,
+    page_ids_list=None,
+) -> list[InferenceResultLLM]:
+    """Analyze several documents together, the layout model sees the pages of
+    all of them and their crops share the `batch_llm_ocr` batches.
+
+    Args:
+        datasets (list[Dataset]): the documents
+        MonkeyOCR_model: the models
+        page_ids_list (list[list[int] | None], optional): the pages of each document, None for all of them.
+            Defaults to all pages of every document.
+
+    Returns:
+        list[InferenceResultLLM]: the inference result of each document, in order
+    """
+    device = MonkeyOCR_model.device
+
     batch_model = BatchAnalyzeLLM(model=MonkeyOCR_model)
 
-    model_json = []
     doc_analyze_start = time.time()
 
+    if page_ids_list is None:
+        page_ids_list = [None] * len(datasets)
+    page_ids_list = [
+        select_page_ids(len(dataset), page_ids=page_ids) for dataset, page_ids in zip(datasets, page_ids_list)
+    ]
+
     images = []
-    for index in range(len(dataset)):
-        if start_page_id <= index <= end_page_id:
-            page_data = dataset.get_page(index)
-            img_dict = page_data.get_image()
-            images.append(img_dict['img'])
+    page_infos_list = []
+    for dataset, page_ids in zip(datasets, page_ids_list):
+        page_images, page_infos = _render_pages(dataset, page_ids)
+        images.extend(img_dict['img'] for img_dict in page_images)
+        page_infos_list.append(page_infos)
     analyze_result = batch_model(images)
 
-    for index in range(len(dataset)):
-        page_data = dataset.get_page(index)
-        img_dict = page_data.get_image()
-        page_width = img_dict['width']
-        page_height = img_dict['height']
-        if start_page_id <= index <= end_page_id:
-            result = analyze_result.pop(0)
-        else:
-            result = []
-
-        page_info = {'page_no': index, 'height': page_height, 'width': page_width}
-        page_dict = {'layout_dets': result, 'page_info': page_info}
-        model_json.append(page_dict)
+    infer_results = []
+    offset = 0
+    for dataset, page_infos, page_ids in zip(datasets, page_infos_list, page_ids_list):
+        doc_result = analyze_result[offset:offset + len(page_ids)]
+        offset += len(page_ids)
+        model_json = _model_json(page_infos, doc_result, page_ids)
+        infer_results.append(InferenceResultLLM(model_json, dataset, page_ids=page_ids))
 
     gc_start = time.time()
     clean_memory(device)
@@ -54,10 +151,10 @@ def doc_analyze_llm(
     logger.info(f'gc time: {gc_time}')
 
     doc_analyze_time = round(time.time() - doc_analyze_start, 2)
-    doc_analyze_speed = round((end_page_id + 1 - start_page_id) / doc_analyze_time, 2)
+    doc_analyze_speed = round(len(images) / doc_analyze_time, 2) if doc_analyze_time else len(images)
     logger.info(
-        f'doc analyze time: {round(time.time() - doc_analyze_start, 2)},'
+        f'batch analyze time: {doc_analyze_time}, documents: {len(datasets)}, '
         f'speed: {doc_analyze_speed} pages/second'
     )
 
-    return InferenceResultLLM(model_json, dataset)
+    return infer_results
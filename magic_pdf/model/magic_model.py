@@ -20,11 +20,24 @@ class PosRelationEnum(enum.Enum):
     ALL = 'all'
 
 
+def copy_model_list(model_list: list) -> list:
+    """Copy what MagicModel changes in a model list: the page dicts, their
+    layout_dets lists and the detection dicts. polys, text, latex and html of
+    the detections are shared with the original."""
+    return [
+        dict(page, layout_dets=[dict(det) for det in page['layout_dets']])
+        for page in model_list
+    ]
+
+
 class MagicModel:
 
     def __fix_axis(self):
         for model_page_info in self.__model_list:
             need_remove_list = []
+            if not model_page_info['layout_dets']:
+                # nothing to fix, skip rendering the page for its scale ratio
+                continue
             page_no = model_page_info['page_info']['page_no']
             horizontal_scale_ratio, vertical_scale_ratio = get_scale_ratio(
                 model_page_info, self.__docs.get_page(page_no)
@@ -0,0 +1,128 @@
+from typing import List
+
+import numpy as np
+import torch
+
+DECODE_MODE_PARITY = "parity"
+DECODE_MODE_GREEDY = "greedy"
+DECODE_MODE_LSA = "lsa"
+
+DECODE_MODES = (DECODE_MODE_PARITY, DECODE_MODE_GREEDY, DECODE_MODE_LSA)
+
+
+def _crop_logits(logits: torch.Tensor, length: int) -> torch.Tensor:
+    # row 0 is the CLS token, columns beyond length are padding / EOS
+    return logits[1 : length + 1, :length].float()
+
+
+def decode_parity(logits: torch.Tensor, length: int) -> List[int]:
+    """
+    resolve duplicated orders exactly like the original parse_logits, but with
+    array ops per conflict round instead of rebuilding python dicts
+
+    every row starts at its best candidate. in each round, for every order that
+    is claimed by more than one row, the row with the highest logit keeps it
+    (ties go to the smaller row index) and all other claimants move on to their
+    next candidate. rounds repeat until all orders are unique.
+
+    :param logits: logits from model
+    :param length: input length
+    :return: orders
+    """
+    logits = logits[1 : length + 1, :length]
+    if length == 0:
+        return []
+    # same candidate sequence as `argsort(descending=False)` + `list.pop()`
+    candidates = logits.argsort(descending=False).flip(-1).numpy()
+    values = logits.float().numpy()
+    # the rounds are small array ops, numpy keeps the per-op overhead low
+    rows = np.arange(length)
+    ptr = np.zeros(length, dtype=np.int64)
+    cur = candidates[:, 0].copy()
+    while True:
+        val = values[rows, cur]
+        # claimants of the same order become adjacent, the winner first
+        claim_order = np.lexsort((rows, -val, cur))
+        claimed = cur[claim_order]
+        is_loser = np.zeros(length, dtype=bool)
+        is_loser[1:] = claimed[1:] == claimed[:-1]
+        if not is_loser.any():
+            break
+        losers = claim_order[is_loser]
+        ptr[losers] += 1
+        if (ptr[losers] >= length).any():
+            # mirrors `pop from empty list` of the list-based implementation
+            raise IndexError("no candidate left while resolving reading order")
+        cur[losers] = candidates[losers, ptr[losers]]
+    return cur.tolist()
+
+
+def decode_greedy(logits: torch.Tensor, length: int) -> List[int]:
+    """
+    greedy global assignment over the logit matrix: repeatedly take the largest
+    remaining (line, order) logit and remove its row and column.
+
+    all entries that are the maximum of both their row and their column are
+    assigned in the same round, which yields the same matching as processing
+    the entries one by one in descending order.
+
+    :param logits: logits from model
+    :param length: input length
+    :return: orders
+    """
+    logits = _crop_logits(logits, length)
+    if length == 0:
+        return []
+    ret = torch.full((length,), -1, dtype=torch.long)
+    rows = torch.arange(length)
+    free_rows = torch.ones(length, dtype=torch.bool)
+    free_cols = torch.ones(length, dtype=torch.bool)
+    neg_inf = torch.tensor(float("-inf"))
+    while bool(free_rows.any()):
+        masked = torch.where(free_rows[:, None] & free_cols[None, :], logits, neg_inf)
+        row_best = masked.argmax(dim=1)
+        col_best = masked.argmax(dim=0)
+        mutual = free_rows & (col_best[row_best] == rows)
+        ret[mutual] = row_best[mutual]
+        free_rows[mutual] = False
+        free_cols[row_best[mutual]] = False
+    return ret.tolist()
+
+
+def decode_lsa(logits: torch.Tensor, length: int) -> List[int]:
+    """
+    optimal assignment which maximizes the sum of logits of the permutation.
+
+    :param logits: logits from model
+    :param length: input length
+    :return: orders
+    """
+    from scipy.optimize import linear_sum_assignment
+
+    logits = _crop_logits(logits, length)
+    if length == 0:
+        return []
+    row_idx, col_idx = linear_sum_assignment(logits.numpy(), maximize=True)
+    ret = [0] * length
+    for r, c in zip(row_idx.tolist(), col_idx.tolist()):
+        ret[r] = c
+    return ret
+
+
+def decode_orders(logits: torch.Tensor, length: int, mode: str = DECODE_MODE_PARITY) -> List[int]:
+    """
+    decode the layoutreader logits to a permutation of line orders
+
+    :param logits: logits from model, shape [seq_len, seq_len] including CLS/EOS
+    :param length: input length
+    :param mode: one of `parity`, `greedy`, `lsa`
+    :return: orders
+    """
+    if mode == DECODE_MODE_PARITY:
+        return decode_parity(logits, length)
+    elif mode == DECODE_MODE_GREEDY:
+        return decode_greedy(logits, length)
+    elif mode == DECODE_MODE_LSA:
+        return decode_lsa(logits, length)
+    else:
+        raise ValueError(f"decode mode: {mode} is not supported, use one of {DECODE_MODES}")
@@ -1,9 +1,11 @@
-from collections import defaultdict
 from typing import List, Dict
 
 import torch
 from transformers import LayoutLMv3ForTokenClassification
 
+from magic_pdf.model.sub_modules.reading_oreder.layoutreader.decoding import (
+    DECODE_MODE_PARITY, decode_orders)
+
 MAX_LEN = 510
 CLS_TOKEN_ID = 0
 UNK_TOKEN_ID = 3
@@ -74,6 +76,29 @@ def boxes2inputs(boxes: List[List[int]]) -> Dict[str, torch.Tensor]:
     }
 
 
+def batch_boxes2inputs(boxes_list: List[List[List[int]]]) -> Dict[str, torch.Tensor]:
+    """
+    inputs of several pages in one batch, padded like `DataCollator`
+
+    :param boxes_list: line boxes of every page
+    :return: inputs, row i belongs to boxes_list[i]
+    """
+    max_len = max(len(boxes) for boxes in boxes_list) + 2
+    bbox = []
+    input_ids = []
+    attention_mask = []
+    for boxes in boxes_list:
+        pad = max_len - len(boxes) - 2
+        bbox.append([[0, 0, 0, 0]] + boxes + [[0, 0, 0, 0]] * (pad + 1))
+        input_ids.append([CLS_TOKEN_ID] + [UNK_TOKEN_ID] * len(boxes) + [EOS_TOKEN_ID] * (pad + 1))
+        attention_mask.append([1] + [1] * len(boxes) + [1] + [0] * pad)
+    return {
+        "bbox": torch.tensor(bbox),
+        "attention_mask": torch.tensor(attention_mask),
+        "input_ids": torch.tensor(input_ids),
+    }
+
+
 def prepare_inputs(
     inputs: Dict[str, torch.Tensor], model: LayoutLMv3ForTokenClassification
 ) -> Dict[str, torch.Tensor]:
@@ -86,39 +111,17 @@ def prepare_inputs(
     return ret
 
 
-def parse_logits(logits: torch.Tensor, length: int) -> List[int]:
+def parse_logits(logits: torch.Tensor, length: int, mode: str = DECODE_MODE_PARITY) -> List[int]:
     """
     parse logits to orders
 
     :param logits: logits from model
     :param length: input length
+    :param mode: decoding mode, see `decoding.decode_orders`. `parity` keeps
+        the historical conflict resolution and output
     :return: orders
     """
-    logits = logits[1 : length + 1, :length]
-    orders = logits.argsort(descending=False).tolist()
-    ret = [o.pop() for o in orders]
-    while True:
-        order_to_idxes = defaultdict(list)
-        for idx, order in enumerate(ret):
-            order_to_idxes[order].append(idx)
-        # filter idxes len > 1
-        order_to_idxes = {k: v for k, v in order_to_idxes.items() if len(v) > 1}
-        if not order_to_idxes:
-            break
-        # filter
-        for order, idxes in order_to_idxes.items():
-            # find original logits of idxes
-            idxes_to_logit = {}
-            for idx in idxes:
-                idxes_to_logit[idx] = logits[idx, order]
-            idxes_to_logit = sorted(
-                idxes_to_logit.items(), key=lambda x: x[1], reverse=True
-            )
-            # keep the highest logit as order, set others to next candidate
-            for idx, _ in idxes_to_logit[1:]:
-                ret[idx] = orders[idx].pop()
-
-    return ret
+    return decode_orders(logits, length, mode)
 
 
 def check_duplicate(a: List[int]) -> bool:
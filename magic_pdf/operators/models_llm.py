@@ -1,28 +1,34 @@
 import copy
-import json
 import os
 from typing import Callable
 
-from magic_pdf.config.constants import PARSE_TYPE_OCR
+from magic_pdf.config.constants import PARSE_TYPE_OCR, PARSE_TYPE_TXT
 from magic_pdf.config.enums import SupportedPdfParseMethod
 from magic_pdf.data.data_reader_writer import DataWriter
 from magic_pdf.data.dataset import Dataset
+from magic_pdf.data.utils import select_page_ids
 from magic_pdf.libs.draw_bbox import draw_model_bbox
+from magic_pdf.libs.json_serializer import compress_chunks, iter_dumps_list
 from magic_pdf.libs.version import __version__
+from magic_pdf.model.magic_model import copy_model_list
 from magic_pdf.operators.pipes_llm import PipeResultLLM
 from magic_pdf.pdf_parse_union_core_v2_llm import pdf_parse_union
 from magic_pdf.operators import InferenceResultBase
 
 class InferenceResultLLM(InferenceResultBase):
-    def __init__(self, inference_results: list, dataset: Dataset):
+    def __init__(self, inference_results: list, dataset: Dataset, page_ids=None, page_images=None):
         """Initialized method.
 
         Args:
             inference_results (list): the inference result generated by model
             dataset (Dataset): the dataset related with model inference result
+            page_ids (list[int], optional): the analyzed pages, the post-processing defaults to them. Defaults to all pages.
+            page_images (dict, optional): page index -> the `get_image` dict the layout model saw, used by `pipe_txt_mode`
         """
         self._infer_res = inference_results
         self._dataset = dataset
+        self._page_ids = page_ids
+        self._page_images = page_images
 
     def draw_model(self, file_path: str) -> None:
         """Draw model inference result.
@@ -34,20 +40,28 @@ class InferenceResultLLM(InferenceResultBase):
         base_name = os.path.basename(file_path)
         if not os.path.exists(dir_name):
             os.makedirs(dir_name, exist_ok=True)
-        draw_model_bbox(
-            copy.deepcopy(self._infer_res), self._dataset, dir_name, base_name
-        )
+        # the overlay does not change the model list, no need for a copy
+        draw_model_bbox(self._infer_res, self._dataset, dir_name, base_name, page_ids=self._page_ids)
 
-    def dump_model(self, writer: DataWriter, file_path: str):
-        """Dump model inference result to file.
+    def dump_model(self, writer: DataWriter, file_path: str, indent=0, compress=False):
+        """Dump model inference result to file, page by page.
 
         Args:
             writer (DataWriter): writer handle
             file_path (str): the location of target file
+            indent (int, optional): 0 writes compact json, 4 the pretty printed json of older versions. Defaults to 0.
+            compress (bool, optional): brotli compress the json, load it with `json_serializer.load`. Defaults to False.
         """
-        writer.write_string(
-            file_path, json.dumps(self._infer_res, ensure_ascii=False, indent=4)
-        )
+        chunks = iter_dumps_list(self._infer_res, indent)
+        writer.write_stream(file_path, compress_chunks(chunks) if compress else chunks)
+
+    def get_page_ids(self):
+        """Get the analyzed pages.
+
+        Returns:
+            list[int] | None: the page indexes, None for all pages
+        """
+        return self._page_ids
 
     def get_infer_res(self):
         """Get the inference result.
@@ -67,8 +81,68 @@ class InferenceResultLLM(InferenceResultBase):
         Returns:
             Any: return the result generated by proc
         """
+        # proc may change anything, the built-in pipes copy less, see pipe_ocr_mode
         return proc(copy.deepcopy(self._infer_res), *args, **kwargs)
 
+    def _pipe(
+        self, parse_method, parse_type, imageWriter, MonkeyOCR_model, start_page_id, end_page_id, debug_mode, lang,
+        page_ids, on_page,
+    ) -> PipeResultLLM:
+        # the pages not analyzed have no layout, they are skipped unless asked for
+        page_ids = select_page_ids(
+            len(self._dataset), start_page_id, end_page_id, self._page_ids if page_ids is None else page_ids
+        )
+        # pdf_parse_union only changes what MagicModel changes, no need for a deep copy
+        res = pdf_parse_union(
+            copy_model_list(self._infer_res),
+            self._dataset,
+            imageWriter,
+            parse_method,
+            page_ids=page_ids,
+            on_page=on_page,
+            debug_mode=debug_mode,
+            lang=lang,
+            MonkeyOCR_model=MonkeyOCR_model,
+            page_images=self._page_images,
+        )
+        res['_parse_type'] = parse_type
+        res['_version_name'] = __version__
+        if lang is not None:
+            res['lang'] = lang
+        return PipeResultLLM(res, self._dataset, page_ids=page_ids)
+
+    def pipe_txt_mode(
+        self,
+        imageWriter: DataWriter,
+        MonkeyOCR_model,
+        start_page_id=0,
+        end_page_id=None,
+        debug_mode=False,
+        lang=None,
+        page_ids=None,
+        on_page=None,
+    ) -> PipeResultLLM:
+        """Post-proc the model inference result, Extract the text using the
+        text layer of the pdf, the text spans without it are recognized by the
+        chat model.
+
+        Args:
+            imageWriter (DataWriter): the image writer handle
+            start_page_id (int, optional): Defaults to 0. Let user select some pages He/She want to process
+            end_page_id (int, optional):  Defaults to the last page index of dataset. Let user select some pages He/She want to process
+            debug_mode (bool, optional): Defaults to False. will dump more log if enabled
+            lang (str, optional): Defaults to None.
+            page_ids (list[int], optional): only these pages of the range. Defaults to the analyzed pages.
+            on_page (Callable[[int, dict], None], optional): called with every page as soon as it is post-processed, see `page_content`
+
+        Returns:
+            PipeResultLLM: the result
+        """
+        return self._pipe(
+            SupportedPdfParseMethod.TXT, PARSE_TYPE_TXT, imageWriter, MonkeyOCR_model,
+            start_page_id, end_page_id, debug_mode, lang, page_ids, on_page,
+        )
+
     def pipe_ocr_mode(
         self,
         imageWriter: DataWriter,
@@ -77,6 +151,8 @@ class InferenceResultLLM(InferenceResultBase):
         end_page_id=None,
         debug_mode=False,
         lang=None,
+        page_ids=None,
+        on_page=None,
     ) -> PipeResultLLM:
         """Post-proc the model inference result, Extract the text using `OCR`
         technical.
@@ -87,28 +163,13 @@ class InferenceResultLLM(InferenceResultBase):
             end_page_id (int, optional):  Defaults to the last page index of dataset. Let user select some pages He/She want to process
             debug_mode (bool, optional): Defaults to False. will dump more log if enabled
             lang (str, optional): Defaults to None.
+            page_ids (list[int], optional): only these pages of the range. Defaults to the analyzed pages.
+            on_page (Callable[[int, dict], None], optional): called with every page as soon as it is post-processed, see `page_content`
 
         Returns:
             PipeResultLLM: the result
         """
-
-        def proc(*args, **kwargs) -> PipeResultLLM:
-            res = pdf_parse_union(*args, **kwargs)
-            res['_parse_type'] = PARSE_TYPE_OCR
-            res['_version_name'] = __version__
-            if 'lang' in kwargs and kwargs['lang'] is not None:
-                res['lang'] = kwargs['lang']
-            return PipeResultLLM(res, self._dataset)
-
-        res = self.apply(
-            proc,
-            self._dataset,
-            imageWriter,
-            SupportedPdfParseMethod.OCR,
-            start_page_id=start_page_id,
-            end_page_id=end_page_id,
-            debug_mode=debug_mode,
-            lang=lang,
-            MonkeyOCR_model=MonkeyOCR_model
+        return self._pipe(
+            SupportedPdfParseMethod.OCR, PARSE_TYPE_OCR, imageWriter, MonkeyOCR_model,
+            start_page_id, end_page_id, debug_mode, lang, page_ids, on_page,
         )
-        return res
\ No newline at end of file
@@ -6,22 +6,79 @@ from typing import Callable
 from magic_pdf.config.make_content_config import DropMode, MakeMode
 from magic_pdf.data.data_reader_writer import DataWriter
 from magic_pdf.data.dataset import Dataset
-from magic_pdf.dict2md.ocr_mkcontent import union_make
-from magic_pdf.libs.draw_bbox import (draw_layout_bbox, draw_line_sort_bbox,
+from magic_pdf.dict2md.ocr_mkcontent import union_make, union_make_pages
+from magic_pdf.libs.draw_bbox import (OVERLAY_SUFFIXES, draw_layout_bbox,
+                                      draw_line_sort_bbox, draw_overlays,
                                       draw_span_bbox)
 from magic_pdf.libs.json_compressor import JsonCompressor
+from magic_pdf.libs.json_serializer import (compress_chunks, iter_dumps_dict,
+                                            iter_dumps_list)
+from magic_pdf.libs.markdown_utils import escape_markdown_output
+
+
+def page_content(page_info: dict, img_dir_or_bucket_prefix: str, drop_mode=DropMode.NONE) -> dict:
+    """Make the markdown and the content list of one post-processed page,
+    e.g. of a page passed to the `on_page` callback of `pipe_ocr_mode`.
+
+    Args:
+        page_info (dict): the page, an item of pdf_info
+        img_dir_or_bucket_prefix (str): The s3 bucket prefix or local file directory which used to store the figure
+        drop_mode (str, optional): Drop strategy when some page which is corrupted or inappropriate. Defaults to DropMode.NONE.
+
+    Returns:
+        dict: markdown, the markdown of the page as `get_markdown` has it, and content_list, its items of `get_content_list`
+    """
+    markdown = ''.join(
+        escape_markdown_output(page_markdown) for page_markdown in union_make_pages(
+            [page_info], MakeMode.MM_MD, drop_mode, img_dir_or_bucket_prefix
+        )
+    )
+    content_list = [
+        item for page_items in union_make_pages(
+            [page_info], MakeMode.STANDARD_FORMAT, drop_mode, img_dir_or_bucket_prefix
+        ) for item in page_items
+    ]
+    return {'markdown': markdown, 'content_list': content_list}
 
 
 class PipeResultLLM:
-    def __init__(self, pipe_res, dataset: Dataset):
+    def __init__(self, pipe_res, dataset: Dataset, page_ids=None):
         """Initialized.
 
         Args:
             pipe_res (list[dict]): the pipeline processed result of model inference result
             dataset (Dataset): the dataset associated with pipe_res
+            page_ids (list[int], optional): the parsed pages, the overlays only have these pages. Defaults to all pages.
         """
         self._pipe_res = pipe_res
         self._dataset = dataset
+        self._page_ids = page_ids
+
+    def iter_markdown(
+        self,
+        img_dir_or_bucket_prefix: str,
+        drop_mode=DropMode.NONE,
+        md_make_mode=MakeMode.MM_MD,
+        page_markers=False,
+    ):
+        """Get markdown content page by page.
+
+        Args:
+            img_dir_or_bucket_prefix (str): The s3 bucket prefix or local file directory which used to store the figure
+            drop_mode (str, optional): Drop strategy when some page which is corrupted or inappropriate. Defaults to DropMode.NONE.
+            md_make_mode (str, optional): The content Type of Markdown be made. Defaults to MakeMode.MM_MD.
+            page_markers (bool, optional): Whether to insert page break markers between pages. Defaults to False.
+
+        Yields:
+            str: markdown chunks, joined together they are the content of `get_markdown`
+        """
+        pdf_info_list = self._pipe_res['pdf_info']
+        pages = union_make_pages(
+            pdf_info_list, md_make_mode, drop_mode, img_dir_or_bucket_prefix, page_markers
+        )
+        for i, page_markdown in enumerate(pages):
+            # the escaped sequences are never split by the page separator
+            yield ('\n\n' if i > 0 else '') + escape_markdown_output(page_markdown)
 
     def get_markdown(
         self,
@@ -41,11 +98,9 @@ class PipeResultLLM:
         Returns:
             str: return markdown content
         """
-        pdf_info_list = self._pipe_res['pdf_info']
-        md_content = union_make(
-            pdf_info_list, md_make_mode, drop_mode, img_dir_or_bucket_prefix, page_markers
-        )
-        return md_content.replace('\$', '$').replace('\*', '*').replace('<seg>', '\<seg\>').replace('<sos', '\<sos\>').replace('<eos>', '\<eos\>').replace('<pad>', '\<pad\>').replace('<unk>', '\<unk\>').replace('<sep>', '\<sep\>').replace('<cls>', '\<cls\>')
+        return ''.join(self.iter_markdown(
+            img_dir_or_bucket_prefix, drop_mode=drop_mode, md_make_mode=md_make_mode, page_markers=page_markers
+        ))
 
     def dump_md(
         self,
@@ -66,11 +121,10 @@ class PipeResultLLM:
             md_make_mode (str, optional): The content Type of Markdown be made. Defaults to MakeMode.MM_MD.
             page_markers (bool, optional): Whether to insert page break markers between pages. Defaults to False.
         """
-
-        md_content = self.get_markdown(
+        md_chunks = self.iter_markdown(
             img_dir_or_bucket_prefix, drop_mode=drop_mode, md_make_mode=md_make_mode, page_markers=page_markers
         )
-        writer.write_string(file_path, md_content)
+        writer.write_stream(file_path, (chunk.encode('utf-8', errors='replace') for chunk in md_chunks))
 
     def get_content_list(
         self,
@@ -102,6 +156,8 @@ class PipeResultLLM:
         file_path: str,
         image_dir_or_bucket_prefix: str,
         drop_mode=DropMode.NONE,
+        indent=0,
+        compress=False,
     ):
         """Dump Content List.
 
@@ -110,13 +166,24 @@ class PipeResultLLM:
             file_path (str): The file location of content list
             image_dir_or_bucket_prefix (str): The s3 bucket prefix or local file directory which used to store the figure
             drop_mode (str, optional): Drop strategy when some page which is corrupted or inappropriate. Defaults to DropMode.NONE.
+            indent (int, optional): 0 writes compact json, 4 the pretty printed json of older versions. Defaults to 0.
+            compress (bool, optional): brotli compress the json, load it with `json_serializer.load`. Defaults to False.
         """
-        content_list = self.get_content_list(
-            image_dir_or_bucket_prefix, drop_mode=drop_mode,
-        )
-        writer.write_string(
-            file_path, json.dumps(content_list, ensure_ascii=False, indent=4)
+        pdf_info_list = self._pipe_res['pdf_info']
+        pages = union_make_pages(
+            pdf_info_list, MakeMode.STANDARD_FORMAT, drop_mode, image_dir_or_bucket_prefix, False
         )
+        chunks = iter_dumps_list((item for page_items in pages for item in page_items), indent)
+        writer.write_stream(file_path, compress_chunks(chunks) if compress else chunks)
+
+    def get_image_stats(self) -> dict:
+        """Get the counts of the figure and table images of the document.
+
+        Returns:
+            dict: images, unique_images, bytes_written and bytes_deduplicated,
+                empty when no image writer was given
+        """
+        return self._pipe_res.get('image_stats', {})
 
     def get_middle_json(self) -> str:
         """Get middle json.
@@ -126,15 +193,17 @@ class PipeResultLLM:
         """
         return json.dumps(self._pipe_res, ensure_ascii=False, indent=4)
 
-    def dump_middle_json(self, writer: DataWriter, file_path: str):
-        """Dump the result of pipeline.
+    def dump_middle_json(self, writer: DataWriter, file_path: str, indent=0, compress=False):
+        """Dump the result of pipeline, page by page.
 
         Args:
             writer (DataWriter): File writer handler
             file_path (str): The file location of middle json
+            indent (int, optional): 0 writes compact json, 4 the pretty printed json of older versions. Defaults to 0.
+            compress (bool, optional): brotli compress the json, load it with `json_serializer.load`. Defaults to False.
         """
-        middle_json = self.get_middle_json()
-        writer.write_string(file_path, middle_json)
+        chunks = iter_dumps_dict(self._pipe_res, 'pdf_info', indent)
+        writer.write_stream(file_path, compress_chunks(chunks) if compress else chunks)
 
     def draw_layout(self, file_path: str) -> None:
         """Draw the layout.
@@ -147,7 +216,7 @@ class PipeResultLLM:
         if not os.path.exists(dir_name):
             os.makedirs(dir_name, exist_ok=True)
         pdf_info = self._pipe_res['pdf_info']
-        draw_layout_bbox(pdf_info, self._dataset.data_bits(), dir_name, base_name)
+        draw_layout_bbox(pdf_info, self._dataset.get_doc(), dir_name, base_name, page_ids=self._page_ids)
 
     def draw_span(self, file_path: str):
         """Draw the Span.
@@ -160,7 +229,30 @@ class PipeResultLLM:
         if not os.path.exists(dir_name):
             os.makedirs(dir_name, exist_ok=True)
         pdf_info = self._pipe_res['pdf_info']
-        draw_span_bbox(pdf_info, self._dataset.data_bits(), dir_name, base_name)
+        draw_span_bbox(pdf_info, self._dataset.get_doc(), dir_name, base_name, page_ids=self._page_ids)
+
+    def draw_overlays(self, dir_name: str, name: str, overlays=tuple(OVERLAY_SUFFIXES), infer_res=None) -> list:
+        """Draw several overlays, the document is opened once for all of them.
+
+        Args:
+            dir_name (str): the directory of the overlay files
+            name (str): the overlay files are named name + the suffix of the overlay, e.g. name_layout.pdf
+            overlays (Iterable[str], optional): a subset of model, layout and spans. Defaults to all of them.
+            infer_res (list, optional): the inference result, needed by the model overlay
+
+        Returns:
+            list: the paths of the written files
+        """
+        if not overlays:
+            return []
+        if not os.path.exists(dir_name):
+            os.makedirs(dir_name, exist_ok=True)
+        filenames = {overlay: f'{name}{OVERLAY_SUFFIXES[overlay]}' for overlay in overlays}
+        # drawn from the opened document, the file it was read from may be deleted by the time deferred overlays are drawn
+        return draw_overlays(
+            self._dataset.get_doc(), dir_name, filenames,
+            pdf_info=self._pipe_res['pdf_info'], model_list=infer_res, page_ids=self._page_ids,
+        )
 
     def draw_line_sort(self, file_path: str):
         """Draw line sort.
@@ -1,32 +1,43 @@
-import copy
 import math
+import multiprocessing
 import os
+import pickle
 import re
 import statistics
+import tempfile
+import threading
 import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+from concurrent.futures.process import BrokenProcessPool
 from typing import List
 
 import fitz
 import torch
 from loguru import logger
+from PIL import Image
 
 from magic_pdf.config.enums import SupportedPdfParseMethod
-from magic_pdf.config.ocr_content_type import BlockType, ContentType
+from magic_pdf.config.ocr_content_type import BlockType, CategoryId, ContentType
+from magic_pdf.data.data_reader_writer.content_addressed import (
+    ContentAddressedDataWriter, apply_image_manifest, merge_image_stats)
+from magic_pdf.data.data_reader_writer.filebase import FileBasedDataReader, MappedFile
+from magic_pdf.data.data_reader_writer.pipelined import PipelinedDataWriter
 from magic_pdf.data.dataset import Dataset, PageableData
+from magic_pdf.data.utils import select_page_ids
 from magic_pdf.libs.boxbase import calculate_overlap_area_in_bbox1_area_ratio, __is_overlaps_y_exceeds_threshold
 from magic_pdf.libs.clean_memory import clean_memory
 from magic_pdf.libs.convert_utils import dict_to_list
 from magic_pdf.libs.hash_utils import compute_md5
-from magic_pdf.libs.pdf_image_tools import cut_image_to_pil_image
 from magic_pdf.model.magic_model import MagicModel
 
 
-from magic_pdf.model.sub_modules.model_init import AtomModelSingleton
 from magic_pdf.post_proc.para_split_v3 import para_split
 from magic_pdf.pre_proc.construct_page_dict import ocr_construct_page_component_v2
 from magic_pdf.pre_proc.cut_image import ocr_cut_image_and_table
 from magic_pdf.pre_proc.ocr_detect_all_bboxes import ocr_prepare_bboxes_for_layout_split_v2
-from magic_pdf.pre_proc.ocr_dict_merge import fill_spans_in_blocks, fix_block_spans_v2, fix_discarded_block
+from magic_pdf.pre_proc.ocr_dict_merge import fill_spans_in_blocks, fix_block_spans_v2, fix_discarded_block, \
+    line_sort_spans_by_left_to_right, merge_spans_to_line
 from magic_pdf.pre_proc.ocr_span_list_modify import get_qa_need_list_v2, remove_overlaps_low_confidence_spans, \
     remove_overlaps_min_spans, check_chars_is_overlap_in_span
 
@@ -79,12 +90,22 @@ def chars_to_content(span):
         char_width_sum = sum([char['bbox'][2] - char['bbox'][0] for char in span['chars']])
         char_avg_width = char_width_sum / len(span['chars'])
 
+        chars = span['chars']
+        center_xs = [(char['bbox'][0] + char['bbox'][2]) / 2 for char in chars]
         content = ''
-        for char in span['chars']:
+        for i, char in enumerate(chars):
 
             # If distance between next char's x0 and previous char's x1 exceeds 0.25 char width, insert a space
             char1 = char
-            char2 = span['chars'][span['chars'].index(char) + 1] if span['chars'].index(char) + 1 < len(span['chars']) else None
+            # the char after the first char equal to this one, like `chars.index(char) + 1`.
+            # equal chars have the same center, so only the run of equal centers is searched
+            first = i
+            k = i - 1
+            while k >= 0 and center_xs[k] == center_xs[i]:
+                if chars[k] == char:
+                    first = k
+                k -= 1
+            char2 = chars[first + 1] if first + 1 < len(chars) else None
             if char2 and char2['bbox'][0] - char1['bbox'][2] > char_avg_width * 0.25 and char['c'] != ' ' and char2['c'] != ' ':
                 content += f"{char['c']} "
             else:
@@ -105,17 +126,36 @@ def fill_char_in_spans(spans, all_chars):
     # Simple top-to-bottom sorting
     spans = sorted(spans, key=lambda x: x['bbox'][1])
 
-    for char in all_chars:
+    # calculate_char_in_span always needs span y0 < char center y < span y1. chars are
+    # swept by their center y and only tested against the spans whose y range holds it,
+    # in the same order as the full scan, so every char ends up in the same span
+    char_center_ys = [(char['bbox'][1] + char['bbox'][3]) / 2 for char in all_chars]
+    char_span_idx = [None] * len(all_chars)
+    active_spans = []
+    next_span = 0
+    for char_idx in sorted(range(len(all_chars)), key=char_center_ys.__getitem__):
+        char = all_chars[char_idx]
+        char_center_y = char_center_ys[char_idx]
         # Skip chars with invalid bbox
         # x1, y1, x2, y2 = char['bbox']
         # if abs(x1 - x2) <= 0.01 or abs(y1 - y2) <= 0.01:
         #     continue
 
-        for span in spans:
-            if calculate_char_in_span(char['bbox'], span['bbox'], char['c']):
-                span['chars'].append(char)
+        while next_span < len(spans) and spans[next_span]['bbox'][1] < char_center_y:
+            active_spans.append(next_span)
+            next_span += 1
+        active_spans = [i for i in active_spans if spans[i]['bbox'][3] > char_center_y]
+
+        for span_idx in active_spans:
+            if calculate_char_in_span(char['bbox'], spans[span_idx]['bbox'], char['c']):
+                char_span_idx[char_idx] = span_idx
                 break
 
+    # chars are added in their original order, chars_to_content sorts them stably
+    for char, span_idx in zip(all_chars, char_span_idx):
+        if span_idx is not None:
+            spans[span_idx]['chars'].append(char)
+
     empty_spans = []
 
     for span in spans:
@@ -178,6 +218,11 @@ def remove_tilted_line(text_blocks):
 
 
 def txt_spans_extract_v2(pdf_page, spans, all_bboxes, all_discarded_blocks, lang):
+    """Fill the text spans with the pdf chars.
+
+    Returns:
+        tuple: (the spans, the text spans with too few chars, `EmptySpanRecognizer` recognizes them)
+    """
 
     # text_blocks_raw = pdf_page.get_text('rawdict', flags=fitz.TEXT_PRESERVE_WHITESPACE | fitz.TEXT_MEDIABOX_CLIP)['blocks']
 
@@ -210,7 +255,7 @@ def txt_spans_extract_v2(pdf_page, spans, all_bboxes, all_discarded_blocks, lang
         span['width'] = span['bbox'][2] - span['bbox'][0]
         span_height_list.append(span_height)
     if len(span_height_list) == 0:
-        return spans
+        return spans, []
     else:
         median_span_height = statistics.median(span_height_list)
 
@@ -222,9 +267,9 @@ def txt_spans_extract_v2(pdf_page, spans, all_bboxes, all_discarded_blocks, lang
         if span['type'] in [ContentType.InterlineEquation, ContentType.Image, ContentType.Table]:
             continue
         for block in all_bboxes + all_discarded_blocks:
-            if block[7] in [BlockType.ImageBody, BlockType.TableBody, BlockType.InterlineEquation]:
+            if block.type in [BlockType.ImageBody, BlockType.TableBody, BlockType.InterlineEquation]:
                 continue
-            if calculate_overlap_area_in_bbox1_area_ratio(span['bbox'], block[0:4]) > 0.5:
+            if calculate_overlap_area_in_bbox1_area_ratio(span['bbox'], block.bbox) > 0.5:
                 if span['height'] > median_span_height * 3 and span['height'] > span['width'] * 3:
                     vertical_spans.append(span)
                 elif block in all_bboxes:
@@ -261,55 +306,206 @@ def txt_spans_extract_v2(pdf_page, spans, all_bboxes, all_discarded_blocks, lang
 
     empty_spans = fill_char_in_spans(new_spans, all_pymu_chars)
 
-    if len(empty_spans) > 0:
+    return spans, empty_spans
 
 
-        atom_model_manager = AtomModelSingleton()
-        ocr_model = atom_model_manager.get_atom_model(
-            atom_model_name='ocr',
-            ocr_show_log=False,
-            det_db_box_thresh=0.3,
-            lang=lang
-        )
+class EmptySpanRecognizer:
+    """Recognizes the text spans without pdf chars with the chat model.
+
+    The spans are cropped from the raster the layout model saw when it is
+    given, the pages are rendered again otherwise. The spans of all pages of
+    one call go through `chat_model.batch_inference` in one batch.
+    """
+
+    def __init__(self, dataset: Dataset, MonkeyOCR_model, page_images=None):
+        """
+        Args:
+            dataset (Dataset): the document
+            MonkeyOCR_model: the models
+            page_images (dict, optional): page index -> the `get_image` dict of the page
+                rendered for layout, see `doc_analyze_llm(keep_images=True)`
+        """
+        self._dataset = dataset
+        self._page_images = page_images or {}
+        self._batch_model = None
+        if getattr(MonkeyOCR_model, 'chat_model', None) is not None:
+            # imported here, page worker processes do not need the model stack
+            from magic_pdf.model.batch_analyze_llm import BatchAnalyzeLLM
+
+            self._batch_model = BatchAnalyzeLLM(MonkeyOCR_model)
+
+    def _crop_spans(self, page_id, spans):
+        page_img = self._page_images.get(page_id)
+        if page_img is None:
+            page_img = self._dataset.get_page(page_id).get_image()
+        img = Image.fromarray(page_img['img'])
+        scale = page_img['width'] / self._dataset.get_page(page_id).get_page_info().w
+        span_imgs = []
+        for span in spans:
+            x0, y0, x1, y1 = span['bbox']
+            crop_box = (
+                max(int(x0 * scale), 0), max(int(y0 * scale), 0),
+                min(math.ceil(x1 * scale), img.width), min(math.ceil(y1 * scale), img.height),
+            )
+            span_imgs.append(img.crop(crop_box))
+        return span_imgs
+
+    def __call__(self, page_states):
+        """Recognize the `empty_spans` of page states of `prepare_page_blocks`.
 
-        for span in empty_spans:
+        Spans whose recognition comes back empty are removed from their
+        blocks, like the ones below the score threshold of the ocr model were.
+        The chat model gives no confidence, there is no threshold for it: the
+        recognized spans are scored 1.0 like the blocks it recognizes in
+        `BatchAnalyzeLLM`.
+
+        Args:
+            page_states (dict): page index -> page state, changed in place
+        """
+        pages = [(page_id, page_state) for page_id, page_state in page_states.items() if page_state.get('empty_spans')]
+        if len(pages) == 0:
+            return
+        if self._batch_model is None:
+            span_count = sum(len(page_state.pop('empty_spans')) for _, page_state in pages)
+            logger.warning(f'{span_count} spans without text layer are kept, no chat model to recognize them')
+            return
+
+        span_imgs = []
+        for page_id, page_state in pages:
+            span_imgs.extend(self._crop_spans(page_id, page_state['empty_spans']))
+        ocr_res = iter(self._batch_model.batch_llm_ocr(span_imgs, [CategoryId.Text] * len(span_imgs)))
+
+        for _, page_state in pages:
+            unrecognized_spans = []
+            for span in page_state.pop('empty_spans'):
+                ocr_text = next(ocr_res)
+                if len(ocr_text) > 0:
+                    span['content'] = ocr_text
+                    span['score'] = 1.0
+                else:
+                    unrecognized_spans.append(span)
+            if len(unrecognized_spans) > 0:
+                remove_spans_from_blocks(page_state, unrecognized_spans)
 
-            span_img = cut_image_to_pil_image(span['bbox'], pdf_page, mode='cv2')
-            ocr_res = ocr_model.ocr(span_img, det=False)
-            if ocr_res and len(ocr_res) > 0:
-                if len(ocr_res[0]) > 0:
-                    ocr_text, ocr_score = ocr_res[0][0]
-                    # logger.info(f"ocr_text: {ocr_text}, ocr_score: {ocr_score}")
-                    if ocr_score > 0.5 and len(ocr_text) > 0:
-                        span['content'] = ocr_text
-                        span['score'] = ocr_score
-                    else:
-                        spans.remove(span)
 
-    return spans
+def remove_spans_from_blocks(page_state, spans):
+    """Remove spans from the blocks of a page state, the lines of the blocks
+    that held them are built again from the other spans."""
+    span_ids = {id(span) for span in spans}
+    if 'page_info' in page_state:
+        blocks = page_state['page_info']['discarded_blocks']
+    else:
+        blocks = page_state['fix_blocks'] + page_state['fix_discarded_blocks']
+    for block in blocks:
+        block_spans = [span for line in block['lines'] for span in line['spans']]
+        kept_spans = [span for span in block_spans if id(span) not in span_ids]
+        if len(kept_spans) < len(block_spans):
+            block['lines'] = line_sort_spans_by_left_to_right(merge_spans_to_line(kept_spans))
+    if 'page_info' not in page_state:
+        page_state['line_height'] = get_line_height(page_state['fix_blocks'])
 
 
-def do_predict(boxes: List[List[int]], model) -> List[int]:
+def do_predict(boxes: List[List[int]], model, decode_mode='parity') -> List[int]:
     from magic_pdf.model.sub_modules.reading_oreder.layoutreader.helpers import (
         boxes2inputs, parse_logits, prepare_inputs)
 
     inputs = boxes2inputs(boxes)
     inputs = prepare_inputs(inputs, model)
     logits = model(**inputs).logits.cpu().squeeze(0)
-    return parse_logits(logits, len(boxes))
+    return parse_logits(logits, len(boxes), decode_mode)
+
+
+def do_predict_batch(boxes_list: List[List[List[int]]], model, decode_mode='parity') -> List[List[int]]:
+    """Order the lines of several pages with one layoutreader forward pass.
+
+    Args:
+        boxes_list (List[List[List[int]]]): line boxes of every page, each at most MAX_LEN lines
+
+    Returns:
+        List[List[int]]: orders of every page
+    """
+    from magic_pdf.model.sub_modules.reading_oreder.layoutreader.helpers import (
+        batch_boxes2inputs, parse_logits, prepare_inputs)
+
+    if len(boxes_list) == 1:
+        return [do_predict(boxes_list[0], model, decode_mode)]
+    inputs = batch_boxes2inputs(boxes_list)
+    inputs = prepare_inputs(inputs, model)
+    logits = model(**inputs).logits.cpu()
+    return [parse_logits(logits[i], len(boxes), decode_mode) for i, boxes in enumerate(boxes_list)]
+
+
+def do_predict_chunked(boxes: List[List[int]], line_block_ids: List[int], model, decode_mode='parity') -> List[int]:
+    """Order a dense page group by group.
+
+    xycut orders the blocks as the coarse pass, consecutive blocks are packed
+    into groups of at most MAX_LEN lines, layoutreader orders the lines inside
+    every group and the group orders are concatenated.
+
+    Args:
+        boxes (List[List[int]]): line boxes scaled to [0, 1000]
+        line_block_ids (List[int]): block id of every line box
+    """
+    import numpy as np
+
+    from magic_pdf.model.sub_modules.reading_oreder.layoutreader.helpers import MAX_LEN
+    from magic_pdf.model.sub_modules.reading_oreder.layoutreader.xycut import xy_cut_order
+
+    block_lines = {}
+    for line_id, block_id in enumerate(line_block_ids):
+        block_lines.setdefault(block_id, []).append(line_id)
+    block_ids = list(block_lines.keys())
+    block_boxes = []
+    for block_id in block_ids:
+        line_boxes = [boxes[i] for i in block_lines[block_id]]
+        block_boxes.append([
+            min(b[0] for b in line_boxes),
+            min(b[1] for b in line_boxes),
+            max(b[2] for b in line_boxes),
+            max(b[3] for b in line_boxes),
+        ])
+
+    groups = []
+    current = []
+    for block_idx in xy_cut_order(np.array(block_boxes)):
+        line_ids = block_lines[block_ids[block_idx]]
+        for start in range(0, len(line_ids), MAX_LEN):
+            piece = line_ids[start:start + MAX_LEN]
+            if len(current) + len(piece) > MAX_LEN:
+                groups.append(current)
+                current = []
+            current.extend(piece)
+    if current:
+        groups.append(current)
+
+    orders = []
+    for group in groups:
+        group_orders = do_predict([boxes[i] for i in group], model, decode_mode)
+        orders.extend(group[i] for i in group_orders)
+    return orders
 
 
 def cal_block_index(fix_blocks, sorted_bboxes):
 
     if sorted_bboxes is not None:
 
+        # first position of every bbox, same result as `sorted_bboxes.index` without the linear scan
+        bbox_to_index = {}
+        for i, bbox in enumerate(sorted_bboxes):
+            bbox_to_index.setdefault(tuple(bbox), i)
+
+        def index_of(bbox):
+            if tuple(bbox) in bbox_to_index:
+                return bbox_to_index[tuple(bbox)]
+            return sorted_bboxes.index(bbox)
+
         for block in fix_blocks:
             line_index_list = []
             if len(block['lines']) == 0:
-                block['index'] = sorted_bboxes.index(block['bbox'])
+                block['index'] = index_of(block['bbox'])
             else:
                 for line in block['lines']:
-                    line['index'] = sorted_bboxes.index(line['bbox'])
+                    line['index'] = index_of(line['bbox'])
                     line_index_list.append(line['index'])
                 median_value = statistics.median(line_index_list)
                 block['index'] = median_value
@@ -317,9 +513,9 @@ def cal_block_index(fix_blocks, sorted_bboxes):
 
             if block['type'] in [BlockType.ImageBody, BlockType.TableBody, BlockType.Title, BlockType.InterlineEquation]:
                 if 'real_lines' in block:
-                    block['virtual_lines'] = copy.deepcopy(block['lines'])
-                    block['lines'] = copy.deepcopy(block['real_lines'])
-                    del block['real_lines']
+                    # the lists are moved, nothing else holds them
+                    block['virtual_lines'] = block['lines']
+                    block['lines'] = block.pop('real_lines')
     else:
 
         block_bboxes = []
@@ -330,21 +526,19 @@ def cal_block_index(fix_blocks, sorted_bboxes):
 
 
             if block['type'] in [BlockType.ImageBody, BlockType.TableBody]:
-                block['virtual_lines'] = copy.deepcopy(block['lines'])
-                block['lines'] = copy.deepcopy(block['real_lines'])
-                del block['real_lines']
+                block['virtual_lines'] = block['lines']
+                block['lines'] = block.pop('real_lines')
 
         import numpy as np
 
         from magic_pdf.model.sub_modules.reading_oreder.layoutreader.xycut import \
-            recursive_xy_cut
+            xy_cut
 
-        random_boxes = np.array(block_bboxes)
-        np.random.shuffle(random_boxes)
-        res = []
-        recursive_xy_cut(np.asarray(random_boxes).astype(int), np.arange(len(block_bboxes)), res)
+        # the blocks are cut in their page order, a shuffled input made the order of a page differ between runs
+        block_boxes = np.array(block_bboxes)
+        res = xy_cut(block_boxes.astype(int))
         assert len(res) == len(block_bboxes)
-        sorted_boxes = random_boxes[np.array(res)].tolist()
+        sorted_boxes = block_boxes[np.array(res)].tolist()
 
         for i, block in enumerate(fix_blocks):
             block['index'] = sorted_boxes.index(block['bbox'])
@@ -402,36 +596,53 @@ def insert_lines_into_block(block_bbox, line_height, page_w, page_h):
         return [[x0, y0, x1, y1]]
 
 
-def sort_lines_by_model(fix_blocks, page_w, page_h, line_height, MonkeyOCR_model):
+# pages with more lines are ordered in xycut groups (or by xycut alone, see `long_page_mode`)
+LAYOUTREADER_MAX_LINES = 200
+
+
+def prepare_lines_for_model(fix_blocks, page_w, page_h, line_height, long_page_mode='chunked'):
+    """Collect the line boxes layoutreader orders, virtual lines are inserted
+    into blocks without lines.
+
+    Returns:
+        tuple: (page_line_list, boxes scaled to [0, 1000], block id of every box),
+            None if the page is left to xycut
+    """
     page_line_list = []
+    # block of every entry in page_line_list, used to group lines of dense pages
+    page_line_block_ids = []
 
-    def add_lines_to_block(b):
+    def add_lines_to_block(b, block_id):
         line_bboxes = insert_lines_into_block(b['bbox'], line_height, page_w, page_h)
         b['lines'] = []
         for line_bbox in line_bboxes:
             b['lines'].append({'bbox': line_bbox, 'spans': []})
         page_line_list.extend(line_bboxes)
+        page_line_block_ids.extend([block_id] * len(line_bboxes))
 
-    for block in fix_blocks:
+    for block_id, block in enumerate(fix_blocks):
         if block['type'] in [
             BlockType.Text, BlockType.Title,
             BlockType.ImageCaption, BlockType.ImageFootnote,
             BlockType.TableCaption, BlockType.TableFootnote
         ]:
             if len(block['lines']) == 0:
-                add_lines_to_block(block)
+                add_lines_to_block(block, block_id)
             elif block['type'] in [BlockType.Title] and len(block['lines']) == 1 and (block['bbox'][3] - block['bbox'][1]) > line_height * 2:
-                block['real_lines'] = copy.deepcopy(block['lines'])
-                add_lines_to_block(block)
+                # add_lines_to_block gives the block a new lines list, the old one is kept as is
+                block['real_lines'] = block['lines']
+                add_lines_to_block(block, block_id)
             else:
                 for line in block['lines']:
                     bbox = line['bbox']
                     page_line_list.append(bbox)
+                    page_line_block_ids.append(block_id)
         elif block['type'] in [BlockType.ImageBody, BlockType.TableBody, BlockType.InterlineEquation]:
-            block['real_lines'] = copy.deepcopy(block['lines'])
-            add_lines_to_block(block)
+            block['real_lines'] = block['lines']
+            add_lines_to_block(block, block_id)
 
-    if len(page_line_list) > 200:
+    long_page = len(page_line_list) > LAYOUTREADER_MAX_LINES
+    if long_page and long_page_mode != 'chunked':
         return None
 
 
@@ -469,12 +680,52 @@ def sort_lines_by_model(fix_blocks, page_w, page_h, line_height, MonkeyOCR_model
             1000 >= right >= left >= 0 and 1000 >= bottom >= top >= 0
         ), f'Invalid box. right: {right}, left: {left}, bottom: {bottom}, top: {top}'  # noqa: E126, E121
         boxes.append([left, top, right, bottom])
+
+    return page_line_list, boxes, page_line_block_ids
+
+
+def sort_lines_by_model(fix_blocks, page_w, page_h, line_height, MonkeyOCR_model):
+    long_page_mode = getattr(MonkeyOCR_model, 'layoutreader_long_page_mode', 'chunked')
+    prepared = prepare_lines_for_model(fix_blocks, page_w, page_h, line_height, long_page_mode)
+    if prepared is None:
+        return None
+    return sort_prepared_lines([prepared], MonkeyOCR_model)[0]
+
+
+# pages that are ordered together in one layoutreader forward pass
+LAYOUTREADER_BATCH_SIZE = 8
+
+
+def sort_prepared_lines(prepared_list, MonkeyOCR_model):
+    """Order the lines of several pages, see `prepare_lines_for_model`.
+
+    Pages up to LAYOUTREADER_MAX_LINES lines are batched, pages of similar
+    length go into the same batch to keep the padding small.
+
+    Returns:
+        list: sorted line bboxes of every page
+    """
     model = MonkeyOCR_model.layoutreader_model
+    decode_mode = getattr(MonkeyOCR_model, 'layoutreader_decode_mode', 'parity')
+    orders_list = [None] * len(prepared_list)
+    short_pages = []
     with torch.no_grad():
-        orders = do_predict(boxes, model)
-    sorted_bboxes = [page_line_list[i] for i in orders]
+        for i, (page_line_list, boxes, page_line_block_ids) in enumerate(prepared_list):
+            if len(boxes) > LAYOUTREADER_MAX_LINES:
+                orders_list[i] = do_predict_chunked(boxes, page_line_block_ids, model, decode_mode)
+            else:
+                short_pages.append(i)
+        short_pages.sort(key=lambda i: len(prepared_list[i][1]))
+        for start in range(0, len(short_pages), LAYOUTREADER_BATCH_SIZE):
+            batch = short_pages[start:start + LAYOUTREADER_BATCH_SIZE]
+            batch_orders = do_predict_batch([prepared_list[i][1] for i in batch], model, decode_mode)
+            for i, orders in zip(batch, batch_orders):
+                orders_list[i] = orders
 
-    return sorted_bboxes
+    sorted_bboxes_list = []
+    for (page_line_list, _, _), orders in zip(prepared_list, orders_list):
+        sorted_bboxes_list.append([page_line_list[i] for i in orders])
+    return sorted_bboxes_list
 
 
 def get_line_height(blocks):
@@ -553,7 +804,7 @@ def revert_group_blocks(blocks):
 
 def remove_outside_spans(spans, all_bboxes, all_discarded_blocks):
     def get_block_bboxes(blocks, block_type_list):
-        return [block[0:4] for block in blocks if block[7] in block_type_list]
+        return [block.bbox for block in blocks if block.type in block_type_list]
 
     image_bboxes = get_block_bboxes(all_bboxes, [BlockType.ImageBody])
     table_bboxes = get_block_bboxes(all_bboxes, [BlockType.TableBody])
@@ -594,8 +845,31 @@ def remove_outside_spans(spans, all_bboxes, all_discarded_blocks):
 
 
 def parse_page_core(
-    page_doc: PageableData, magic_model, page_id, pdf_bytes_md5, imageWriter, parse_mode, lang, MonkeyOCR_model
+    page_doc: PageableData, magic_model, page_id, pdf_bytes_md5, imageWriter, parse_mode, lang, MonkeyOCR_model,
+    recognize_spans,
 ):
+    page_state = prepare_page_blocks(page_doc, magic_model, page_id, pdf_bytes_md5, imageWriter, parse_mode, lang)
+    recognize_spans({page_id: page_state})
+    if 'page_info' in page_state:
+        return page_state['page_info']
+
+    sorted_bboxes = sort_lines_by_model(
+        page_state['fix_blocks'], page_state['page_w'], page_state['page_h'], page_state['line_height'], MonkeyOCR_model
+    )
+    return finish_page_blocks(page_state, sorted_bboxes)
+
+
+def prepare_page_blocks(
+    page_doc: PageableData, magic_model, page_id, pdf_bytes_md5, imageWriter, parse_mode, lang
+):
+    """Everything of `parse_page_core` before the lines are ordered.
+
+    Returns:
+        dict: {'page_info': ...} for pages that are already complete, otherwise
+            the blocks and page attributes `finish_page_blocks` needs. In txt
+            mode 'empty_spans' holds the spans of the blocks left to
+            `EmptySpanRecognizer`
+    """
     need_drop = False
     drop_reason = []
 
@@ -716,9 +990,10 @@ def parse_page_core(
     spans, dropped_spans_by_confidence = remove_overlaps_low_confidence_spans(spans)
     spans, dropped_spans_by_span_overlap = remove_overlaps_min_spans(spans)
 
+    empty_spans = []
     if parse_mode == SupportedPdfParseMethod.TXT:
 
-        spans = txt_spans_extract_v2(page_doc, spans, all_bboxes, all_discarded_blocks, lang)
+        spans, empty_spans = txt_spans_extract_v2(page_doc, spans, all_bboxes, all_discarded_blocks, lang)
 
     elif parse_mode == SupportedPdfParseMethod.OCR:
         pass
@@ -732,7 +1007,7 @@ def parse_page_core(
 
     if len(all_bboxes) == 0:
         logger.warning(f'skip this page, not found useful bbox, page_id: {page_id}')
-        return ocr_construct_page_component_v2(
+        return {'page_info': ocr_construct_page_component_v2(
             [],
             [],
             page_id,
@@ -745,7 +1020,7 @@ def parse_page_core(
             fix_discarded_blocks,
             need_drop,
             drop_reason,
-        )
+        ), 'empty_spans': empty_spans}
 
     spans = ocr_cut_image_and_table(
         spans, page_doc, page_id, pdf_bytes_md5, imageWriter
@@ -759,9 +1034,22 @@ def parse_page_core(
 
     line_height = get_line_height(fix_blocks)
 
-    sorted_bboxes = sort_lines_by_model(fix_blocks, page_w, page_h, line_height, MonkeyOCR_model)
+    return {
+        'fix_blocks': fix_blocks,
+        'fix_discarded_blocks': fix_discarded_blocks,
+        'page_id': page_id,
+        'page_w': page_w,
+        'page_h': page_h,
+        'line_height': line_height,
+        'need_drop': need_drop,
+        'drop_reason': drop_reason,
+        'empty_spans': empty_spans,
+    }
 
-    fix_blocks = cal_block_index(fix_blocks, sorted_bboxes)
+
+def finish_page_blocks(page_state, sorted_bboxes):
+    """Index, sort and assemble the blocks of `prepare_page_blocks` into the page info."""
+    fix_blocks = cal_block_index(page_state['fix_blocks'], sorted_bboxes)
 
     fix_blocks = revert_group_blocks(fix_blocks)
 
@@ -776,20 +1064,190 @@ def parse_page_core(
     page_info = ocr_construct_page_component_v2(
         sorted_blocks,
         [],
-        page_id,
-        page_w,
-        page_h,
+        page_state['page_id'],
+        page_state['page_w'],
+        page_state['page_h'],
         [],
         images,
         tables,
         interline_equations,
-        fix_discarded_blocks,
-        need_drop,
-        drop_reason,
+        page_state['fix_discarded_blocks'],
+        page_state['need_drop'],
+        page_state['drop_reason'],
     )
     return page_info
 
 
+def _prepare_pages_in_worker(
+    pdf_path, page_infos, model_pages, pdf_bytes_md5, imageWriter, parse_mode, lang, long_page_mode
+):
+    """Run `prepare_page_blocks` and `prepare_lines_for_model` for some pages
+    in a worker process, the lines are ordered and the empty spans are
+    recognized by the parent which owns the models."""
+    from magic_pdf.data.dataset import PymuDocDataset
+
+    # every worker opens its own fitz handle, they can not be shared between processes. It is closed
+    # with the task, a document kept open would keep its file mapped after the parent deleted it
+    dataset = PymuDocDataset(FileBasedDataReader(use_mmap=True).read(pdf_path))
+    try:
+        return _prepare_pages(
+            dataset, page_infos, model_pages, pdf_bytes_md5, imageWriter, parse_mode, lang, long_page_mode
+        )
+    finally:
+        dataset.close()
+
+
+def _prepare_pages(dataset, page_infos, model_pages, pdf_bytes_md5, imageWriter, parse_mode, lang, long_page_mode):
+    model_list = [{'layout_dets': [], 'page_info': page_info} for page_info in page_infos]
+    for model_page in model_pages:
+        model_list[model_page['page_info']['page_no']] = model_page
+    magic_model = MagicModel(model_list, dataset)
+
+    results = []
+    content_writer = ContentAddressedDataWriter(imageWriter) if imageWriter else None
+    with PipelinedDataWriter(content_writer) if content_writer else nullcontext() as page_image_writer:
+        for model_page in model_pages:
+            page_id = model_page['page_info']['page_no']
+            page_state = prepare_page_blocks(
+                dataset.get_page(page_id), magic_model, page_id, pdf_bytes_md5, page_image_writer, parse_mode, lang
+            )
+            # the lines of pages with empty spans are prepared by the parent once they are recognized
+            if 'page_info' not in page_state and not page_state['empty_spans']:
+                page_state['prepared_lines'] = prepare_lines_for_model(
+                    page_state['fix_blocks'], page_state['page_w'], page_state['page_h'],
+                    page_state['line_height'], long_page_mode,
+                )
+            results.append((page_id, page_state))
+    if content_writer is None:
+        return results, {}, {}
+    return results, content_writer.manifest, content_writer.stats()
+
+
+# worker pools are kept across documents, starting the processes costs seconds
+_page_pools = {}
+_page_pools_lock = threading.Lock()
+
+
+def get_page_pool(num_workers) -> ProcessPoolExecutor:
+    with _page_pools_lock:
+        if num_workers not in _page_pools:
+            # spawn, forking a process that holds CUDA contexts and inference threads is not safe
+            _page_pools[num_workers] = ProcessPoolExecutor(
+                max_workers=num_workers, mp_context=multiprocessing.get_context('spawn')
+            )
+        return _page_pools[num_workers]
+
+
+def shutdown_page_pools(wait=True):
+    """Shut down the worker pools of `parse_pages_in_workers`, a later
+    document starts new ones."""
+    with _page_pools_lock:
+        pools = list(_page_pools.values())
+        _page_pools.clear()
+    for pool in pools:
+        pool.shutdown(wait=wait)
+
+
+def _can_parse_pages_in_workers(num_workers, num_pages, imageWriter):
+    if num_workers is None or num_workers <= 1 or num_pages <= 1:
+        return False
+    try:
+        pickle.dumps(imageWriter)
+    except Exception as e:
+        logger.warning(f'image writer can not be sent to worker processes, process pages serially: {e}')
+        return False
+    return True
+
+
+def parse_pages_in_workers(
+    model_list, dataset: Dataset, page_ids, pdf_bytes_md5, imageWriter, parse_mode, lang, MonkeyOCR_model, num_workers,
+    recognize_spans,
+):
+    """Page-parallel `parse_page_core`.
+
+    Worker processes prepare the blocks of the pages and write their crops
+    themselves, the models stay in this process: the empty spans of all
+    pages are recognized in one batch and the layoutreader model orders the
+    lines of all pages in batches.
+
+    Returns:
+        tuple: (page_id -> page info, the merged image manifest, the image
+            stats of every worker task)
+    """
+    long_page_mode = getattr(MonkeyOCR_model, 'layoutreader_long_page_mode', 'chunked')
+    page_infos = [model_page['page_info'] for model_page in model_list]
+    # a few tasks per worker so that slow pages do not hold up a whole worker share
+    chunk_size = max(1, math.ceil(len(page_ids) / (num_workers * 4)))
+    chunks = [
+        [model_list[page_id] for page_id in page_ids[i:i + chunk_size]]
+        for i in range(0, len(page_ids), chunk_size)
+    ]
+
+    page_states = {}
+    image_manifest = {}
+    image_stats = []
+    executor = get_page_pool(num_workers)
+    # the workers read the document from a file instead of receiving its bytes with every task,
+    # a mapped input file is read by them directly
+    pdf_bits = dataset.data_bits()
+    if isinstance(pdf_bits, MappedFile):
+        pdf_file = nullcontext(pdf_bits.name)
+    else:
+        pdf_file = tempfile.NamedTemporaryFile(suffix='.pdf')
+        pdf_file.write(pdf_bits)
+        pdf_file.flush()
+    with pdf_file as pdf_path:
+        if not isinstance(pdf_path, str):
+            pdf_path = pdf_path.name
+        futures = [
+            executor.submit(
+                _prepare_pages_in_worker, pdf_path, page_infos, chunk,
+                pdf_bytes_md5, imageWriter, parse_mode, lang, long_page_mode,
+            )
+            for chunk in chunks
+        ]
+        try:
+            for future in futures:
+                results, manifest, stats = future.result()
+                for page_id, page_state in results:
+                    page_states[page_id] = page_state
+                image_manifest.update(manifest)
+                image_stats.append(stats)
+        except BrokenProcessPool:
+            # a worker died (e.g. killed for memory), the next document gets a new pool
+            with _page_pools_lock:
+                _page_pools.pop(num_workers, None)
+            raise
+
+    pages_to_recognize = [page_id for page_id in page_ids if page_states[page_id]['empty_spans']]
+    recognize_spans({page_id: page_states[page_id] for page_id in pages_to_recognize})
+    for page_id in pages_to_recognize:
+        page_state = page_states[page_id]
+        if 'page_info' not in page_state:
+            page_state['prepared_lines'] = prepare_lines_for_model(
+                page_state['fix_blocks'], page_state['page_w'], page_state['page_h'],
+                page_state['line_height'], long_page_mode,
+            )
+
+    pages_to_sort = [
+        page_id for page_id in page_ids
+        if 'page_info' not in page_states[page_id] and page_states[page_id]['prepared_lines'] is not None
+    ]
+    sorted_bboxes_list = sort_prepared_lines(
+        [page_states[page_id]['prepared_lines'] for page_id in pages_to_sort], MonkeyOCR_model
+    )
+    sorted_bboxes_of_page = dict(zip(pages_to_sort, sorted_bboxes_list))
+
+    page_info_dict = {}
+    for page_id in page_ids:
+        page_state = page_states[page_id]
+        if 'page_info' in page_state:
+            page_info_dict[page_id] = page_state['page_info']
+        else:
+            page_info_dict[page_id] = finish_page_blocks(page_state, sorted_bboxes_of_page.get(page_id))
+    return page_info_dict, image_manifest, image_stats
+
+
 def pdf_parse_union(
     model_list,
     dataset: Dataset,
@@ -800,54 +1258,117 @@ def pdf_parse_union(
     end_page_id=None,
     debug_mode=False,
     lang=None,
+    num_workers=None,
+    page_ids=None,
+    on_page=None,
+    page_images=None,
 ):
+    """Post-process the model results of a document page by page.
+
+    Args:
+        page_ids (list[int], optional): only these pages of the range, the
+            others are added as skipped pages. Defaults to all of them
+        on_page (Callable[[int, dict], None], optional): called in page order
+            with the index and the finished page info of every parsed page, its
+            images written and its para_blocks made, while the next pages are parsed
+        num_workers (int, optional): post-process the pages in that many worker
+            processes. Defaults to `post_proc_workers` of MonkeyOCR_model, pages
+            are processed in this process if it is not above 1
+        page_images (dict, optional): page index -> the `get_image` dict of the page rendered
+            for layout, the text spans without pdf chars are cropped from them in txt mode.
+            Defaults to rendering the pages that have such spans again
+    """
 
     pdf_bytes_md5 = compute_md5(dataset.data_bits())
 
     pdf_info_dict = {}
 
-    magic_model = MagicModel(model_list, dataset)
+    if num_workers is None:
+        num_workers = getattr(MonkeyOCR_model, 'post_proc_workers', 0)
 
-    # end_page_id = end_page_id if end_page_id else len(pdf_docs) - 1
-    end_page_id = (
-        end_page_id
-        if end_page_id is not None and end_page_id >= 0
-        else len(dataset) - 1
-    )
-
-    if end_page_id > len(dataset) - 1:
-        logger.warning('end_page_id is out of range, use pdf_docs length')
-        end_page_id = len(dataset) - 1
+    page_ids = select_page_ids(len(dataset), start_page_id, end_page_id, page_ids)
+    selected_page_ids = set(page_ids)
 
     start_time = time.time()
 
-    for page_id, page in enumerate(dataset):
+    # one batch model for the document, the spans of a page or of all worker pages share a batch
+    recognize_spans = EmptySpanRecognizer(dataset, MonkeyOCR_model, page_images)
+
+    image_manifest = {}
+    image_stats = []
+    if _can_parse_pages_in_workers(num_workers, len(page_ids), imageWriter):
+        parsed_pages, image_manifest, image_stats = parse_pages_in_workers(
+            model_list, dataset, page_ids, pdf_bytes_md5, imageWriter, parse_mode, lang, MonkeyOCR_model, num_workers,
+            recognize_spans,
+        )
         if debug_mode:
-            time_now = time.time()
             logger.info(
-                f'page_id: {page_id}, last_page_cost_time: {round(time.time() - start_time, 2)}'
-            )
-            start_time = time_now
-
-        if start_page_id <= page_id <= end_page_id:
-            page_info = parse_page_core(
-                page, magic_model, page_id, pdf_bytes_md5, imageWriter, parse_mode, lang, MonkeyOCR_model
+                f'{len(page_ids)} pages post-processed by {num_workers} workers, cost_time: {round(time.time() - start_time, 2)}'
             )
-        else:
-            page_info = page.get_page_info()
-            page_w = page_info.w
-            page_h = page_info.h
-            page_info = ocr_construct_page_component_v2(
-                [], [], page_id, page_w, page_h, [], [], [], [], [], True, 'skip page'
-            )
-        pdf_info_dict[f'page_{page_id}'] = page_info
-
-    para_split(pdf_info_dict)
+    else:
+        parsed_pages = None
+        magic_model = MagicModel(model_list, dataset)
+
+    # the crops are written once per distinct content, see `ContentAddressedDataWriter`,
+    # encoded and written in threads while the next pages are parsed
+    content_writer = ContentAddressedDataWriter(imageWriter) if imageWriter else None
+    page_image_writer = PipelinedDataWriter(content_writer) if content_writer else imageWriter
+    # pages already given to on_page, with their para_blocks
+    split_pages = set()
+    try:
+        for page_id, page in enumerate(dataset):
+            if debug_mode:
+                time_now = time.time()
+                logger.info(
+                    f'page_id: {page_id}, last_page_cost_time: {round(time.time() - start_time, 2)}'
+                )
+                start_time = time_now
+
+            if parsed_pages is not None and page_id in parsed_pages:
+                page_info = parsed_pages[page_id]
+            elif page_id in selected_page_ids:
+                page_info = parse_page_core(
+                    page, magic_model, page_id, pdf_bytes_md5, page_image_writer, parse_mode, lang, MonkeyOCR_model,
+                    recognize_spans,
+                )
+            else:
+                page_info = page.get_page_info()
+                page_w = page_info.w
+                page_h = page_info.h
+                page_info = ocr_construct_page_component_v2(
+                    [], [], page_id, page_w, page_h, [], [], [], [], [], True, 'skip page'
+                )
+            pdf_info_dict[f'page_{page_id}'] = page_info
+            if on_page is not None and page_id in selected_page_ids:
+                # the page links to the content keys of its images once they are written
+                if content_writer is not None:
+                    page_image_writer.flush()
+                    apply_image_manifest(page_info, content_writer.manifest)
+                apply_image_manifest(page_info, image_manifest)
+                para_split({f'page_{page_id}': page_info})
+                split_pages.add(f'page_{page_id}')
+                on_page(page_id, page_info)
+    finally:
+        if page_image_writer:
+            page_image_writer.close()
+
+    if content_writer is not None:
+        image_manifest.update(content_writer.manifest)
+        image_stats.append(content_writer.stats())
+    # the spans were cut under their location paths, they link to the content keys
+    apply_image_manifest(pdf_info_dict, image_manifest)
+
+    # the page infos given to on_page are the ones of the result, they are not split again
+    para_split({key: page_info for key, page_info in pdf_info_dict.items() if key not in split_pages})
 
     pdf_info_list = dict_to_list(pdf_info_dict)
     new_pdf_info_dict = {
         'pdf_info': pdf_info_list,
     }
+    if imageWriter:
+        new_pdf_info_dict['image_manifest'] = image_manifest
+        new_pdf_info_dict['image_stats'] = merge_image_stats(image_stats, image_manifest)
+        logger.info(f'images: {new_pdf_info_dict["image_stats"]}')
 
     clean_memory(MonkeyOCR_model.device)
 
@@ -375,18 +375,16 @@ def __para_merge_page(blocks):
 def para_split(pdf_info_dict):
     all_blocks = []
     for page_num, page in pdf_info_dict.items():
-        blocks = copy.deepcopy(page['preproc_blocks'])
+        # only the block dicts get new keys, lines and spans are shared with preproc_blocks.
+        # __para_merge_page changes lines and spans, copy them again if it is enabled
+        blocks = [dict(block) for block in page['preproc_blocks']]
         for block in blocks:
             block['page_num'] = page_num
             block['page_size'] = page['page_size']
+        page['para_blocks'] = blocks
         all_blocks.extend(blocks)
 
     # __para_merge_page(all_blocks)
-    for page_num, page in pdf_info_dict.items():
-        page['para_blocks'] = []
-        for block in all_blocks:
-            if block['page_num'] == page_num:
-                page['para_blocks'].append(block)
 
 
 if __name__ == '__main__':
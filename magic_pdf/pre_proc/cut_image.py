@@ -2,25 +2,34 @@ from loguru import logger
 
 from magic_pdf.config.ocr_content_type import ContentType
 from magic_pdf.libs.commons import join_path
-from magic_pdf.libs.pdf_image_tools import cut_image
+from magic_pdf.libs.pdf_image_tools import cut_images
 
 
 def ocr_cut_image_and_table(spans, page, page_id, pdf_bytes_md5, imageWriter):
     def return_path(type):
         return join_path(pdf_bytes_md5, type)
 
+    if not imageWriter:
+        return spans
+
+    # all crops of the page are cut in one pass
+    cut_spans = []
+    clips = []
     for span in spans:
         span_type = span['type']
         if span_type == ContentType.Image:
-            if not check_img_bbox(span['bbox']) or not imageWriter:
+            if not check_img_bbox(span['bbox']):
                 continue
-            span['image_path'] = cut_image(span['bbox'], page_id, page, return_path=return_path('images'),
-                                           imageWriter=imageWriter)
+            cut_spans.append(span)
+            clips.append((span['bbox'], return_path('images')))
         elif span_type == ContentType.Table:
-            if not check_img_bbox(span['bbox']) or not imageWriter:
+            if not check_img_bbox(span['bbox']):
                 continue
-            span['image_path'] = cut_image(span['bbox'], page_id, page, return_path=return_path('tables'),
-                                           imageWriter=imageWriter)
+            cut_spans.append(span)
+            clips.append((span['bbox'], return_path('tables')))
+
+    for span, img_path in zip(cut_spans, cut_images(clips, page_id, page, imageWriter)):
+        span['image_path'] = img_path
 
     return spans
 
@@ -8,6 +8,38 @@ from magic_pdf.libs.boxbase import (
 from magic_pdf.pre_proc.remove_bbox_overlap import remove_overlap_between_bbox_for_block
 
 
+class LayoutBox:
+    """A block candidate of the layout split.
+
+    Replaces the 13/14 element lists which only used index 0-3 (bbox),
+    7 (type), 12 (score) and 13 (group id of image/table parts). Equality is
+    by value like it was for the lists.
+    """
+
+    __slots__ = ('bbox', 'type', 'score', 'group_id')
+
+    def __init__(self, bbox, block_type, score, group_id=None):
+        self.bbox = bbox
+        self.type = block_type
+        self.score = score
+        self.group_id = group_id
+
+    def __eq__(self, other):
+        if not isinstance(other, LayoutBox):
+            return NotImplemented
+        return (
+            self.bbox == other.bbox
+            and self.type == other.type
+            and self.score == other.score
+            and self.group_id == other.group_id
+        )
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f'LayoutBox({self.bbox}, {self.type!r}, {self.score}, {self.group_id})'
+
+
 def add_bboxes(blocks, block_type, bboxes):
     for block in blocks:
         x0, y0, x1, y1 = block['bbox']
@@ -19,42 +51,9 @@ def add_bboxes(blocks, block_type, bboxes):
             BlockType.TableCaption,
             BlockType.TableFootnote,
         ]:
-            bboxes.append(
-                [
-                    x0,
-                    y0,
-                    x1,
-                    y1,
-                    None,
-                    None,
-                    None,
-                    block_type,
-                    None,
-                    None,
-                    None,
-                    None,
-                    block['score'],
-                    block['group_id'],
-                ]
-            )
+            bboxes.append(LayoutBox([x0, y0, x1, y1], block_type, block['score'], block['group_id']))
         else:
-            bboxes.append(
-                [
-                    x0,
-                    y0,
-                    x1,
-                    y1,
-                    None,
-                    None,
-                    None,
-                    block_type,
-                    None,
-                    None,
-                    None,
-                    None,
-                    block['score'],
-                ]
-            )
+            bboxes.append(LayoutBox([x0, y0, x1, y1], block_type, block['score']))
 
 
 def ocr_prepare_bboxes_for_layout_split_v2(
@@ -109,14 +108,14 @@ def ocr_prepare_bboxes_for_layout_split_v2(
     all_bboxes = remove_overlaps_min_blocks(all_bboxes)
     all_discarded_blocks = remove_overlaps_min_blocks(all_discarded_blocks)
     # all_bboxes, drop_reasons = remove_overlap_between_bbox_for_block(all_bboxes)
-    all_bboxes.sort(key=lambda x: x[0]+x[1])
+    all_bboxes.sort(key=lambda x: x.bbox[0] + x.bbox[1])
     return all_bboxes, all_discarded_blocks
 
 
 def find_blocks_under_footnote(all_bboxes, footnote_blocks):
     need_remove_blocks = []
     for block in all_bboxes:
-        block_x0, block_y0, block_x1, block_y1 = block[:4]
+        block_x0, block_y0, block_x1, block_y1 = block.bbox
         for footnote_bbox in footnote_blocks:
             footnote_x0, footnote_y0, footnote_x1, footnote_y1 = footnote_bbox
 
@@ -137,19 +136,19 @@ def fix_interline_equation_overlap_text_blocks_with_hi_iou(all_bboxes):
 
     text_blocks = []
     for block in all_bboxes:
-        if block[7] == BlockType.Text:
+        if block.type == BlockType.Text:
             text_blocks.append(block)
     interline_equation_blocks = []
     for block in all_bboxes:
-        if block[7] == BlockType.InterlineEquation:
+        if block.type == BlockType.InterlineEquation:
             interline_equation_blocks.append(block)
 
     need_remove = []
 
     for interline_equation_block in interline_equation_blocks:
         for text_block in text_blocks:
-            interline_equation_block_bbox = interline_equation_block[:4]
-            text_block_bbox = text_block[:4]
+            interline_equation_block_bbox = interline_equation_block.bbox
+            text_block_bbox = text_block.bbox
             if calculate_iou(interline_equation_block_bbox, text_block_bbox) > 0.8:
                 if text_block not in need_remove:
                     need_remove.append(text_block)
@@ -165,19 +164,19 @@ def fix_text_overlap_title_blocks(all_bboxes):
 
     text_blocks = []
     for block in all_bboxes:
-        if block[7] == BlockType.Text:
+        if block.type == BlockType.Text:
             text_blocks.append(block)
     title_blocks = []
     for block in all_bboxes:
-        if block[7] == BlockType.Title:
+        if block.type == BlockType.Title:
             title_blocks.append(block)
 
     need_remove = []
 
     for text_block in text_blocks:
         for title_block in title_blocks:
-            text_block_bbox = text_block[:4]
-            title_block_bbox = title_block[:4]
+            text_block_bbox = text_block.bbox
+            title_block_bbox = title_block.bbox
             if calculate_iou(text_block_bbox, title_block_bbox) > 0.8:
                 if title_block not in need_remove:
                     need_remove.append(title_block)
@@ -193,7 +192,7 @@ def remove_need_drop_blocks(all_bboxes, discarded_blocks):
     need_remove = []
     for block in all_bboxes:
         for discarded_block in discarded_blocks:
-            block_bbox = block[:4]
+            block_bbox = block.bbox
             if (
                 calculate_overlap_area_in_bbox1_area_ratio(
                     block_bbox, discarded_block['bbox']
@@ -216,15 +215,16 @@ def remove_overlaps_min_blocks(all_bboxes):
     need_remove = []
     for block1 in all_bboxes:
         for block2 in all_bboxes:
-            if block1 != block2:
-                block1_bbox = block1[:4]
-                block2_bbox = block2[:4]
+            # equal boxes are skipped like before, comparing the bbox lists first is cheaper
+            if block1.bbox != block2.bbox or block1 != block2:
+                block1_bbox = block1.bbox
+                block2_bbox = block2.bbox
                 overlap_box = get_minbox_if_overlap_by_ratio(
                     block1_bbox, block2_bbox, 0.8
                 )
                 if overlap_box is not None:
                     block_to_remove = next(
-                        (block for block in all_bboxes if block[:4] == overlap_box),
+                        (block for block in all_bboxes if block.bbox == overlap_box),
                         None,
                     )
                     if (
@@ -232,13 +232,13 @@ def remove_overlaps_min_blocks(all_bboxes):
                         and block_to_remove not in need_remove
                     ):
                         large_block = block1 if block1 != block_to_remove else block2
-                        x1, y1, x2, y2 = large_block[:4]
-                        sx1, sy1, sx2, sy2 = block_to_remove[:4]
+                        x1, y1, x2, y2 = large_block.bbox
+                        sx1, sy1, sx2, sy2 = block_to_remove.bbox
                         x1 = min(x1, sx1)
                         y1 = min(y1, sy1)
                         x2 = max(x2, sx2)
                         y2 = max(y2, sy2)
-                        large_block[:4] = [x1, y1, x2, y2]
+                        large_block.bbox = [x1, y1, x2, y2]
                         need_remove.append(block_to_remove)
 
     if len(need_remove) > 0:
@@ -63,8 +63,8 @@ def merge_spans_to_line(spans, threshold=0.6):
 def fill_spans_in_blocks(blocks, spans, radio):
     block_with_spans = []
     for block in blocks:
-        block_type = block[7]
-        block_bbox = block[0:4]
+        block_type = block.type
+        block_bbox = list(block.bbox)
         block_dict = {
             'type': block_type,
             'bbox': block_bbox,
@@ -73,7 +73,7 @@ def fill_spans_in_blocks(blocks, spans, radio):
             BlockType.ImageBody, BlockType.ImageCaption, BlockType.ImageFootnote,
             BlockType.TableBody, BlockType.TableCaption, BlockType.TableFootnote
         ]:
-            block_dict['group_id'] = block[-1]
+            block_dict['group_id'] = block.group_id
         block_spans = []
         for span in spans:
             span_bbox = span['bbox']
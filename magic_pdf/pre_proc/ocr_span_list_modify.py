@@ -34,8 +34,14 @@ def remove_overlaps_low_confidence_spans(spans):
 
 
 def check_chars_is_overlap_in_span(chars):
+    # an iou above 0 needs overlapping x ranges, with the chars sorted by x0 only the
+    # following chars that start before the current one ends have to be tested
+    chars = sorted(chars, key=lambda char: char['bbox'][0])
     for i in range(len(chars)):
+        x1 = chars[i]['bbox'][2]
         for j in range(i + 1, len(chars)):
+            if chars[j]['bbox'][0] >= x1:
+                break
             if calculate_iou(chars[i]['bbox'], chars[j]['bbox']) > 0.35:
                 return True
     return False
@@ -89,12 +89,12 @@ def remove_overlap_between_bbox_for_span(spans):
 
 
 def remove_overlap_between_bbox_for_block(all_bboxes):
-    arr = [{'bbox': bbox[:4], 'score': bbox[-1]} for bbox in all_bboxes]
+    arr = [{'bbox': list(block.bbox), 'score': block.score} for block in all_bboxes]
     res, drop_reasons = _remove_overlap_between_bboxes(arr)
     ret = []
     for i in range(len(res)):
         if res[i] is None:
             continue
-        all_bboxes[i][:4] = res[i]['bbox']
+        all_bboxes[i].bbox = res[i]['bbox']
         ret.append(all_bboxes[i])
     return ret, drop_reasons
@@ -3,15 +3,20 @@
 import os
 import time
 import argparse
+import fitz
 import sys
 from pathlib import Path
 import torch.distributed as dist
 from pdf2image import convert_from_path
 
-from magic_pdf.data.data_reader_writer import FileBasedDataWriter, FileBasedDataReader
+from magic_pdf.data.data_reader_writer import FileBasedDataWriter, FileBasedDataReader, MappedFile
 from magic_pdf.data.dataset import PymuDocDataset, ImageDataset
-from magic_pdf.model.doc_analyze_by_custom_model_llm import doc_analyze_llm
+from magic_pdf.data.utils import page_ranges_to_ids, parse_page_ranges
+from magic_pdf.libs.draw_bbox import OVERLAY_SUFFIXES
+from magic_pdf.libs.json_serializer import COMPRESSED_SUFFIX
+from magic_pdf.model.doc_analyze_by_custom_model_llm import doc_analyze_llm, doc_analyze_llm_batch
 from magic_pdf.model.custom_model import MonkeyOCR
+from magic_pdf.operators.pipes_llm import page_content
 
 # 定义任务指令
 TASK_INSTRUCTIONS = {
@@ -20,7 +25,8 @@ TASK_INSTRUCTIONS = {
     'table': 'Please output the table in the image in LaTeX format.'
 }
 
-def parse_folder(folder_path, output_dir, config_path, task=None, page_markers=False):
+def parse_folder(folder_path, output_dir, config_path, task=None, page_markers=False,
+                 overlays=tuple(OVERLAY_SUFFIXES), batch_pages=0, pages=None):
     """
     Parse all PDF and image files in a folder
     
@@ -29,6 +35,10 @@ def parse_folder(folder_path, output_dir, config_path, task=None, page_markers=F
         output_dir: Output directory
         config_path: Configuration file path
         task: Optional task type for single task recognition
+        overlays: Debug overlays to draw for every file
+        batch_pages: Parse the files in batches of about this many pages with parse_pdf_batch,
+            0 parses them one by one
+        pages: Page ranges made by parse_page_ranges, only these pages of every file are parsed
     """
     print(f"Starting to parse folder: {folder_path}")
     
@@ -68,7 +78,28 @@ def parse_folder(folder_path, output_dir, config_path, task=None, page_markers=F
     successful_files = []
     failed_files = []
     
-    for i, file_path in enumerate(files_to_process, 1):
+    if batch_pages > 0 and not task:
+        for batch in batch_files(files_to_process, batch_pages, pages):
+            print(f"\n{'='*60}")
+            print(f"Processing batch of {len(batch)} files: {', '.join(os.path.basename(f) for f in batch)}")
+            print(f"{'='*60}")
+            
+            try:
+                results = parse_pdf_batch(batch, output_dir, MonkeyOCR_model, page_markers, overlays, pages)
+            except Exception as e:
+                results = [e] * len(batch)
+            for file_path, result in zip(batch, results):
+                if isinstance(result, Exception):
+                    failed_files.append((file_path, str(result)))
+                    print(f"❌ Failed to process {os.path.basename(file_path)}: {str(result)}")
+                else:
+                    successful_files.append(file_path)
+                    print(f"✅ Successfully processed: {os.path.basename(file_path)}")
+        files_to_process_one_by_one = []
+    else:
+        files_to_process_one_by_one = files_to_process
+    
+    for i, file_path in enumerate(files_to_process_one_by_one, 1):
         print(f"\n{'='*60}")
         print(f"Processing file {i}/{len(files_to_process)}: {os.path.basename(file_path)}")
         print(f"{'='*60}")
@@ -77,7 +108,7 @@ def parse_folder(folder_path, output_dir, config_path, task=None, page_markers=F
             if task:
                 result_dir = single_task_recognition(file_path, output_dir, MonkeyOCR_model, task)
             else:
-                result_dir = parse_pdf(file_path, output_dir, MonkeyOCR_model, page_markers)
+                result_dir = parse_pdf(file_path, output_dir, MonkeyOCR_model, page_markers, overlays, pages=pages)
             
             successful_files.append(file_path)
             print(f"✅ Successfully processed: {os.path.basename(file_path)}")
@@ -101,6 +132,34 @@ def parse_folder(folder_path, output_dir, config_path, task=None, page_markers=F
     
     return output_dir
 
+def batch_files(file_paths, batch_pages, pages=None):
+    """
+    Group files into batches of about batch_pages pages, in order
+    
+    A file with more pages than batch_pages makes a batch of its own. With
+    page ranges only the selected pages of a file are counted.
+    """
+    batches = []
+    batch = []
+    batch_page_count = 0
+    for file_path in file_paths:
+        if file_path.lower().endswith('.pdf'):
+            with fitz.open(file_path) as doc:
+                page_count = doc.page_count
+        else:
+            page_count = 1
+        if pages:
+            page_count = len(page_ranges_to_ids(pages, page_count))
+        if batch and batch_page_count + page_count > batch_pages:
+            batches.append(batch)
+            batch = []
+            batch_page_count = 0
+        batch.append(file_path)
+        batch_page_count += page_count
+    if batch:
+        batches.append(batch)
+    return batches
+
 def single_task_recognition(input_file, output_dir, MonkeyOCR_model, task):
     """
     Single task recognition for specific content type
@@ -204,17 +263,17 @@ def single_task_recognition(input_file, output_dir, MonkeyOCR_model, task):
     except Exception as e:
         raise RuntimeError(f"Single task recognition failed: {str(e)}")
 
-def parse_pdf(input_file, output_dir, MonkeyOCR_model, page_markers=False):
+def open_document(input_file, output_dir):
     """
-    Parse PDF file and save results
+    Open an input file and prepare its output directory
     
     Args:
-        input_file: Input PDF file path
-        output_dir: Output directory
-        MonkeyOCR_model: Pre-initialized model instance
+        input_file: Input PDF or image file path
+        output_dir: Output directory, the results go to a folder named after the file
+        
+    Returns:
+        Dict with the dataset, the name, the output folders and their writers
     """
-    print(f"Starting to parse file: {input_file}")
-    
     # Check if input file exists
     if not os.path.exists(input_file):
         raise FileNotFoundError(f"Input file does not exist: {input_file}")
@@ -225,52 +284,266 @@ def parse_pdf(input_file, output_dir, MonkeyOCR_model, page_markers=False):
     # Prepare output directory
     local_image_dir = os.path.join(output_dir, name_without_suff, "images")
     local_md_dir = os.path.join(output_dir, name_without_suff)
-    image_dir = os.path.basename(local_image_dir)
     os.makedirs(local_image_dir, exist_ok=True)
     os.makedirs(local_md_dir, exist_ok=True)
     
     print(f"Output dir: {local_md_dir}")
-    image_writer = FileBasedDataWriter(local_image_dir)
-    md_writer = FileBasedDataWriter(local_md_dir)
     
-    # Read file content
-    reader = FileBasedDataReader()
+    # Read file content, mapped so that large inputs are not copied into memory
+    reader = FileBasedDataReader(use_mmap=True)
     file_bytes = reader.read(input_file)
     
     # Create dataset instance
     file_extension = input_file.split(".")[-1].lower()
-    if file_extension == "pdf":
-        ds = PymuDocDataset(file_bytes)
-    else:
-        ds = ImageDataset(file_bytes)
-    
-    # Start inference
-    print("Performing document parsing...")
-    start_time = time.time()
+    try:
+        if file_extension == "pdf":
+            ds = PymuDocDataset(file_bytes)
+        else:
+            ds = ImageDataset(file_bytes)
+    except Exception:
+        if isinstance(file_bytes, MappedFile):
+            file_bytes.close()
+        raise
+    
+    return {
+        'dataset': ds,
+        'name': name_without_suff,
+        'md_dir': local_md_dir,
+        'image_dir': os.path.basename(local_image_dir),
+        'image_writer': FileBasedDataWriter(local_image_dir),
+        'md_writer': FileBasedDataWriter(local_md_dir),
+    }
+
+def write_results(document, infer_result, MonkeyOCR_model, page_markers=False,
+                  overlays=tuple(OVERLAY_SUFFIXES), overlay_executor=None, overlay_done=None, on_event=None):
+    """
+    Build the outputs of an analyzed document and save them
     
-    infer_result = ds.apply(doc_analyze_llm, MonkeyOCR_model=MonkeyOCR_model)
+    Args:
+        document: Opened by open_document
+        infer_result: Analysis of the document
+        MonkeyOCR_model: Pre-initialized model instance
+        overlays: Debug overlays to draw, a subset of model, layout and spans
+        overlay_executor: Draw the overlays in this executor instead of before returning,
+            their future is kept in the document as 'overlay_future'
+        overlay_done: Called with the future of the overlays drawn in overlay_executor
+        on_event: Called with a page event as each page is post-processed, see parse_pdf
+        
+    Returns:
+        The folder of the results
+    """
+    name_without_suff = document['name']
+    local_md_dir = document['md_dir']
+    image_dir = document['image_dir']
+    md_writer = document['md_writer']
+    
+    on_page = None
+    if on_event is not None:
+        page_ids = infer_result.get_page_ids()
+        total_pages = len(page_ids) if page_ids is not None else len(document['dataset'])
+        pages_done = 0
+        
+        def on_page(page_id, page_info):
+            nonlocal pages_done
+            pages_done += 1
+            on_event({
+                'event': 'page', 'page_idx': page_id, 'done': pages_done, 'total': total_pages,
+                **page_content(page_info, image_dir)
+            })
     
     # Pipeline processing
-    pipe_result = infer_result.pipe_ocr_mode(image_writer, MonkeyOCR_model=MonkeyOCR_model)
+    pipe_result = infer_result.pipe_ocr_mode(document['image_writer'], MonkeyOCR_model=MonkeyOCR_model, on_page=on_page)
     
-    parsing_time = time.time() - start_time
-    print(f"Parsing time: {parsing_time:.2f}s")
+    image_stats = pipe_result.get_image_stats()
+    if image_stats:
+        print(f"Images: {image_stats['images']} ({image_stats['unique_images']} unique), "
+              f"{image_stats['bytes_written']} bytes written, {image_stats['bytes_deduplicated']} bytes deduplicated")
 
-    infer_result.draw_model(os.path.join(local_md_dir, f"{name_without_suff}_model.pdf"))
-    
-    pipe_result.draw_layout(os.path.join(local_md_dir, f"{name_without_suff}_layout.pdf"))
-
-    pipe_result.draw_span(os.path.join(local_md_dir, f"{name_without_suff}_spans.pdf"))
+    if overlays:
+        # the overlays only read the results, they can be drawn while the caller goes on
+        draw_args = (local_md_dir, name_without_suff, overlays, infer_result.get_infer_res())
+        if overlay_executor is not None:
+            future = overlay_executor.submit(pipe_result.draw_overlays, *draw_args)
+            document['overlay_future'] = future
+            if overlay_done is not None:
+                future.add_done_callback(overlay_done)
+        else:
+            pipe_result.draw_overlays(*draw_args)
 
     pipe_result.dump_md(md_writer, f"{name_without_suff}.md", image_dir, page_markers=page_markers)
     
-    pipe_result.dump_content_list(md_writer, f"{name_without_suff}_content_list.json", image_dir)
+    json_indent = getattr(MonkeyOCR_model, 'json_indent', 0)
+    compress_json = getattr(MonkeyOCR_model, 'compress_json', False)
+    json_suffix = f'.json{COMPRESSED_SUFFIX}' if compress_json else '.json'
+
+    pipe_result.dump_content_list(
+        md_writer, f"{name_without_suff}_content_list{json_suffix}", image_dir, indent=json_indent, compress=compress_json
+    )
 
-    pipe_result.dump_middle_json(md_writer, f'{name_without_suff}_middle.json')
+    pipe_result.dump_middle_json(
+        md_writer, f'{name_without_suff}_middle{json_suffix}', indent=json_indent, compress=compress_json
+    )
     
     print("Results saved to ", local_md_dir)
     return local_md_dir
 
+def selected_page_ids(dataset, pages):
+    """
+    Page indexes of a dataset selected by page ranges
+    
+    Args:
+        dataset: Opened document
+        pages: Page ranges made by parse_page_ranges, None selects every page
+        
+    Returns:
+        Sorted page indexes, None for every page
+        
+    Raises:
+        ValueError: If no selected page is in the document
+    """
+    if not pages:
+        return None
+    page_ids = page_ranges_to_ids(pages, len(dataset))
+    if not page_ids:
+        raise ValueError(f"No selected page in the document, it has {len(dataset)} pages")
+    return page_ids
+
+def parse_pdf(input_file, output_dir, MonkeyOCR_model, page_markers=False,
+              overlays=tuple(OVERLAY_SUFFIXES), overlay_executor=None, overlay_done=None, pages=None,
+              on_event=None):
+    """
+    Parse PDF file and save results
+    
+    Args:
+        input_file: Input PDF file path
+        output_dir: Output directory
+        MonkeyOCR_model: Pre-initialized model instance
+        overlays: Debug overlays to draw, a subset of model, layout and spans
+        overlay_executor: Draw the overlays in this executor instead of before returning
+        overlay_done: Called with the future of the overlays drawn in overlay_executor
+        pages: Page ranges made by parse_page_ranges, the other pages are not rendered,
+            analyzed or drawn. Defaults to every page
+        on_event: Called from the parsing thread with the progress, as dicts:
+            {'event': 'stage', 'stage': 'rendered' | 'layout' | 'recognized', 'done', 'total'}
+            with pages, or regions for recognized, then one
+            {'event': 'page', 'page_idx', 'done', 'total', 'markdown', 'content_list'}
+            per page as soon as it is post-processed
+    """
+    print(f"Starting to parse file: {input_file}")
+    
+    document = open_document(input_file, output_dir)
+    try:
+        page_ids = selected_page_ids(document['dataset'], pages)
+        
+        # Start inference
+        print("Performing document parsing...")
+        start_time = time.time()
+        
+        progress = None
+        if on_event is not None:
+            def progress(stage, done, total):
+                on_event({'event': 'stage', 'stage': stage, 'done': done, 'total': total})
+        
+        infer_result = document['dataset'].apply(
+            doc_analyze_llm, MonkeyOCR_model=MonkeyOCR_model, page_ids=page_ids, progress=progress
+        )
+        
+        parsing_time = time.time() - start_time
+        print(f"Parsing time: {parsing_time:.2f}s")
+        
+        return write_results(
+            document, infer_result, MonkeyOCR_model, page_markers, overlays, overlay_executor, overlay_done, on_event
+        )
+    finally:
+        # The overlays drawn in overlay_executor read the document, it is closed once they are drawn
+        overlay_future = document.get('overlay_future')
+        if overlay_future is None:
+            document['dataset'].close()
+        else:
+            overlay_future.add_done_callback(lambda _: document['dataset'].close())
+
+def parse_pdf_batch(input_files, output_dir, MonkeyOCR_model, page_markers=False, overlays=tuple(OVERLAY_SUFFIXES),
+                    pages=None):
+    """
+    Parse several files together and save the results of each
+    
+    The layout model runs over the pages of all files and their crops share
+    the VLM batches, which is much faster than parse_pdf per file for many
+    small documents.
+    
+    Args:
+        input_files: Input PDF or image file paths
+        output_dir: Output directory, the results of each file go to a folder named after it
+        MonkeyOCR_model: Pre-initialized model instance
+        overlays: Debug overlays to draw for every file
+        pages: Page ranges made by parse_page_ranges, only these pages of every file are parsed
+        
+    Returns:
+        List with the result folder of each file, or the exception that failed it
+    """
+    print(f"Starting to parse {len(input_files)} files together")
+    
+    # A file that fails to open or to select its pages is left out of the batch
+    results = [None] * len(input_files)
+    documents = []
+    try:
+        for index, input_file in enumerate(input_files):
+            document = None
+            try:
+                document = open_document(input_file, output_dir)
+                page_ids = selected_page_ids(document['dataset'], pages)
+                documents.append((index, document, page_ids))
+            except Exception as e:
+                print(f"❌ Failed to open {input_file}: {str(e)}")
+                if document is not None:
+                    document['dataset'].close()
+                results[index] = e
+        
+        if documents:
+            print("Performing batch document parsing...")
+            start_time = time.time()
+            try:
+                infer_results = doc_analyze_llm_batch(
+                    [document['dataset'] for _, document, _ in documents], MonkeyOCR_model,
+                    [page_ids for _, _, page_ids in documents]
+                )
+            except Exception as e:
+                print(f"❌ Batch parsing failed: {str(e)}")
+                for index, _, _ in documents:
+                    results[index] = e
+                return results
+            print(f"Batch parsing time: {time.time() - start_time:.2f}s")
+            
+            # A document that fails here does not fail the others
+            for (index, document, _), infer_result in zip(documents, infer_results):
+                try:
+                    results[index] = write_results(document, infer_result, MonkeyOCR_model, page_markers, overlays)
+                except Exception as e:
+                    print(f"❌ Failed to write results of {document['name']}: {str(e)}")
+                    results[index] = e
+        return results
+    finally:
+        for _, document, _ in documents:
+            document['dataset'].close()
+
+def parse_overlays(value):
+    """Parse a comma separated overlay list, 'none' or an empty string selects no overlay"""
+    if not value or value.strip().lower() == 'none':
+        return ()
+    overlays = tuple(overlay.strip() for overlay in value.split(',') if overlay.strip())
+    unknown = [overlay for overlay in overlays if overlay not in OVERLAY_SUFFIXES]
+    if unknown:
+        raise ValueError(f"Unsupported overlays: {', '.join(unknown)}. Allowed: {', '.join(OVERLAY_SUFFIXES)}")
+    return overlays
+
+
+def parse_pages(value):
+    """Parse a page selection for argparse, see parse_page_ranges"""
+    try:
+        return parse_page_ranges(value)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+
 
 def main():
     parser = argparse.ArgumentParser(
@@ -282,6 +555,8 @@ Usage examples:
   python parse.py input.pdf -o ./output      # Parse single PDF with custom output dir
   python parse.py /path/to/folder            # Parse all files in folder
   python parse.py /path/to/folder -t text    # Single task recognition for all files in folder
+  python parse.py /path/to/folder -b 64      # Parse the files of a folder in batches of ~64 pages
+  python parse.py input.pdf --pages 1-5,8    # Parse only pages 1 to 5 and 8
   python parse.py input.pdf -c model_configs.yaml
   python parse.py image.jpg -t text          # Single task: text recognition
   python parse.py image.jpg -t formula       # Single task: formula recognition  
@@ -319,7 +594,30 @@ Usage examples:
         help="Insert page break markers between pages in markdown output"
     )
     
+    parser.add_argument(
+        "-b", "--batch-pages",
+        type=int,
+        default=0,
+        help="For a folder, parse the files together in batches of about this many pages, "
+             "sharing the layout and VLM batches between them (default: 0, one file at a time)"
+    )
+    
+    parser.add_argument(
+        "--pages",
+        type=parse_pages,
+        help="Pages to parse, numbered from 1, e.g. '1-5,8,10-' (default: all pages). "
+             "The other pages are not rendered, analyzed or drawn"
+    )
+    
+    parser.add_argument(
+        "--overlays",
+        default=",".join(OVERLAY_SUFFIXES),
+        type=parse_overlays,
+        help="Comma separated debug overlays to draw, of model, layout and spans, or 'none' (default: all)"
+    )
+    
     args = parser.parse_args()
+    overlays = args.overlays
     
     MonkeyOCR_model = None
     
@@ -332,7 +630,10 @@ Usage examples:
                 args.output,
                 args.config,
                 args.task,
-                args.page_markers
+                args.page_markers,
+                overlays,
+                args.batch_pages,
+                args.pages
             )
             
             if args.task:
@@ -357,7 +658,9 @@ Usage examples:
                     args.input_path,
                     args.output,
                     MonkeyOCR_model,
-                    args.page_markers
+                    args.page_markers,
+                    overlays,
+                    pages=args.pages
                 )
                 print(f"\n✅ Parsing completed! Results saved in: {result_dir}")
         else:
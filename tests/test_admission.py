@@ -0,0 +1,107 @@
+import asyncio
+
+import fitz
+import pytest
+from fastapi import HTTPException
+
+from api.admission import AdmissionController, Rejected, count_pages
+
+
+@pytest.fixture
+def controller():
+    return AdmissionController(max_queued_pages=10, max_pages_per_request=8, slots=2, initial_pages_per_second=1.0)
+
+
+def pending_pages(controller):
+    snapshot = controller.snapshot()
+    return snapshot['queued_pages'] + snapshot['running_pages']
+
+
+def test_request_is_rejected_with_retry_after_while_the_queue_is_full(controller):
+    controller.admit(6)
+    controller.admit(3)
+    with pytest.raises(Rejected) as e:
+        controller.admit(4)
+    assert e.value.status_code == 429
+    # 3 pages over the budget at 2 pages per second
+    assert e.value.retry_after == 2
+    assert controller.snapshot()['rejected_requests'] == 1
+    assert pending_pages(controller) == 9
+
+
+def test_page_budget(controller):
+    with pytest.raises(Rejected) as e:
+        controller.admit(9)
+    assert e.value.status_code == 413
+    assert e.value.retry_after is None
+
+    # a request at an empty server is taken even above the queue budget
+    big = AdmissionController(max_queued_pages=10, max_pages_per_request=0, slots=1)
+    big.admit(50)
+    assert big.snapshot()['saturated']
+    with pytest.raises(Rejected):
+        big.admit(1)
+
+
+def test_force_admits_regardless_of_the_limits(controller):
+    controller.admit(8)
+    controller.admit(20, force=True)
+    assert pending_pages(controller) == 28
+
+
+def test_finish_releases_started_and_unstarted_tickets(controller):
+    started = controller.admit(4)
+    unstarted = controller.admit(4)
+    controller.start(started)
+    assert controller.snapshot()['running_pages'] == 4
+    controller.finish(started)
+    controller.finish(unstarted)
+    snapshot = controller.snapshot()
+    assert pending_pages(controller) == 0
+    assert (snapshot['queued_requests'], snapshot['running_requests'], snapshot['finished_requests']) == (0, 0, 1)
+
+
+def test_count_pages(tmp_path):
+    doc = fitz.open()
+    for _ in range(3):
+        doc.new_page()
+    path = tmp_path / 'doc.pdf'
+    doc.save(path)
+    assert count_pages(str(path)) == 3
+    assert count_pages(str(tmp_path / 'scan.png')) == 1
+    (tmp_path / 'broken.pdf').write_bytes(b'not a pdf')
+    with pytest.raises(ValueError):
+        count_pages(str(tmp_path / 'broken.pdf'))
+
+
+@pytest.fixture
+def api_main(controller, monkeypatch):
+    import api.main
+
+    monkeypatch.setattr(api.main, 'admission', controller)
+    return api.main
+
+
+def test_full_queue_answers_429_with_retry_after(api_main, controller, tmp_path):
+    doc = fitz.open()
+    for _ in range(4):
+        doc.new_page()
+    path = tmp_path / 'doc.pdf'
+    doc.save(path)
+    controller.admit(8)
+    with pytest.raises(HTTPException) as e:
+        api_main.admit_upload(str(path))
+    assert e.value.status_code == 429
+    assert e.value.headers == {'Retry-After': '1'}
+
+
+def test_ticket_is_released_when_parse_upload_fails_before_submitting(api_main, controller, monkeypatch):
+    def fail(*args, **kwargs):
+        raise OSError('no space left')
+
+    monkeypatch.setattr(api_main.tempfile, 'mkdtemp', fail)
+    ticket = controller.admit(3)
+    upload = api_main.Upload('doc.pdf', '/tmp/upload.pdf')
+    with pytest.raises(OSError):
+        asyncio.run(api_main.parse_upload(upload, ticket, False, (), None))
+    assert pending_pages(controller) == 0
@@ -0,0 +1,158 @@
+from types import SimpleNamespace
+
+import fitz
+import pytest
+
+import parse
+from magic_pdf.data import dataset as dataset_module
+from magic_pdf.data.dataset import PymuDocDataset
+from magic_pdf.model import doc_analyze_by_custom_model_llm as doc_analyze
+from magic_pdf.model.doc_analyze_by_custom_model_llm import doc_analyze_llm, doc_analyze_llm_batch
+
+MODEL = SimpleNamespace(device='cpu')
+
+
+class FakeBatchAnalyzeLLM:
+    """Records the images of each call, the layout of an image is its shape"""
+
+    calls = []
+
+    def __init__(self, model, progress=None):
+        self.model = model
+
+    def __call__(self, images):
+        FakeBatchAnalyzeLLM.calls.append(len(images))
+        return [[{'shape': image.shape[:2]}] for image in images]
+
+
+@pytest.fixture
+def fake_batch_model(monkeypatch):
+    FakeBatchAnalyzeLLM.calls = []
+    monkeypatch.setattr(doc_analyze, 'BatchAnalyzeLLM', FakeBatchAnalyzeLLM)
+    return FakeBatchAnalyzeLLM
+
+
+@pytest.fixture
+def rendered(monkeypatch):
+    pages = []
+    to_image = dataset_module.fitz_doc_to_image
+
+    def recording_to_image(page, *args, **kwargs):
+        pages.append((page.parent.name, page.number))
+        return to_image(page, *args, **kwargs)
+
+    monkeypatch.setattr(dataset_module, 'fitz_doc_to_image', recording_to_image)
+    return pages
+
+
+def pdf_bytes(pages, width=200):
+    doc = fitz.open()
+    for i in range(pages):
+        # the pages differ in width so that their images tell them apart
+        doc.new_page(width=width + 10 * i, height=300).insert_text((20, 40), f'page {i}')
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+
+def write_pdf(path, pages):
+    path.write_bytes(pdf_bytes(pages))
+    return str(path)
+
+
+def layout_shapes(infer_result):
+    return [
+        [tuple(det['shape']) for det in page['layout_dets']] for page in infer_result.get_infer_res()
+    ]
+
+
+def test_batch_matches_one_document_at_a_time(fake_batch_model):
+    datasets = [PymuDocDataset(pdf_bytes(pages, width=100 * pages)) for pages in (1, 3, 2)]
+    results = doc_analyze_llm_batch(datasets, MODEL)
+    # the layout model sees the pages of all documents at once
+    assert fake_batch_model.calls == [6]
+
+    for dataset, result in zip(datasets, results):
+        expected = doc_analyze_llm(dataset, MODEL)
+        assert result.get_page_ids() == expected.get_page_ids() == list(range(len(dataset)))
+        assert layout_shapes(result) == layout_shapes(expected)
+        assert [page['page_info'] for page in result.get_infer_res()] == \
+            [page['page_info'] for page in expected.get_infer_res()]
+        for page in result.get_infer_res():
+            [shape] = [tuple(det['shape']) for det in page['layout_dets']]
+            assert shape == (page['page_info']['height'], page['page_info']['width'])
+
+
+def test_batch_renders_only_the_selected_pages(fake_batch_model, rendered):
+    datasets = [PymuDocDataset(pdf_bytes(4)), PymuDocDataset(pdf_bytes(3))]
+    results = doc_analyze_llm_batch(datasets, MODEL, [[3, 1], None])
+    assert fake_batch_model.calls == [5]
+    assert [page_number for _, page_number in rendered] == [1, 3, 0, 1, 2]
+
+    first, second = results
+    assert first.get_page_ids() == [1, 3]
+    assert [len(page['layout_dets']) for page in first.get_infer_res()] == [0, 1, 0, 1]
+    # the pages that are not selected still have their size
+    assert [page['page_info']['width'] for page in first.get_infer_res()] == \
+        [page['page_info']['width'] for page in doc_analyze_llm(datasets[0], MODEL).get_infer_res()]
+    assert second.get_page_ids() == [0, 1, 2]
+
+
+def test_empty_batch(fake_batch_model):
+    assert doc_analyze_llm_batch([], MODEL) == []
+
+
+def test_files_are_grouped_by_pages(tmp_path):
+    files = [write_pdf(tmp_path / f'{i}.pdf', pages) for i, pages in enumerate([2, 3, 9, 1, 1])]
+    image = tmp_path / 'scan.png'
+    fitz.Pixmap(fitz.csRGB, fitz.IRect(0, 0, 8, 8), False).save(image)
+
+    assert parse.batch_files(files, 5) == [files[:2], files[2:3], files[3:]]
+    assert parse.batch_files(files + [str(image)], 3) == [
+        files[:1], files[1:2], files[2:3], files[3:] + [str(image)],
+    ]
+    # only the selected pages count
+    assert parse.batch_files(files, 2, pages=parse.parse_pages('1')) == [files[:2], files[2:4], files[4:]]
+    assert parse.batch_files([], 5) == []
+
+
+def test_a_failing_document_does_not_fail_the_batch(tmp_path, monkeypatch):
+    files = [
+        write_pdf(tmp_path / 'a.pdf', 2), str(tmp_path / 'missing.pdf'), write_pdf(tmp_path / 'b.pdf', 3),
+        write_pdf(tmp_path / 'c.pdf', 1),
+    ]
+    analyzed = []
+
+    def fake_batch(datasets, MonkeyOCR_model, page_ids_list):
+        analyzed.append([len(dataset) for dataset in datasets])
+        return [SimpleNamespace(dataset=dataset) for dataset in datasets]
+
+    def fake_write_results(document, infer_result, *args):
+        assert infer_result.dataset is document['dataset']
+        if document['name'] == 'b':
+            raise RuntimeError('cannot write b')
+        return document['md_dir']
+
+    monkeypatch.setattr(parse, 'doc_analyze_llm_batch', fake_batch)
+    monkeypatch.setattr(parse, 'write_results', fake_write_results)
+    results = parse.parse_pdf_batch(files, str(tmp_path / 'out'), MODEL)
+
+    assert analyzed == [[2, 3, 1]]
+    assert results[0] == str(tmp_path / 'out' / 'a')
+    assert isinstance(results[1], FileNotFoundError)
+    assert isinstance(results[2], RuntimeError)
+    assert results[3] == str(tmp_path / 'out' / 'c')
+
+
+def test_a_failing_batch_fails_every_opened_document(tmp_path, monkeypatch):
+    files = [write_pdf(tmp_path / 'a.pdf', 2), write_pdf(tmp_path / 'b.pdf', 1)]
+    datasets = []
+
+    def failing_batch(batch_datasets, MonkeyOCR_model, page_ids_list):
+        datasets.extend(batch_datasets)
+        raise MemoryError('out of memory')
+
+    monkeypatch.setattr(parse, 'doc_analyze_llm_batch', failing_batch)
+    results = parse.parse_pdf_batch(files, str(tmp_path / 'out'), MODEL)
+    assert all(isinstance(result, MemoryError) for result in results)
+    assert all(dataset.get_doc().is_closed for dataset in datasets)
@@ -0,0 +1,65 @@
+import copy
+
+import numpy as np
+
+from magic_pdf.config.ocr_content_type import BlockType
+from magic_pdf.pdf_parse_union_core_v2_llm import (LAYOUTREADER_MAX_LINES,
+                                                   cal_block_index,
+                                                   sort_lines_by_model)
+
+PAGE_W, PAGE_H = 1000, 2000
+LINE_H = 6
+
+
+class XycutModel:
+    layoutreader_long_page_mode = 'xycut'
+
+
+def dense_page():
+    """Two columns of 30 blocks of 9 lines and one more line, 541 lines. The
+    rows of the columns are not aligned, there is no gap across the page
+    between them"""
+    blocks = []
+    for column, x0 in enumerate((50, 550)):
+        for row in range(30):
+            y0 = 40 + column * 32 + row * 64
+            lines = [
+                {'bbox': [x0, y0 + i * LINE_H, x0 + 400, y0 + (i + 1) * LINE_H], 'spans': []} for i in range(9)
+            ]
+            blocks.append({
+                'type': BlockType.Text, 'bbox': [x0, y0, x0 + 400, y0 + 9 * LINE_H], 'lines': lines,
+                'column': column, 'row': row,
+            })
+    # a block starting at the corner of another one, xycut orders such ties by their position in the page
+    blocks.append({
+        'type': BlockType.Text, 'bbox': [50, 40, 250, 40 + LINE_H], 'column': 0, 'row': 0,
+        'lines': [{'bbox': [50, 40, 250, 40 + LINE_H], 'spans': []}],
+    })
+    return blocks
+
+
+def order_blocks(blocks, seed):
+    np.random.seed(seed)
+    sorted_bboxes = sort_lines_by_model(blocks, PAGE_W, PAGE_H, LINE_H, XycutModel())
+    assert sorted_bboxes is None
+    return cal_block_index(blocks, sorted_bboxes)
+
+
+def test_xycut_order_of_a_long_page_is_deterministic():
+    page = dense_page()
+    assert sum(len(block['lines']) for block in page) > max(LAYOUTREADER_MAX_LINES, 510)
+
+    def indexes(blocks):
+        return [(block['index'], [line['index'] for line in block['lines']]) for block in blocks]
+
+    first = order_blocks(copy.deepcopy(page), seed=0)
+    for seed in range(1, 10):
+        assert indexes(order_blocks(copy.deepcopy(page), seed=seed)) == indexes(first)
+
+    # column by column, top to bottom
+    ordered = sorted(first, key=lambda block: block['index'])
+    assert [(block['column'], block['row']) for block in ordered] == \
+        [(0, 0)] + [(c, r) for c in range(2) for r in range(30)]
+    assert ordered[0] is first[0]
+    line_indexes = [line['index'] for block in ordered for line in block['lines']]
+    assert line_indexes == list(range(1, 542))
@@ -0,0 +1,61 @@
+import pytest
+
+from magic_pdf.data.data_reader_writer import FileBasedDataWriter
+from magic_pdf.data.data_reader_writer.content_addressed import (
+    ContentAddressedDataWriter, apply_image_manifest, merge_image_stats)
+from magic_pdf.libs.hash_utils import compute_bytes_sha256
+
+
+class FailingDataWriter(FileBasedDataWriter):
+    def write(self, path, data):
+        raise OSError('disk full')
+
+
+def test_same_content_is_written_once(tmp_path):
+    writer = ContentAddressedDataWriter(FileBasedDataWriter(str(tmp_path)))
+    writer.write('a.jpg', b'same')
+    writer.write('b.jpg', b'same')
+    writer.write('c.png', b'other')
+
+    key = compute_bytes_sha256(b'same') + '.jpg'
+    assert writer.manifest == {'a.jpg': key, 'b.jpg': key, 'c.png': compute_bytes_sha256(b'other') + '.png'}
+    assert sorted(p.name for p in tmp_path.iterdir()) == sorted(set(writer.manifest.values()))
+    assert (tmp_path / key).read_bytes() == b'same'
+    assert writer.stats() == {'images': 3, 'unique_images': 2, 'bytes_written': 9, 'bytes_deduplicated': 4}
+
+
+def test_failed_write_is_not_recorded(tmp_path):
+    writer = ContentAddressedDataWriter(FailingDataWriter(str(tmp_path)))
+    with pytest.raises(OSError):
+        writer.write('a.jpg', b'data')
+    assert writer.manifest == {}
+    assert writer.stats()['unique_images'] == 0
+
+
+def test_worker_writers_are_merged(tmp_path):
+    # every worker task has its own writer, they do not know the contents of the others
+    workers = [ContentAddressedDataWriter(FileBasedDataWriter(str(tmp_path))) for _ in range(2)]
+    workers[0].write('0_1.jpg', b'logo')
+    workers[0].write('0_2.jpg', b'logo')
+    workers[1].write('1_1.jpg', b'logo')
+    workers[1].write('1_2.jpg', b'chart')
+
+    manifest = {}
+    for worker in workers:
+        manifest.update(worker.manifest)
+    stats = merge_image_stats([worker.stats() for worker in workers], manifest)
+    assert stats == {'images': 4, 'unique_images': 2, 'bytes_written': 13, 'bytes_deduplicated': 4}
+    assert len(list(tmp_path.iterdir())) == 2
+
+    pdf_info = {
+        'pdf_info': [
+            {'preproc_blocks': [{'lines': [{'spans': [{'type': 'image', 'image_path': '0_1.jpg'}]}]}]},
+            {'preproc_blocks': [{'blocks': [{'lines': [{'spans': [{'image_path': '1_2.jpg'}]}]}]}]},
+            {'preproc_blocks': [{'lines': [{'spans': [{'image_path': 'not_cut.jpg'}, {'image_path': ''}]}]}]},
+        ]
+    }
+    apply_image_manifest(pdf_info, manifest)
+    pages = pdf_info['pdf_info']
+    assert pages[0]['preproc_blocks'][0]['lines'][0]['spans'][0]['image_path'] == manifest['0_1.jpg']
+    assert pages[1]['preproc_blocks'][0]['blocks'][0]['lines'][0]['spans'][0]['image_path'] == manifest['1_2.jpg']
+    assert [span['image_path'] for span in pages[2]['preproc_blocks'][0]['lines'][0]['spans']] == ['not_cut.jpg', '']
@@ -0,0 +1,47 @@
+import os
+
+import fitz
+import pytest
+
+from magic_pdf.data.data_reader_writer import FileBasedDataReader, MappedFile
+from magic_pdf.data.dataset import ImageDataset, PymuDocDataset
+
+
+@pytest.fixture
+def pdf_path(tmp_path):
+    doc = fitz.open()
+    for i in range(3):
+        doc.new_page().insert_text((72, 72), f'page {i}')
+    path = tmp_path / 'doc.pdf'
+    doc.save(path)
+    doc.close()
+    return str(path)
+
+
+def test_close_unmaps_a_mapped_pdf(pdf_path):
+    bits = FileBasedDataReader(use_mmap=True).read(pdf_path)
+    assert isinstance(bits, MappedFile)
+    dataset = PymuDocDataset(bits)
+    assert len(dataset) == 3
+    dataset.close()
+    assert bits.closed
+    assert dataset.get_doc().is_closed
+
+
+def test_close_unmaps_a_mapped_image(tmp_path):
+    pix = fitz.Pixmap(fitz.csRGB, fitz.IRect(0, 0, 16, 16), False)
+    path = tmp_path / 'image.png'
+    pix.save(path)
+    bits = FileBasedDataReader(use_mmap=True).read(str(path))
+    dataset = ImageDataset(bits)
+    assert len(dataset) == 1
+    dataset.close()
+    assert bits.closed
+
+
+def test_document_readable_after_unlink(pdf_path):
+    # the deferred overlays draw from the opened document after the upload is deleted
+    dataset = PymuDocDataset(FileBasedDataReader(use_mmap=True).read(pdf_path))
+    os.unlink(pdf_path)
+    assert dataset.get_doc()[2].get_text().strip() == 'page 2'
+    dataset.close()
@@ -0,0 +1,69 @@
+import fitz
+import pytest
+
+from magic_pdf.config.ocr_content_type import BlockType, ContentType
+from magic_pdf.libs.draw_bbox import OVERLAY_SUFFIXES, draw_layers, draw_overlays
+from parse import parse_overlays
+
+
+@pytest.fixture
+def pdf_bytes():
+    doc = fitz.open()
+    for i in range(3):
+        doc.new_page(width=400, height=400).insert_text((72, 72), f'page {i}')
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+
+def page_info(page_id):
+    span = {'type': ContentType.Text, 'bbox': [70, 60, 140, 76], 'content': f'page {page_id}'}
+    block = {'type': BlockType.Text, 'bbox': [60, 50, 200, 80], 'lines': [{'bbox': span['bbox'], 'spans': [span]}]}
+    return {'page_idx': page_id, 'preproc_blocks': [block], 'para_blocks': [block], 'discarded_blocks': []}
+
+
+def drawing_count(path):
+    with fitz.open(path) as doc:
+        return [len(page.get_drawings()) for page in doc]
+
+
+def test_only_the_requested_overlays_are_written(tmp_path, pdf_bytes):
+    pdf_info = [page_info(i) for i in range(3)]
+    filenames = {name: f'doc{OVERLAY_SUFFIXES[name]}' for name in ('layout', 'spans')}
+    paths = draw_overlays(pdf_bytes, str(tmp_path), filenames, pdf_info=pdf_info)
+
+    assert paths == [f'{tmp_path}/doc_layout.pdf', f'{tmp_path}/doc_spans.pdf']
+    assert sorted(p.name for p in tmp_path.iterdir()) == ['doc_layout.pdf', 'doc_spans.pdf']
+    for path in paths:
+        assert all(count > 0 for count in drawing_count(path))
+
+
+def test_overlay_of_parsed_pages_has_only_these_pages(tmp_path, pdf_bytes):
+    pdf_info = [page_info(i) for i in range(3)]
+    paths = draw_overlays(pdf_bytes, str(tmp_path), {'spans': 'doc_spans.pdf'}, pdf_info=pdf_info, page_ids=[1])
+    with fitz.open(paths[0]) as doc:
+        assert doc.page_count == 1
+        assert doc[0].get_text().strip() == 'page 1'
+
+
+def test_unknown_overlay_is_rejected(tmp_path, pdf_bytes):
+    with pytest.raises(ValueError):
+        draw_overlays(pdf_bytes, str(tmp_path), {'words': 'doc_words.pdf'})
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_draw_layers_skips_missing_pages():
+    doc = fitz.open()
+    page = doc.new_page()
+    draw_layers(1, [([[[0, 0, 10, 10]]], [255, 0, 0], True, True, True)], page)
+    assert page.get_drawings() == []
+    draw_layers(0, [([[[0, 0, 10, 10]]], [255, 0, 0], True, True, True)], page)
+    assert len(page.get_drawings()) == 1
+
+
+def test_parse_overlays():
+    assert parse_overlays('layout, spans') == ('layout', 'spans')
+    assert parse_overlays('none') == ()
+    assert parse_overlays('') == ()
+    with pytest.raises(ValueError, match='words'):
+        parse_overlays('layout,words')
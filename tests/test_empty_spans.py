@@ -0,0 +1,120 @@
+import fitz
+import numpy as np
+import pytest
+
+from magic_pdf.config.enums import SupportedPdfParseMethod
+from magic_pdf.data.dataset import PymuDocDataset
+from magic_pdf.model.magic_model import MagicModel
+from magic_pdf.pdf_parse_union_core_v2_llm import (EmptySpanRecognizer,
+                                                   _prepare_pages,
+                                                   prepare_page_blocks)
+
+PAGE_W, PAGE_H = 600, 400
+TEXT_SPAN = [70, 88, 150, 104]
+# a span of the layout model over a part of the page without text layer
+EMPTY_SPAN = [300, 88, 400, 104]
+
+
+class FakeChatModel:
+    def __init__(self, texts):
+        self.texts = texts
+        self.batches = []
+
+    def batch_inference(self, images, messages):
+        self.batches.append([image.size for image in images])
+        return [self.texts[i % len(self.texts)] for i in range(len(images))]
+
+
+class FakeModel:
+    def __init__(self, texts):
+        self.chat_model = FakeChatModel(texts)
+
+
+@pytest.fixture
+def dataset():
+    doc = fitz.open()
+    for _ in range(2):
+        doc.new_page(width=PAGE_W, height=PAGE_H).insert_text((72, 100), 'hello world', fontsize=12)
+    dataset = PymuDocDataset(doc.tobytes())
+    doc.close()
+    yield dataset
+    dataset.close()
+
+
+def model_page(page_no):
+    return {
+        'layout_dets': [
+            {'category_id': 1, 'bbox': [60, 80, 420, 110], 'score': 0.9},
+            {'category_id': 15, 'bbox': list(TEXT_SPAN), 'score': 0.9, 'text': ''},
+            {'category_id': 15, 'bbox': list(EMPTY_SPAN), 'score': 0.9, 'text': ''},
+        ],
+        'page_info': {'page_no': page_no, 'width': PAGE_W, 'height': PAGE_H},
+    }
+
+
+def prepare(dataset, page_id):
+    magic_model = MagicModel([model_page(i) for i in range(len(dataset))], dataset)
+    return prepare_page_blocks(
+        dataset.get_page(page_id), magic_model, page_id, 'md5', None, SupportedPdfParseMethod.TXT, None
+    )
+
+
+def block_contents(page_state):
+    return [span['content'] for line in page_state['fix_blocks'][0]['lines'] for span in line['spans']]
+
+
+def test_prepare_page_blocks_leaves_empty_spans_to_the_recognizer(dataset):
+    page_state = prepare(dataset, 0)
+    assert [span['bbox'] for span in page_state['empty_spans']] == [EMPTY_SPAN]
+    assert block_contents(page_state) == ['hello world', '']
+
+
+def test_recognized_spans_are_filled_from_the_layout_raster(dataset):
+    page_state = prepare(dataset, 0)
+    model = FakeModel(['recognized'])
+    # a raster at twice the pdf size, the crops are taken from it instead of rendering the page
+    raster = {'img': np.zeros((PAGE_H * 2, PAGE_W * 2, 3), dtype=np.uint8), 'width': PAGE_W * 2, 'height': PAGE_H * 2}
+    EmptySpanRecognizer(dataset, model, {0: raster})({0: page_state})
+
+    assert model.chat_model.batches == [[(200, 32)]]
+    assert 'empty_spans' not in page_state
+    assert block_contents(page_state) == ['hello world', 'recognized']
+    span = page_state['fix_blocks'][0]['lines'][0]['spans'][1]
+    assert span['score'] == 1.0
+
+
+def test_unrecognized_spans_are_removed_from_their_blocks(dataset):
+    page_state = prepare(dataset, 0)
+    EmptySpanRecognizer(dataset, FakeModel(['']))({0: page_state})
+
+    assert block_contents(page_state) == ['hello world']
+    line = page_state['fix_blocks'][0]['lines'][0]
+    assert line['bbox'] == TEXT_SPAN
+
+
+def test_spans_of_several_pages_share_one_batch(dataset):
+    page_states = {page_id: prepare(dataset, page_id) for page_id in range(2)}
+    model = FakeModel(['first', 'second'])
+    EmptySpanRecognizer(dataset, model)(page_states)
+
+    assert len(model.chat_model.batches) == 1
+    assert len(model.chat_model.batches[0]) == 2
+    assert block_contents(page_states[0]) == ['hello world', 'first']
+    assert block_contents(page_states[1]) == ['hello world', 'second']
+
+
+def test_without_chat_model_the_spans_are_kept(dataset):
+    page_state = prepare(dataset, 0)
+    EmptySpanRecognizer(dataset, object())({0: page_state})
+    assert block_contents(page_state) == ['hello world', '']
+
+
+def test_page_workers_leave_pages_with_empty_spans_to_the_parent(dataset):
+    page_infos = [model_page(i)['page_info'] for i in range(2)]
+    results, _, _ = _prepare_pages(
+        dataset, page_infos, [model_page(i) for i in range(2)], 'md5', None, SupportedPdfParseMethod.TXT, None,
+        'chunked',
+    )
+    for _, page_state in results:
+        assert len(page_state['empty_spans']) == 1
+        assert 'prepared_lines' not in page_state
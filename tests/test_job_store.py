@@ -0,0 +1,111 @@
+import pytest
+
+from api.job_store import DONE, FAILED, QUEUED, RUNNING, JobStore
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / 'jobs.sqlite3')
+
+
+@pytest.fixture
+def store(db_path):
+    store = JobStore(db_path)
+    yield store
+    store.close()
+
+
+def create(store, name):
+    return store.create(f'{name}.pdf', f'/in/{name}.pdf', f'/out/{name}', options={'pages': 2})
+
+
+def test_claim_takes_the_oldest_queued_job(store):
+    first = create(store, 'first')
+    create(store, 'second')
+    assert first['state'] == QUEUED
+    assert first['options'] == {'pages': 2}
+
+    job = store.claim_next()
+    assert job['id'] == first['id']
+    assert job['state'] == RUNNING
+    assert job['attempts'] == 1
+    assert job['started_at'] is not None
+    assert store.count(QUEUED) == 1
+
+
+def test_claim_without_queued_jobs(store):
+    assert store.claim_next() is None
+
+
+def test_finish_and_fail(store):
+    create(store, 'a')
+    create(store, 'b')
+    a = store.claim_next()
+    b = store.claim_next()
+
+    store.set_progress(a['id'], 'page', 0.75)
+    assert store.get(a['id'])['stage'] == 'page'
+    store.finish(a['id'], {'zip': 'a.zip'})
+    store.fail(b['id'], 'broken pdf')
+
+    a = store.get(a['id'])
+    assert (a['state'], a['stage'], a['progress'], a['artifacts']) == (DONE, None, 1.0, {'zip': 'a.zip'})
+    b = store.get(b['id'])
+    assert (b['state'], b['error']) == (FAILED, 'broken pdf')
+    assert b['finished_at'] is not None
+    assert store.get('missing') is None
+
+
+def test_running_jobs_are_requeued_after_reopen(db_path):
+    store = JobStore(db_path)
+    job = create(store, 'a')
+    store.claim_next()
+    store.set_progress(job['id'], 'layout', 0.1)
+    store.close()
+
+    store = JobStore(db_path)
+    try:
+        assert store.requeue_running() == ([job['id']], [])
+        job = store.get(job['id'])
+        assert (job['state'], job['stage'], job['progress'], job['attempts']) == (QUEUED, None, 0, 1)
+        assert store.claim_next()['attempts'] == 2
+    finally:
+        store.close()
+
+
+def test_jobs_interrupted_too_often_are_failed(db_path):
+    store = JobStore(db_path)
+    job = create(store, 'a')
+    for _ in range(2):
+        store.claim_next()
+        store.close()
+        store = JobStore(db_path)
+        requeued, failed = store.requeue_running(max_attempts=2)
+    try:
+        assert (requeued, failed) == ([], [job['id']])
+        job = store.get(job['id'])
+        assert job['state'] == FAILED
+        assert job['error'] == 'Interrupted in 2 attempts'
+        assert store.claim_next() is None
+    finally:
+        store.close()
+
+
+def test_parse_events_drive_the_job_progress(store, monkeypatch):
+    import api.main
+
+    monkeypatch.setattr(api.main, 'job_store', store)
+    job = create(store, 'a')
+    on_event = api.main.job_progress(job['id'])
+
+    progress = []
+    for event in [
+        {'event': 'stage', 'stage': 'rendered', 'done': 2, 'total': 2},
+        {'event': 'stage', 'stage': 'recognized', 'done': 0, 'total': 0},
+        {'event': 'page', 'page_idx': 0, 'done': 1, 'total': 2, 'markdown': '', 'content_list': []},
+        {'event': 'page', 'page_idx': 1, 'done': 2, 'total': 2, 'markdown': '', 'content_list': []},
+    ]:
+        on_event(event)
+        job = store.get(job['id'])
+        progress.append((job['stage'], job['progress']))
+    assert progress == [('rendered', 0.05), ('recognized', 0.6), ('page', 0.75), ('page', 0.9)]
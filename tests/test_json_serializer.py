@@ -0,0 +1,86 @@
+import json
+import math
+
+import pytest
+
+from magic_pdf.libs import json_serializer
+from magic_pdf.libs.json_serializer import (COMPRESSED_SUFFIX, compress_chunks,
+                                            dumps, iter_dumps_dict,
+                                            iter_dumps_list, load, loads)
+
+MIDDLE_JSON = {
+    'pdf_info': [
+        {'page_idx': i, 'page_size': [612.0, 792.5], 'para_blocks': [
+            {'type': 'text', 'bbox': [1, 2, 3, 4], 'lines': [{'spans': [{'content': f'页 {i} "q"', 'score': 0.93}]}]},
+        ]}
+        for i in range(3)
+    ],
+    '_parse_type': 'ocr',
+    '_version_name': '0.1',
+    'image_stats': {1: 'non-str key'},
+}
+
+
+@pytest.fixture(params=['orjson', 'json'])
+def serializer(request, monkeypatch):
+    if request.param == 'json':
+        monkeypatch.setattr(json_serializer, 'orjson', None)
+    elif json_serializer.orjson is None:
+        pytest.skip('orjson is not installed')
+    return request.param
+
+
+def expected(obj):
+    # what the json module loads from json.dumps, non-str keys become strings
+    return json.loads(json.dumps(obj))
+
+
+@pytest.mark.parametrize('indent', [0, 2, 4])
+def test_iter_dumps_list_round_trip(serializer, indent):
+    items = MIDDLE_JSON['pdf_info']
+    data = b''.join(iter_dumps_list(iter(items), indent))
+    assert data == dumps(items, indent)
+    assert loads(data) == expected(items)
+    assert b''.join(iter_dumps_list([], indent)) == b'[]'
+
+
+@pytest.mark.parametrize('indent', [0, 2, 4])
+def test_iter_dumps_dict_round_trip(serializer, indent):
+    data = b''.join(iter_dumps_dict(MIDDLE_JSON, 'pdf_info', indent))
+    assert loads(data) == expected(MIDDLE_JSON)
+    if indent == 4:
+        # the layout of the files written before streaming
+        assert data.decode('utf-8') == json.dumps(MIDDLE_JSON, ensure_ascii=False, indent=4)
+    assert b''.join(iter_dumps_dict({}, 'pdf_info', indent)) == b'{}'
+
+
+def test_compressed_file_round_trip(serializer, tmp_path):
+    path = tmp_path / f'middle.json{COMPRESSED_SUFFIX}'
+    chunks = compress_chunks(iter_dumps_dict(MIDDLE_JSON, 'pdf_info'))
+    path.write_bytes(b''.join(chunks))
+    assert load(str(path)) == expected(MIDDLE_JSON)
+
+    plain = tmp_path / 'middle.json'
+    plain.write_bytes(b''.join(iter_dumps_dict(MIDDLE_JSON, 'pdf_info')))
+    assert load(str(plain)) == expected(MIDDLE_JSON)
+
+
+def test_non_finite_floats(serializer):
+    data = dumps({'score': math.nan, 'width': math.inf})
+    loaded = loads(data)
+    if serializer == 'orjson':
+        assert loaded == {'score': None, 'width': None}
+    else:
+        assert math.isnan(loaded['score']) and loaded['width'] == math.inf
+
+
+def test_json_module_output_loads_with_orjson(monkeypatch):
+    monkeypatch.setattr(json_serializer, 'orjson', None)
+    data = dumps({'score': math.nan})
+    monkeypatch.undo()
+    assert math.isnan(loads(data)['score'])
+
+
+def test_values_orjson_can_not_serialize_fall_back_to_json():
+    data = dumps({'big': 2 ** 70, 'text': 'lone \ud800 surrogate'})
+    assert json.loads(data.decode('utf-8'))['big'] == 2 ** 70
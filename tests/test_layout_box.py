@@ -0,0 +1,89 @@
+from magic_pdf.config.ocr_content_type import BlockType
+from magic_pdf.pre_proc.ocr_detect_all_bboxes import (
+    LayoutBox, ocr_prepare_bboxes_for_layout_split_v2,
+    remove_overlaps_min_blocks)
+
+PAGE_W, PAGE_H = 600, 800
+
+
+def blocks(*bboxes, score=0.9, group_id=None):
+    ret = []
+    for bbox in bboxes:
+        block = {'bbox': list(bbox), 'score': score}
+        if group_id is not None:
+            block['group_id'] = group_id
+        ret.append(block)
+    return ret
+
+
+def prepare(text=(), title=(), img_body=(), img_caption=(), discarded=(), equations=()):
+    return ocr_prepare_bboxes_for_layout_split_v2(
+        img_body, img_caption, [], [], [], [], list(discarded), list(text), list(title), list(equations),
+        PAGE_W, PAGE_H,
+    )
+
+
+def test_layout_box_compares_by_value():
+    box = LayoutBox([1, 2, 3, 4], BlockType.Text, 0.9)
+    same = LayoutBox([1, 2, 3, 4], BlockType.Text, 0.9)
+    assert box == same and box is not same
+    assert box != LayoutBox([1, 2, 3, 4], BlockType.Title, 0.9)
+    assert box != LayoutBox([1, 2, 3, 4], BlockType.Text, 0.9, group_id=1)
+    assert box != [1, 2, 3, 4]
+
+    boxes = [LayoutBox([0, 0, 1, 1], BlockType.Text, 0.5), same]
+    assert box in boxes
+    boxes.remove(box)
+    assert boxes == [LayoutBox([0, 0, 1, 1], BlockType.Text, 0.5)]
+
+
+def test_blocks_keep_their_type_score_and_group():
+    all_bboxes, discarded = prepare(
+        text=blocks([50, 300, 550, 400], score=0.8),
+        img_body=blocks([50, 50, 550, 250], group_id=3),
+        img_caption=blocks([50, 255, 550, 280], score=0.7, group_id=3),
+        discarded=blocks([50, 10, 550, 30], score=0.6),
+    )
+    assert all_bboxes == [
+        LayoutBox([50, 50, 550, 250], BlockType.ImageBody, 0.9, 3),
+        LayoutBox([50, 255, 550, 280], BlockType.ImageCaption, 0.7, 3),
+        LayoutBox([50, 300, 550, 400], BlockType.Text, 0.8),
+    ]
+    assert discarded == [LayoutBox([50, 10, 550, 30], BlockType.Discarded, 0.6)]
+
+
+def test_overlapping_blocks_are_resolved():
+    all_bboxes, _ = prepare(
+        # a title the same as a text block is dropped
+        text=blocks([50, 50, 550, 100], [51, 300, 550, 400], [50, 500, 550, 600]),
+        title=blocks([50, 50, 550, 101]),
+        # a text block the same as an equation is dropped
+        equations=blocks([50, 300, 550, 400]),
+    )
+    assert [(box.type, box.bbox) for box in all_bboxes] == [
+        (BlockType.Text, [50, 50, 550, 100]),
+        (BlockType.InterlineEquation, [50, 300, 550, 400]),
+        (BlockType.Text, [50, 500, 550, 600]),
+    ]
+
+
+def test_blocks_under_a_wide_footer_become_discarded():
+    all_bboxes, discarded = prepare(
+        text=blocks([50, 100, 550, 400], [50, 720, 550, 780]),
+        discarded=blocks([50, 650, 550, 700]),
+    )
+    assert all_bboxes == [LayoutBox([50, 100, 550, 400], BlockType.Text, 0.9)]
+    assert [box.bbox for box in discarded] == [[50, 650, 550, 700], [50, 720, 550, 780]]
+
+
+def test_smaller_of_two_overlapping_blocks_is_merged_into_the_larger():
+    large = LayoutBox([50, 100, 550, 400], BlockType.Text, 0.9)
+    small = LayoutBox([40, 110, 300, 200], BlockType.Text, 0.8)
+    other = LayoutBox([50, 500, 550, 600], BlockType.Text, 0.9)
+    result = remove_overlaps_min_blocks([large, small, other])
+    assert result == [LayoutBox([40, 100, 550, 400], BlockType.Text, 0.9), other]
+    assert result[0] is large
+
+    # equal blocks are left as they are
+    twins = [LayoutBox([0, 0, 10, 10], BlockType.Text, 0.9), LayoutBox([0, 0, 10, 10], BlockType.Text, 0.9)]
+    assert len(remove_overlaps_min_blocks(twins)) == 2
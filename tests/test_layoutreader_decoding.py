@@ -0,0 +1,116 @@
+from collections import defaultdict
+
+import pytest
+import torch
+
+from magic_pdf.model.sub_modules.reading_oreder.layoutreader.decoding import (
+    DECODE_MODES, decode_greedy, decode_lsa, decode_orders, decode_parity)
+from magic_pdf.model.sub_modules.reading_oreder.layoutreader.helpers import parse_logits
+
+
+def legacy_parse_logits(logits, length):
+    """parse_logits before the decoders, the reference of the parity mode"""
+    logits = logits[1 : length + 1, :length]
+    orders = logits.argsort(descending=False).tolist()
+    ret = [o.pop() for o in orders]
+    while True:
+        order_to_idxes = defaultdict(list)
+        for idx, order in enumerate(ret):
+            order_to_idxes[order].append(idx)
+        order_to_idxes = {k: v for k, v in order_to_idxes.items() if len(v) > 1}
+        if not order_to_idxes:
+            break
+        for order, idxes in order_to_idxes.items():
+            idxes_to_logit = {}
+            for idx in idxes:
+                idxes_to_logit[idx] = logits[idx, order]
+            idxes_to_logit = sorted(idxes_to_logit.items(), key=lambda x: x[1], reverse=True)
+            for idx, _ in idxes_to_logit[1:]:
+                ret[idx] = orders[idx].pop()
+    return ret
+
+
+def greedy_reference(logits, length):
+    """The largest remaining (line, order) logit first, one entry at a time"""
+    logits = logits[1 : length + 1, :length].tolist()
+    entries = sorted(((logits[r][c], r, c) for r in range(length) for c in range(length)), reverse=True)
+    ret = [-1] * length
+    used = set()
+    for _, r, c in entries:
+        if ret[r] == -1 and c not in used:
+            ret[r] = c
+            used.add(c)
+    return ret
+
+
+def model_logits(length, seed, conflicts=False, ties=False):
+    """Logits shaped like the model output, CLS row first and padding columns after the lines"""
+    generator = torch.Generator().manual_seed(seed)
+    size = length + 2
+    if ties:
+        return torch.randint(0, 4, (size, size), generator=generator).float()
+    logits = torch.randn(size, size, generator=generator)
+    if conflicts:
+        # every line prefers the first orders, the rows compete for them
+        logits = logits * 0.1 - torch.arange(size, dtype=torch.float)[None, :]
+    return logits
+
+
+def total(logits, length, orders):
+    return sum(float(logits[1 + r, c]) for r, c in enumerate(orders))
+
+
+CASES = [
+    (length, seed, conflicts, ties)
+    for length in (1, 2, 7, 40, 120)
+    for seed in range(3)
+    for conflicts, ties in ((False, False), (True, False), (False, True))
+]
+
+
+@pytest.mark.parametrize('length, seed, conflicts, ties', CASES)
+def test_every_mode_gives_a_permutation(length, seed, conflicts, ties):
+    logits = model_logits(length, seed, conflicts, ties)
+    for mode in DECODE_MODES:
+        orders = decode_orders(logits, length, mode)
+        assert sorted(orders) == list(range(length)), mode
+
+
+@pytest.mark.parametrize('length, seed, conflicts, ties', CASES)
+def test_parity_matches_the_legacy_parse_logits(length, seed, conflicts, ties):
+    logits = model_logits(length, seed, conflicts, ties)
+    expected = legacy_parse_logits(logits, length)
+    assert decode_parity(logits, length) == expected
+    assert parse_logits(logits, length) == expected
+
+
+@pytest.mark.parametrize('length, seed, conflicts', [(n, s, c) for n in (2, 7, 40) for s in range(3) for c in (False, True)])
+def test_greedy_takes_the_largest_logits_first(length, seed, conflicts):
+    logits = model_logits(length, seed, conflicts)
+    assert decode_greedy(logits, length) == greedy_reference(logits, length)
+
+
+@pytest.mark.parametrize('length, seed, conflicts', [(n, s, c) for n in (2, 7, 40) for s in range(3) for c in (False, True)])
+def test_lsa_maximizes_the_sum_of_logits(length, seed, conflicts):
+    logits = model_logits(length, seed, conflicts)
+    best = total(logits, length, decode_lsa(logits, length))
+    for mode in DECODE_MODES:
+        assert total(logits, length, decode_orders(logits, length, mode)) <= best + 1e-4
+
+
+def test_ties_go_to_the_first_line():
+    # both lines prefer order 0 with the same logit, the first one keeps it in every mode
+    logits = torch.zeros(4, 4)
+    logits[1:3, 0] = 5.0
+    logits[1:3, 1] = 1.0
+    assert decode_parity(logits, 2) == legacy_parse_logits(logits, 2) == [0, 1]
+    assert decode_greedy(logits, 2) == [0, 1]
+    assert sorted(decode_lsa(logits, 2)) == [0, 1]
+
+
+def test_empty_input_and_unknown_mode():
+    logits = torch.zeros(2, 2)
+    for mode in DECODE_MODES:
+        assert decode_orders(logits, 0, mode) == []
+    with pytest.raises(ValueError):
+        decode_orders(logits, 0, 'beam')
@@ -0,0 +1,84 @@
+import copy
+
+import fitz
+import pytest
+
+from magic_pdf.data.dataset import PymuDocDataset
+from magic_pdf.model.magic_model import MagicModel, copy_model_list
+from magic_pdf.post_proc.para_split_v3 import para_split
+
+PAGE_W, PAGE_H = 600, 800
+
+
+@pytest.fixture
+def dataset():
+    doc = fitz.open()
+    for _ in range(2):
+        doc.new_page(width=PAGE_W, height=PAGE_H)
+    dataset = PymuDocDataset(doc.tobytes())
+    doc.close()
+    yield dataset
+    dataset.close()
+
+
+def model_list():
+    return [
+        {
+            'layout_dets': [
+                # poly in image pixels at 2x, MagicModel turns it into a pdf bbox
+                {'category_id': 1, 'poly': [120, 160, 1080, 160, 1080, 400, 120, 400], 'score': 0.9},
+                {'category_id': 15, 'poly': [120, 170, 1080, 170, 1080, 210, 120, 210], 'score': 0.9, 'text': 'line'},
+                {'category_id': 5, 'poly': [120, 800, 1080, 800, 1080, 1200, 120, 1200], 'score': 0.9,
+                 'html': '<table><tr><td>1</td></tr></table>'},
+                {'category_id': 1, 'poly': [120, 1300, 1080, 1300, 1080, 1400, 120, 1400], 'score': 0.03},
+            ],
+            'page_info': {'page_no': page_no, 'width': PAGE_W * 2, 'height': PAGE_H * 2},
+        }
+        for page_no in range(2)
+    ]
+
+
+def test_magic_model_leaves_the_original_model_list_unchanged(dataset):
+    original = model_list()
+    expected = copy.deepcopy(original)
+    copied = copy_model_list(original)
+    magic_model = MagicModel(copied, dataset)
+
+    assert original == expected
+    # the copy is the one MagicModel fixed, with pdf bboxes and without the low score detection
+    assert all('bbox' in det for det in copied[0]['layout_dets'])
+    assert len(copied[0]['layout_dets']) < len(original[0]['layout_dets'])
+    # the same result as a deep copy
+    deep_copied = copy.deepcopy(original)
+    MagicModel(deep_copied, dataset)
+    assert copied == deep_copied
+    assert magic_model.get_model_list(0) is copied[0]
+
+
+def test_copy_model_list_shares_the_detection_values():
+    original = model_list()
+    copied = copy_model_list(original)
+    for page, copied_page in zip(original, copied):
+        assert copied_page is not page and copied_page['page_info'] is page['page_info']
+        for det, copied_det in zip(page['layout_dets'], copied_page['layout_dets']):
+            assert copied_det == det and copied_det is not det
+            assert copied_det['poly'] is det['poly']
+
+
+def test_para_split_does_not_change_the_preproc_blocks():
+    def page(page_id):
+        line = {'bbox': [0, 0, 10, 10], 'spans': [{'bbox': [0, 0, 10, 10], 'content': f'text {page_id}'}]}
+        return {
+            'preproc_blocks': [{'type': 'text', 'bbox': [0, 0, 10, 10], 'lines': [line]}],
+            'page_size': [PAGE_W, PAGE_H],
+        }
+
+    pdf_info_dict = {f'page_{i}': page(i) for i in range(3)}
+    preproc_blocks = copy.deepcopy({key: page['preproc_blocks'] for key, page in pdf_info_dict.items()})
+    para_split(pdf_info_dict)
+
+    for key, page in pdf_info_dict.items():
+        assert page['preproc_blocks'] == preproc_blocks[key]
+        [block] = page['para_blocks']
+        assert block['page_num'] == key and block['page_size'] == [PAGE_W, PAGE_H]
+        assert block['lines'] is page['preproc_blocks'][0]['lines']
@@ -0,0 +1,115 @@
+import json
+import random
+
+import pytest
+
+from magic_pdf.config.make_content_config import DropMode, MakeMode
+from magic_pdf.data.data_reader_writer import DataWriter, FileBasedDataWriter
+from magic_pdf.dict2md.ocr_mkcontent import union_make, union_make_pages
+from magic_pdf.libs.markdown_utils import escape_markdown_output
+from magic_pdf.operators.pipes_llm import PipeResultLLM
+
+
+def chained_escape(content):
+    """The str.replace chain get_markdown used before escape_markdown_output"""
+    return content.replace('\\$', '$').replace('\\*', '*').replace('<seg>', '\\<seg\\>').replace(
+        '<sos', '\\<sos\\>').replace('<eos>', '\\<eos\\>').replace('<pad>', '\\<pad\\>').replace(
+        '<unk>', '\\<unk\\>').replace('<sep>', '\\<sep\\>').replace('<cls>', '\\<cls\\>')
+
+
+def text_block(text, block_type='text'):
+    return {'type': block_type, 'lines': [{'spans': [{'type': 'text', 'content': text}]}]}
+
+
+def page(page_idx, *texts, need_drop=False):
+    return {
+        'page_idx': page_idx,
+        'para_blocks': [text_block(text) for text in texts],
+        'need_drop': need_drop,
+        'drop_reason': 'skip page' if need_drop else None,
+    }
+
+
+PDF_INFO = [
+    page(0, 'First page', 'costs $5 and *more*'),
+    page(1),
+    page(2, 'Third <seg> page'),
+    page(3, 'Dropped page', need_drop=True),
+]
+
+
+class MemoryWriter(DataWriter):
+    """A writer without write_stream of its own"""
+
+    def __init__(self):
+        self.files = {}
+
+    def write(self, path: str, data: bytes) -> None:
+        self.files[path] = data
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_escape_markdown_output_matches_the_replace_chain(seed):
+    rng = random.Random(seed)
+    pieces = ['\\$', '\\*', '\\', '$', '*', '<seg>', '<sos>', '<sos', '<eos>', '<pad>', '<unk>', '<sep>', '<cls>',
+              '<', '>', 'text', '\n\n', ' ']
+    for _ in range(200):
+        content = ''.join(rng.choice(pieces) for _ in range(rng.randint(0, 20)))
+        assert escape_markdown_output(content) == chained_escape(content)
+
+
+@pytest.mark.parametrize('make_mode', [MakeMode.MM_MD, MakeMode.NLP_MD])
+@pytest.mark.parametrize('page_markers', [False, True])
+def test_markdown_pages_join_into_union_make(make_mode, page_markers):
+    pages = list(union_make_pages(PDF_INFO, make_mode, DropMode.NONE, 'images', page_markers))
+    # the page without blocks gives nothing
+    assert len(pages) == 3
+    assert '\n\n'.join(pages) == union_make(PDF_INFO, make_mode, DropMode.NONE, 'images', page_markers)
+    if page_markers:
+        assert pages[1].startswith('<!-- Page Break: Page 3 of 4 -->\n\n')
+        assert pages[2].startswith('<!-- Page Break: Page 4 of 4 -->\n\n')
+    else:
+        assert pages[1].strip() == 'Third <seg> page'
+
+
+def test_content_list_pages_and_drop_modes():
+    pages = list(union_make_pages(PDF_INFO, MakeMode.STANDARD_FORMAT, DropMode.NONE))
+    assert [[item['text'].strip() for item in items] for items in pages] == [
+        ['First page', 'costs \\$5 and \\*more\\*'], ['Third <seg> page'], ['Dropped page'],
+    ]
+    assert [item for items in pages for item in items] == union_make(PDF_INFO, MakeMode.STANDARD_FORMAT, DropMode.NONE)
+
+    pages = list(union_make_pages(PDF_INFO, MakeMode.STANDARD_FORMAT, DropMode.SINGLE_PAGE))
+    assert len(pages) == 2
+    pages = list(union_make_pages(PDF_INFO, MakeMode.STANDARD_FORMAT, DropMode.NONE_WITH_REASON))
+    assert len(pages) == 3
+
+
+def test_pages_may_come_from_a_generator():
+    pages = union_make_pages(
+        (page_info for page_info in PDF_INFO), MakeMode.MM_MD, DropMode.NONE, page_markers=True, total_pages=10,
+    )
+    assert next(pages).split('\n\n') == ['First page  ', 'costs \\$5 and \\*more\\*  ']
+    assert next(pages).startswith('<!-- Page Break: Page 3 of 10 -->')
+
+
+def test_pipe_result_markdown_and_content_list_files(tmp_path):
+    result = PipeResultLLM({'pdf_info': PDF_INFO}, None)
+    chunks = list(result.iter_markdown('images', page_markers=True))
+    markdown = result.get_markdown('images', page_markers=True)
+    assert ''.join(chunks) == markdown
+    assert markdown == chained_escape(union_make(PDF_INFO, MakeMode.MM_MD, DropMode.NONE, 'images', True))
+    assert 'costs $5 and *more*' in markdown and 'Third \\<seg\\> page' in markdown
+
+    writer = FileBasedDataWriter(str(tmp_path))
+    result.dump_md(writer, 'doc.md', 'images', page_markers=True)
+    assert (tmp_path / 'doc.md').read_text(encoding='utf-8') == markdown
+
+    result.dump_content_list(writer, 'doc_content_list.json', 'images', indent=4)
+    content_list = result.get_content_list('images')
+    assert (tmp_path / 'doc_content_list.json').read_text(encoding='utf-8') == \
+        json.dumps(content_list, ensure_ascii=False, indent=4)
+
+    memory = MemoryWriter()
+    result.dump_md(memory, 'doc.md', 'images', page_markers=True)
+    assert memory.files['doc.md'] == markdown.encode('utf-8')
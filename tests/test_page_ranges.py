@@ -0,0 +1,169 @@
+import argparse
+from types import SimpleNamespace
+
+import fitz
+import pytest
+
+import parse
+from magic_pdf.data import dataset as dataset_module
+from magic_pdf.data.dataset import PymuDocDataset
+from magic_pdf.data.utils import (fitz_doc_image_size, fitz_doc_to_image, page_ranges_to_ids,
+                                  parse_page_ranges, select_page_ids)
+from magic_pdf.model import doc_analyze_by_custom_model_llm as doc_analyze
+from magic_pdf.model.doc_analyze_by_custom_model_llm import doc_analyze_llm
+
+
+class FakeBatchAnalyzeLLM:
+    """Records the images of each call, the layout of an image is its shape"""
+
+    calls = []
+
+    def __init__(self, model, progress=None):
+        self.progress = progress
+
+    def __call__(self, images):
+        FakeBatchAnalyzeLLM.calls.append(len(images))
+        return [[{'shape': image.shape[:2]}] for image in images]
+
+
+@pytest.fixture
+def fake_batch_model(monkeypatch):
+    FakeBatchAnalyzeLLM.calls = []
+    monkeypatch.setattr(doc_analyze, 'BatchAnalyzeLLM', FakeBatchAnalyzeLLM)
+    return FakeBatchAnalyzeLLM
+
+
+def pdf_bytes(pages):
+    doc = fitz.open()
+    for i in range(pages):
+        doc.new_page(width=200 + 10 * i, height=300).insert_text((20, 40), f'page {i}')
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+
+@pytest.mark.parametrize('spec, ranges', [
+    ('1-5,8,10-', [(0, 4), (7, 7), (9, None)]),
+    (' 3 ', [(2, 2)]),
+    ('-2', [(0, 1)]),
+    ('4-4, ,2-', [(3, 3), (1, None)]),
+])
+def test_parse_page_ranges(spec, ranges):
+    assert parse_page_ranges(spec) == ranges
+
+
+@pytest.mark.parametrize('spec', ['', ',', '0', '5-3', 'a', '1-b', '1-2-3', '-0'])
+def test_malformed_page_ranges_are_rejected(spec):
+    with pytest.raises(ValueError):
+        parse_page_ranges(spec)
+    with pytest.raises(argparse.ArgumentTypeError):
+        parse.parse_pages(spec)
+
+
+def test_page_ranges_to_ids():
+    ranges = parse_page_ranges('1-3,2,9-,5')
+    assert page_ranges_to_ids(ranges, 12) == [0, 1, 2, 4, 8, 9, 10, 11]
+    # the pages past the end of a document are left out
+    assert page_ranges_to_ids(ranges, 4) == [0, 1, 2]
+    assert page_ranges_to_ids(parse_page_ranges('7-'), 4) == []
+
+
+def test_select_page_ids():
+    assert select_page_ids(5) == [0, 1, 2, 3, 4]
+    assert select_page_ids(5, 1, 3) == [1, 2, 3]
+    assert select_page_ids(5, 2, -1) == [2, 3, 4]
+    assert select_page_ids(5, end_page_id=99) == [0, 1, 2, 3, 4]
+    assert select_page_ids(5, page_ids=[4, 0, 4, 2]) == [0, 2, 4]
+    # a page list is limited to the range
+    assert select_page_ids(5, 1, 3, page_ids=[0, 1, 3, 7]) == [1, 3]
+    assert select_page_ids(5, page_ids=[]) == []
+
+
+def test_selected_page_ids_of_a_document():
+    dataset = PymuDocDataset(pdf_bytes(4))
+    assert parse.selected_page_ids(dataset, None) is None
+    assert parse.selected_page_ids(dataset, parse_page_ranges('2,4-')) == [1, 3]
+    with pytest.raises(ValueError, match='4 pages'):
+        parse.selected_page_ids(dataset, parse_page_ranges('5-'))
+
+
+@pytest.mark.parametrize('width, height', [(200, 300), (612.5, 791.3), (100, 2000)])
+def test_image_size_without_rendering(width, height):
+    doc = fitz.open()
+    page = doc.new_page(width=width, height=height)
+    image = fitz_doc_to_image(page)
+    assert fitz_doc_image_size(page) == {'width': image['width'], 'height': image['height']}
+    assert image['img'].shape[:2] == (image['height'], image['width'])
+
+
+def test_only_the_selected_pages_are_rendered(fake_batch_model, monkeypatch):
+    rendered = []
+    to_image = dataset_module.fitz_doc_to_image
+
+    def recording_to_image(page, *args, **kwargs):
+        rendered.append(page.number)
+        return to_image(page, *args, **kwargs)
+
+    monkeypatch.setattr(dataset_module, 'fitz_doc_to_image', recording_to_image)
+    dataset = PymuDocDataset(pdf_bytes(6))
+    stages = []
+    result = doc_analyze_llm(
+        dataset, SimpleNamespace(device='cpu'), start_page_id=1, end_page_id=4, page_ids=[0, 4, 2],
+        progress=lambda *stage: stages.append(stage),
+    )
+
+    assert rendered == [2, 4]
+    assert fake_batch_model.calls == [2]
+    assert stages == [('rendered', 2, 2)]
+    assert result.get_page_ids() == [2, 4]
+    pages = result.get_infer_res()
+    assert [page['page_info']['page_no'] for page in pages] == list(range(6))
+    assert [len(page['layout_dets']) for page in pages] == [0, 0, 1, 0, 1, 0]
+    for page in pages:
+        for det in page['layout_dets']:
+            assert tuple(det['shape']) == (page['page_info']['height'], page['page_info']['width'])
+
+
+@pytest.fixture
+def api_main(monkeypatch):
+    import api.main
+    from api.admission import AdmissionController
+
+    monkeypatch.setattr(api.main, 'admission', AdmissionController(
+        max_queued_pages=0, max_pages_per_request=5, slots=1
+    ))
+    return api.main
+
+
+def test_pages_field(api_main):
+    from fastapi import HTTPException
+
+    assert api_main.parse_pages_field(None) is None
+    assert api_main.parse_pages_field('  ') is None
+    assert api_main.parse_pages_field('1-5,8') == [(0, 4), (7, 7)]
+    with pytest.raises(HTTPException) as e:
+        api_main.parse_pages_field('5-1')
+    assert e.value.status_code == 400
+
+
+def test_only_the_selected_pages_are_admitted(api_main, tmp_path):
+    from fastapi import HTTPException
+
+    paths = []
+    for pages in (9, 2):
+        path = tmp_path / f'{pages}.pdf'
+        path.write_bytes(pdf_bytes(pages))
+        paths.append(str(path))
+
+    with pytest.raises(HTTPException) as e:
+        api_main.admit_uploads(paths)
+    assert e.value.status_code == 413
+
+    ticket = api_main.admit_uploads(paths, parse_page_ranges('2-3'))
+    assert ticket.pages == 3
+    api_main.admission.finish(ticket)
+
+    # a document without a selected page is turned away
+    with pytest.raises(HTTPException) as e:
+        api_main.admit_uploads(paths, parse_page_ranges('4-'))
+    assert e.value.status_code == 400
@@ -0,0 +1,132 @@
+import os
+import threading
+
+import fitz
+import pytest
+import torch
+
+from magic_pdf.config.enums import SupportedPdfParseMethod
+from magic_pdf.data.data_reader_writer import FileBasedDataWriter
+from magic_pdf.data.dataset import PymuDocDataset
+from magic_pdf.pdf_parse_union_core_v2_llm import (_can_parse_pages_in_workers,
+                                                   pdf_parse_union,
+                                                   shutdown_page_pools)
+
+PAGE_W, PAGE_H = 600, 800
+NUM_PAGES = 5
+
+
+class FakeLogits:
+    def __init__(self, logits):
+        self.logits = logits
+
+
+class FakeLayoutReader:
+    """Reads the lines in input order, every line row prefers the order of its position"""
+
+    device = torch.device('cpu')
+    dtype = torch.float32
+
+    def __init__(self):
+        self.batches = []
+
+    def __call__(self, bbox, attention_mask, input_ids):
+        size = bbox.shape[1]
+        self.batches.append(bbox.shape[0])
+        logits = torch.diag(torch.ones(size - 1), -1)
+        return FakeLogits(logits.expand(bbox.shape[0], size, size))
+
+
+class FakeModel:
+    device = 'cpu'
+
+    def __init__(self):
+        self.layoutreader_model = FakeLayoutReader()
+
+
+def model_page(page_no):
+    layout_dets = [
+        {'category_id': 0, 'bbox': [60, 40, 540, 70], 'score': 0.95},
+        {'category_id': 15, 'bbox': [60, 45, 300, 65], 'score': 0.95, 'text': f'Title {page_no}'},
+        {'category_id': 3, 'bbox': [100, 400, 500, 600], 'score': 0.9},
+    ]
+    for i in range(3):
+        top = 100 + i * 80
+        layout_dets.append({'category_id': 1, 'bbox': [60, top, 540, top + 60], 'score': 0.9})
+        for j in range(2):
+            layout_dets.append({
+                'category_id': 15, 'bbox': [60, top + j * 30, 540, top + j * 30 + 20], 'score': 0.9,
+                'text': f'page {page_no} block {i} line {j}',
+            })
+    return {'layout_dets': layout_dets, 'page_info': {'page_no': page_no, 'width': PAGE_W, 'height': PAGE_H}}
+
+
+@pytest.fixture
+def dataset():
+    doc = fitz.open()
+    for i in range(NUM_PAGES):
+        page = doc.new_page(width=PAGE_W, height=PAGE_H)
+        # a different figure on every page, the crops do not share a content key
+        page.draw_rect(fitz.Rect(120 + i * 10, 420, 480, 580), color=(0, 0, 1), fill=(i / NUM_PAGES, 0.5, 0))
+    dataset = PymuDocDataset(doc.tobytes())
+    doc.close()
+    yield dataset
+    dataset.close()
+
+
+@pytest.fixture(scope='module', autouse=True)
+def page_pools():
+    yield
+    shutdown_page_pools()
+
+
+def parse(dataset, image_dir, num_workers):
+    model = FakeModel()
+    result = pdf_parse_union(
+        [model_page(i) for i in range(NUM_PAGES)], dataset, FileBasedDataWriter(str(image_dir)),
+        SupportedPdfParseMethod.OCR, model, num_workers=num_workers,
+    )
+    return result, model
+
+
+def test_workers_give_the_serial_result(dataset, tmp_path):
+    serial, serial_model = parse(dataset, tmp_path / 'serial', 0)
+    parallel, parallel_model = parse(dataset, tmp_path / 'parallel', 2)
+
+    assert parallel['pdf_info'] == serial['pdf_info']
+    assert parallel['image_manifest'] == serial['image_manifest']
+    # the crops are written by the workers, once per page
+    assert sorted(os.listdir(tmp_path / 'parallel')) == sorted(os.listdir(tmp_path / 'serial'))
+    assert len(os.listdir(tmp_path / 'parallel')) == NUM_PAGES
+    # the parent orders the lines of all pages in one batch
+    assert serial_model.layoutreader_model.batches == [1] * NUM_PAGES
+    assert parallel_model.layoutreader_model.batches == [NUM_PAGES]
+
+    first_page = serial['pdf_info'][0]
+    texts = [span['content'] for block in first_page['preproc_blocks'] for line in block.get('lines', [])
+             for span in line['spans'] if 'content' in span]
+    assert texts[0] == 'Title 0'
+    assert texts[1:3] == ['page 0 block 0 line 0', 'page 0 block 0 line 1']
+
+
+def test_selected_pages_only(dataset, tmp_path):
+    model = FakeModel()
+    result = pdf_parse_union(
+        [model_page(i) for i in range(NUM_PAGES)], dataset, FileBasedDataWriter(str(tmp_path)),
+        SupportedPdfParseMethod.OCR, model, num_workers=2, page_ids=[1, 3],
+    )
+    skipped = [page['page_idx'] for page in result['pdf_info'] if page['need_drop']]
+    assert skipped == [0, 2, 4]
+    assert len(os.listdir(tmp_path)) == 2
+
+
+def test_pages_are_parsed_serially_when_workers_do_not_apply(tmp_path):
+    writer = FileBasedDataWriter(str(tmp_path))
+    assert _can_parse_pages_in_workers(2, 3, writer)
+    assert _can_parse_pages_in_workers(2, 3, None)
+    assert not _can_parse_pages_in_workers(1, 3, writer)
+    assert not _can_parse_pages_in_workers(None, 3, writer)
+    assert not _can_parse_pages_in_workers(2, 1, writer)
+
+    writer.lock = threading.Lock()
+    assert not _can_parse_pages_in_workers(2, 3, writer)
@@ -0,0 +1,78 @@
+from io import BytesIO
+
+import fitz
+import pytest
+from PIL import Image
+
+from magic_pdf.data.data_reader_writer import FileBasedDataWriter
+from magic_pdf.libs.pdf_image_tools import (cut_images,
+                                            embedded_image_for_clip,
+                                            extract_embedded_image)
+
+IMAGE_RECT = (100, 100, 300, 250)
+
+
+def image_bytes(fmt, mode='RGB'):
+    buffer = BytesIO()
+    Image.new(mode, (200, 150), (200, 30, 30, 128)[:len(mode)]).save(buffer, format=fmt)
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def jpeg():
+    return image_bytes('JPEG')
+
+
+def make_page(stream, rotate=0, text=None):
+    doc = fitz.open()
+    page = doc.new_page(width=400, height=400)
+    page.insert_image(fitz.Rect(*IMAGE_RECT), stream=stream, rotate=rotate)
+    if text:
+        page.insert_text((120, 180), text)
+    return page
+
+
+def test_clip_of_an_embedded_jpeg_gets_its_bytes(tmp_path, jpeg):
+    page = make_page(jpeg)
+    info = embedded_image_for_clip(page, IMAGE_RECT, page.get_image_info(xrefs=True))
+    assert info is not None
+    assert extract_embedded_image(page.parent, info['xref']) == (jpeg, 'jpg')
+
+    paths = cut_images([(IMAGE_RECT, 'images')], 0, page, FileBasedDataWriter(str(tmp_path)))
+    assert paths[0].endswith('.jpg')
+    assert (tmp_path / paths[0]).read_bytes() == jpeg
+
+
+def test_partial_clip_is_rendered(tmp_path, jpeg):
+    page = make_page(jpeg)
+    clip = (100, 100, 200, 175)
+    assert embedded_image_for_clip(page, clip, page.get_image_info(xrefs=True)) is None
+
+    paths = cut_images([(clip, 'images')], 0, page, FileBasedDataWriter(str(tmp_path)))
+    data = (tmp_path / paths[0]).read_bytes()
+    assert data != jpeg
+    # rendered at 3x zoom
+    assert Image.open(BytesIO(data)).size == (300, 225)
+
+
+@pytest.mark.parametrize('rotate, text', [(90, None), (0, 'caption over the image')])
+def test_transformed_or_covered_image_is_rendered(tmp_path, jpeg, rotate, text):
+    page = make_page(jpeg, rotate=rotate, text=text)
+    image_infos = page.get_image_info(xrefs=True)
+    bbox = tuple(image_infos[0]['bbox'])
+    assert embedded_image_for_clip(page, bbox, image_infos) is None
+
+    paths = cut_images([(bbox, 'images')], 0, page, FileBasedDataWriter(str(tmp_path)))
+    assert (tmp_path / paths[0]).read_bytes() != jpeg
+
+
+def test_images_with_alpha_are_not_extracted():
+    page = make_page(image_bytes('PNG', 'RGBA'))
+    xref = page.get_image_info(xrefs=True)[0]['xref']
+    assert extract_embedded_image(page.parent, xref) is None
+
+
+def test_extraction_can_be_turned_off(tmp_path, jpeg):
+    page = make_page(jpeg)
+    paths = cut_images([(IMAGE_RECT, 'images')], 0, page, FileBasedDataWriter(str(tmp_path)), extract_embedded=False)
+    assert (tmp_path / paths[0]).read_bytes() != jpeg
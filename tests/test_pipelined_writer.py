@@ -0,0 +1,123 @@
+import threading
+import time
+from io import BytesIO
+
+import fitz
+import numpy as np
+import pytest
+from PIL import Image
+
+from magic_pdf.data.data_reader_writer import DataWriter, FileBasedDataWriter
+from magic_pdf.data.data_reader_writer.pipelined import PipelinedDataWriter
+from magic_pdf.libs.pdf_image_tools import cut_image, cut_image_path, cut_images
+
+CLIPS = [((50, 50, 250, 150), 'images'), ((300, 200, 550, 400), 'tables'), ((50, 500, 550, 700), 'images')]
+
+
+class SlowWriter(DataWriter):
+    """Records the writes and how many ran at the same time"""
+
+    def __init__(self, delay=0.02):
+        self.delay = delay
+        self.files = {}
+        self.running = 0
+        self.max_running = 0
+        self.lock = threading.Lock()
+
+    def write(self, path, data):
+        with self.lock:
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+        time.sleep(self.delay)
+        with self.lock:
+            self.running -= 1
+            self.files[path] = data
+
+
+@pytest.fixture
+def page():
+    doc = fitz.open()
+    page = doc.new_page(width=600, height=800)
+    page.draw_rect(fitz.Rect(60, 60, 240, 140), color=(0, 0, 1), fill=(1, 0.8, 0))
+    page.insert_text((320, 260), 'a table cell', fontsize=14)
+    page.draw_line((300, 300), (550, 300))
+    page.draw_circle((300, 600), 80, fill=(0, 0.5, 0.2))
+    yield page
+    doc.close()
+
+
+def test_writes_run_in_threads_and_are_all_done_after_close():
+    writer = SlowWriter()
+    threads = set()
+
+    def make_data(i):
+        threads.add(threading.current_thread().name)
+        return str(i).encode()
+
+    with PipelinedDataWriter(writer, num_workers=4, max_in_flight=16) as pipelined:
+        for i in range(20):
+            pipelined.submit(f'{i}.txt', lambda i=i: make_data(i))
+        pipelined.write('plain.txt', b'plain')
+    assert writer.files == {**{f'{i}.txt': str(i).encode() for i in range(20)}, 'plain.txt': b'plain'}
+    assert writer.max_running > 1
+    assert all(name.startswith('data_writer') for name in threads)
+
+
+def test_pending_writes_are_bounded():
+    writer = SlowWriter(delay=0.01)
+    created = []
+    with PipelinedDataWriter(writer, num_workers=4, max_in_flight=2) as pipelined:
+        for i in range(10):
+            pipelined.submit(f'{i}.bin', lambda: b'x')
+            created.append(len(writer.files))
+    # submitting waits for a free slot, at most two writes are not finished after every submit
+    assert all(i + 1 - done <= 2 for i, done in enumerate(created))
+    assert writer.max_running <= 2
+    assert len(writer.files) == 10
+
+
+def test_flush_raises_the_first_failure_and_the_writer_stays_usable():
+    writer = SlowWriter(delay=0)
+    pipelined = PipelinedDataWriter(writer, num_workers=1)
+
+    def fail(message):
+        raise OSError(message)
+
+    pipelined.submit('a', lambda: fail('first'))
+    pipelined.submit('b', lambda: b'b')
+    pipelined.submit('c', lambda: fail('second'))
+    with pytest.raises(OSError, match='first'):
+        pipelined.flush()
+    assert writer.files == {'b': b'b'}
+
+    pipelined.write('d', b'd')
+    pipelined.close()
+    assert writer.files == {'b': b'b', 'd': b'd'}
+
+
+@pytest.mark.parametrize('pipelined', [False, True])
+def test_cut_images_renders_the_pixels_of_cut_image(page, tmp_path, pipelined):
+    expected_dir = tmp_path / 'one_by_one'
+    expected_writer = FileBasedDataWriter(str(expected_dir))
+    expected_paths = [cut_image(bbox, 3, page, return_path, expected_writer) for bbox, return_path in CLIPS]
+
+    writer = FileBasedDataWriter(str(tmp_path / 'together'))
+    if pipelined:
+        with PipelinedDataWriter(writer) as pipelined_writer:
+            paths = cut_images(CLIPS, 3, page, pipelined_writer)
+    else:
+        paths = cut_images(CLIPS, 3, page, writer)
+
+    assert paths == expected_paths == [cut_image_path(bbox, 3, return_path) for bbox, return_path in CLIPS]
+    for (bbox, _), path in zip(CLIPS, paths):
+        image = Image.open(BytesIO((tmp_path / 'together' / path).read_bytes()))
+        assert image.format == 'JPEG'
+        pix = page.get_pixmap(clip=fitz.Rect(*bbox), matrix=fitz.Matrix(3, 3))
+        assert image.size == (pix.width, pix.height)
+        # both are jpegs of the same pixels, only the encoders differ
+        rendered = np.frombuffer(pix.samples, dtype=np.uint8).reshape(pix.height, pix.width, pix.n)
+        assert np.abs(np.asarray(image, dtype=int) - rendered[:, :, :3].astype(int)).mean() < 2
+
+
+def test_cut_images_without_clips(page):
+    assert cut_images([], 0, page, SlowWriter()) == []
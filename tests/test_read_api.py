@@ -0,0 +1,144 @@
+import json
+import threading
+import time
+
+import fitz
+import pytest
+
+from magic_pdf.config.exceptions import EmptyData
+from magic_pdf.data import read_api
+from magic_pdf.data.read_api import (_iter_prefetched, iter_jsonl,
+                                     iter_local_images, iter_local_pdfs,
+                                     read_jsonl, read_local_pdfs)
+
+
+def write_pdf(path, pages):
+    doc = fitz.open()
+    for i in range(pages):
+        doc.new_page().insert_text((72, 72), f'{path.stem} page {i}')
+    doc.save(path)
+    doc.close()
+
+
+@pytest.fixture
+def pdf_dir(tmp_path):
+    for i in range(4):
+        write_pdf(tmp_path / f'doc{i}.pdf', i + 1)
+    (tmp_path / 'notes.txt').write_text('not a pdf')
+    return tmp_path
+
+
+def first_text(dataset):
+    return dataset.get_doc()[0].get_text().strip()
+
+
+def prefetch_threads():
+    return [thread for thread in threading.enumerate() if thread.name == 'dataset_prefetch']
+
+
+def wait_for(condition, timeout=2.0):
+    deadline = time.time() + timeout
+    while not condition() and time.time() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+@pytest.mark.parametrize('prefetch', [0, 2])
+def test_pdfs_are_yielded_one_at_a_time_and_closed_after_use(pdf_dir, prefetch):
+    seen = []
+    lengths = []
+    for dataset in iter_local_pdfs(str(pdf_dir), prefetch=prefetch):
+        for previous in seen:
+            assert previous.get_doc().is_closed
+        assert not dataset.get_doc().is_closed
+        seen.append(dataset)
+        lengths.append(len(dataset))
+    assert sorted(lengths) == [1, 2, 3, 4]
+    assert all(dataset.get_doc().is_closed for dataset in seen)
+
+
+def test_read_local_pdfs_keeps_the_datasets_open(pdf_dir):
+    datasets = read_local_pdfs(str(pdf_dir))
+    assert sorted(len(dataset) for dataset in datasets) == [1, 2, 3, 4]
+    for dataset in datasets:
+        with dataset:
+            assert first_text(dataset).endswith('page 0')
+        assert dataset.get_doc().is_closed
+
+    [dataset] = read_local_pdfs(str(pdf_dir / 'doc2.pdf'))
+    assert len(dataset) == 3
+
+
+def test_prefetch_is_bounded():
+    loaded = []
+    consumed = []
+
+    def load(item):
+        loaded.append(item)
+        return item
+
+    for item in _iter_prefetched(range(20), load, prefetch=2):
+        # the loader may be one item ahead of the queue, waiting to put it
+        assert wait_for(lambda: len(loaded) >= min(len(consumed) + 3, 20))
+        time.sleep(0.02)
+        assert len(loaded) <= len(consumed) + 1 + 2 + 1
+        consumed.append(item)
+    assert consumed == list(range(20))
+
+
+def test_load_errors_are_raised_in_order():
+    def load(item):
+        if item == 2:
+            raise OSError('unreadable')
+        return item
+
+    items = _iter_prefetched(range(5), load, prefetch=2)
+    assert next(items) == 0
+    assert next(items) == 1
+    with pytest.raises(OSError, match='unreadable'):
+        next(items)
+
+
+def test_leaving_early_stops_the_prefetch_thread():
+    items = _iter_prefetched(range(1000), lambda item: item, prefetch=2)
+    assert next(items) == 0
+    assert prefetch_threads()
+    items.close()
+    assert wait_for(lambda: not prefetch_threads())
+
+
+def test_jsonl_with_page_ids(pdf_dir, tmp_path):
+    jsonl = tmp_path / 'docs.jsonl'
+    jsonl.write_text('\n'.join([
+        json.dumps({'file_location': str(pdf_dir / 'doc3.pdf'), 'page_ids': [3, 1]}),
+        '',
+        json.dumps({'path': str(pdf_dir / 'doc1.pdf')}),
+    ]))
+
+    texts = [[page.get_text().strip() for page in dataset.get_doc()] for dataset in iter_jsonl(str(jsonl))]
+    assert texts == [['doc3 page 3', 'doc3 page 1'], ['doc1 page 0', 'doc1 page 1']]
+    assert [len(dataset) for dataset in read_jsonl(str(jsonl))] == [2, 2]
+
+    jsonl.write_text(json.dumps({'file_location': ''}))
+    with pytest.raises(EmptyData):
+        iter_jsonl(str(jsonl))
+
+
+def test_images(tmp_path):
+    for i in range(3):
+        fitz.Pixmap(fitz.csRGB, fitz.IRect(0, 0, 8 + i, 8), False).save(tmp_path / f'{i}.png')
+    widths = [dataset.get_page(0).get_page_info().w for dataset in iter_local_images(str(tmp_path))]
+    assert len(set(widths)) == 3
+
+
+def test_files_are_read_on_the_prefetch_thread(pdf_dir, monkeypatch):
+    threads = set()
+    read = read_api.FileBasedDataReader.read
+
+    def recording_read(self, path):
+        threads.add(threading.current_thread().name)
+        return read(self, path)
+
+    monkeypatch.setattr(read_api.FileBasedDataReader, 'read', recording_read)
+    assert len(list(iter_local_pdfs(str(pdf_dir)))) == 4
+    assert threads == {'dataset_prefetch'}
@@ -0,0 +1,104 @@
+"""Range reads of s3 pdfs, against moto's in-process s3 (pip install moto)."""
+import json
+import os
+
+import fitz
+import pytest
+
+moto = pytest.importorskip('moto')
+
+from magic_pdf.data.data_reader_writer import MultiBucketS3DataReader  # noqa: E402
+from magic_pdf.data.io import s3 as s3_io  # noqa: E402
+from magic_pdf.data.read_api import read_jsonl, read_s3_pdf  # noqa: E402
+from magic_pdf.data.schemas import S3Config  # noqa: E402
+
+BUCKET = 'docs'
+ENDPOINT = 'https://s3.amazonaws.com'
+PAGES = 12
+
+
+def make_pdf(pages: int) -> bytes:
+    # a noise image per page, so that every page has its own large object
+    doc = fitz.open()
+    for i in range(pages):
+        page = doc.new_page()
+        page.insert_text((72, 72), f'page {i}')
+        pix = fitz.Pixmap(fitz.csRGB, 256, 256, os.urandom(256 * 256 * 3), False)
+        page.insert_image(fitz.Rect(72, 100, 328, 356), pixmap=pix)
+    bits = doc.tobytes()
+    doc.close()
+    return bits
+
+
+@pytest.fixture
+def s3(monkeypatch):
+    monkeypatch.setenv('AWS_DEFAULT_REGION', 'us-east-1')
+    monkeypatch.setattr(s3_io, '_s3_clients', {})
+    with moto.mock_aws():
+        client = s3_io.get_s3_client('ak', 'sk', ENDPOINT)
+        client.create_bucket(Bucket=BUCKET)
+        pdf = make_pdf(PAGES)
+        client.put_object(Bucket=BUCKET, Key='doc.pdf', Body=pdf)
+        reader = MultiBucketS3DataReader(
+            BUCKET, [S3Config(bucket_name=BUCKET, access_key='ak', secret_key='sk', endpoint_url=ENDPOINT)]
+        )
+        yield reader, client, pdf
+
+
+def test_range_file_reads_the_object(s3):
+    reader, _, pdf = s3
+    with reader.open(f's3://{BUCKET}/doc.pdf', block_size=1024) as f:
+        assert len(f) == len(pdf)
+        f.seek(5000)
+        assert f.read(3000) == pdf[5000:8000]
+        f.seek(-100, os.SEEK_END)
+        assert f.read() == pdf[-100:]
+        f.seek(0)
+        assert f.read() == pdf
+        # the blocks read twice come from the cache
+        assert f.bytes_fetched < 2 * len(pdf)
+
+
+def test_read_pages_fetches_only_their_ranges(s3):
+    reader, _, pdf = s3
+    opened = []
+    open_file = reader.open
+
+    def spy(path, **kwargs):
+        opened.append(open_file(path, **kwargs))
+        return opened[-1]
+
+    reader.open = spy
+    dataset = read_s3_pdf(f's3://{BUCKET}/doc.pdf', reader, page_ids=[7, 2])
+    assert len(dataset) == 2
+    assert [dataset.get_doc()[i].get_text().strip() for i in range(2)] == ['page 7', 'page 2']
+    assert opened[0].bytes_fetched < len(pdf) / 2
+
+
+def test_read_pages_without_pypdf_has_the_same_pages(s3, monkeypatch):
+    reader, _, _ = s3
+
+    def fail(*args, **kwargs):
+        raise RuntimeError('unreadable')
+
+    monkeypatch.setattr('magic_pdf.data.utils.pypdf.PdfReader', fail)
+    dataset = read_s3_pdf(f's3://{BUCKET}/doc.pdf', reader, page_ids=[7, 2])
+    assert [dataset.get_doc()[i].get_text().strip() for i in range(len(dataset))] == ['page 7', 'page 2']
+
+
+def test_read_pages_not_in_the_pdf(s3):
+    reader, _, _ = s3
+    with pytest.raises(ValueError):
+        read_s3_pdf(f's3://{BUCKET}/doc.pdf', reader, page_ids=[PAGES])
+
+
+def test_read_jsonl_pages(s3):
+    reader, client, _ = s3
+    lines = [
+        {'file_location': f's3://{BUCKET}/doc.pdf', 'page_ids': [0, 11]},
+        {'file_location': f's3://{BUCKET}/doc.pdf'},
+    ]
+    client.put_object(Bucket=BUCKET, Key='docs.jsonl', Body='\n'.join(json.dumps(d) for d in lines).encode())
+    datasets = read_jsonl(f's3://{BUCKET}/docs.jsonl', reader)
+    assert [len(ds) for ds in datasets] == [2, PAGES]
+    assert datasets[0].get_doc()[1].get_text().strip() == 'page 11'
@@ -0,0 +1,131 @@
+import os
+import threading
+import time
+
+import pytest
+
+moto = pytest.importorskip('moto')
+
+from api import s3_utils  # noqa: E402
+from api.s3_utils import S3Client  # noqa: E402
+
+BUCKET = 'results'
+
+
+@pytest.fixture
+def s3_env(monkeypatch):
+    monkeypatch.setenv('S3_BUCKET_NAME', BUCKET)
+    monkeypatch.setenv('AWS_REGION', 'us-east-1')
+    monkeypatch.setenv('AWS_ACCESS_KEY_ID', 'ak')
+    monkeypatch.setenv('AWS_SECRET_ACCESS_KEY', 'sk')
+    monkeypatch.setenv('S3_UPLOAD_CONCURRENCY', '4')
+    monkeypatch.setenv('S3_UPLOAD_RETRIES', '2')
+    monkeypatch.delenv('S3_ENDPOINT_URL', raising=False)
+    monkeypatch.delenv('S3_PUBLIC_URL', raising=False)
+    return monkeypatch
+
+
+@pytest.fixture
+def s3_client(s3_env):
+    with moto.mock_aws():
+        client = S3Client()
+        client.s3_client.create_bucket(Bucket=BUCKET)
+        yield client
+        client.close()
+
+
+@pytest.fixture
+def files(tmp_path):
+    paths = []
+    for i in range(20):
+        path = tmp_path / f'{i}.jpg'
+        path.write_bytes(os.urandom(1000 + i))
+        paths.append(str(path))
+    return paths
+
+
+def test_files_are_uploaded_in_parallel(s3_client, files, monkeypatch):
+    running = []
+    max_running = [0]
+    lock = threading.Lock()
+    upload_file = s3_client.upload_file
+
+    def slow_upload_file(*args):
+        with lock:
+            running.append(threading.current_thread().name)
+            max_running[0] = max(max_running[0], len(running))
+        time.sleep(0.02)
+        try:
+            return upload_file(*args)
+        finally:
+            with lock:
+                running.pop()
+
+    monkeypatch.setattr(s3_client, 'upload_file', slow_upload_file)
+    uploads = [(path, f'parsed/{os.path.basename(path)}', {'task': 'parse'}) for path in files]
+    size = s3_client.upload_files(uploads)
+
+    assert size == sum(os.path.getsize(path) for path in files)
+    assert 1 < max_running[0] <= 4
+    for path, key, _ in uploads:
+        obj = s3_client.s3_client.get_object(Bucket=BUCKET, Key=key)
+        with open(path, 'rb') as f:
+            assert obj['Body'].read() == f.read()
+        assert obj['Metadata'] == {'task': 'parse'}
+    assert s3_client.upload_files([]) == 0
+
+
+def test_failed_files_are_retried(s3_client, files, monkeypatch):
+    monkeypatch.setattr(s3_utils.time, 'sleep', lambda delay: None)
+    failures = {files[0]: 2, files[1]: 5}
+    upload_file = s3_client.upload_file
+
+    def flaky_upload_file(file_path, s3_key, metadata=None):
+        if failures.get(file_path, 0) > 0:
+            failures[file_path] -= 1
+            raise ConnectionResetError('connection reset')
+        return upload_file(file_path, s3_key, metadata)
+
+    monkeypatch.setattr(s3_client, 'upload_file', flaky_upload_file)
+    s3_client.upload_files([(files[0], 'parsed/a.jpg', None)])
+    assert failures[files[0]] == 0
+    assert s3_client.check_object_exists('parsed/a.jpg')
+
+    # S3_UPLOAD_RETRIES=2 gives up after three attempts, the other files are still uploaded
+    with pytest.raises(ConnectionResetError):
+        s3_client.upload_files([(files[1], 'parsed/b.jpg', None), (files[2], 'parsed/c.jpg', None)])
+    assert failures[files[1]] == 2
+    assert not s3_client.check_object_exists('parsed/b.jpg')
+    assert s3_client.check_object_exists('parsed/c.jpg')
+
+
+def test_missing_file_raises(s3_client, tmp_path):
+    with pytest.raises(OSError):
+        s3_client.upload_files([(str(tmp_path / 'missing.jpg'), 'parsed/missing.jpg', None)])
+
+
+def test_close_stops_the_threads_and_a_later_upload_starts_them_again(s3_client, files):
+    s3_client.upload_files([(files[0], 'parsed/a.jpg', None)])
+    s3_client.close()
+    assert s3_client._upload_executor is None
+    s3_client.upload_files([(files[1], 'parsed/b.jpg', None)])
+    assert s3_client.check_object_exists('parsed/b.jpg')
+
+
+def test_presigned_urls_in_bulk(s3_client):
+    keys = [f'parsed/{i}.jpg' for i in range(5)]
+    urls = s3_client.generate_presigned_urls(keys, expiration=600)
+    assert list(urls) == keys
+    for key, url in urls.items():
+        assert url.split('?')[0] == s3_client.generate_presigned_url(key, expiration=600).split('?')[0]
+        assert url.split('?')[0].endswith(f'/{key}')
+    assert s3_client.generate_presigned_urls([]) == {}
+
+
+def test_presigned_urls_use_the_public_url(s3_env):
+    s3_env.setenv('S3_ENDPOINT_URL', 'http://minio:9000')
+    s3_env.setenv('S3_PUBLIC_URL', 'https://files.example.com/')
+    client = S3Client()
+    urls = client.generate_presigned_urls(['parsed/a.jpg'])
+    assert urls['parsed/a.jpg'].startswith('https://files.example.com/results/parsed/a.jpg?')
+    assert urls['parsed/a.jpg'].split('?')[0] == client.generate_presigned_url('parsed/a.jpg').split('?')[0]
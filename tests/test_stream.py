@@ -0,0 +1,230 @@
+import json
+import os
+
+import fitz
+import pytest
+import torch
+
+from magic_pdf.config.enums import SupportedPdfParseMethod
+from magic_pdf.data.data_reader_writer import FileBasedDataWriter
+from magic_pdf.data.dataset import PymuDocDataset
+from magic_pdf.model import batch_analyze_llm
+from magic_pdf.model.batch_analyze_llm import BatchAnalyzeLLM
+from magic_pdf.operators.pipes_llm import PipeResultLLM, page_content
+from magic_pdf.pdf_parse_union_core_v2_llm import pdf_parse_union, shutdown_page_pools
+
+PAGE_W, PAGE_H = 600, 800
+NUM_PAGES = 4
+
+
+class FakeLogits:
+    def __init__(self, logits):
+        self.logits = logits
+
+
+class FakeLayoutReader:
+    """Reads the lines in input order"""
+
+    device = torch.device('cpu')
+    dtype = torch.float32
+
+    def __call__(self, bbox, attention_mask, input_ids):
+        size = bbox.shape[1]
+        logits = torch.diag(torch.ones(size - 1), -1)
+        return FakeLogits(logits.expand(bbox.shape[0], size, size))
+
+
+class FakeModel:
+    device = 'cpu'
+
+    def __init__(self):
+        self.layoutreader_model = FakeLayoutReader()
+
+
+def model_page(page_no):
+    layout_dets = [
+        {'category_id': 0, 'bbox': [60, 40, 540, 70], 'score': 0.95},
+        {'category_id': 15, 'bbox': [60, 45, 300, 65], 'score': 0.95, 'text': f'Title {page_no}'},
+        {'category_id': 3, 'bbox': [100, 400, 500, 600], 'score': 0.9},
+    ]
+    for i in range(2):
+        top = 100 + i * 80
+        layout_dets.append({'category_id': 1, 'bbox': [60, top, 540, top + 60], 'score': 0.9})
+        for j in range(2):
+            layout_dets.append({
+                'category_id': 15, 'bbox': [60, top + j * 30, 540, top + j * 30 + 20], 'score': 0.9,
+                'text': f'page {page_no} block {i} line {j}',
+            })
+    return {'layout_dets': layout_dets, 'page_info': {'page_no': page_no, 'width': PAGE_W, 'height': PAGE_H}}
+
+
+@pytest.fixture
+def dataset():
+    doc = fitz.open()
+    for i in range(NUM_PAGES):
+        page = doc.new_page(width=PAGE_W, height=PAGE_H)
+        page.draw_rect(fitz.Rect(120 + i * 10, 420, 480, 580), color=(0, 0, 1), fill=(i / NUM_PAGES, 0.5, 0))
+    dataset = PymuDocDataset(doc.tobytes())
+    doc.close()
+    yield dataset
+    dataset.close()
+
+
+@pytest.fixture(scope='module', autouse=True)
+def page_pools():
+    yield
+    shutdown_page_pools()
+
+
+@pytest.mark.parametrize('num_workers', [0, 2])
+def test_every_parsed_page_is_passed_on_in_order(dataset, tmp_path, num_workers):
+    seen = []
+
+    def on_page(page_id, page_info):
+        # the images of the page are written by the time it is passed on
+        for image_path in page_images(page_info):
+            assert (tmp_path / image_path).is_file()
+        seen.append((page_id, page_content(page_info, 'images')))
+
+    result = pdf_parse_union(
+        [model_page(i) for i in range(NUM_PAGES)], dataset, FileBasedDataWriter(str(tmp_path)),
+        SupportedPdfParseMethod.OCR, FakeModel(), num_workers=num_workers, page_ids=[0, 2, 3], on_page=on_page,
+    )
+
+    assert [page_id for page_id, _ in seen] == [0, 2, 3]
+    # the paragraphs of a page split on their own are those of the whole document
+    pdf_info = result['pdf_info']
+    for page_id, content in seen:
+        assert content == page_content(pdf_info[page_id], 'images')
+        assert f'page {page_id} block 1 line 1' in content['markdown']
+    pipe_result = PipeResultLLM(result, dataset)
+    assert [item for _, content in seen for item in content['content_list']] == pipe_result.get_content_list('images')
+    assert '\n\n'.join(content['markdown'] for _, content in seen) == pipe_result.get_markdown('images')
+
+
+def page_images(page_info):
+    return [
+        span['image_path'] for block in page_info['preproc_blocks'] for sub_block in block.get('blocks', [])
+        for line in sub_block.get('lines', []) for span in line['spans'] if span.get('image_path')
+    ]
+
+
+def test_recognition_progress_is_reported_in_chunks(monkeypatch):
+    monkeypatch.setattr(batch_analyze_llm, 'RECOGNITION_PROGRESS_CHUNK', 4)
+    calls = []
+
+    def infer(images, messages):
+        calls.append(len(images))
+        return [f'{image}:{message}' for image, message in zip(images, messages)]
+
+    progress = []
+    batch_model = BatchAnalyzeLLM(model=None, progress=lambda *stage: progress.append(stage))
+    images = list(range(10))
+    messages = [f'm{i}' for i in images]
+    assert batch_model._batch_inference(infer, images, messages) == [f'{i}:m{i}' for i in images]
+    assert calls == [4, 4, 2]
+    assert progress == [('recognized', 4, 10), ('recognized', 8, 10), ('recognized', 10, 10)]
+
+    progress.clear()
+    assert batch_model._batch_inference(infer, [], []) == []
+    assert progress == [('recognized', 0, 0)]
+
+    # without a progress callback the regions go to the model at once
+    calls.clear()
+    BatchAnalyzeLLM(model=None)._batch_inference(infer, images, messages)
+    assert calls == [10]
+
+
+@pytest.fixture
+def api_main(tmp_path, monkeypatch):
+    import api.main
+    from api.admission import AdmissionController
+
+    monkeypatch.setattr(api.main, 'downloads_dir', str(tmp_path / 'downloads'))
+    monkeypatch.setattr(api.main, 's3_client', None)
+    monkeypatch.setattr(api.main, 'monkey_ocr_model', object())
+    monkeypatch.setattr(api.main, 'admission', AdmissionController(
+        max_queued_pages=0, max_pages_per_request=0, slots=1
+    ))
+    return api.main
+
+
+EVENTS = [
+    {'event': 'stage', 'stage': 'rendered', 'done': 2, 'total': 2},
+    {'event': 'stage', 'stage': 'layout', 'done': 2, 'total': 2},
+    {'event': 'stage', 'stage': 'recognized', 'done': 5, 'total': 5},
+    {'event': 'page', 'page_idx': 0, 'done': 1, 'total': 2, 'markdown': '# Title', 'content_list': []},
+    {'event': 'page', 'page_idx': 1, 'done': 2, 'total': 2, 'markdown': 'text', 'content_list': []},
+]
+
+
+def fake_parse_pdf(input_file, output_dir, MonkeyOCR_model, page_markers, overlays, overlay_executor,
+                   overlay_done, pages, on_event):
+    """Emits the events of a two page parse and writes its Markdown"""
+    for event in EVENTS:
+        on_event(event)
+    result_dir = os.path.join(output_dir, 'doc')
+    os.makedirs(result_dir)
+    with open(os.path.join(result_dir, 'doc.md'), 'w', encoding='utf-8') as f:
+        f.write('# Title\n\ntext')
+    return result_dir
+
+
+def post_stream(api_main, fields=()):
+    from fastapi.testclient import TestClient
+
+    doc = fitz.open()
+    doc.new_page()
+    doc.new_page()
+    files = {'file': ('report.pdf', doc.tobytes(), 'application/pdf')}
+    doc.close()
+    return TestClient(api_main.app).post('/parse/stream', data=dict(fields), files=files)
+
+
+@pytest.mark.parametrize('stream_format', ['sse', 'ndjson'])
+def test_stream_sends_the_events_then_the_result(api_main, monkeypatch, stream_format):
+    monkeypatch.setattr(api_main, 'parse_pdf', fake_parse_pdf)
+    response = post_stream(api_main, {'format': stream_format})
+    assert response.status_code == 200
+    assert response.headers['content-type'].startswith(api_main.STREAM_FORMATS[stream_format])
+
+    if stream_format == 'sse':
+        messages = [message for message in response.text.split('\n\n') if message]
+        names = [message.split('\n')[0] for message in messages]
+        events = [json.loads(message.split('\n')[1][len('data: '):]) for message in messages]
+        assert names == [f"event: {event['event']}" for event in events]
+    else:
+        events = [json.loads(line) for line in response.text.splitlines()]
+    assert events[:-1] == EVENTS
+    result = events[-1]
+    assert result['event'] == 'result' and result['success']
+    assert result['files'] == ['doc.md']
+    assert result['download_url'].startswith('/download/zip/')
+
+
+def test_failed_parse_ends_the_stream_with_an_error(api_main, monkeypatch):
+    def failing_parse_pdf(*args):
+        on_event = args[-1]
+        on_event(EVENTS[0])
+        raise RuntimeError('model crashed')
+
+    monkeypatch.setattr(api_main, 'parse_pdf', failing_parse_pdf)
+    response = post_stream(api_main, {'format': 'ndjson'})
+    events = [json.loads(line) for line in response.text.splitlines()]
+    assert events == [EVENTS[0], {'event': 'error', 'detail': 'Parsing failed: model crashed'}]
+    # the pages of the failed parse are released
+    snapshot = api_main.admission.snapshot()
+    assert snapshot['queued_pages'] == snapshot['running_pages'] == 0
+
+
+def test_stream_rejects_bad_fields_before_parsing(api_main, monkeypatch):
+    monkeypatch.setattr(api_main, 'parse_pdf', pytest.fail)
+    assert post_stream(api_main, {'format': 'xml'}).status_code == 400
+    assert post_stream(api_main, {'pages': '3-1'}).status_code == 400
+
+
+def test_stream_event_formats(api_main):
+    event = {'event': 'page', 'page_idx': 0, 'markdown': 'é'}
+    assert api_main.format_stream_event(event, 'ndjson') == (json.dumps(event, ensure_ascii=False) + '\n').encode()
+    assert api_main.format_stream_event(event, 'sse') == \
+        f'event: page\ndata: {json.dumps(event, ensure_ascii=False)}\n\n'.encode()
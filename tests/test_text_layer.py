@@ -0,0 +1,139 @@
+import copy
+import random
+
+import pytest
+
+from magic_pdf.libs.boxbase import calculate_iou
+from magic_pdf.pdf_parse_union_core_v2_llm import (calculate_char_in_span,
+                                                   chars_to_content,
+                                                   fill_char_in_spans)
+from magic_pdf.pre_proc.ocr_span_list_modify import check_chars_is_overlap_in_span
+
+
+def scan_check_chars_is_overlap_in_span(chars):
+    """check_chars_is_overlap_in_span before the x0 sort, every pair is tested"""
+    for i in range(len(chars)):
+        for j in range(i + 1, len(chars)):
+            if calculate_iou(chars[i]['bbox'], chars[j]['bbox']) > 0.35:
+                return True
+    return False
+
+
+def index_chars_to_content(span):
+    """chars_to_content before the equal center runs, with its list.index lookup"""
+    if len(span['chars']) == 0:
+        pass
+    elif scan_check_chars_is_overlap_in_span(span['chars']):
+        pass
+    else:
+        span['chars'] = sorted(span['chars'], key=lambda x: (x['bbox'][0] + x['bbox'][2]) / 2)
+        char_avg_width = sum([char['bbox'][2] - char['bbox'][0] for char in span['chars']]) / len(span['chars'])
+        content = ''
+        for char in span['chars']:
+            next_idx = span['chars'].index(char) + 1
+            char2 = span['chars'][next_idx] if next_idx < len(span['chars']) else None
+            if char2 and char2['bbox'][0] - char['bbox'][2] > char_avg_width * 0.25 and char['c'] != ' ' and char2['c'] != ' ':
+                content += f"{char['c']} "
+            else:
+                content += char['c']
+        span['content'] = content
+    del span['chars']
+
+
+def scan_fill_char_in_spans(spans, all_chars):
+    """fill_char_in_spans before the y sweep, every char is tested against every span"""
+    spans = sorted(spans, key=lambda x: x['bbox'][1])
+    for char in all_chars:
+        for span in spans:
+            if calculate_char_in_span(char['bbox'], span['bbox'], char['c']):
+                span['chars'].append(char)
+                break
+    empty_spans = []
+    for span in spans:
+        index_chars_to_content(span)
+        if len(span['content']) * span['height'] < span['width'] * 0.5:
+            empty_spans.append(span)
+        del span['height'], span['width']
+    return empty_spans
+
+
+def make_span(bbox):
+    return {'bbox': bbox, 'content': '', 'chars': [], 'height': bbox[3] - bbox[1], 'width': bbox[2] - bbox[0]}
+
+
+def random_page(seed):
+    """Spans in two columns, some overlapping in y, and chars on and around them with
+    duplicates, zero sizes, equal centers and line start and stop marks"""
+    rng = random.Random(seed)
+    spans = []
+    for row in range(30):
+        for x0 in (50, 320):
+            y0 = 40 + row * 18 + rng.choice([0, 0, 3, 9])
+            spans.append(make_span([x0 + rng.randint(0, 5), y0, x0 + rng.randint(150, 250), y0 + 12]))
+    rng.shuffle(spans)
+
+    chars = []
+    for span in spans:
+        x0, y0, x1, y1 = span['bbox']
+        x = x0 - 6
+        while x < x1 + 6:
+            w = rng.choice([0, 4, 5, 6])
+            dy = rng.choice([0, 0, 0, 2, 5])
+            chars.append({'c': rng.choice('abcxyz.,([ '), 'bbox': [x, y0 + dy, x + w, y1 + dy]})
+            if rng.random() < 0.05:
+                chars.append(copy.deepcopy(chars[-1]))
+            x += w + rng.choice([0, 1, 3])
+    rng.shuffle(chars)
+    return spans, chars
+
+
+def contents(spans):
+    return [(span['bbox'], span['content']) for span in sorted(spans, key=lambda span: span['bbox'])]
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_sweep_gives_the_full_scan_result(seed):
+    spans, chars = random_page(seed)
+    expected_spans = copy.deepcopy(spans)
+    expected_empty = scan_fill_char_in_spans(expected_spans, copy.deepcopy(chars))
+
+    empty = fill_char_in_spans(spans, chars)
+    assert contents(spans) == contents(expected_spans)
+    assert contents(empty) == contents(expected_empty)
+    assert any(span['content'] for span in spans)
+
+
+def test_chars_go_to_the_first_span_from_the_top():
+    upper = make_span([0, 0, 100, 20])
+    lower = make_span([0, 5, 100, 25])
+    other = make_span([200, 0, 300, 20])
+    chars = [
+        {'c': 'a', 'bbox': [10, 5, 15, 15]},
+        {'c': 'b', 'bbox': [20, 10, 25, 20]},
+        {'c': 'c', 'bbox': [210, 5, 215, 15]},
+        {'c': 'd', 'bbox': [500, 5, 505, 15]},
+    ]
+    fill_char_in_spans([lower, other, upper], chars)
+    assert (upper['content'], lower['content'], other['content']) == ('a b', '', 'c')
+
+
+def test_chars_to_content_with_equal_chars():
+    char = {'c': 'a', 'bbox': [0, 0, 4, 10]}
+    chars = [dict(char), {'c': 'b', 'bbox': [20, 0, 24, 10]}, dict(char), {'c': 'a', 'bbox': [1, 0, 3, 10]}]
+    for shuffled in (chars, chars[::-1]):
+        span = {'chars': copy.deepcopy(shuffled)}
+        expected = {'chars': copy.deepcopy(shuffled)}
+        chars_to_content(span)
+        index_chars_to_content(expected)
+        assert span == expected
+
+
+@pytest.mark.parametrize('seed', range(10))
+def test_overlap_check_matches_the_pair_scan(seed):
+    rng = random.Random(seed)
+    for _ in range(50):
+        chars = []
+        for _ in range(rng.randint(0, 12)):
+            x = rng.randint(0, 60)
+            chars.append({'bbox': [x, 0, x + rng.choice([0, 3, 6]), 10]})
+        assert check_chars_is_overlap_in_span(chars) == scan_check_chars_is_overlap_in_span(chars)
@@ -0,0 +1,188 @@
+import asyncio
+import os
+
+import fitz
+import pytest
+
+from api.uploads import (PdfHeadCheck, UploadRejected, form_bool,
+                         receive_upload, receive_uploads)
+
+BOUNDARY = 'testboundary'
+
+
+class FakeRequest:
+    """The parts of a Starlette request receive_uploads reads, the body comes in chunks"""
+
+    def __init__(self, body: bytes, chunk_size: int = 1024, content_length: bool = True):
+        self.headers = {'content-type': f'multipart/form-data; boundary={BOUNDARY}'}
+        if content_length:
+            self.headers['content-length'] = str(len(body))
+        self.body = body
+        self.chunk_size = chunk_size
+        self.chunks_read = 0
+
+    async def stream(self):
+        for start in range(0, len(self.body), self.chunk_size):
+            self.chunks_read += 1
+            yield self.body[start:start + self.chunk_size]
+
+    @property
+    def total_chunks(self):
+        return -(-len(self.body) // self.chunk_size)
+
+
+def multipart_body(parts):
+    body = b''
+    for name, value, filename in parts:
+        disposition = f'form-data; name="{name}"'
+        if filename is not None:
+            disposition += f'; filename="{filename}"'
+        body += f'--{BOUNDARY}\r\nContent-Disposition: {disposition}\r\n\r\n'.encode() + value + b'\r\n'
+    return body + f'--{BOUNDARY}--\r\n'.encode()
+
+
+def pdf_bytes(pages=2):
+    doc = fitz.open()
+    for i in range(pages):
+        doc.new_page().insert_text((72, 72), f'page {i}')
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+
+def linearized_head(pages, encrypted=False):
+    head = b'%PDF-1.7\n%\xe2\xe3\xcf\xd3\n'
+    head += f'1 0 obj\n<< /Linearized 1 /L 123456 /N {pages} /T 1000 >>\nendobj\n'.encode()
+    head += b'xref\n0 1\n0000000000 65535 f \ntrailer\n<< /Size 10'
+    if encrypted:
+        head += b' /Encrypt 5 0 R'
+    return head + b' >>\n' + b'0' * 4096
+
+
+def receive(request, **kwargs):
+    return asyncio.run(receive_upload(request, allowed_extensions={'.pdf', '.png'}, **kwargs))
+
+
+def test_valid_pdf_is_streamed_to_a_file(tmp_path):
+    data = pdf_bytes()
+    request = FakeRequest(multipart_body([
+        ('page_markers', b'true', None), ('file', data, 'doc.pdf'), ('overlays', b'layout', None),
+    ]))
+    upload, fields = receive(request, max_size=len(data), max_pages=2, dest_dir=str(tmp_path))
+    try:
+        assert upload.filename == 'doc.pdf'
+        assert upload.size == len(data)
+        assert os.path.dirname(upload.path) == str(tmp_path)
+        with open(upload.path, 'rb') as f:
+            assert f.read() == data
+        assert fields == {'page_markers': 'true', 'overlays': 'layout'}
+    finally:
+        upload.discard()
+    assert not os.path.exists(upload.path)
+
+
+def test_non_pdf_is_rejected_from_its_head(tmp_path):
+    request = FakeRequest(multipart_body([('file', b'<html>' + b'x' * 100000, 'doc.pdf')]))
+    with pytest.raises(UploadRejected) as e:
+        receive(request, dest_dir=str(tmp_path))
+    assert e.value.status_code == 400
+    assert 'not a PDF' in e.value.detail
+    assert request.chunks_read < request.total_chunks
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_oversize_body_is_rejected_while_it_arrives(tmp_path):
+    data = pdf_bytes() + b'%' * 100000
+    request = FakeRequest(multipart_body([('file', data, 'doc.pdf')]), content_length=False)
+    with pytest.raises(UploadRejected) as e:
+        receive(request, max_size=20000, dest_dir=str(tmp_path))
+    assert e.value.status_code == 413
+    assert request.chunks_read < request.total_chunks
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_declared_oversize_body_is_rejected_before_reading():
+    request = FakeRequest(multipart_body([('file', b'%PDF-' + b'0' * 200000, 'doc.pdf')]))
+    with pytest.raises(UploadRejected) as e:
+        receive(request, max_size=1000)
+    assert e.value.status_code == 413
+    assert request.chunks_read == 0
+
+
+def test_linearized_pdf_with_too_many_pages_is_rejected():
+    request = FakeRequest(multipart_body([('file', linearized_head(50) + b'0' * 100000, 'doc.pdf')]))
+    with pytest.raises(UploadRejected) as e:
+        receive(request, max_pages=10)
+    assert e.value.status_code == 413
+    assert request.chunks_read < request.total_chunks
+
+    # with a page selection before the file only the selected pages count
+    request = FakeRequest(multipart_body([('pages', b'1-5', None), ('file', linearized_head(50), 'doc.pdf')]))
+    upload, fields = receive(request, max_pages=10, page_field='pages')
+    upload.discard()
+    assert fields == {'pages': '1-5'}
+
+
+def test_other_rejections():
+    with pytest.raises(UploadRejected) as e:
+        receive(FakeRequest(multipart_body([('file', b'data', 'doc.exe')])))
+    assert e.value.status_code == 400
+
+    with pytest.raises(UploadRejected) as e:
+        receive(FakeRequest(multipart_body([('other', b'data', 'doc.pdf')])))
+    assert e.value.status_code == 400
+
+    request = FakeRequest(b'{}')
+    request.headers = {'content-type': 'application/json'}
+    with pytest.raises(UploadRejected) as e:
+        receive(request)
+    assert e.value.status_code == 415
+
+
+def test_several_files_and_their_total_size(tmp_path):
+    data = pdf_bytes()
+    body = multipart_body([('files', data, 'a.pdf'), ('files', b'\x89PNG image', 'b.png')])
+    uploads, _ = asyncio.run(receive_uploads(FakeRequest(body), 'files', dest_dir=str(tmp_path)))
+    assert [upload.filename for upload in uploads] == ['a.pdf', 'b.png']
+    assert len(list(tmp_path.iterdir())) == 2
+
+    for upload in uploads:
+        upload.discard()
+    with pytest.raises(UploadRejected) as e:
+        asyncio.run(receive_uploads(
+            FakeRequest(body, content_length=False), 'files', max_total_size=len(data) + 2, dest_dir=str(tmp_path)
+        ))
+    assert e.value.status_code == 413
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_pdf_head_check_fed_in_small_chunks():
+    check = PdfHeadCheck(max_pages=10)
+    head = b'garbage\n' + linearized_head(50)
+    with pytest.raises(UploadRejected) as e:
+        for i in range(0, len(head), 7):
+            check.feed(head[i:i + 7])
+    assert e.value.status_code == 413
+
+    check = PdfHeadCheck()
+    with pytest.raises(UploadRejected) as e:
+        check.feed(linearized_head(3, encrypted=True))
+    assert e.value.status_code == 400
+
+    # a pdf that is not linearized is checked once it is complete
+    check = PdfHeadCheck(max_pages=1)
+    check.feed(pdf_bytes(pages=5))
+
+
+@pytest.mark.parametrize('value, expected', [
+    (None, False), ('', False), ('true', True), (' Yes ', True), ('1', True), ('on', True),
+    ('false', False), ('0', False), ('no', False),
+])
+def test_form_bool(value, expected):
+    assert form_bool(value) is expected
+
+
+def test_form_bool_default():
+    assert form_bool(None, default=True) is True
+    assert form_bool('', default=True) is True
+    assert form_bool('off', default=True) is False
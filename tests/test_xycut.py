@@ -0,0 +1,116 @@
+import numpy as np
+import pytest
+
+from magic_pdf.model.sub_modules.reading_oreder.layoutreader.xycut import (
+    projection_by_bboxes, recursive_xy_cut, split_projection_profile, xy_cut,
+    xy_cut_order)
+
+
+def loop_projection_by_bboxes(boxes, axis):
+    """projection_by_bboxes before the difference array"""
+    length = np.max(boxes[:, axis::2])
+    res = np.zeros(length, dtype=int)
+    for start, end in boxes[:, axis::2]:
+        res[start:end] += 1
+    return res
+
+
+def stable_recursive_xy_cut(boxes, indices, res):
+    """recursive_xy_cut with stable argsorts, the reference of xy_cut when coordinates tie"""
+    _indices = boxes[:, 1].argsort(kind='stable')
+    y_sorted_boxes = boxes[_indices]
+    y_sorted_indices = indices[_indices]
+    pos_y = split_projection_profile(projection_by_bboxes(y_sorted_boxes, 1), 0, 1)
+    if not pos_y:
+        return
+    for r0, r1 in zip(*pos_y):
+        _indices = (r0 <= y_sorted_boxes[:, 1]) & (y_sorted_boxes[:, 1] < r1)
+        chunk_boxes = y_sorted_boxes[_indices]
+        chunk_indices = y_sorted_indices[_indices]
+        _indices = chunk_boxes[:, 0].argsort(kind='stable')
+        chunk_boxes = chunk_boxes[_indices]
+        chunk_indices = chunk_indices[_indices]
+        pos_x = split_projection_profile(projection_by_bboxes(chunk_boxes, 0), 0, 1)
+        if not pos_x:
+            continue
+        if len(pos_x[0]) == 1:
+            res.extend(chunk_indices)
+            continue
+        for c0, c1 in zip(*pos_x):
+            _indices = (c0 <= chunk_boxes[:, 0]) & (chunk_boxes[:, 0] < c1)
+            stable_recursive_xy_cut(chunk_boxes[_indices], chunk_indices[_indices], res)
+
+
+def page_boxes(seed, num_regions=6, unique=False):
+    """Lines of regions with 1 to 3 columns stacked down a page. With `unique`
+    no two boxes share an x0 or a y0, so every argsort has a single answer"""
+    rng = np.random.default_rng(seed)
+    boxes = []
+    top = 10
+    for _ in range(num_regions):
+        columns = int(rng.integers(1, 4))
+        rows = int(rng.integers(2, 12))
+        col_w = 900 // columns
+        for c in range(columns):
+            x0 = 20 + c * col_w + int(rng.integers(0, 10))
+            for r in range(rows):
+                y0 = top + r * 20 + int(rng.integers(0, 4))
+                boxes.append([x0, y0, x0 + col_w - 40 - int(rng.integers(0, 100)), y0 + 12])
+        top += rows * 20 + 30
+    boxes = np.array(boxes, dtype=int)
+    rng.shuffle(boxes)
+    if unique:
+        # spread the coordinates apart and break the ties with the position
+        n = len(boxes)
+        boxes = boxes * n
+        boxes[:, 0] += np.arange(n)
+        boxes[:, 1] += np.arange(n)
+    return boxes
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_projection_matches_the_per_box_loop(seed):
+    rng = np.random.default_rng(seed)
+    starts = rng.integers(0, 200, size=(50, 2))
+    sizes = rng.integers(0, 40, size=(50, 2))
+    boxes = np.concatenate([starts, starts + sizes], axis=1)
+    for axis in (0, 1):
+        assert np.array_equal(projection_by_bboxes(boxes, axis), loop_projection_by_bboxes(boxes, axis))
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_xy_cut_matches_recursive_xy_cut(seed):
+    boxes = page_boxes(seed, unique=True)
+    expected = []
+    recursive_xy_cut(boxes, np.arange(len(boxes)), expected)
+    assert xy_cut(boxes) == [int(i) for i in expected]
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_xy_cut_orders_ties_like_a_stable_sort(seed):
+    boxes = page_boxes(seed)
+    # aligned columns, every line of a column shares its x0
+    boxes[:, 0] -= boxes[:, 0] % 50
+    expected = []
+    stable_recursive_xy_cut(boxes, np.arange(len(boxes)), expected)
+    assert xy_cut(boxes) == [int(i) for i in expected]
+
+    indices = np.arange(len(boxes)) + 100
+    assert xy_cut(boxes, indices) == [int(i) + 100 for i in expected]
+
+
+def test_columns_are_read_one_after_the_other():
+    # the lines of a column touch, the only gaps of the band run between the columns
+    left = [[10, 10 + 20 * r, 400, 30 + 20 * r] for r in range(5)]
+    right = [[500, 10 + 20 * r, 900, 30 + 20 * r] for r in range(5)]
+    footer = [[10, 200, 900, 212]]
+    boxes = np.array(right + footer + left)
+    assert xy_cut(boxes) == [6, 7, 8, 9, 10, 0, 1, 2, 3, 4, 5]
+
+
+def test_xy_cut_order_keeps_boxes_xy_cut_drops():
+    boxes = np.array([[10, 50, 100, 60], [30, 30, 30, 30], [10, 10, 100, 20], [5, 70, 5, 80]])
+    assert xy_cut(boxes) == [2, 0]
+    assert xy_cut_order(boxes) == [2, 0, 1, 3]
+    assert xy_cut(np.zeros((0, 4), dtype=int)) == []
+    assert xy_cut_order([]) == []
@@ -0,0 +1,163 @@
+import io
+import json
+import os
+import time
+import zipfile
+
+import pytest
+
+from api.zip_stream import ZipStream, zip_members
+
+
+@pytest.fixture
+def result_dir(tmp_path):
+    root = tmp_path / 'result'
+    (root / 'images').mkdir(parents=True)
+    (root / 'doc.md').write_text('# Title\n' + 'text ' * 5000, encoding='utf-8')
+    (root / 'doc_content_list.json').write_text('[]', encoding='utf-8')
+    (root / 'doc_middle.json').write_text('{"pdf_info": []}', encoding='utf-8')
+    (root / 'doc_layout.pdf').write_bytes(b'%PDF-1.7 layout')
+    (root / 'notes.txt').write_text('notes', encoding='utf-8')
+    (root / 'images' / 'crop.jpg').write_bytes(os.urandom(300000))
+    return root
+
+
+def archive_names(members):
+    return sorted(name for _, name in members)
+
+
+def test_members_are_named_after_the_upload(result_dir):
+    members = zip_members(str(result_dir), 'report')
+    assert archive_names(members) == [
+        'images/report_crop.jpg', 'report.md', 'report_content_list.json', 'report_layout.pdf',
+        'report_middle.json', 'report_notes.txt',
+    ]
+    for file_path, _ in members:
+        assert os.path.isfile(file_path)
+
+    members = zip_members(str(result_dir), 'report', skip=[os.path.join('images', 'crop.jpg'), 'notes.txt'])
+    assert 'images/report_crop.jpg' not in archive_names(members)
+    assert 'report_notes.txt' not in archive_names(members)
+
+
+def test_stream_reads_back_as_a_zip(result_dir):
+    members = zip_members(str(result_dir), 'report')
+    stream = ZipStream(members, 'report.zip', chunk_size=64 * 1024)
+    chunks = list(stream)
+    data = b''.join(chunks)
+    # the archive is sent while the members are read, not in one piece at the end
+    assert len(chunks) > 3
+    assert stream.bytes_sent == len(data)
+    assert stream.time_to_first_byte is not None and stream.duration >= stream.time_to_first_byte
+
+    with zipfile.ZipFile(io.BytesIO(data)) as zipf:
+        assert zipf.testzip() is None
+        assert sorted(zipf.namelist()) == archive_names(members)
+        for file_path, name in members:
+            with open(file_path, 'rb') as f:
+                assert zipf.read(name) == f.read()
+        # compressed formats are stored, text is deflated
+        assert zipf.getinfo('images/report_crop.jpg').compress_type == zipfile.ZIP_STORED
+        assert zipf.getinfo('report.md').compress_type == zipfile.ZIP_DEFLATED
+        assert zipf.getinfo('report.md').compress_size < zipf.getinfo('report.md').file_size
+
+
+def test_empty_archive():
+    data = b''.join(ZipStream([]))
+    with zipfile.ZipFile(io.BytesIO(data)) as zipf:
+        assert zipf.namelist() == []
+
+
+@pytest.fixture
+def api_main(tmp_path, monkeypatch):
+    import api.main
+
+    monkeypatch.setattr(api.main, 'downloads_dir', str(tmp_path / 'downloads'))
+    monkeypatch.setattr(api.main, 's3_client', None)
+    return api.main
+
+
+def download(api_main, url):
+    from fastapi.testclient import TestClient
+
+    return TestClient(api_main.app).get(url)
+
+
+def test_local_zip_is_streamed_from_its_manifest(api_main, result_dir):
+    members = zip_members(str(result_dir), 'report')
+    url, key, uploaded = api_main.publish_archive(members, 'report.zip', 'report', 'report.pdf')
+    assert url.startswith('/download/zip/') and key is None and uploaded == 0
+
+    response = download(api_main, url)
+    assert response.status_code == 200
+    assert response.headers['content-type'] == 'application/zip'
+    assert 'report.zip' in response.headers['content-disposition']
+    with zipfile.ZipFile(io.BytesIO(response.content)) as zipf:
+        assert sorted(zipf.namelist()) == archive_names(members)
+
+    # two archives of the same name do not collide
+    other_url, _, _ = api_main.publish_archive(members[:1], 'report.zip', 'report', 'report.pdf')
+    assert other_url != url
+
+
+def test_expired_removed_or_unknown_zip_is_not_found(api_main, result_dir, monkeypatch):
+    members = zip_members(str(result_dir), 'report')
+    assert download(api_main, '/download/zip/not-an-id').status_code == 404
+
+    url = api_main.serve_zip_locally(members, 'report.zip', None)
+    manifest_path = os.path.join(api_main.downloads_dir, url.rsplit('/', 1)[1] + '.json')
+    with open(manifest_path, encoding='utf-8') as f:
+        manifest = json.load(f)
+    manifest['expires'] = time.time() - 1
+    with open(manifest_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f)
+    assert download(api_main, url).status_code == 404
+
+    url = api_main.serve_zip_locally(members, 'report.zip', None)
+    assert download(api_main, url).status_code == 200
+    os.unlink(result_dir / 'notes.txt')
+    assert download(api_main, url).status_code == 404
+
+
+@pytest.fixture
+def s3_client(monkeypatch):
+    moto = pytest.importorskip('moto')
+    from api.s3_utils import S3Client
+
+    monkeypatch.setenv('S3_BUCKET_NAME', 'results')
+    monkeypatch.setenv('AWS_REGION', 'us-east-1')
+    monkeypatch.setenv('AWS_ACCESS_KEY_ID', 'ak')
+    monkeypatch.setenv('AWS_SECRET_ACCESS_KEY', 'sk')
+    monkeypatch.delenv('S3_ENDPOINT_URL', raising=False)
+    with moto.mock_aws():
+        client = S3Client()
+        client.s3_client.create_bucket(Bucket='results')
+        yield client
+
+
+def test_stream_is_uploaded_in_parts(s3_client):
+    part_size = 5 * 1024 * 1024
+    chunks = [os.urandom(1024 * 1024) for _ in range(7)]
+    size = s3_client.upload_stream(iter(chunks), 'parsed/doc.zip', metadata={'task': 'parse'}, part_size=part_size)
+    assert size == 7 * 1024 * 1024
+
+    obj = s3_client.s3_client.get_object(Bucket='results', Key='parsed/doc.zip')
+    assert obj['Body'].read() == b''.join(chunks)
+    assert obj['Metadata'] == {'task': 'parse'}
+    # the etag of a multipart object ends with its part count
+    assert obj['ETag'].strip('"').endswith('-2')
+
+    # an empty stream is one empty part
+    assert s3_client.upload_stream(iter([]), 'parsed/empty.zip') == 0
+    assert s3_client.s3_client.get_object(Bucket='results', Key='parsed/empty.zip')['Body'].read() == b''
+
+
+def test_failed_stream_aborts_the_upload(s3_client):
+    def chunks():
+        yield os.urandom(6 * 1024 * 1024)
+        raise OSError('result file removed')
+
+    with pytest.raises(OSError):
+        s3_client.upload_stream(chunks(), 'parsed/doc.zip', part_size=5 * 1024 * 1024)
+    assert s3_client.s3_client.list_multipart_uploads(Bucket='results').get('Uploads', []) == []
+    assert s3_client.s3_client.list_objects_v2(Bucket='results').get('KeyCount') == 0
@@ -0,0 +1,171 @@
+from argparse import ArgumentParser
+from collections import defaultdict
+import time
+
+import numpy as np
+import torch
+
+from magic_pdf.model.sub_modules.reading_oreder.layoutreader.decoding import (
+    DECODE_MODES, decode_orders)
+from magic_pdf.model.sub_modules.reading_oreder.layoutreader.xycut import (
+    recursive_xy_cut, split_projection_profile, xy_cut)
+
+
+def legacy_parse_logits(logits, length):
+    """The list based conflict loop that `parse_logits` used before `decoding`."""
+    logits = logits[1 : length + 1, :length]
+    orders = logits.argsort(descending=False).tolist()
+    ret = [o.pop() for o in orders]
+    while True:
+        order_to_idxes = defaultdict(list)
+        for idx, order in enumerate(ret):
+            order_to_idxes[order].append(idx)
+        order_to_idxes = {k: v for k, v in order_to_idxes.items() if len(v) > 1}
+        if not order_to_idxes:
+            break
+        for order, idxes in order_to_idxes.items():
+            idxes_to_logit = {}
+            for idx in idxes:
+                idxes_to_logit[idx] = logits[idx, order]
+            idxes_to_logit = sorted(
+                idxes_to_logit.items(), key=lambda x: x[1], reverse=True
+            )
+            for idx, _ in idxes_to_logit[1:]:
+                ret[idx] = orders[idx].pop()
+    return ret
+
+
+def legacy_projection_by_bboxes(boxes, axis):
+    length = np.max(boxes[:, axis::2])
+    res = np.zeros(length, dtype=int)
+    for start, end in boxes[:, axis::2]:
+        res[start:end] += 1
+    return res
+
+
+def legacy_recursive_xy_cut(boxes, indices, res, kind='quicksort'):
+    """`recursive_xy_cut` with the per-box projection loop it used to have."""
+    _indices = boxes[:, 1].argsort(kind=kind)
+    y_sorted_boxes = boxes[_indices]
+    y_sorted_indices = indices[_indices]
+    pos_y = split_projection_profile(legacy_projection_by_bboxes(y_sorted_boxes, 1), 0, 1)
+    if not pos_y:
+        return
+    for r0, r1 in zip(*pos_y):
+        _indices = (r0 <= y_sorted_boxes[:, 1]) & (y_sorted_boxes[:, 1] < r1)
+        y_sorted_boxes_chunk = y_sorted_boxes[_indices]
+        y_sorted_indices_chunk = y_sorted_indices[_indices]
+        _indices = y_sorted_boxes_chunk[:, 0].argsort(kind=kind)
+        x_sorted_boxes_chunk = y_sorted_boxes_chunk[_indices]
+        x_sorted_indices_chunk = y_sorted_indices_chunk[_indices]
+        pos_x = split_projection_profile(legacy_projection_by_bboxes(x_sorted_boxes_chunk, 0), 0, 1)
+        if not pos_x:
+            continue
+        if len(pos_x[0]) == 1:
+            res.extend(x_sorted_indices_chunk)
+            continue
+        for c0, c1 in zip(*pos_x):
+            _indices = (c0 <= x_sorted_boxes_chunk[:, 0]) & (x_sorted_boxes_chunk[:, 0] < c1)
+            legacy_recursive_xy_cut(
+                x_sorted_boxes_chunk[_indices], x_sorted_indices_chunk[_indices], res, kind
+            )
+
+
+def fake_page_boxes(num_boxes, scale, rng):
+    """Lines of a page with regions of 1-4 columns, on a `scale` x `scale` grid."""
+    boxes = []
+    while len(boxes) < num_boxes:
+        columns = int(rng.integers(1, 5))
+        col_w = scale // columns
+        rows = int(rng.integers(5, 40))
+        for c in range(columns):
+            x0 = c * col_w + int(rng.integers(0, col_w // 10))
+            x1 = (c + 1) * col_w - int(rng.integers(col_w // 20, col_w // 5))
+            for r in range(rows):
+                w = max(x1 - int(rng.integers(0, col_w // 3)) - x0, 1)
+                boxes.append([x0, len(boxes), w, c])
+        boxes.append(None)
+    # stack the regions top to bottom and squeeze them into the page height
+    boxes = boxes[:num_boxes]
+    line_h = scale / (len(boxes) + 1)
+    ret = []
+    row = 0
+    for box in boxes:
+        if box is None:
+            row += 2
+            continue
+        x0, _, w, c = box
+        if c == 0:
+            row += 1
+        y0 = int(row * line_h) + int(rng.integers(0, max(int(line_h / 4), 1)))
+        ret.append([x0, y0, x0 + w, y0 + max(int(line_h * 3 / 4), 1)])
+    return np.array(ret, dtype=int)
+
+
+def fake_logits(length, noise, generator):
+    """Logits that prefer the identity order, blurred so that rows collide."""
+    size = length + 2
+    logits = torch.randn(size, size, generator=generator) * noise
+    logits[1 : length + 1, :length] += torch.eye(length) * 2.0
+    return logits
+
+
+def timeit(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        out = fn()
+    return (time.perf_counter() - start) / repeat, out
+
+
+if __name__ == '__main__':
+    parser = ArgumentParser()
+    parser.add_argument('--lengths', type=int, nargs='+', default=[200, 500])
+    parser.add_argument('--noise', type=float, default=1.5)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--xycut-boxes', type=int, nargs='+', default=[1000, 5000])
+    args = parser.parse_args()
+
+    generator = torch.Generator().manual_seed(args.seed)
+    for length in args.lengths:
+        logits = fake_logits(length, args.noise, generator)
+        legacy_time, legacy_orders = timeit(lambda: legacy_parse_logits(logits, length), args.repeat)
+        print(f'lines: {length}')
+        print(f'  legacy  : {legacy_time * 1000:9.2f} ms')
+        for mode in DECODE_MODES:
+            try:
+                cost, orders = timeit(lambda: decode_orders(logits, length, mode), args.repeat)
+            except ImportError as e:
+                print(f'  {mode:<8}: skipped ({e})')
+                continue
+            assert sorted(orders) == list(range(length)), f'{mode} is not a permutation'
+            same = 'identical' if orders == legacy_orders else 'differs'
+            print(f'  {mode:<8}: {cost * 1000:9.2f} ms ({same} to legacy)')
+
+    rng = np.random.default_rng(args.seed)
+    for num_boxes in args.xycut_boxes:
+        print(f'xycut boxes: {num_boxes}')
+        for scale in (1000, 100000):
+            boxes = fake_page_boxes(num_boxes, scale, rng)
+            indices = np.arange(len(boxes))
+
+            def run_legacy(kind='quicksort'):
+                res = []
+                legacy_recursive_xy_cut(boxes, indices, res, kind)
+                return [int(i) for i in res]
+
+            def run_recursive():
+                res = []
+                recursive_xy_cut(boxes, indices, res)
+                return [int(i) for i in res]
+
+            legacy_time, legacy_res = timeit(run_legacy, args.repeat)
+            recursive_time, recursive_res = timeit(run_recursive, args.repeat)
+            new_time, new_res = timeit(lambda: xy_cut(boxes), args.repeat)
+            stable_res = run_legacy('stable')
+            print(f'  grid {scale:>6}: legacy {legacy_time * 1000:8.2f} ms, '
+                  f'recursive (vectorized profile) {recursive_time * 1000:8.2f} ms, '
+                  f'iterative {new_time * 1000:8.2f} ms')
+            print(f'    recursive == legacy: {recursive_res == legacy_res}, '
+                  f'iterative == legacy: {new_res == legacy_res}, '
+                  f'iterative == legacy (stable argsort): {new_res == stable_res}')
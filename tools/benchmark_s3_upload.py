@@ -0,0 +1,78 @@
+"""Compare one-by-one and parallel uploads of parse results.
+
+Runs against the S3 configured in the environment (S3_BUCKET_NAME, S3_ENDPOINT_URL
+for MinIO...), or against a local moto server with --moto.
+"""
+from argparse import ArgumentParser
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'api'))
+
+
+def start_moto():
+    from moto.server import ThreadedMotoServer
+
+    server = ThreadedMotoServer(port=0)
+    server.start()
+    host, port = server.get_host_and_port()
+    os.environ.update({
+        'S3_ENDPOINT_URL': f'http://{host}:{port}',
+        'S3_USE_SSL': 'false',
+        'S3_BUCKET_NAME': os.environ.get('S3_BUCKET_NAME', 'monkeyocr-benchmark'),
+        'AWS_ACCESS_KEY_ID': 'testing',
+        'AWS_SECRET_ACCESS_KEY': 'testing',
+    })
+    return server
+
+
+if __name__ == '__main__':
+    parser = ArgumentParser()
+    parser.add_argument('--files', type=int, default=300, help='files of the benchmarked result')
+    parser.add_argument('--size', type=int, default=60 * 1024, help='bytes per file, about a figure crop')
+    parser.add_argument('--moto', action='store_true', help='upload to a local moto server')
+    parser.add_argument('--latency', type=float, default=0.0,
+                        help='seconds added to every request, a local server has none of the S3 round trip')
+    args = parser.parse_args()
+
+    server = start_moto() if args.moto else None
+    from s3_utils import S3Client
+
+    client = S3Client()
+    if args.moto:
+        client.s3_client.create_bucket(Bucket=client.bucket_name)
+    if args.latency:
+        client.s3_client.meta.events.register('before-send.s3', lambda **kwargs: time.sleep(args.latency))
+
+    with tempfile.TemporaryDirectory() as result_dir:
+        paths = []
+        for i in range(args.files):
+            path = os.path.join(result_dir, f'{i}.jpg')
+            with open(path, 'wb') as f:
+                f.write(os.urandom(args.size))
+            paths.append(path)
+
+        prefix = f'{client.prefix}/benchmark/{int(time.time())}'
+        start = time.perf_counter()
+        for i, path in enumerate(paths):
+            key = f'{prefix}/serial/{i}.jpg'
+            client.upload_file(path, key)
+            client.generate_presigned_url(key, expiration=86400)
+        serial = time.perf_counter() - start
+
+        keys = [f'{prefix}/parallel/{i}.jpg' for i in range(len(paths))]
+        start = time.perf_counter()
+        size = client.upload_files([(path, key, None) for path, key in zip(paths, keys)])
+        urls = client.generate_presigned_urls(keys, expiration=86400)
+        parallel = time.perf_counter() - start
+
+        uploaded = client.list_objects(f'{prefix}/parallel/', max_keys=len(keys) + 1)
+        print(f'files: {args.files} x {args.size} bytes, concurrency: {client.upload_concurrency}')
+        print(f'  one by one   : {serial:8.2f} s')
+        print(f'  upload_files : {parallel:8.2f} s, {size} bytes, {len(uploaded)} objects, {len(urls)} urls')
+
+    client.close()
+    if server is not None:
+        server.stop()
@@ -0,0 +1,60 @@
+from argparse import ArgumentParser
+import json
+import time
+
+from magic_pdf.libs import json_serializer
+from magic_pdf.libs.json_serializer import (compress_chunks, iter_dumps_dict,
+                                            loads)
+
+
+def timeit(fn, repeat):
+    cost = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        out = fn()
+        cost += time.perf_counter() - start
+    return cost / repeat, out
+
+
+def scale_middle_json(middle_json, pages):
+    """The middle json with its pages repeated up to `pages` pages, the repetition
+    flatters the brotli ratio, compare it on a real document of that size."""
+    pdf_info = middle_json['pdf_info']
+    return dict(middle_json, pdf_info=[pdf_info[i % len(pdf_info)] for i in range(pages)])
+
+
+if __name__ == '__main__':
+    parser = ArgumentParser()
+    parser.add_argument('middle_json', help='a *_middle.json written by parse.py')
+    parser.add_argument('--pages', type=int, default=1000, help='pages of the benchmarked document')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    with open(args.middle_json, 'rb') as f:
+        middle_json = scale_middle_json(json.loads(f.read()), args.pages)
+
+    def legacy():
+        return json.dumps(middle_json, ensure_ascii=False, indent=4).encode('utf-8')
+
+    def stdlib_compact():
+        orjson = json_serializer.orjson
+        json_serializer.orjson = None
+        try:
+            return b''.join(iter_dumps_dict(middle_json, 'pdf_info'))
+        finally:
+            json_serializer.orjson = orjson
+
+    cases = [
+        ('indent 4 (legacy)', legacy, False),
+        ('compact, json module', stdlib_compact, False),
+        ('compact' + (', orjson' if json_serializer.orjson else ', json module'),
+         lambda: b''.join(iter_dumps_dict(middle_json, 'pdf_info')), False),
+        ('compact + brotli', lambda: b''.join(compress_chunks(iter_dumps_dict(middle_json, 'pdf_info'))), True),
+    ]
+    print(f'pages: {args.pages}')
+    for name, fn, compressed in cases:
+        dump_time, data = timeit(fn, args.repeat)
+        load_time, loaded = timeit(lambda: loads(data, compressed), args.repeat)
+        same = 'identical' if loaded == middle_json else 'differs'
+        print(f'  {name:<24}: {len(data) / 2 ** 20:9.3f} MB, dump {dump_time * 1000:9.2f} ms, '
+              f'load {load_time * 1000:9.2f} ms ({same} after load)')
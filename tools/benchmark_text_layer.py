@@ -0,0 +1,127 @@
+from argparse import ArgumentParser
+import copy
+import time
+
+import fitz
+
+from magic_pdf.libs.boxbase import calculate_iou
+from magic_pdf.pdf_parse_union_core_v2_llm import (calculate_char_in_span,
+                                                   fill_char_in_spans)
+from magic_pdf.pre_proc.ocr_span_list_modify import check_chars_is_overlap_in_span
+
+
+def legacy_check_chars_is_overlap_in_span(chars):
+    for i in range(len(chars)):
+        for j in range(i + 1, len(chars)):
+            if calculate_iou(chars[i]['bbox'], chars[j]['bbox']) > 0.35:
+                return True
+    return False
+
+
+def legacy_chars_to_content(span):
+    """`chars_to_content` with the `list.index` lookup it used to have, without the text clean up."""
+    if len(span['chars']) == 0:
+        pass
+    elif legacy_check_chars_is_overlap_in_span(span['chars']):
+        pass
+    else:
+        span['chars'] = sorted(span['chars'], key=lambda x: (x['bbox'][0] + x['bbox'][2]) / 2)
+        char_width_sum = sum([char['bbox'][2] - char['bbox'][0] for char in span['chars']])
+        char_avg_width = char_width_sum / len(span['chars'])
+        content = ''
+        for char in span['chars']:
+            char1 = char
+            char2 = span['chars'][span['chars'].index(char) + 1] if span['chars'].index(char) + 1 < len(span['chars']) else None
+            if char2 and char2['bbox'][0] - char1['bbox'][2] > char_avg_width * 0.25 and char['c'] != ' ' and char2['c'] != ' ':
+                content += f"{char['c']} "
+            else:
+                content += char['c']
+        span['content'] = content
+    del span['chars']
+
+
+def legacy_fill_char_in_spans(spans, all_chars):
+    """The full char x span scan of `fill_char_in_spans`."""
+    spans = sorted(spans, key=lambda x: x['bbox'][1])
+    for char in all_chars:
+        for span in spans:
+            if calculate_char_in_span(char['bbox'], span['bbox'], char['c']):
+                span['chars'].append(char)
+                break
+    empty_spans = []
+    for span in spans:
+        legacy_chars_to_content(span)
+        if len(span['content']) * span['height'] < span['width'] * 0.5:
+            empty_spans.append(span)
+        del span['height'], span['width']
+    return empty_spans
+
+
+def fake_dense_page(lines, columns, chars_per_line):
+    """A born-digital page with `columns` columns of `lines` text lines each."""
+    width = 200 * columns + 100
+    doc = fitz.open()
+    page = doc.new_page(width=width, height=lines * 7 + 100)
+    text = ('lorem ipsum dolor sit amet, consectetur adipiscing elit ' * 10)[:chars_per_line]
+    for c in range(columns):
+        for r in range(lines):
+            page.insert_text((50 + c * 200, 60 + r * 7), text, fontsize=5)
+    return page
+
+
+def page_chars_and_spans(page):
+    """Chars as `txt_spans_extract_v2` collects them and one text span per pdf line."""
+    all_chars = []
+    spans = []
+    for block in page.get_text('rawdict', flags=fitz.TEXTFLAGS_TEXT)['blocks']:
+        for line in block['lines']:
+            for span in line['spans']:
+                all_chars.extend(span['chars'])
+            x0, y0, x1, y1 = line['bbox']
+            spans.append({'bbox': [x0 - 1, y0 - 1, x1 + 1, y1 + 1], 'content': '', 'type': 'text'})
+    for span in spans:
+        span['chars'] = []
+        span['height'] = span['bbox'][3] - span['bbox'][1]
+        span['width'] = span['bbox'][2] - span['bbox'][0]
+    return all_chars, spans
+
+
+def timeit(fn, repeat):
+    cost = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        out = fn()
+        cost += time.perf_counter() - start
+    return cost / repeat, out
+
+
+if __name__ == '__main__':
+    parser = ArgumentParser()
+    parser.add_argument('--lines', type=int, nargs='+', default=[50, 150])
+    parser.add_argument('--columns', type=int, default=2)
+    parser.add_argument('--chars-per-line', type=int, default=60)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    for lines in args.lines:
+        page = fake_dense_page(lines, args.columns, args.chars_per_line)
+        all_chars, spans = page_chars_and_spans(page)
+
+        def run(fill):
+            page_spans = copy.deepcopy(spans)
+            fill(page_spans, all_chars)
+            return [span['content'] for span in page_spans]
+
+        legacy_time, legacy_contents = timeit(lambda: run(legacy_fill_char_in_spans), args.repeat)
+        new_time, new_contents = timeit(lambda: run(fill_char_in_spans), args.repeat)
+        # the ligature / U+FFFD clean up of chars_to_content does not touch this text
+        same = 'identical' if legacy_contents == new_contents else 'differs'
+        print(f'chars: {len(all_chars)}, spans: {len(spans)}')
+        print(f'  legacy : {legacy_time * 1000:9.2f} ms')
+        print(f'  sweep  : {new_time * 1000:9.2f} ms ({same} span contents)')
+
+        overlapping = sorted(all_chars, key=lambda c: c['bbox'][0])[:2000]
+        legacy_time, legacy_res = timeit(lambda: legacy_check_chars_is_overlap_in_span(overlapping), args.repeat)
+        new_time, new_res = timeit(lambda: check_chars_is_overlap_in_span(overlapping), args.repeat)
+        print(f'  overlap check of {len(overlapping)} chars: legacy {legacy_time * 1000:.2f} ms, '
+              f'sorted {new_time * 1000:.2f} ms ({legacy_res} / {new_res})')